@@ -0,0 +1,217 @@
+"""Benchmark the connection adapters end to end against the stub broker.
+
+Starts tests/stub_broker.py in its own process and, for each adapter, message
+size and prefetch count, declares a queue and reports:
+
+- publish: Messages published per second, up to the Queue.DeclareOk of a
+  passive Queue.Declare sent after the last message
+- consume: Messages consumed and acknowledged per second
+- latency: The median and 99th percentile milliseconds from publishing a
+  message to its delivery, one message at a time. The select and blocking
+  adapters write the Basic.Ack of a delivery and the next publish as two
+  writes and, as pika does not set TCP_NODELAY, Nagle's algorithm holds the
+  publish back until the broker's delayed ACK, about 40 ms on Linux
+
+A prefetch count of 0 leaves the channel without a QoS limit. Tornado is
+benchmarked when it is installed. The results are written as JSON to the
+output file.
+
+Usage: python benchmarks/adapter_benchmark.py [output] [messages]
+
+"""
+import functools
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pika
+from pika import adapters
+
+BROKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                      'tests', 'stub_broker.py')
+
+SIZES = [64, 4096, 131072]
+PREFETCH_COUNTS = [1, 100, 0]
+ROUND_TRIPS = 100
+
+
+class AsyncScenario(object):
+    """Runs the scenario with an asynchronous adapter, each step started
+    from the callback of the one before it.
+
+    """
+    def __init__(self, connection_class, parameters, queue, body, prefetch,
+                 messages):
+        self.queue = queue
+        self.body = body
+        self.prefetch = prefetch
+        self.messages = messages
+        self.result = dict()
+        self.latencies = list()
+        self.received = 0
+        self.started = None
+        self.channel = None
+        self.connection = connection_class(parameters, self.on_open)
+
+    def run(self):
+        self.connection.ioloop.start()
+        return self.result, self.latencies
+
+    def on_open(self, connection):
+        connection.channel(self.on_channel_open)
+
+    def on_channel_open(self, channel):
+        self.channel = channel
+        channel.queue_declare(self.on_queue_declared, self.queue)
+
+    def on_queue_declared(self, frame):
+        if self.prefetch:
+            self.channel.basic_qos(self.on_qos_ok,
+                                   prefetch_count=self.prefetch)
+        else:
+            self.on_qos_ok(None)
+
+    def on_qos_ok(self, frame):
+        self.started = time.time()
+        for count in xrange(self.messages):
+            self.channel.basic_publish('', self.queue, self.body)
+        self.channel.queue_declare(self.on_published, self.queue,
+                                   passive=True)
+
+    def on_published(self, frame):
+        self.result['publish'] = self.messages / (time.time() - self.started)
+        self.started = time.time()
+        self.channel.basic_consume(self.on_message, self.queue)
+
+    def on_message(self, channel, method, properties, body):
+        channel.basic_ack(method.delivery_tag)
+        self.received += 1
+        if self.received < self.messages:
+            return
+        if self.received == self.messages:
+            self.result['consume'] = (self.messages /
+                                      (time.time() - self.started))
+        else:
+            self.latencies.append(time.time() - self.started)
+        if len(self.latencies) == ROUND_TRIPS:
+            channel.queue_delete(self.on_queue_deleted, self.queue)
+            return
+        self.started = time.time()
+        channel.basic_publish('', self.queue, self.body)
+
+    def on_queue_deleted(self, frame):
+        self.connection.close()
+
+
+def async_scenario(connection_class, *args):
+    """Run the scenario with an asynchronous adapter"""
+    return AsyncScenario(connection_class, *args).run()
+
+
+def blocking_scenario(parameters, queue, body, prefetch, messages):
+    """Run the scenario with BlockingConnection"""
+    result, latencies, received = dict(), list(), list()
+    connection = pika.BlockingConnection(parameters)
+    channel = connection.channel()
+    channel.queue_declare(queue=queue)
+    if prefetch:
+        channel.basic_qos(prefetch_count=prefetch)
+
+    started = time.time()
+    for count in xrange(messages):
+        channel.basic_publish('', queue, body)
+    channel.queue_declare(queue=queue, passive=True)
+    result['publish'] = messages / (time.time() - started)
+
+    def on_message(channel, method, properties, body):
+        channel.basic_ack(method.delivery_tag)
+        received.append(time.time())
+
+    started = time.time()
+    consumer_tag = channel.basic_consume(on_message, queue)
+    while len(received) < messages:
+        connection.process_data_events()
+    result['consume'] = messages / (time.time() - started)
+
+    for count in xrange(ROUND_TRIPS):
+        started = time.time()
+        channel.basic_publish('', queue, body)
+        while len(received) == messages + count:
+            connection.process_data_events()
+        latencies.append(received[-1] - started)
+
+    channel.basic_cancel(consumer_tag)
+    channel.queue_delete(queue=queue)
+    connection.close()
+    return result, latencies
+
+
+def connection_adapters():
+    """Return the adapters to benchmark and the functions running the
+    scenario with them
+
+    """
+    values = [('select', pika.SelectConnection),
+              ('blocking', None),
+              ('asyncore', pika.AsyncoreConnection),
+              ('tornado', adapters.TornadoConnection)]
+    for name, connection_class in values:
+        if name == 'blocking':
+            yield name, blocking_scenario
+        elif connection_class:
+            yield name, functools.partial(async_scenario, connection_class)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    output = sys.argv[1] if len(sys.argv) > 1 else 'adapter_benchmark.json'
+    messages = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    # Large messages are published faster than they are written, keep pika's
+    # write buffer warnings out of the results
+    logging.basicConfig(level=logging.ERROR)
+    broker = subprocess.Popen([sys.executable, BROKER],
+                              stdout=subprocess.PIPE)
+    try:
+        parameters = pika.ConnectionParameters(
+            '127.0.0.1', int(broker.stdout.readline()))
+        results = list()
+        print '%-9s %7s %8s %10s %10s %8s %8s' % \
+              ('adapter', 'size', 'prefetch', 'publish/s', 'consume/s',
+               'p50 ms', 'p99 ms')
+        for name, scenario in connection_adapters():
+            for size in SIZES:
+                for prefetch in PREFETCH_COUNTS:
+                    queue = 'benchmark.%s.%i.%i' % (name, size, prefetch)
+                    result, latencies = scenario(parameters, queue,
+                                                 'x' * size, prefetch,
+                                                 messages)
+                    result.update({'adapter': name,
+                                   'size': size,
+                                   'prefetch': prefetch,
+                                   'messages': messages,
+                                   'latency_p50': percentile(latencies, 0.5),
+                                   'latency_p99': percentile(latencies,
+                                                             0.99)})
+                    results.append(result)
+                    print '%-9s %7i %8i %10.0f %10.0f %8.3f %8.3f' % \
+                          (name, size, prefetch, result['publish'],
+                           result['consume'], result['latency_p50'] * 1000,
+                           result['latency_p99'] * 1000)
+        with open(output, 'w') as handle:
+            json.dump(results, handle, indent=2, sort_keys=True)
+    finally:
+        broker.terminate()
+        broker.wait()
+
+
+if __name__ == '__main__':
+    main()
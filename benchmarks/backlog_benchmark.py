@@ -0,0 +1,55 @@
+"""Benchmark the memory held by a backlog of buffered deliveries.
+
+Decodes the frames of delivered messages with frame.decode_frame, the way
+the connection does, and keeps the Basic.Deliver method, the properties and
+the body of each message, as Channel._pending does for a consumer with a
+large prefetch backlog. Reports the growth of the peak resident memory of
+the process and the bytes held per message.
+
+Usage: python benchmarks/backlog_benchmark.py [messages] [body_size]
+
+"""
+import os
+import resource
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pika import frame
+from pika import spec
+
+
+def delivery(delivery_tag, body_size):
+    """Return the marshaled frames of a delivered message"""
+    return (frame.Method(1, spec.Basic.Deliver('ctag', delivery_tag, False,
+                                               'events',
+                                               'orders.created')).marshal() +
+            frame.Header(1, body_size,
+                         spec.BasicProperties(content_type='text/plain',
+                                              delivery_mode=2)).marshal() +
+            frame.Body(1, 'x' * body_size).marshal())
+
+
+def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    body_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    values = [delivery(delivery_tag, body_size)
+              for delivery_tag in xrange(1, messages + 1)]
+    start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    pending = list()
+    for value in values:
+        offset = 0
+        frames = list()
+        while offset < len(value):
+            consumed, frame_value = frame.decode_frame(value, offset)
+            offset += consumed
+            frames.append(frame_value)
+        pending.append((frames[0].method, frames[1].properties,
+                        frames[2].fragment))
+    growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start
+    print '%i buffered deliveries: %.1f MB, %i bytes/message' % \
+          (messages, growth / 1024.0, growth * 1024 / messages)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Benchmark the inbound path for large message bodies.
+
+Feeds the frames of delivered messages to Connection._on_data_available in
+reads of up to READ_SIZE bytes, the way the adapters pass on socket reads, and
+reports the seconds per message and the peak resident memory of the
+process. Each mode runs in its own process so the peak memory of one does
+not hide the other:
+
+- str: Bodies are joined from their frames and passed on as str
+- zero-copy: Channel.set_zero_copy_bodies, bodies are copied into a buffer
+  allocated for the body size and passed on as memoryview objects
+- stream: basic_consume with on_chunk and on_end, each body frame is passed
+  on as it arrives and the body is never held whole
+
+Usage: python benchmarks/body_benchmark.py [megabytes] [messages]
+
+"""
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import mock
+
+from pika import connection
+from pika import frame
+from pika import spec
+
+FRAME_MAX = 131072
+READ_SIZE = 262144
+
+
+def message_reads(body_size):
+    """Return the reads a delivered message arrives in, the method and
+    header frames and then READ_SIZE bytes of body frames at a time, without
+    holding the whole message in memory
+
+    """
+    yield (frame.Method(1, spec.Basic.Deliver('ctag', 1, False, 'ex',
+                                              'rk')).marshal() +
+           frame.Header(1, body_size, spec.BasicProperties()).marshal())
+    fragment_size = FRAME_MAX - 8
+    frames_per_read = READ_SIZE // FRAME_MAX
+    data = frame.Body(1, 'x' * fragment_size).marshal() * frames_per_read
+    while body_size >= fragment_size * frames_per_read:
+        yield data
+        body_size -= fragment_size * frames_per_read
+    while body_size:
+        yield frame.Body(1, 'x' * min(body_size, fragment_size)).marshal()
+        body_size -= min(body_size, fragment_size)
+
+
+def bench(megabytes, messages, mode):
+    with mock.patch.object(connection.Connection, '_connect'):
+        conn = connection.Connection()
+    conn._flush_outbound = mock.Mock()
+    conn._set_connection_state(conn.CONNECTION_OPEN)
+    channel = conn._create_channel(1, None)
+    conn._channels[1] = channel
+    conn._add_channel_callbacks(1)
+    channel._add_callbacks()
+    channel._set_state(channel.OPEN)
+    channel.set_zero_copy_bodies(mode == 'zero-copy')
+    received = list()
+    streamed = [0]
+
+    def on_message(channel, method, properties, body):
+        received.append(len(body))
+
+    def on_chunk(channel, chunk):
+        streamed[0] += len(chunk)
+
+    def on_end(channel, method):
+        received.append(streamed[0])
+        streamed[0] = 0
+
+    if mode == 'stream':
+        channel.basic_consume(None, consumer_tag='ctag', on_chunk=on_chunk,
+                              on_end=on_end)
+    else:
+        channel.basic_consume(on_message, consumer_tag='ctag')
+    start = time.time()
+    for message in range(messages):
+        for data in message_reads(megabytes * 1048576):
+            conn._on_data_available(data)
+    duration = time.time() - start
+    assert received == [megabytes * 1048576] * messages
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    return duration / messages, peak
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    messages = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    if len(sys.argv) > 3:
+        duration, peak = bench(megabytes, messages, sys.argv[3])
+        print '%-10s %.4f sec/message, peak RSS %.0f MB' % (sys.argv[3],
+                                                            duration, peak)
+        return
+    print '%i MB bodies, %i messages' % (megabytes, messages)
+    for mode in ('str', 'zero-copy', 'stream'):
+        subprocess.check_call([sys.executable, __file__, str(megabytes),
+                               str(messages), mode])
+
+
+if __name__ == '__main__':
+    main()
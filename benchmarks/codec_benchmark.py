@@ -0,0 +1,289 @@
+"""Benchmark the frame codec and compare the results with a stored baseline.
+
+Runs the encoding and decoding of frames, field tables and message
+properties without a socket, the work the connection does for every frame it
+reads and writes, and reports for each case the operations per second and
+the objects each operation leaves allocated:
+
+- decode.*: frame.decode_frame of a Basic.Deliver, a Basic.Ack, a content
+  header and a body frame
+- marshal.*: Frame.marshal of a Basic.Publish, a content header and a body
+  frame
+- table.*: data.encode_table and data.decode_table of message headers
+- properties.*: BasicProperties.encode and BasicProperties.decode
+- stream.synthetic: frame.decode_frame over the frames of 100 deliveries,
+  reported in frames per second
+- stream.<file>: the same over each recorded stream given with --stream, the
+  bytes a client read from the broker, either raw or a pika.capture file
+
+Objects are the containers, such as frames, methods, tuples and dicts, still
+referenced by the results of an operation, counted by the garbage collector.
+
+The results are compared with the last baseline in the baseline file, a case
+regressing when its operations per second fall by more than the threshold,
+and the benchmark exits with status 1 if any did. --save appends the results
+to the baseline file as the new baseline.
+
+Usage: python benchmarks/codec_benchmark.py [--save] [--baseline FILE]
+           [--threshold PERCENT] [--stream FILE ...] [--ops N]
+
+"""
+import gc
+import json
+import optparse
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pika import capture
+from pika import data
+from pika import frame
+from pika import spec
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'codec_baseline.json')
+OPS = 20000
+REPEAT = 7
+THRESHOLD = 10.0
+
+# Operations run while counting the objects their results keep
+ALLOCATION_OPS = 1000
+
+HEADERS = {'traceparent': '00-4bf92f3577b34da6a3ce929d0e0e4736-'
+                          '00f067aa0ba902b7-01',
+           'x-b3-sampled': True,
+           'x-request-id': 'f058ebd6-02f7-4d3f-942e-904344e8cde5',
+           'x-retry': 0,
+           'x-death': [{'count': 1L, 'reason': 'rejected',
+                        'queue': 'orders', 'exchange': 'events',
+                        'routing-keys': ['orders.created']}]}
+
+PROPERTIES = spec.BasicProperties(content_type='application/json',
+                                  content_encoding='utf-8',
+                                  headers=HEADERS,
+                                  delivery_mode=2,
+                                  correlation_id='c0ffee',
+                                  message_id='42',
+                                  timestamp=1339000000,
+                                  app_id='orders')
+
+BODY = 'x' * 512
+
+
+def delivery_frames(delivery_tag):
+    """Return the frames of a delivered message"""
+    return [frame.Method(1, spec.Basic.Deliver('ctag1.0', delivery_tag, False,
+                                               'events', 'orders.created')),
+            frame.Header(1, len(BODY), PROPERTIES),
+            frame.Body(1, BODY)]
+
+
+def decoder(value):
+    """Return the operation decoding the marshaled frame value"""
+    marshaled = value.marshal()
+    decode_frame = frame.decode_frame
+
+    def operation():
+        return decode_frame(marshaled, 0)
+    return operation
+
+
+def stream_decoder(stream):
+    """Return the operation decoding every frame of stream, and the number
+    of frames in it
+
+    """
+    decode_frame = frame.decode_frame
+    frames = 0
+    offset = 0
+    while offset < len(stream):
+        consumed, value = decode_frame(stream, offset)
+        if not consumed:
+            break
+        offset += consumed
+        frames += 1
+    if not frames:
+        raise ValueError('No frames could be decoded from the stream')
+    end = offset
+
+    def operation():
+        values = list()
+        offset = 0
+        while offset < end:
+            consumed, value = decode_frame(stream, offset)
+            values.append(value)
+            offset += consumed
+        return values
+    return operation, frames
+
+
+def read_streams(path):
+    """Return the name and the bytes of each stream in the file at path, the
+    bytes read by each connection of a capture or the whole file
+
+    """
+    name = 'stream.%s' % os.path.basename(path)
+    with open(path, 'rb') as handle:
+        if handle.read(len(capture.MAGIC)) != capture.MAGIC:
+            return [(name, open(path, 'rb').read())]
+    values = [value for value in capture.streams(path) if value]
+    if len(values) == 1:
+        return [(name, values[0])]
+    return [('%s.%i' % (name, index), value)
+            for index, value in enumerate(values)]
+
+
+def cases(streams):
+    """Return the name, operation and frames per operation of each case
+
+    :param list streams: The paths of the recorded streams to decode
+    :rtype: list
+
+    """
+    deliver, header, body = delivery_frames(1)
+    ack = frame.Method(1, spec.Basic.Ack(1, True))
+    publish = frame.Method(1, spec.Basic.Publish(exchange='events',
+                                                 routing_key='orders.created'))
+    pieces = list()
+    data.encode_table(pieces, HEADERS)
+    table = ''.join(pieces)
+    properties = ''.join(PROPERTIES.encode())
+
+    def encode_table():
+        pieces = list()
+        data.encode_table(pieces, HEADERS)
+        return pieces
+
+    values = [('decode.deliver', decoder(deliver), 1),
+              ('decode.ack', decoder(ack), 1),
+              ('decode.header', decoder(header), 1),
+              ('decode.body', decoder(body), 1),
+              ('marshal.publish', publish.marshal, 1),
+              ('marshal.header', header.marshal, 1),
+              ('marshal.body', body.marshal, 1),
+              ('table.encode', encode_table, 1),
+              ('table.decode', lambda: data.decode_table(table, 0), 1),
+              ('properties.encode', PROPERTIES.encode, 1),
+              ('properties.decode',
+               lambda: spec.BasicProperties().decode(properties), 1)]
+
+    synthetic = ''.join(value.marshal() for delivery_tag in xrange(1, 101)
+                        for value in delivery_frames(delivery_tag))
+    recorded = [('stream.synthetic', synthetic)]
+    for path in streams:
+        recorded.extend(read_streams(path))
+    for name, stream in recorded:
+        operation, frames = stream_decoder(stream)
+        values.append((name, operation, frames))
+    return values
+
+
+def bench(operation, ops):
+    """Return the best operations per second of REPEAT runs"""
+    durations = list()
+    for run in xrange(REPEAT):
+        start = time.time()
+        for count in xrange(ops):
+            operation()
+        durations.append(time.time() - start)
+    return ops / min(durations)
+
+
+def allocations(operation):
+    """Return the objects the results of an operation keep allocated"""
+    gc.collect()
+    gc.disable()
+    try:
+        before = len(gc.get_objects())
+        results = [operation() for count in xrange(ALLOCATION_OPS)]
+        after = len(gc.get_objects())
+    finally:
+        gc.enable()
+    # The results list is one of the objects counted
+    return (after - before - 1) / float(len(results))
+
+
+def run(streams, ops):
+    """Run the cases and return their results by name"""
+    results = dict()
+    for name, operation, frames in cases(streams):
+        # Stream cases decode many frames in an operation, run fewer of them
+        count = max(1, ops / frames)
+        results[name] = {'ops': bench(operation, count) * frames,
+                         'objects': allocations(operation) / frames}
+    return results
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return list()
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def save_baseline(path, baselines, results):
+    baselines.append({'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                      'python': platform.python_version(),
+                      'results': results})
+    with open(path, 'w') as handle:
+        json.dump(baselines, handle, indent=2, sort_keys=True)
+
+
+def report(results, baseline, threshold):
+    """Print the results and their change from the baseline, returning the
+    names of the cases that regressed by more than threshold percent
+
+    """
+    regressions = list()
+    print '%-24s %12s %9s %12s %8s' % ('case', 'ops/s', 'objects',
+                                       'baseline', 'change')
+    for name in sorted(results):
+        result = results[name]
+        line = '%-24s %12.0f %9.2f' % (name, result['ops'], result['objects'])
+        if name in baseline:
+            change = (result['ops'] / baseline[name]['ops'] - 1) * 100
+            line += ' %12.0f %+7.1f%%' % (baseline[name]['ops'], change)
+            if change < -threshold:
+                line += '  REGRESSED'
+                regressions.append(name)
+        print line
+    return regressions
+
+
+def main():
+    parser = optparse.OptionParser(usage=__doc__.split('Usage: ')[1].strip())
+    parser.add_option('--baseline', default=BASELINE,
+                      help='The baseline file [%default]')
+    parser.add_option('--save', action='store_true', default=False,
+                      help='Store the results as the new baseline')
+    parser.add_option('--threshold', type='float', default=THRESHOLD,
+                      help='The percent fall in ops/s reported as a '
+                           'regression [%default]')
+    parser.add_option('--stream', action='append', default=list(),
+                      help='A recorded stream of frames to decode')
+    parser.add_option('--ops', type='int', default=OPS,
+                      help='The operations per run of a case [%default]')
+    options, args_unused = parser.parse_args()
+
+    baselines = load_baselines(options.baseline)
+    baseline = baselines[-1] if baselines else None
+    if baseline:
+        print 'Baseline of %s, Python %s' % (baseline['time'],
+                                             baseline['python'])
+    results = run(options.stream, options.ops)
+    regressions = report(results, baseline['results'] if baseline else {},
+                         options.threshold)
+    if options.save:
+        save_baseline(options.baseline, baselines, results)
+        print 'Saved the baseline to %s' % options.baseline
+    if regressions:
+        print '%i cases regressed by more than %.1f%%: %s' % \
+              (len(regressions), options.threshold, ', '.join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Benchmark the decoding of method and content header frames.
+
+Decodes marshaled frames with frame.decode_frame, the way the connection
+does for each frame it reads, and reports the microseconds per frame for:
+
+- deliver: The Basic.Deliver method frame of a delivered message
+- ack: The Basic.Ack method frame of a publisher confirm
+- header: The content header frame of a message with a few properties
+
+Usage: python benchmarks/decode_benchmark.py [frames]
+
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pika import frame
+from pika import spec
+
+REPEAT = 15
+
+FRAMES = [('deliver',
+           frame.Method(1, spec.Basic.Deliver('ctag1.0123456789', 1, False,
+                                              'events',
+                                              'orders.created')).marshal()),
+          ('ack', frame.Method(1, spec.Basic.Ack(1, True)).marshal()),
+          ('header',
+           frame.Header(1, 100,
+                        spec.BasicProperties(content_type='application/json',
+                                             delivery_mode=2,
+                                             app_id='orders',
+                                             message_id='42')).marshal())]
+
+
+def bench(frames, value):
+    decode_frame = frame.decode_frame
+    start = time.time()
+    for count in xrange(frames):
+        decode_frame(value, 0)
+    return (time.time() - start) / frames
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    for name, value in FRAMES:
+        duration = min([bench(frames, value) for run in range(REPEAT)])
+        print '%-8s %.2f usec/frame' % (name, duration * 1000000)
+
+
+if __name__ == '__main__':
+    main()
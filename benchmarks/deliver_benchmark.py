@@ -0,0 +1,83 @@
+"""Benchmark the decoding of delivered messages' methods and properties.
+
+Decodes the Basic.Deliver method and the content header properties of
+messages delivered to a few consumers from a few exchanges with a few
+routing keys, the way frame.decode_frame does for each delivery, and
+reports the messages decoded per second. It then keeps the decoded methods
+and properties of a batch of messages, as a consumer that queues messages
+for a worker pool does, and reports how many distinct string objects they
+hold and the memory those take.
+
+Usage: python benchmarks/deliver_benchmark.py [messages]
+
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pika import spec
+
+REPEAT = 5
+BATCH = 10000
+
+
+def encoded_messages(count):
+    """Return the encoded method and properties of count deliveries"""
+    messages = list()
+    for delivery_tag in xrange(1, count + 1):
+        method = spec.Basic.Deliver('ctag%i.%s' % (delivery_tag % 4,
+                                                   'x' * 24),
+                                    delivery_tag, False,
+                                    'events.%i' % (delivery_tag % 3),
+                                    'orders.created.eu-west-%i' %
+                                    (delivery_tag % 5))
+        properties = spec.BasicProperties(content_type='application/json',
+                                          content_encoding='utf-8',
+                                          delivery_mode=2,
+                                          app_id='orders',
+                                          message_id=str(delivery_tag))
+        messages.append((''.join(method.encode()),
+                         ''.join(properties.encode())))
+    return messages
+
+
+def bench(messages):
+    start = time.time()
+    for method, properties in messages:
+        spec.Basic.Deliver().decode(method)
+        spec.BasicProperties().decode(properties)
+    return len(messages) / (time.time() - start)
+
+
+def retained(messages):
+    """Return the number of distinct str and unicode objects held by the
+    decoded methods and properties of messages, and their size in bytes
+
+    """
+    values = list()
+    for method, properties in messages:
+        values.append(spec.Basic.Deliver().decode(method))
+        values.append(spec.BasicProperties().decode(properties))
+    strings = dict()
+    for value in values:
+        for name in value.__slots__:
+            attribute = getattr(value, name)
+            if isinstance(attribute, basestring):
+                strings[id(attribute)] = sys.getsizeof(attribute)
+    return len(strings), sum(strings.values())
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    messages = encoded_messages(count)
+    rate = max([bench(messages) for run in range(REPEAT)])
+    print '%.0f deliveries decoded/s' % rate
+    objects, size = retained(messages[:BATCH])
+    print '%i deliveries held: %i string objects, %.1f KB' % \
+          (BATCH, objects, size / 1024.0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark the assembly of delivered messages by frame.Dispatcher.
+
+Feeds the Basic.Deliver method frame, the content header frame and the body
+frames of each message to a channel's Dispatcher and reports the messages
+assembled and dispatched to the _on_basic_deliver callback per second.
+
+Usage: python benchmarks/dispatch_benchmark.py [messages] [body_size]
+
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pika import callback
+from pika import frame
+from pika import spec
+
+FRAME_MAX = 131072
+REPEAT = 5
+
+
+def frames(body_size):
+    """Return the frames of a delivered message with a body of body_size"""
+    body = 'x' * body_size
+    values = [frame.Method(1, spec.Basic.Deliver('ctag', 1, False, 'ex',
+                                                 'rk')),
+              frame.Header(1, body_size, spec.BasicProperties())]
+    for offset in range(0, body_size, FRAME_MAX - 8):
+        values.append(frame.Body(1, body[offset:offset + FRAME_MAX - 8]))
+    return values
+
+
+def bench(messages, body_size):
+    callbacks = callback.CallbackManager()
+    dispatcher = frame.Dispatcher(callbacks)
+    received = [0]
+
+    def on_deliver(method_frame, header_frame, body):
+        received[0] += 1
+
+    callbacks.add(1, '_on_basic_deliver', on_deliver, False, dispatcher)
+    values = frames(body_size)
+    process = dispatcher.process
+    start = time.time()
+    for message in xrange(messages):
+        for value in values:
+            process(value)
+    duration = time.time() - start
+    assert received[0] == messages
+    return messages / duration
+
+
+def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    body_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    rate = max([bench(messages, body_size) for run in range(REPEAT)])
+    print '%i byte bodies: %.0f messages/s' % (body_size, rate)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark publishing the same message to many routing keys.
+
+Publishes a message to WIDTHS routing keys at a time on an open channel
+whose outbound buffer is discarded after every write, and reports the time
+taken per routing key:
+
+- basic_publish: The message is published with basic_publish once for
+  each routing key, marshaling its content frames every time
+- basic_publish_multi: The content frames are marshaled once and sent for
+  every routing key
+
+Usage: python benchmarks/fanout_benchmark.py [body_size]
+
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import mock
+
+from pika import connection
+from pika import spec
+
+MESSAGES = 200
+REPEAT = 5
+WIDTHS = (1, 10, 50)
+
+
+def open_channel():
+    """Return an open channel on a connection that discards what is written
+    to its outbound buffer
+
+    """
+    with mock.patch.object(connection.Connection, '_connect'):
+        conn = connection.Connection()
+    conn._flush_outbound = conn.outbound_buffer.flush
+    conn._set_connection_state(conn.CONNECTION_OPEN)
+    conn._body_max_length = conn._get_body_frame_max_length()
+    channel = conn._create_channel(1, None)
+    channel._set_state(channel.OPEN)
+    return channel
+
+
+def bench(width, body, multi):
+    channel = open_channel()
+    routing_keys = ['routing.key.%i' % value for value in range(width)]
+    properties = spec.BasicProperties(content_type='text/plain')
+    start = time.time()
+    for message in xrange(MESSAGES):
+        if multi:
+            channel.basic_publish_multi('ex', routing_keys, body, properties)
+        else:
+            for routing_key in routing_keys:
+                channel.basic_publish('ex', routing_key, body, properties)
+    return (time.time() - start) * 1000000 / (MESSAGES * width)
+
+
+def main():
+    body = 'x' * (int(sys.argv[1]) if len(sys.argv) > 1 else 65536)
+    print '%i byte body, usec per routing key' % len(body)
+    for width in WIDTHS:
+        print ('%3i routing keys: basic_publish %.1f, '
+               'basic_publish_multi %.1f' % (
+                   width,
+                   min([bench(width, body, False) for run in range(REPEAT)]),
+                   min([bench(width, body, True) for run in range(REPEAT)])))
+
+
+if __name__ == '__main__':
+    main()
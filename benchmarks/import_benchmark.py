@@ -0,0 +1,59 @@
+"""Benchmark the time it takes to import pika.
+
+Runs each statement in a new interpreter, the way a short-lived command line
+tool or a freshly forked worker starts, and reports the best wall time of
+the interpreter and the modules the statement loaded:
+
+- import pika
+- import pika and read pika.BlockingConnection
+- import pika and read pika.SelectConnection
+
+Usage: python benchmarks/import_benchmark.py [runs]
+
+"""
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+STATEMENTS = ['import pika',
+              'import pika; pika.BlockingConnection',
+              'import pika; pika.SelectConnection']
+
+# Prints the modules loaded by the statement, run after it
+MODULES = ('import sys; '
+           'print len([name for name in set(sys.modules) - before '
+           'if sys.modules[name]]), '
+           'len([name for name in sys.modules if name.startswith("pika") '
+           'and sys.modules[name]])')
+
+
+def bench(runs, statement):
+    """Return the best wall time of the interpreter running statement"""
+    durations = list()
+    for run in range(runs):
+        start = time.time()
+        subprocess.check_call([sys.executable, '-c', statement], cwd=ROOT)
+        durations.append(time.time() - start)
+    return min(durations)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    baseline = bench(runs, 'pass')
+    print 'interpreter start: %.1f ms' % (baseline * 1000)
+    for statement in STATEMENTS:
+        duration = bench(runs, statement)
+        modules, pika_modules = subprocess.check_output(
+            [sys.executable, '-c',
+             'import sys; before = set(sys.modules); %s; %s' % (statement,
+                                                               MODULES)],
+            cwd=ROOT).split()
+        print '%-40s +%.1f ms, %s modules (%s pika)' % \
+              (statement, (duration - baseline) * 1000, modules, pika_modules)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Benchmark the encoding of the content header frames of messages that
+share most of their properties.
+
+Reports the time taken to create the properties of a message and marshal
+its content header frame:
+
+- BasicProperties: All of the properties are encoded for every message
+- PropertiesTemplate: The shared properties are encoded once, only the
+  message id and timestamp are encoded for every message
+
+Usage: python benchmarks/properties_benchmark.py
+
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pika import frame
+from pika import spec
+from pika import templates
+
+NUMBER = 100000
+REPEAT = 5
+SHARED = {'content_type': 'application/json',
+          'content_encoding': 'utf-8',
+          'headers': {'tenant': 'acme', 'schema': 'order.v2', 'retries': 0},
+          'delivery_mode': 2,
+          'app_id': 'orders'}
+
+
+def main():
+    template = templates.PropertiesTemplate(spec.BasicProperties(**SHARED))
+
+    def basic_properties():
+        frame.Header(1, 100, spec.BasicProperties(message_id='m1',
+                                                  timestamp=1000,
+                                                  **SHARED)).marshal()
+
+    def properties_template():
+        frame.Header(1, 100, template.properties(message_id='m1',
+                                                 timestamp=1000)).marshal()
+
+    for name, function in (('BasicProperties', basic_properties),
+                           ('PropertiesTemplate', properties_template)):
+        duration = min(timeit.repeat(function, number=NUMBER, repeat=REPEAT))
+        print '%-18s %.2f usec/message' % (name, duration * 1000000 / NUMBER)
+
+
+if __name__ == '__main__':
+    main()
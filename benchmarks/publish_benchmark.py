@@ -0,0 +1,100 @@
+"""Benchmark Channel.basic_publish to a handful of destinations.
+
+Publishes small messages round robin to DESTINATIONS (exchange, routing
+key) pairs on an open channel, discarding the outbound buffer after every
+message, and reports the messages published per second:
+
+- encoded: The Basic.Publish method frame is built and marshaled for every
+  message
+- cached: The marshaled Basic.Publish frames are taken from the channel's
+  cache of recently used destinations
+
+It also reports the time taken to get the marshaled Basic.Publish frame of
+a destination both ways, and to marshal a heartbeat frame.
+
+Usage: python benchmarks/publish_benchmark.py [messages]
+
+"""
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import mock
+
+from pika import connection
+from pika import frame
+from pika import spec
+
+DESTINATIONS = [('exchange-%i' % (value % 3), 'routing.key.%i' % value)
+                for value in range(8)]
+REPEAT = 5
+
+
+def encoded_frame(channel):
+    """Return a _publish_frame replacement that builds a new frame every
+    time, the way basic_publish did before frames were cached
+
+    """
+    def publish_frame(exchange, routing_key, mandatory, immediate):
+        return frame.Method(channel.channel_number,
+                            spec.Basic.Publish(exchange=exchange,
+                                               routing_key=routing_key,
+                                               mandatory=mandatory,
+                                               immediate=immediate))
+    return publish_frame
+
+
+def open_channel(cached):
+    """Return an open channel on a connection that discards what is written
+    to its outbound buffer
+
+    """
+    with mock.patch.object(connection.Connection, '_connect'):
+        conn = connection.Connection()
+    conn._flush_outbound = conn.outbound_buffer.flush
+    conn._set_connection_state(conn.CONNECTION_OPEN)
+    conn._body_max_length = conn._get_body_frame_max_length()
+    channel = conn._create_channel(1, None)
+    channel._set_state(channel.OPEN)
+    if not cached:
+        channel._publish_frame = encoded_frame(channel)
+    return channel
+
+
+def bench(messages, cached):
+    publish = open_channel(cached).basic_publish
+    properties = spec.BasicProperties()
+    destinations = DESTINATIONS * (messages // len(DESTINATIONS))
+    start = time.time()
+    for exchange, routing_key in destinations:
+        publish(exchange, routing_key, 'body', properties)
+    return len(destinations) / (time.time() - start)
+
+
+def bench_frame(cached):
+    publish_frame = open_channel(cached)._publish_frame
+    exchange, routing_key = DESTINATIONS[0]
+
+    def marshal():
+        publish_frame(exchange, routing_key, False, False).marshal()
+
+    return min(timeit.repeat(marshal, number=100000, repeat=REPEAT)) * 10
+
+
+def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for mode, cached in (('encoded', False), ('cached', True)):
+        rate = max([bench(messages, cached) for run in range(REPEAT)])
+        print '%-8s %.0f messages/s, Basic.Publish frame %.2f usec' % (
+            mode, rate, bench_frame(cached))
+    heartbeat = frame.Heartbeat()
+    duration = min(timeit.repeat(heartbeat.marshal, number=100000,
+                                 repeat=REPEAT))
+    print 'Heartbeat.marshal %.3f usec' % (duration * 10)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Benchmark the socket read path of BaseConnection.
+
+A thread writes a stream of data into one end of a socket pair in chunks of
+a fixed size while the other end is read by a BaseConnection the way an
+IOLoop would drive it: wait for the socket to be readable, then call
+_handle_read. Each strategy reports the throughput, the number of poller
+waits and socket syscalls per MB read:
+
+- recv: A single socket.recv of frame_max bytes per readable event, the
+  read path before reads went into a preallocated buffer
+- recv_into: The current read path, reading a non-blocking socket into the
+  frame buffer with adaptive read sizes until it would block, up to
+  READ_BUDGET bytes per event
+
+Usage: python benchmarks/read_benchmark.py [megabytes] [chunk_size]
+
+"""
+import os
+import select
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pika import connection
+from pika.adapters import base_connection
+
+MB = 1048576
+
+
+class CountingSocket(object):
+    """Proxy a socket, counting the syscalls made through it"""
+    def __init__(self, sock, counts):
+        self.sock = sock
+        self.counts = counts
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def recv(self, *args):
+        self.counts['recv'] += 1
+        return self.sock.recv(*args)
+
+    def recv_into(self, *args):
+        self.counts['recv'] += 1
+        return self.sock.recv_into(*args)
+
+
+class Connection(base_connection.BaseConnection):
+    """Just enough of a BaseConnection to drive _handle_read"""
+    def __init__(self, sock, counts, legacy):
+        self.params = connection.ConnectionParameters()
+        self.socket = CountingSocket(sock, counts)
+        self.counts = counts
+        self.legacy = legacy
+        self.received = 0
+        self._capture = None
+        self.NON_BLOCKING_SOCKET = not legacy
+        self._read_size = self.READ_SIZE_MIN * 4
+        self._read_buffer = bytearray(self._read_size * 2)
+        self._read_view = memoryview(self._read_buffer)
+        self._frame_buffer = self._read_buffer
+        self._frame_offset = self._frame_end = 0
+
+    def _read_socket(self):
+        if self.legacy:
+            return self.socket.recv(self._buffer_size)
+        return super(Connection, self)._read_socket()
+
+    def _on_data_available(self, data):
+        self.received += len(data)
+        self._frame_offset = self._frame_end
+
+
+def writer(sock, total, chunk_size):
+    chunk = 'x' * chunk_size
+    sent = 0
+    while sent < total:
+        sock.sendall(chunk)
+        sent += chunk_size
+    sock.close()
+
+
+def bench(megabytes, chunk_size, legacy):
+    total = megabytes * MB
+    reader, sender = socket.socketpair()
+    if legacy:
+        reader.settimeout(1)
+    else:
+        reader.setblocking(0)
+    counts = {'recv': 0, 'poll': 0}
+    conn = Connection(reader, counts, legacy)
+    thread = threading.Thread(target=writer, args=(sender, total, chunk_size))
+    start = time.time()
+    thread.start()
+    while conn.received < total:
+        select.select([reader], [], [])
+        counts['poll'] += 1
+        conn._handle_read()
+    duration = time.time() - start
+    thread.join()
+    reader.close()
+    return duration, counts
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 4096
+    print '%i MB written in %i byte chunks' % (megabytes, chunk_size)
+    for name, legacy in (('recv', True), ('recv_into', False)):
+        duration, counts = bench(megabytes, chunk_size, legacy)
+        syscalls = sum(counts.values())
+        print ('%-10s %8.1f MB/s  %7.1f syscalls/MB (poll %.1f, recv %.1f)' %
+               (name, megabytes / duration, float(syscalls) / megabytes,
+                float(counts['poll']) / megabytes,
+                float(counts['recv']) / megabytes))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Benchmark the decoding and dispatch of a recorded workload.
+
+Replays a capture recorded with the capture connection parameter through a
+connection without a socket, as fast as the frames can be decoded and
+dispatched to the channels and consumers, and reports the best throughput
+of the runs in reads, frames and MB per second. With --profile, a last run
+times the decoding, the dispatch and the consumer callbacks of the frames
+with a pika.profiling.PhaseProfiler and prints its table.
+
+Usage: python benchmarks/replay_benchmark.py [--profile] capture [runs]
+
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pika import capture
+from pika import profiling
+
+MB = 1048576
+
+
+def main():
+    args = [value for value in sys.argv[1:] if value != '--profile']
+    if not args:
+        sys.exit(__doc__.split('Usage: ')[1].strip())
+    runs = int(args[1]) if len(args) > 1 else 5
+    replays = [capture.replay(args[0]) for run in range(runs)]
+    best = min(replays, key=lambda replayer: replayer.duration)
+    print '%i connections, %i reads, %i frames, %.1f MB' % \
+          (len(best.connections), best.reads, best.frames,
+           best.bytes_read / float(MB))
+    print '%.0f reads/s, %.0f frames/s, %.1f MB/s' % \
+          (best.reads / best.duration, best.frames / best.duration,
+           best.bytes_read / float(MB) / best.duration)
+    if '--profile' in sys.argv:
+        profiler = profiling.PhaseProfiler()
+        capture.Replayer(profiler=profiler).replay(args[0])
+        profiler.stop()
+        print
+        print profiler.report()
+
+
+if __name__ == '__main__':
+    main()
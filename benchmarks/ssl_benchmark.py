@@ -0,0 +1,148 @@
+"""Benchmark the SSL connection setup and read path of BaseConnection.
+
+Starts a local TLS server with a self-signed certificate created with the
+openssl command line tool and measures:
+
+- reconnect: Seconds to connect and complete the TLS handshake, wrapping
+  every socket with ssl.wrap_socket, which loads the certificates each time,
+  versus the shared SSLContext. Every handshake is a full one, the ssl
+  module of Python 2 can not resume sessions
+- latency: Seconds from the server writing a burst of small TLS records to
+  the client having read all of them, reading once per poller event versus
+  draining the records pending in the SSL layer
+
+Usage: python benchmarks/ssl_benchmark.py [iterations]
+
+"""
+import os
+import select
+import shutil
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pika import connection
+from pika.adapters import base_connection
+
+RECORD_SIZE = 512
+RECORDS = 64
+
+
+class Server(threading.Thread):
+    """Accept TLS connections, writing RECORDS records of RECORD_SIZE bytes
+    each time the client sends a byte.
+
+    """
+    def __init__(self, certfile):
+        super(Server, self).__init__()
+        self.daemon = True
+        self.certfile = certfile
+        self.listener = socket.socket()
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(16)
+        self.port = self.listener.getsockname()[1]
+        self.context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+        self.context.load_cert_chain(certfile)
+
+    def run(self):
+        while True:
+            sock, address = self.listener.accept()
+            handler = threading.Thread(target=self.handle, args=(sock,))
+            handler.daemon = True
+            handler.start()
+
+    def handle(self, sock):
+        try:
+            sock = self.context.wrap_socket(sock, server_side=True)
+            while sock.read(1):
+                for record in range(RECORDS):
+                    sock.write('x' * RECORD_SIZE)
+        except (socket.error, ssl.SSLError):
+            pass
+        sock.close()
+
+
+class Connection(base_connection.BaseConnection):
+    """Just enough of a BaseConnection to drive _wrap_socket and _read_ssl"""
+    def __init__(self, port):
+        self.params = connection.ConnectionParameters('127.0.0.1', port,
+                                                      ssl=True)
+        self.endpoint = ('127.0.0.1', port)
+        self.socket = None
+
+    def connect(self, legacy=False):
+        sock = socket.create_connection(self.endpoint)
+        if legacy:
+            self.socket = ssl.wrap_socket(sock)
+        else:
+            self.socket = self._wrap_socket(sock)
+
+    def close(self):
+        self.socket.close()
+
+
+def create_certificate(directory):
+    certfile = os.path.join(directory, 'server.pem')
+    subprocess.check_call(['openssl', 'req', '-x509', '-newkey', 'rsa:2048',
+                           '-nodes', '-days', '1', '-subj', '/CN=localhost',
+                           '-keyout', certfile, '-out', certfile],
+                          stdout=open(os.devnull, 'w'),
+                          stderr=subprocess.STDOUT)
+    return certfile
+
+
+def bench_reconnect(port, iterations, legacy):
+    conn = Connection(port)
+    start = time.time()
+    for iteration in range(iterations):
+        conn.connect(legacy)
+        conn.close()
+    return (time.time() - start) / iterations
+
+
+def bench_latency(port, iterations, drain):
+    conn = Connection(port)
+    conn.connect()
+    expected = RECORD_SIZE * RECORDS
+    total = 0
+    for iteration in range(iterations):
+        received = 0
+        start = time.time()
+        conn.socket.write('.')
+        while received < expected:
+            select.select([conn.socket], [], [], 1)
+            if drain:
+                received += len(conn._read_ssl())
+            else:
+                received += len(conn.socket.read(conn._buffer_size))
+        total += time.time() - start
+    conn.close()
+    return total / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    directory = tempfile.mkdtemp()
+    try:
+        server = Server(create_certificate(directory))
+        server.start()
+        for name, legacy in (('ssl.wrap_socket', True),
+                             ('shared SSLContext', False)):
+            print 'reconnect %-20s %.6f sec' % (
+                name, bench_reconnect(server.port, iterations, legacy))
+        for name, drain in (('single read', False), ('pending drain', True)):
+            print 'latency   %-20s %.6f sec' % (
+                name, bench_latency(server.port, iterations, drain))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
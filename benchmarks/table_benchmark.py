@@ -0,0 +1,80 @@
+"""Benchmark the encoding and decoding of field tables by pika.data.
+
+Encodes and decodes header tables of the kinds messages carry in practice
+and reports the microseconds per table:
+
+- tracing: The headers of a traced message, trace and span ids, baggage and
+  the sampling flag
+- x-death: The headers of a message dead-lettered three times, an array of
+  the tables RabbitMQ adds each time
+- nested: Arrays and tables nested eight deep
+
+Usage: python benchmarks/table_benchmark.py [tables]
+
+"""
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pika import data
+
+REPEAT = 5
+
+TRACING = {'traceparent': '00-4bf92f3577b34da6a3ce929d0e0e4736-'
+                          '00f067aa0ba902b7-01',
+           'tracestate': 'congo=t61rcWkgMzE,rojo=00f067aa0ba902b7',
+           'x-b3-traceid': '4bf92f3577b34da6a3ce929d0e0e4736',
+           'x-b3-spanid': '00f067aa0ba902b7',
+           'x-b3-sampled': True,
+           'baggage': 'userId=alice,serverNode=DF%2028,isProduction=false',
+           'x-request-id': 'f058ebd6-02f7-4d3f-942e-904344e8cde5',
+           'x-retry': 0}
+
+X_DEATH = {'x-death': [{'count': 1L, 'reason': reason, 'queue': queue,
+                        'time': datetime(2012, 6, 1, 12, 0, second),
+                        'exchange': 'events',
+                        'routing-keys': ['orders.created', 'orders.eu']}
+                       for second, (reason, queue) in
+                       enumerate([('rejected', 'orders'),
+                                  ('expired', 'orders.retry'),
+                                  ('rejected', 'orders')])],
+           'x-first-death-reason': 'rejected',
+           'x-first-death-queue': 'orders',
+           'x-first-death-exchange': 'events'}
+
+NESTED = {'value': 'leaf'}
+for depth in range(8):
+    NESTED = {'level': depth, 'children': [NESTED, 'sibling']}
+
+TABLES = [('tracing', TRACING), ('x-death', X_DEATH), ('nested', NESTED)]
+
+
+def bench(tables, table):
+    pieces = list()
+    data.encode_table(pieces, table)
+    encoded = ''.join(pieces)
+    start = time.time()
+    for count in xrange(tables):
+        data.encode_table(list(), table)
+    encoding = time.time() - start
+    start = time.time()
+    for count in xrange(tables):
+        data.decode_table(encoded, 0)
+    decoding = time.time() - start
+    return encoding / tables, decoding / tables
+
+
+def main():
+    tables = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for name, table in TABLES:
+        results = [bench(tables, table) for run in range(REPEAT)]
+        print '%-8s encode %.2f usec, decode %.2f usec' % \
+              (name, min([value[0] for value in results]) * 1000000,
+               min([value[1] for value in results]) * 1000000)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,15 +5,6 @@
 # ***** END LICENSE BLOCK *****
 __version__ = '0.9.6-pre4'
 
-from pika.connection import ConnectionParameters
-from pika.credentials import PlainCredentials
-from pika.spec import BasicProperties
-
-from pika.adapters.base_connection import BaseConnection
-from pika.adapters.asyncore_connection import AsyncoreConnection
-from pika.adapters.blocking_connection import BlockingConnection
-from pika.adapters.select_connection import SelectConnection
-
 # Python 2.4 support: add struct.unpack_from if it's missing.
 try:
     import struct
@@ -23,3 +14,39 @@ except AttributeError:
         slice = buffer(buf, offset, struct.calcsize(fmt))
         return struct.unpack(fmt, slice)
     struct.unpack_from = _unpack_from
+
+# The public names and the modules they are imported from when first read,
+# so that "import pika" does not import the adapters and the spec. The
+# submodules and struct are exported by "from pika import *" as they were
+# when the package imported them up front.
+from pika import lazy
+lazy.install(__name__,
+             {'ConnectionParameters': 'pika.connection',
+              'PlainCredentials': 'pika.credentials',
+              'BasicProperties': 'pika.spec',
+              'PropertiesTemplate': 'pika.templates',
+              'BaseConnection': 'pika.adapters.base_connection',
+              'AsyncoreConnection': 'pika.adapters.asyncore_connection',
+              'BlockingConnection': 'pika.adapters.blocking_connection',
+              'SelectConnection': 'pika.adapters.select_connection',
+              'adapters': 'pika.adapters',
+              'amqp_object': 'pika.amqp_object',
+              'callback': 'pika.callback',
+              'capture': 'pika.capture',
+              'channel': 'pika.channel',
+              'connection': 'pika.connection',
+              'credentials': 'pika.credentials',
+              'data': 'pika.data',
+              'exceptions': 'pika.exceptions',
+              'failover': 'pika.failover',
+              'frame': 'pika.frame',
+              'heartbeat': 'pika.heartbeat',
+              'metrics': 'pika.metrics',
+              'profiling': 'pika.profiling',
+              'reconnection_strategies': 'pika.reconnection_strategies',
+              'resolver': 'pika.resolver',
+              'simplebuffer': 'pika.simplebuffer',
+              'spec': 'pika.spec',
+              'struct': 'struct',
+              'templates': 'pika.templates',
+              'utils': 'pika.utils'})
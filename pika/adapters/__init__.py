@@ -16,14 +16,16 @@
   synchronous operation on top of library for simple uses.
 
 """
-from base_connection import BaseConnection
-from asyncore_connection import AsyncoreConnection
-from blocking_connection import BlockingConnection
-from select_connection import SelectConnection
-from select_connection import IOLoop
+from pika import lazy
 
-# Dynamically handle 3rd party library dependencies for optional imports
-try:
-    from tornado_connection import TornadoConnection
-except ImportError:
-    TornadoConnection = None
+# The adapters are imported when first read, so that importing one adapter
+# does not import the others. TornadoConnection is None if tornado can not
+# be imported.
+lazy.install(__name__,
+             {'BaseConnection': 'pika.adapters.base_connection',
+              'AsyncoreConnection': 'pika.adapters.asyncore_connection',
+              'BlockingConnection': 'pika.adapters.blocking_connection',
+              'SelectConnection': 'pika.adapters.select_connection',
+              'IOLoop': 'pika.adapters.select_connection',
+              'TornadoConnection': 'pika.adapters.tornado_connection'},
+             optional=('TornadoConnection',))
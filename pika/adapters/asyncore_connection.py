@@ -97,3 +97,4 @@ class AsyncoreConnection(base_connection.BaseConnection):
         self.socket = PikaDispatcher(self.socket, None, self._handle_events)
         self.ioloop = self.socket
         self._on_connected()
+        return True
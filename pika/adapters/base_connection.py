@@ -5,6 +5,8 @@ isolate socket and low level communication.
 """
 import errno
 import logging
+import os
+import select
 import socket
 import time
 
@@ -18,8 +20,17 @@ try:
 except ImportError:
     ssl = None
 
+# Python < 2.7 has no memoryview to read into the frame buffer with
+try:
+    memoryview
+except NameError:
+    memoryview = None
+
+from pika import capture
 from pika import connection
 from pika import exceptions
+from pika import profiling
+from pika import resolver
 
 LOGGER = logging.getLogger(__name__)
 
@@ -35,9 +46,45 @@ class BaseConnection(connection.Connection):
     ERRORS_TO_IGNORE = [errno.EWOULDBLOCK, errno.EAGAIN, errno.EINTR]
     DO_HANDSHAKE = True
 
+    # Seconds to wait for a connection attempt before starting the next one
+    # in parallel, the Connection Attempt Delay of RFC 8305
+    CONNECTION_ATTEMPT_DELAY = 0.25
+    CONNECT_IN_PROGRESS = (errno.EINPROGRESS, errno.EWOULDBLOCK,
+                           errno.EALREADY)
+
+    # Adapters with an IOLoop before the socket is connected connect to
+    # several addresses on it instead of blocking in select
+    CONNECT_ON_IOLOOP = False
+
+    # Adapters whose IOLoop waits for the socket to be readable and writable
+    # use it in non-blocking mode, reads then continue until it would block
+    NON_BLOCKING_SOCKET = False
+
+    # The endpoint addresses are cached for all connections
+    RESOLVER = resolver.Resolver()
+
+    # SSL contexts are shared by connections using the same ssl_options, so
+    # the certificates are loaded once
+    SSL_CONTEXTS = dict()
+
+    # ssl.wrap_socket arguments that are set on the SSLContext instead
+    SSL_CONTEXT_OPTIONS = ('ssl_version', 'cert_reqs', 'ca_certs', 'certfile',
+                           'keyfile', 'ciphers')
+
+    # Bounds for the size of socket reads, the size is doubled when a read
+    # fills it and halved when a read fills less than a quarter of it. The
+    # socket is read into the frame buffer, which grows to fit the read size
+    # and the frame being received.
+    READ_SIZE_MIN = 4096
+    READ_SIZE_MAX = 262144
+
+    # Bytes to read for a single IOLoop event before returning to the poller
+    READ_BUDGET = 1048576
+
     def __init__(self, parameters=None,
                        on_open_callback=None,
-                       stop_ioloop_on_close=True):
+                       stop_ioloop_on_close=True,
+                       reconnection_strategy=None):
         """Create a new instance of the Connection object.
 
         :param parameters: Connection parameters
@@ -46,6 +93,9 @@ class BaseConnection(connection.Connection):
         :type on_open_callback: method
         :param bool stop_ioloop_on_close: Will stop the ioloop when the
                 connection is fully closed.
+        :param reconnection_strategy: Reconnect when the connection is lost
+        :type reconnection_strategy:
+            pika.reconnection_strategies.ReconnectionStrategy
         :raises: RuntimeError
 
         """
@@ -59,7 +109,21 @@ class BaseConnection(connection.Connection):
         self.event_state = self.base_events
         self.socket = None
         self.write_buffer = None
-        super(BaseConnection, self).__init__(parameters, on_open_callback)
+        self._connect_attempts = 0
+        self._candidates = list()
+        self._pending_connects = dict()
+        self._connect_error = None
+        self._next_connect_timer = None
+        self._connect_timeout_timer = None
+        self._capture = None
+        self._read_size = self.READ_SIZE_MIN * 4
+        self._read_buffer = None
+        self._read_view = None
+        if memoryview:
+            self._read_buffer = bytearray(self._read_size * 2)
+            self._read_view = memoryview(self._read_buffer)
+        super(BaseConnection, self).__init__(parameters, on_open_callback,
+                                             reconnection_strategy)
 
     def add_timeout(self, deadline, callback_method):
         """Add the callback_method to the IOLoop timer to fire after deadline
@@ -82,7 +146,11 @@ class BaseConnection(connection.Connection):
         :param str reply_text: The text reason for the close
 
         """
+        self._stop_connecting()
         super(BaseConnection, self).close(reply_code, reply_text)
+        if self._capture:
+            # The IOLoop may be stopped before the socket is closed
+            self._capture.flush()
         self._handle_ioloop_stop()
 
     def remove_timeout(self, timeout_id):
@@ -95,35 +163,61 @@ class BaseConnection(connection.Connection):
         self.ioloop.remove_timeout(timeout_id)
 
     def _adapter_connect(self):
-        """Connect to the RabbitMQ broker"""
+        """Connect to the RabbitMQ broker, returning True when connected. If
+        the attempt fails and there are attempts left, adapters with an IOLoop
+        schedule the next attempt on it and return False, the others wait
+        retry_delay seconds and try again. Adapters that CONNECT_ON_IOLOOP
+        also return False while connecting to several addresses in parallel,
+        _adapter_connected is invoked once one of them is connected.
+
+        :rtype: bool
+        :raises: AMQPConnectionError
+
+        """
         LOGGER.debug('Connecting the adapter to the remote host')
-        reason = 'Unknown'
-        remaining_attempts = self.params.connection_attempts
-        while remaining_attempts:
-            remaining_attempts -= 1
+        while True:
+            self._connect_attempts += 1
             try:
-                self._create_and_connect_to_socket()
-                return
-            except socket.timeout:
-                reason = 'timeout'
+                if not self._create_and_connect_to_socket():
+                    return False
+                self._connect_attempts = 0
+                return True
             except socket.error, err:
-                LOGGER.error('socket error: %s', err[-1])
-                reason = err[-1]
-                self.socket.close()
+                if not self._retry_connect_after(err):
+                    return False
 
-            LOGGER.warning('Could not connect due to "%s," retrying in %i sec',
-                           reason, self.params.retry_delay)
-            time.sleep(self.params.retry_delay)
+    def _append_frame_buffer(self, bytes):
+        """Append the bytes to the frame buffer. Socket reads are made into
+        the frame buffer already, the bytes read otherwise, from SSL, are
+        copied into it.
+
+        :param str|memoryview bytes: The bytes read
+
+        """
+        if self._read_buffer is None:
+            return super(BaseConnection, self)._append_frame_buffer(bytes)
+        if bytes.__class__ is not str:
+            return
+        self._reserve_frame_buffer(len(bytes))
+        self._read_buffer[self._frame_end:self._frame_end + len(bytes)] = bytes
+        self._frame_end += len(bytes)
 
-        LOGGER.error('Could not connect: %s', reason)
-        raise exceptions.AMQPConnectionError(self.params.connection_attempts *
-                                             self.params.retry_delay)
+    def _adapter_connected(self):
+        """Invoked once the socket connected on the IOLoop, adapters that
+        CONNECT_ON_IOLOOP override it to watch the socket and start the
+        protocol handshake.
+
+        :raises: NotImplementedError
+
+        """
+        raise NotImplementedError
 
     def _adapter_disconnect(self):
         """Invoked if the connection is being told to disconnect"""
         #self.socket.shutdown(socket.SHUT_RDWR)
         self.socket.close()
         self.socket = None
+        self._stop_capture()
         self._check_state_on_disconnect()
         self._handle_ioloop_stop()
 
@@ -149,23 +243,133 @@ class BaseConnection(connection.Connection):
             LOGGER.warning('Unknown state on disconnect: %i',
                            self.connection_state)
 
+    def _close_pending_connects(self):
+        """Stop watching and close the sockets of the pending connects"""
+        for fd, (sock, candidate) in self._pending_connects.items():
+            self.ioloop.remove_handler(fd)
+            sock.close()
+        self._pending_connects = dict()
+
+    def _connect_candidate(self, candidate):
+        """Connect to a single candidate address, blocking for up to
+        socket_timeout seconds.
+
+        :param tuple candidate: The endpoint and address to connect to
+        :rtype: socket.socket
+        :raises: socket.error
+
+        """
+        endpoint, (family, socktype, proto, sockaddr) = candidate
+        sock = socket.socket(family, socktype, proto)
+        sock.settimeout(self.params.socket_timeout)
+        try:
+            sock.connect(sockaddr)
+        except socket.error:
+            sock.close()
+            raise
+        return sock
+
+    def _connect_candidates(self, candidates):
+        """Connect to the candidate addresses in parallel, starting the next
+        attempt every CONNECTION_ATTEMPT_DELAY seconds or as soon as an attempt
+        fails, returning the first socket to connect along with its candidate.
+        The attempts time out socket_timeout seconds after the last one was
+        started, so they are not cut short by a CONNECTION_ATTEMPT_DELAY as
+        long as the socket_timeout.
+
+        :param list candidates: The endpoints and addresses to connect to
+        :rtype: tuple(socket.socket, tuple)
+        :raises: socket.error
+
+        """
+        waiting = list(candidates)
+        pending = dict()
+        error = socket.timeout()
+        next_attempt = deadline = 0
+        try:
+            while waiting or pending:
+                now = time.time()
+                if waiting and (now >= next_attempt or not pending):
+                    candidate = waiting.pop(0)
+                    try:
+                        sock = self._start_connect(candidate)
+                    except socket.error, error:
+                        LOGGER.debug('Connecting to %r failed: %s',
+                                     candidate[1][3], error)
+                        continue
+                    pending[sock] = candidate
+                    next_attempt = now + self.CONNECTION_ATTEMPT_DELAY
+                    deadline = now + self.params.socket_timeout
+                    continue
+
+                timeout = next_attempt if waiting else deadline
+                try:
+                    _, writable, failed = select.select(list(), pending.keys(),
+                                                        pending.keys(),
+                                                        max(0, timeout - now))
+                except select.error, err:
+                    if err.args[0] == errno.EINTR:
+                        continue
+                    raise
+                for sock in set(writable + failed):
+                    candidate = pending.pop(sock)
+                    error = self._get_connect_error(sock)
+                    if not error:
+                        return sock, candidate
+                    sock.close()
+                    LOGGER.debug('Connecting to %r failed: %s',
+                                 candidate[1][3], error)
+                    next_attempt = 0
+                if pending and not waiting and time.time() >= deadline:
+                    LOGGER.debug('Connecting to %i addresses timed out',
+                                 len(pending))
+                    for sock in pending:
+                        sock.close()
+                    pending.clear()
+                    error = socket.timeout()
+        finally:
+            for sock in pending:
+                sock.close()
+        raise error
+
+    def _connect_candidates_on_ioloop(self, candidates):
+        """Connect to the candidate addresses in parallel like
+        _connect_candidates without blocking the IOLoop: the pending sockets
+        are watched for write events and the next attempt is started by an
+        IOLoop timer.
+
+        :param list candidates: The endpoints and addresses to connect to
+
+        """
+        self._candidates = list(candidates)
+        self._pending_connects = dict()
+        self._connect_error = socket.timeout()
+        self._start_next_connect()
+
     def _create_and_connect_to_socket(self):
-        """Create socket and connect to it, using SSL if enabled."""
-        LOGGER.debug('Creating the socket')
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM, 0)
-        #self.socket.setsockopt(socket.SOL_TCP, socket.TCP_NODELAY, 1)
-        if self.params.ssl:
-            self.socket = self._wrap_socket(self.socket)
-            ssl_text = " with SSL"
+        """Resolve the endpoints and connect to the first address that
+        accepts the connection, using SSL if enabled. Returns False if the
+        connection is being made on the IOLoop.
+
+        :rtype: bool
+        :raises: socket.error
+
+        """
+        candidates = self._get_connection_candidates()
+        if len(candidates) == 1:
+            LOGGER.debug('Creating the socket')
+            self.socket = self._connect_candidate(candidates[0])
+            candidate = candidates[0]
+        elif self.CONNECT_ON_IOLOOP:
+            LOGGER.debug('Connecting to %i addresses on the IOLoop',
+                         len(candidates))
+            self._connect_candidates_on_ioloop(candidates)
+            return False
         else:
-            ssl_text = ""
-        LOGGER.info("Connecting fd %d to %s:%i%s",
-                    self.socket.fileno(), self.params.host,
-                    self.params.port, ssl_text)
-        self.socket.settimeout(self.params.socket_timeout)
-        self.socket.connect((self.params.host, self.params.port))
-        if self.params.ssl and self.DO_HANDSHAKE:
-            self._do_ssl_handshake()
+            LOGGER.debug('Connecting to %i addresses', len(candidates))
+            self.socket, candidate = self._connect_candidates(candidates)
+        self._on_socket_connected(candidate)
+        return True
 
     def _do_ssl_handshake(self):
         """Perform SSL handshaking, copied from python stdlib test_ssl.py.
@@ -188,6 +392,69 @@ class BaseConnection(connection.Connection):
                     raise
                 self._manage_event_state()
 
+    def _get_connect_error(self, sock):
+        """Return the error of the non-blocking connect of the socket, or
+        None if it connected.
+
+        :param socket.socket sock: The socket that became writable
+        :rtype: socket.error|None
+
+        """
+        result = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if result:
+            return socket.error(result, os.strerror(result))
+        return None
+
+    def _get_connection_candidates(self):
+        """Resolve the endpoints, returning (endpoint, address) tuples with
+        the address families interleaved.
+
+        :rtype: list
+        :raises: socket.gaierror
+
+        """
+        candidates, error = list(), None
+        for host, port in self.params.endpoints:
+            try:
+                addresses = self.RESOLVER.resolve(host, port)
+            except socket.gaierror, error:
+                LOGGER.warning('Could not resolve %s: %s', host, error)
+                continue
+            candidates.extend([((host, port), address)
+                               for address in addresses])
+        if not candidates:
+            raise error
+        return resolver.interleave(candidates)
+
+    def _get_ssl_context(self):
+        """Return the SSLContext for the ssl_options, creating it the first
+        time the options are used. Returns None if the ssl module does not
+        provide SSLContext (Python < 2.7.9).
+
+        :rtype: ssl.SSLContext
+
+        """
+        if not hasattr(ssl, 'SSLContext'):
+            return None
+        options = self.params.ssl_options
+        key = repr(sorted([(name, options[name])
+                           for name in self.SSL_CONTEXT_OPTIONS
+                           if name in options]))
+        if key not in self.SSL_CONTEXTS:
+            LOGGER.debug('Creating the SSL context for %s', key)
+            context = ssl.SSLContext(options.get('ssl_version',
+                                                 ssl.PROTOCOL_SSLv23))
+            context.verify_mode = options.get('cert_reqs', ssl.CERT_NONE)
+            if options.get('ca_certs'):
+                context.load_verify_locations(options['ca_certs'])
+            if options.get('certfile'):
+                context.load_cert_chain(options['certfile'],
+                                        options.get('keyfile'))
+            if options.get('ciphers'):
+                context.set_ciphers(options['ciphers'])
+            self.SSL_CONTEXTS[key] = context
+        return self.SSL_CONTEXTS[key]
+
     def _get_error_code(self, error_value):
         """Get the error code from the error_value accounting for Python
         version differences.
@@ -207,10 +474,25 @@ class BaseConnection(connection.Connection):
         """Call the state manager who will figure out that we need to write."""
         self._manage_event_state()
 
+    @property
+    def _has_connection_attempts_left(self):
+        """Returns True if connection_attempts allows another attempt.
+
+        :rtype: bool
+
+        """
+        return (self.params.connection_attempts is None or
+                self._connect_attempts < self.params.connection_attempts)
+
     def _handle_disconnect(self):
         """Called internally when the socket is disconnected already
         """
-        self._adapter_disconnect()
+        try:
+            self._adapter_disconnect()
+        except exceptions.AMQPConnectionError:
+            # A failed handshake is retried when reconnecting
+            if not self._should_reconnect:
+                raise
         self._on_connection_closed(None, True)
 
     def _handle_ioloop_stop(self):
@@ -218,11 +500,108 @@ class BaseConnection(connection.Connection):
         should be stopped or not.
 
         """
-        if self.stop_ioloop_on_close and self.ioloop:
+        if self._should_reconnect:
+            LOGGER.debug('Connection was lost, not stopping IOLoop')
+        elif self.stop_ioloop_on_close and self.ioloop:
             self.ioloop.stop()
         else:
             LOGGER.warning('Connection is closed but not stopping IOLoop')
 
+    def _on_connect_failed(self, error):
+        """Report that connecting failed, stopping the IOLoop if
+        stop_ioloop_on_close is set and no further attempt will be made.
+
+        :param pika.exceptions.AMQPConnectionError error: The failure
+
+        """
+        super(BaseConnection, self)._on_connect_failed(error)
+        if self.is_closed:
+            self._handle_ioloop_stop()
+
+    def _on_connect_event(self, fd, events, error=None, write_only=False):
+        """Invoked by the IOLoop when a pending connect completed. The first
+        socket to connect is used and the other attempts are stopped, a
+        failed attempt starts the next one right away.
+
+        :param int fd: The file descriptor of the pending socket
+        :param int events: The events that fired
+        :param error: The error raised by the poller, if any
+        :param bool write_only: Only process write events
+
+        """
+        if fd not in self._pending_connects:
+            return
+        sock, candidate = self._pending_connects.pop(fd)
+        self.ioloop.remove_handler(fd)
+        connect_error = self._get_connect_error(sock)
+        if connect_error:
+            sock.close()
+            LOGGER.debug('Connecting to %r failed: %s', candidate[1][3],
+                         connect_error)
+            self._connect_error = connect_error
+            if self._next_connect_timer:
+                self.remove_timeout(self._next_connect_timer)
+            return self._start_next_connect()
+        self._stop_connecting()
+        self.socket = sock
+        try:
+            self._on_socket_connected(candidate)
+        except socket.error, connect_error:
+            self.socket.close()
+            self.socket = None
+            return self._on_connect_attempt_failed(connect_error)
+        self._connect_attempts = 0
+        self._adapter_connected()
+
+    def _on_connect_attempt_failed(self, error):
+        """Invoked when connecting on the IOLoop failed, scheduling the next
+        attempt or reporting the failure when there are no attempts left.
+
+        :param socket.error error: The last failure
+
+        """
+        try:
+            self._retry_connect_after(error)
+        except exceptions.AMQPConnectionError, error:
+            self._on_connect_failed(error)
+
+    def _on_connect_timeout(self):
+        """Invoked by the IOLoop timer when the pending connects did not
+        complete within socket_timeout seconds of the last one starting.
+
+        """
+        self._connect_timeout_timer = None
+        LOGGER.debug('Connecting to %i addresses timed out',
+                     len(self._pending_connects))
+        self._stop_connecting()
+        self._on_connect_attempt_failed(socket.timeout())
+
+    def _on_socket_connected(self, candidate):
+        """Set up the connected socket, wrapping it for SSL if enabled.
+
+        :param tuple candidate: The endpoint and address connected to
+        :raises: socket.error
+
+        """
+        self.endpoint = candidate[0]
+        if self.NON_BLOCKING_SOCKET and not self.params.ssl:
+            self.socket.setblocking(0)
+        else:
+            self.socket.settimeout(self.params.socket_timeout)
+        #self.socket.setsockopt(socket.SOL_TCP, socket.TCP_NODELAY, 1)
+        if self.params.ssl:
+            self.socket = self._wrap_socket(self.socket)
+            ssl_text = " with SSL"
+        else:
+            ssl_text = ""
+        LOGGER.info("Connected fd %d to %s:%i (%s)%s",
+                    self.socket.fileno(), self.endpoint[0], self.endpoint[1],
+                    candidate[1][3][0], ssl_text)
+        if self.params.ssl and self.DO_HANDSHAKE:
+            self._do_ssl_handshake()
+        if self.params.capture:
+            self._start_capture()
+
     def _handle_error(self, error_value):
         """Internal error handling method. Here we expect a socket.error
         coming in and will handle different socket errors differently.
@@ -288,22 +667,35 @@ class BaseConnection(connection.Connection):
             self._manage_event_state()
 
     def _handle_read(self):
-        """Read from the socket and call our on_data_available with the data."""
+        """Read from the socket and call our on_data_available with the data.
+        With SSL the records already decrypted by the SSL layer are read as
+        well, the poller will not report them as readable.
+
+        """
+        profiler = self.profiler
+        if profiler:
+            previous = profiler.enter(profiling.READ)
         try:
             if self.params.ssl:
-                data = self.socket.read(self._buffer_size)
+                data = self._read_ssl()
             else:
-                data = self.socket.recv(self._buffer_size)
+                data = self._read_socket()
         except socket.timeout:
             raise
         except socket.error, error:
             return self._handle_error(error)
+        finally:
+            if profiler:
+                profiler.leave(previous)
 
         # Empty data, should disconnect
         if not data or data == 0:
             LOGGER.error('Read empty data, calling disconnect')
             return self._handle_disconnect()
 
+        if self._capture:
+            self._capture.write(capture.READ, data)
+
         # Pass the data into our top level frame dispatching method
         self._on_data_available(data)
         return len(data)
@@ -312,14 +704,25 @@ class BaseConnection(connection.Connection):
         """Handle any outbound buffer writes that need to take place."""
         total_written = 0
         if self.outbound_buffer.size:
+            profiler = self.profiler
+            if profiler:
+                previous = profiler.enter(profiling.WRITE)
             try:
-                bytes_written = self.socket.send(self.outbound_buffer.read())
-            except socket.timeout:
-                raise
-            except socket.error, error:
-                return self._handle_error(error)
-            self.outbound_buffer.consume(bytes_written)
-            total_written += bytes_written
+                data = self.outbound_buffer.read()
+                try:
+                    bytes_written = self.socket.send(data)
+                except socket.timeout:
+                    raise
+                except socket.error, error:
+                    return self._handle_error(error)
+                if self._capture:
+                    self._capture.write(capture.WRITTEN, data[:bytes_written])
+                self.outbound_buffer.consume(bytes_written)
+                total_written += bytes_written
+                self._fill_outbound_buffer()
+            finally:
+                if profiler:
+                    profiler.leave(previous)
         return total_written
 
     def _init_connection_state(self):
@@ -329,6 +732,8 @@ class BaseConnection(connection.Connection):
 
         """
         super(BaseConnection, self)._init_connection_state()
+        if self._read_buffer is not None:
+            self._frame_buffer = self._read_buffer
         self.fd = None
         self.ioloop = None
         self.base_events = self.READ | self.ERROR
@@ -350,12 +755,236 @@ class BaseConnection(connection.Connection):
             self.event_state = self.base_events
             self.ioloop.update_handler(self.socket.fileno(), self.event_state)
 
+    def _adapt_read_size(self, count):
+        """Grow the read size when a read filled it and shrink it when a
+        read used less than a quarter of it.
+
+        :param int count: The number of bytes the last read returned
+
+        """
+        if count == self._read_size and self._read_size < self.READ_SIZE_MAX:
+            self._read_size = min(self._read_size * 2, self.READ_SIZE_MAX)
+        elif (count < self._read_size / 4 and
+              self._read_size > self.READ_SIZE_MIN):
+            self._read_size = max(self._read_size / 2, self.READ_SIZE_MIN)
+
+    def _read_socket(self):
+        """Read from the socket into the free space at the end of the frame
+        buffer, returning a memoryview of the bytes read, which the frames
+        are decoded from without copying them. On a non-blocking socket,
+        while reads fill the read size keep reading until the socket would
+        block or READ_BUDGET bytes were read, so a busy socket does not need
+        a poll per read.
+
+        :rtype: memoryview
+        :raises: socket.error
+
+        """
+        if self._read_view is None:
+            return self.socket.recv(self._read_size)
+        total = 0
+        while True:
+            size = self._read_size
+            self._reserve_frame_buffer(size)
+            try:
+                count = self.socket.recv_into(
+                    self._read_view[self._frame_end:], size)
+            except socket.error, error:
+                if not total:
+                    raise
+                # Hand over what was read, the next read raises it again
+                if self._get_error_code(error) not in self.ERRORS_TO_IGNORE:
+                    LOGGER.debug('Error reading more data: %s', error)
+                break
+            if not count:
+                break
+            self._frame_end += count
+            total += count
+            self._adapt_read_size(count)
+            if (count < size or total >= self.READ_BUDGET or
+                not self.NON_BLOCKING_SOCKET):
+                break
+        return self._read_view[self._frame_end - total:self._frame_end]
+
+    def _read_ssl(self):
+        """Read from the SSL socket, draining the data left pending in the
+        SSL layer after the first read.
+
+        :rtype: str
+        :raises: socket.error
+
+        """
+        data = self.socket.read(self._buffer_size)
+        if not data or not self.socket.pending():
+            return data
+        chunks = [data]
+        pending = self.socket.pending()
+        while pending:
+            chunks.append(self.socket.read(pending))
+            pending = self.socket.pending()
+        return ''.join(chunks)
+
+    def _reserve_frame_buffer(self, size):
+        """Make room for size bytes at the end of the frame buffer, moving
+        the bytes not decoded yet to its start, or into a buffer twice the
+        size if they would overlap or there is not enough room.
+
+        :param int size: The number of bytes to make room for
+
+        """
+        if self._frame_offset == self._frame_end:
+            self._frame_offset = self._frame_end = 0
+        if self._frame_end + size <= len(self._read_buffer):
+            return
+        pending = self._frame_end - self._frame_offset
+        if pending <= self._frame_offset and \
+                pending + size <= len(self._read_buffer):
+            self._read_buffer[:pending] = \
+                self._read_view[self._frame_offset:self._frame_end]
+        else:
+            buffer_size = max(len(self._read_buffer) * 2, pending + size)
+            LOGGER.debug('Growing the frame buffer to %i bytes', buffer_size)
+            read_buffer = bytearray(buffer_size)
+            read_buffer[:pending] = \
+                self._read_view[self._frame_offset:self._frame_end]
+            self._read_buffer = self._frame_buffer = read_buffer
+            self._read_view = memoryview(read_buffer)
+        self._frame_offset, self._frame_end = 0, pending
+
+    def _retry_connect(self):
+        """Invoked by the IOLoop timer to make the next connection attempt"""
+        self._reconnect_timer = None
+        if self._close_requested:
+            return
+        try:
+            self._connect()
+        except exceptions.AMQPConnectionError, error:
+            self._on_connect_failed(error)
+
+    def _retry_connect_after(self, error):
+        """Decide how to retry after a connection attempt failed: returns
+        True once retry_delay seconds were waited for adapters without an
+        IOLoop, or False if the next attempt was scheduled on the IOLoop.
+
+        :param socket.error error: The failure
+        :rtype: bool
+        :raises: AMQPConnectionError
+
+        """
+        if isinstance(error, socket.timeout):
+            reason = 'timeout'
+        else:
+            LOGGER.error('socket error: %s', error[-1])
+            reason = error[-1]
+
+        # When reconnecting the IOLoop timers drive the retries instead
+        if self._reconnecting or not self._has_connection_attempts_left:
+            LOGGER.error('Could not connect: %s', reason)
+            attempts, self._connect_attempts = self._connect_attempts, 0
+            raise exceptions.AMQPConnectionError(attempts)
+        LOGGER.warning('Could not connect due to "%s," retrying in %s sec',
+                       reason, self.params.retry_delay)
+        if self.ioloop:
+            self._reconnect_timer = self.add_timeout(self.params.retry_delay,
+                                                     self._retry_connect)
+            return False
+        time.sleep(self.params.retry_delay)
+        return True
+
+    def _start_capture(self):
+        """Record the bytes read from and written to the socket in the
+        capture file of the connection parameters.
+
+        """
+        LOGGER.info('Recording the connection in %s', self.params.capture)
+        self._capture = capture.CaptureWriter(self.params.capture)
+        self._capture.connected(self.endpoint)
+
+    def _stop_capture(self):
+        """Close the capture file, a reconnection appends to it."""
+        if self._capture:
+            self._capture.close()
+            self._capture = None
+
+    def _stop_connecting(self):
+        """Stop the parallel connect on the IOLoop, closing the sockets of
+        the attempts still pending.
+
+        """
+        self._candidates = list()
+        if self._next_connect_timer:
+            self.remove_timeout(self._next_connect_timer)
+            self._next_connect_timer = None
+        if self._connect_timeout_timer:
+            self.remove_timeout(self._connect_timeout_timer)
+            self._connect_timeout_timer = None
+        self._close_pending_connects()
+
+    def _start_connect(self, candidate):
+        """Start a non-blocking connect to the candidate address, returning
+        the socket to wait on for the connect to complete.
+
+        :param tuple candidate: The endpoint and address to connect to
+        :rtype: socket.socket
+        :raises: socket.error
+
+        """
+        endpoint, (family, socktype, proto, sockaddr) = candidate
+        LOGGER.debug('Connecting to %r', sockaddr)
+        sock = socket.socket(family, socktype, proto)
+        sock.setblocking(0)
+        result = sock.connect_ex(sockaddr)
+        if result and result not in self.CONNECT_IN_PROGRESS:
+            sock.close()
+            raise socket.error(result, os.strerror(result))
+        return sock
+
+    def _start_next_connect(self):
+        """Start a connect to the next candidate address on the IOLoop,
+        scheduling the one after it in CONNECTION_ATTEMPT_DELAY seconds. Once
+        all were started the pending ones have socket_timeout seconds to
+        connect, when none is left pending the connection attempt failed.
+
+        """
+        self._next_connect_timer = None
+        while self._candidates:
+            candidate = self._candidates.pop(0)
+            try:
+                sock = self._start_connect(candidate)
+            except socket.error, error:
+                LOGGER.debug('Connecting to %r failed: %s',
+                             candidate[1][3], error)
+                self._connect_error = error
+                continue
+            self._pending_connects[sock.fileno()] = (sock, candidate)
+            self.ioloop.add_handler(sock.fileno(), self._on_connect_event,
+                                    self.WRITE | self.ERROR)
+            if self._candidates:
+                self._next_connect_timer = self.add_timeout(
+                    self.CONNECTION_ATTEMPT_DELAY, self._start_next_connect)
+                return
+        if not self._pending_connects:
+            self._stop_connecting()
+            return self._on_connect_attempt_failed(self._connect_error)
+        if not self._connect_timeout_timer:
+            self._connect_timeout_timer = self.add_timeout(
+                self.params.socket_timeout, self._on_connect_timeout)
+
     def _wrap_socket(self, sock):
-        """Wrap the socket for connecting over SSL.
+        """Wrap the socket for connecting over SSL, using the shared
+        SSLContext when the ssl module provides it.
 
+        :param socket.socket sock: The connected socket
         :rtype: ssl.SSLSocket
 
         """
-        return ssl.wrap_socket(sock,
-                               do_handshake_on_connect=self.DO_HANDSHAKE,
-                               **self.params.ssl_options)
+        context = self._get_ssl_context()
+        if not context:
+            return ssl.wrap_socket(sock,
+                                   do_handshake_on_connect=self.DO_HANDSHAKE,
+                                   **self.params.ssl_options)
+        kwargs = dict([(name, value)
+                       for name, value in self.params.ssl_options.items()
+                       if name not in self.SSL_CONTEXT_OPTIONS])
+        kwargs['do_handshake_on_connect'] = self.DO_HANDSHAKE
+        return context.wrap_socket(sock, **kwargs)
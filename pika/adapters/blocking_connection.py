@@ -76,6 +76,7 @@ class BlockingConnection(base_connection.BaseConnection):
     def disconnect(self):
         """Disconnect from the socket"""
         self.socket.close()
+        self._stop_capture()
 
     def process_data_events(self):
         """Will make sure that data events are processed. Your app can
@@ -132,6 +133,7 @@ class BlockingConnection(base_connection.BaseConnection):
         LOGGER.debug('Setting socket timeout to %s', self.params.socket_timeout)
         self.socket.settimeout(self.params.socket_timeout)
         LOGGER.info('Adapter connected')
+        return True
 
     def _adapter_disconnect(self):
         """Called if the connection is being requested to disconnect."""
@@ -183,10 +185,13 @@ class BlockingConnection(base_connection.BaseConnection):
     def _flush_outbound(self):
         """Flush the outbound socket buffer."""
         LOGGER.debug('Outbound buffer size: %r', self.outbound_buffer.size)
-        if self.outbound_buffer.size > 0:
+        # Keep writing while frames queued behind the buffer, such as the
+        # body of a message published from a file, refill it
+        while self.outbound_buffer.size > 0:
             try:
-                if self._handle_write():
-                    self._socket_timeouts = 0
+                if not self._handle_write():
+                    return
+                self._socket_timeouts = 0
             except socket.timeout:
                 return self._handle_timeout()
 
@@ -205,7 +210,7 @@ class BlockingConnection(base_connection.BaseConnection):
             self.closing = (method_frame.method.reply_code,
                             method_frame.method.reply_text)
             LOGGER.warning("Disconnected from RabbitMQ at %s:%i (%s): %s",
-                           self.params.host, self.params.port,
+                           self.endpoint[0], self.endpoint[1],
                            self.closing[0], self.closing[1])
         self._set_connection_state(self.CONNECTION_CLOSED)
         self._remove_connection_callbacks()
@@ -227,7 +232,10 @@ class BlockingConnection(base_connection.BaseConnection):
         """
         super(BlockingConnection, self)._send_frame(frame_value)
         self._frames_written_without_read += 1
-        if self._frames_written_without_read == self.WRITE_TO_READ_RATIO:
+        # Do not read while the frames of a message are being queued, the
+        # callbacks invoked could send frames in between them
+        if (self._frames_written_without_read >= self.WRITE_TO_READ_RATIO and
+            not self._corked):
             self._frames_written_without_read = 0
             self.process_data_events()
 
@@ -295,18 +303,25 @@ class BlockingChannel(channel.Channel):
         return self._response[0], self._response[1], self._response[2]
 
     def basic_publish(self, exchange, routing_key, body,
-                      properties=None, mandatory=False, immediate=False):
+                      properties=None, mandatory=False, immediate=False,
+                      body_size=None):
         """Publish to the channel with the given exchange, routing key and body.
         For more information on basic_publish and what the parameters do, see:
 
         http://www.rabbitmq.com/amqp-0-9-1-reference.html#basic.publish
 
+        The body may also be a file-like object or an iterator of strings,
+        with body_size set to the number of bytes to send. The body is then
+        read a frame at a time as the outbound buffer drains instead of
+        being held in memory, regular files are read through mmap.
+
         :param str exchange: The exchange name
         :param str routing_key: The routing key
-        :param str body: The message body
+        :param str|file|iter body: The message body
         :param pika.spec.Properties properties: Basic.properties
         :param bool mandatory: The mandatory flag
         :param bool immediate: The immediate flag
+        :param int body_size: The size of a file-like or iterator body
 
         """
         if not self.is_open:
@@ -314,8 +329,12 @@ class BlockingChannel(channel.Channel):
         if immediate:
             LOGGER.warning('The immediate flag is deprecated in RabbitMQ')
         properties = properties or spec.BasicProperties()
+        content = ((properties, body) if body_size is None else
+                   (properties, body, body_size))
 
+        self.metrics.publishes += 1
         if self._confirmation:
+            published = time.time()
             response = self._rpc(spec.Basic.Publish(exchange=exchange,
                                                     routing_key=routing_key,
                                                     mandatory=mandatory,
@@ -324,20 +343,64 @@ class BlockingChannel(channel.Channel):
                                  [spec.Basic.Ack,
                                   spec.Basic.Nack,
                                   spec.Basic.Reject],
-                                 (properties, body))
+                                 content)
             if isinstance(response.method, spec.Basic.Ack):
+                self.metrics.confirm(True, time.time() - published)
                 return True
             elif (isinstance(response.method, spec.Basic.Nack) or
                   isinstance(response.method, spec.Basic.Reject)):
+                self.metrics.confirm(False, time.time() - published)
                 return False
             else:
                 raise ValueError('Unexpected frame type: %r', response)
         else:
-            self._send_method(spec.Basic.Publish(exchange=exchange,
-                                                 routing_key=routing_key,
-                                                 mandatory=mandatory,
-                                                 immediate=immediate),
-                              (properties, body), False)
+            self._send_method(self._publish_frame(exchange, routing_key,
+                                                  mandatory, immediate),
+                              content, False)
+
+    def basic_publish_multi(self, exchange, routing_keys, body,
+                            properties=None, mandatory=False,
+                            immediate=False):
+        """Publish the same message to the exchange once for each of the
+        routing keys, marshaling its content header and body frames once.
+        Returns a list with a bool for each routing key if delivery
+        confirmations are enabled, like basic_publish.
+
+        :param str exchange: The exchange name
+        :param list routing_keys: The routing keys to publish with
+        :param str body: The message body
+        :param pika.spec.Properties properties: Basic.properties
+        :param bool mandatory: The mandatory flag
+        :param bool immediate: The immediate flag
+        :rtype: list|None
+
+        """
+        if not self.is_open:
+            raise exceptions.ChannelClosed()
+        if immediate:
+            LOGGER.warning('The immediate flag is deprecated in RabbitMQ')
+        content = self.connection._content_frames(
+            self.channel_number, properties or spec.BasicProperties(), body)
+        self.metrics.publishes += len(routing_keys)
+        if not self._confirmation:
+            for routing_key in routing_keys:
+                self._send_method(self._publish_frame(exchange, routing_key,
+                                                      mandatory, immediate),
+                                  content, False)
+            return
+        results = list()
+        for routing_key in routing_keys:
+            published = time.time()
+            response = self._rpc(self._publish_frame(exchange, routing_key,
+                                                     mandatory, immediate),
+                                 None,
+                                 [spec.Basic.Ack,
+                                  spec.Basic.Nack,
+                                  spec.Basic.Reject],
+                                 content)
+            results.append(isinstance(response.method, spec.Basic.Ack))
+            self.metrics.confirm(results[-1], time.time() - published)
+        return results
 
     def basic_qos(self, prefetch_size=0, prefetch_count=0, all_channels=False):
         """Specify quality of service. This method requests a specific quality
@@ -603,7 +666,11 @@ class BlockingChannel(channel.Channel):
         self._replies.append(reply)
 
     def _add_callbacks(self):
-        """Add callbacks for when the channel opens and closes."""
+        """Add the callbacks of the channel for deliveries, Basic.Get replies
+        and for when the channel opens and closes.
+
+        """
+        super(BlockingChannel, self)._add_callbacks()
         self.connection.callbacks.add(self.channel_number,
                                       spec.Channel.CloseOk,
                                       self._on_rpc_complete)
@@ -682,9 +749,16 @@ class BlockingChannel(channel.Channel):
                                              reply,
                                              self._on_rpc_complete)
             replies.append(key)
-        self._received_response = False
-        self._send_method(method_frame, content,
-                          self._wait_on_response(method_frame))
+        wait = self._wait_on_response(method_frame)
+        if wait:
+            # Not cleared for methods without a reply, such as a Basic.Ack
+            # sent by a consumer called while another RPC waits for its reply
+            self._received_response = False
+        # The confirmation of a message published is timed by basic_publish
+        timed = wait and replies and content is None
+        if timed:
+            self.metrics.rpc_sent(method_frame.NAME, acceptable_replies)
+        self._send_method(method_frame, content, wait)
         return self._process_replies(replies, callback)
 
     def _send_method(self, method_frame, content=None, wait=True):
@@ -697,7 +771,8 @@ class BlockingChannel(channel.Channel):
 
         """
         self.wait = wait
-        self._received_response = False
+        if wait:
+            self._received_response = False
         LOGGER.debug('Connection: %r', self.connection)
         self.connection.send_method(self.channel_number, method_frame, content)
         while self.connection.outbound_buffer.size > 0:
@@ -2,8 +2,10 @@
 platform pika is running on.
 
 """
+import errno
 import logging
 import select
+import socket
 import time
 
 from pika.adapters.base_connection import BaseConnection
@@ -24,46 +26,190 @@ class SelectConnection(BaseConnection):
     event loop adapter for the given platform.
 
     """
+    CONNECT_ON_IOLOOP = True
+    NON_BLOCKING_SOCKET = True
+
+    # Seconds frames may be held back for in auto-cork mode
+    MAX_CORK_DELAY = 0.005
+
+    def __init__(self, parameters=None,
+                       on_open_callback=None,
+                       stop_ioloop_on_close=True,
+                       custom_ioloop=None,
+                       reconnection_strategy=None,
+                       auto_cork=False,
+                       max_cork_delay=MAX_CORK_DELAY,
+                       tcp_cork=False):
+        """Create a new instance of the SelectConnection. Multiple connections
+        may share one IOLoop by passing it in as custom_ioloop.
+
+        In auto-cork mode the frames sent during one IOLoop iteration are
+        written together at the end of the iteration instead of one write
+        and poller update per frame. Frames are written sooner when they
+        have been held for max_cork_delay seconds or fill a frame_max
+        worth of bytes, so long running callbacks do not hold them back.
+
+        :param parameters: Connection parameters
+        :type parameters: pika.connection.ConnectionParameters
+        :param on_open_callback: The method to call when the connection is open
+        :type on_open_callback: method
+        :param bool stop_ioloop_on_close: Will stop the ioloop when the
+                connection is fully closed.
+        :param IOLoop custom_ioloop: Use an existing IOLoop
+        :param reconnection_strategy: Reconnect when the connection is lost
+        :type reconnection_strategy:
+            pika.reconnection_strategies.ReconnectionStrategy
+        :param bool auto_cork: Write the frames of an IOLoop iteration
+            together at the end of the iteration
+        :param float max_cork_delay: Seconds frames may be held back for in
+            auto-cork mode
+        :param bool tcp_cork: Also set TCP_CORK on the socket while frames
+            are held back, where the platform supports it
+
+        """
+        self._ioloop = custom_ioloop or IOLoop()
+        self.auto_cork = auto_cork
+        self.max_cork_delay = max_cork_delay
+        self.tcp_cork = tcp_cork and hasattr(socket, 'TCP_CORK')
+        if tcp_cork and not self.tcp_cork:
+            LOGGER.warning('TCP_CORK is not supported on this platform')
+        self._corked_at = None
+        super(SelectConnection, self).__init__(parameters, on_open_callback,
+                                               stop_ioloop_on_close,
+                                               reconnection_strategy)
+
     def _adapter_connect(self):
-        """Connect to the RabbitMQ broker"""
-        super(SelectConnection, self)._adapter_connect()
-        self.ioloop = IOLoop(self._manage_event_state)
-        self.ioloop.start_poller(self._handle_events,
-                                 self.event_state,
-                                 self.socket.fileno())
+        """Connect to the RabbitMQ broker, returning True when connected.
+
+        :rtype: bool
+
+        """
+        self.ioloop = self._ioloop
+        if not super(SelectConnection, self)._adapter_connect():
+            return False
+        self._adapter_connected()
+        return True
+
+    def _adapter_connected(self):
+        """Watch the connected socket and start the protocol handshake"""
+        self.ioloop.add_handler(self.socket.fileno(),
+                                self._handle_events,
+                                self.event_state)
         self._on_connected()
 
+    def _adapter_disconnect(self):
+        """Stop watching the socket before it is closed"""
+        self._corked_at = None
+        if self.socket:
+            self.ioloop.remove_handler(self.socket.fileno())
+        super(SelectConnection, self)._adapter_disconnect()
+
+    def _detect_backpressure(self):
+        """Frames held back in auto-cork mode are not a sign of backpressure,
+        it is detected once they were written.
+
+        """
+        if self._corked_at is None:
+            super(SelectConnection, self)._detect_backpressure()
+
     def _flush_outbound(self):
         """Call the state manager who will figure out that we need to write then
-        call the poller's poll function to force it to process events.
+        call the poller's poll function to force it to process events. In
+        auto-cork mode the write is deferred to the end of the IOLoop
+        iteration.
 
         """
+        if self.auto_cork:
+            return self._flush_corked()
         self.ioloop.poller.process_timeouts()
-        self.ioloop.poller._manage_event_state()
+        self._manage_event_state()
         # Force our poller to come up for air, but in write only mode
         # write only mode prevents messages from coming in and kicking off
         # events through the consumer
         self.ioloop.poller.poll(write_only=True)
 
+    def _flush_corked(self):
+        """Hold the outbound frames back until the end of the IOLoop
+        iteration, writing them right away once they have been held for
+        max_cork_delay seconds or fill frame_max bytes.
+
+        """
+        if self._corked_at is None:
+            self._corked_at = time.time()
+            if self.tcp_cork:
+                self._set_tcp_cork(1)
+            self.ioloop.add_tick_callback(self._write_corked)
+        elif (self.outbound_buffer.size >= self._buffer_size or
+              time.time() - self._corked_at >= self.max_cork_delay):
+            self._write_corked()
+
+    def _set_tcp_cork(self, value):
+        """Set the TCP_CORK socket option
+
+        :param int value: 1 to hold back partial segments, 0 to send them
+
+        """
+        try:
+            self.socket.setsockopt(socket.SOL_TCP, socket.TCP_CORK, value)
+        except socket.error, error:
+            LOGGER.debug('Could not set TCP_CORK: %s', error)
+
+    def _write_corked(self):
+        """Write the frames held back in auto-cork mode, only asking the
+        poller for write events if they could not all be written.
+
+        """
+        if self._corked_at is None or not self.socket:
+            return
+        self._corked_at = None
+        if self.outbound_buffer.size:
+            self._handle_write()
+        if self.socket:
+            if self.outbound_buffer.size:
+                self._detect_backpressure()
+            if self.tcp_cork:
+                self._set_tcp_cork(0)
+            self._manage_event_state()
+
 
 class IOLoop(object):
-    """Singlton wrapper that decides which type of poller to use, creates an
-    instance of it in start_poller and keeps the invoking application in a
-    blocking state by calling the pollers start method. Poller should keep
-    looping until IOLoop.instance().stop() is called or there is a socket
-    error.
+    """Wrapper that decides which type of poller to use and keeps the invoking
+    application in a blocking state by calling the pollers start method.
+    Poller should keep looping until IOLoop.stop() is called.
 
-    Also provides a convenient pass-through for add_timeout and set_events
+    Any number of file descriptors may be watched by one IOLoop, so several
+    connections can share the same loop. Also provides a convenient
+    pass-through for add_timeout and the handler management methods.
 
     """
-    def __init__(self, state_manager):
-        """Create an instance of the IOLoop object.
+    def __init__(self, state_manager=None):
+        """Create an instance of the IOLoop object, choosing the poller.
+
+        :param method state_manager: Ignored, accepted for compatibility with
+                                     callers of IOLoop(state_manager)
+
+        """
+        self.poller = self._get_poller()
+
+    def add_handler(self, fileno, handler, events):
+        """Watch the file descriptor for events, calling handler with the
+        file descriptor and the events that fired.
 
-        :param method state_manager: The method to manage state
+        :param int fileno: The file descriptor to poll for
+        :param method handler: The method to call to handle events
+        :param int events: The events to handle
 
         """
-        self.poller = None
-        self._manage_event_state = state_manager
+        self.poller.add_handler(fileno, handler, events)
+
+    def add_tick_callback(self, handler):
+        """Call handler once at the end of the current IOLoop iteration,
+        after the events and timeouts of the iteration were processed.
+
+        :param method handler: The method to call
+
+        """
+        self.poller.add_tick_callback(handler)
 
     def add_timeout(self, deadline, handler):
         """Add a timeout with with given deadline, should return a timeout id.
@@ -86,6 +232,14 @@ class IOLoop(object):
         """
         return self.poller.__class__.__name__
 
+    def remove_handler(self, fileno):
+        """Stop watching the file descriptor.
+
+        :param int fileno: The file descriptor to stop polling for
+
+        """
+        self.poller.remove_handler(fileno)
+
     def remove_timeout(self, timeout_id):
         """Remove a timeout if it's still in the timeout stack of the poller
 
@@ -95,42 +249,22 @@ class IOLoop(object):
         self.poller.remove_timeout(timeout_id)
 
     def start(self):
-        """Start the IOLoop, waiting for a Poller to take over."""
+        """Start the IOLoop, blocking until it is stopped."""
         LOGGER.debug('Starting IOLoop')
-        while not self.poller:
-            time.sleep(SelectPoller.TIMEOUT)
+        self.poller.open = True
         self.poller.start()
         self.poller.flush_pending_timeouts()
 
     def start_poller(self, handler, events, fileno):
-        """Start the Poller, once started will take over for IOLoop.start()
+        """Watch the file descriptor, kept for adapters written against the
+        single descriptor IOLoop.
 
         :param method handler: The method to call to handle events
         :param int events: The events to handle
         :param int fileno: The file descriptor to poll for
 
         """
-        LOGGER.debug('Starting the Poller')
-        self.poller = None
-        if hasattr(select, 'poll') and hasattr(select.poll, 'modify'):
-            if not SELECT_TYPE or SELECT_TYPE == 'poll':
-                LOGGER.debug('Using PollPoller')
-                self.poller = PollPoller(fileno, handler, events,
-                                         self._manage_event_state)
-        if not self.poller and hasattr(select, 'epoll'):
-            if not SELECT_TYPE or SELECT_TYPE == 'epoll':
-                LOGGER.debug('Using EPollPoller')
-                self.poller = EPollPoller(fileno, handler, events,
-                                          self._manage_event_state)
-        if not self.poller and hasattr(select, 'kqueue'):
-            if not SELECT_TYPE or SELECT_TYPE == 'kqueue':
-                LOGGER.debug('Using KQueuePoller')
-                self.poller = KQueuePoller(fileno, handler, events,
-                                           self._manage_event_state)
-        if not self.poller:
-            LOGGER.debug('Using SelectPoller')
-            self.poller = SelectPoller(fileno, handler, events,
-                                       self._manage_event_state)
+        self.add_handler(fileno, handler, events)
 
     def stop(self):
         """Stop the poller's event loop"""
@@ -146,30 +280,63 @@ class IOLoop(object):
         """
         self.poller.update_handler(fileno, events)
 
+    def _get_poller(self):
+        """Return the fastest poller available for the platform, honoring
+        SELECT_TYPE if it is set.
+
+        :rtype: SelectPoller
+
+        """
+        if hasattr(select, 'poll') and hasattr(select.poll, 'modify'):
+            if not SELECT_TYPE or SELECT_TYPE == 'poll':
+                LOGGER.debug('Using PollPoller')
+                return PollPoller()
+        if hasattr(select, 'epoll'):
+            if not SELECT_TYPE or SELECT_TYPE == 'epoll':
+                LOGGER.debug('Using EPollPoller')
+                return EPollPoller()
+        if hasattr(select, 'kqueue'):
+            if not SELECT_TYPE or SELECT_TYPE == 'kqueue':
+                LOGGER.debug('Using KQueuePoller')
+                return KQueuePoller()
+        LOGGER.debug('Using SelectPoller')
+        return SelectPoller()
+
 
 class SelectPoller(object):
     """Default behavior is to use Select since it's the widest supported and has
     all of the methods we need for child classes as well. One should only need
-    to override the update_handler and start methods for additional types.
+    to override the handler management methods and poll for additional types.
 
     """
     TIMEOUT = 1
 
-    def __init__(self, fileno, handler, events, state_manager):
-        """Create an instance of the SelectPoller
+    def __init__(self):
+        """Create an instance of the SelectPoller"""
+        self.open = True
+        self._fd_events = dict()
+        self._fd_handlers = dict()
+        self._tick_callbacks = list()
+        self._timeouts = dict()
+
+    def add_handler(self, fileno, handler, events):
+        """Add a handler for the file descriptor and events
 
         :param int fileno: The file descriptor to check events for
         :param method handler: What is called when an event happens
         :param int events: The events to look for
-        :param method state_manager: The method to manage state
 
         """
-        self.fileno = fileno
-        self.events = events
-        self.open = True
-        self._handler = handler
-        self._timeouts = dict()
-        self._manage_event_state = state_manager
+        self._fd_handlers[fileno] = handler
+        self._fd_events[fileno] = events
+
+    def add_tick_callback(self, handler):
+        """Add a handler to call at the end of the current loop iteration
+
+        :param method handler: The method to call
+
+        """
+        self._tick_callbacks.append(handler)
 
     def add_timeout(self, deadline, handler):
         """Add a timeout with with given deadline, should return a timeout id.
@@ -182,6 +349,9 @@ class SelectPoller(object):
         value = time.time() + deadline
         LOGGER.debug('Will call %r on or after %i', handler, value)
         timeout_id = '%.8f' % value
+        while timeout_id in self._timeouts:
+            value += 0.00000001
+            timeout_id = '%.8f' % value
         self._timeouts[timeout_id] = {'timestamp': value, 'handler': handler}
         return timeout_id
 
@@ -201,44 +371,74 @@ class SelectPoller(object):
         """
         # Build our values to pass into select
         input_fileno, output_fileno, error_fileno = [], [], []
-
-        if self.events & READ:
-            input_fileno = [self.fileno]
-        if self.events & WRITE:
-            output_fileno = [self.fileno]
-        if self.events & ERROR:
-            error_fileno = [self.fileno]
+        for fileno, events in self._fd_events.items():
+            if events & READ:
+                input_fileno.append(fileno)
+            if events & WRITE:
+                output_fileno.append(fileno)
+            if events & ERROR:
+                error_fileno.append(fileno)
+
+        # Nothing to watch, wait for the next timeout instead
+        if not (input_fileno or output_fileno or error_fileno):
+            if not write_only:
+                time.sleep(self._poll_timeout())
+            return
 
         # Wait on select to let us know what's up
         try:
             read, write, error = select.select(input_fileno,
                                                output_fileno,
                                                error_fileno,
-                                               SelectPoller.TIMEOUT)
+                                               self._poll_timeout())
         except select.error, error:
-            return self._handler(self.fileno, ERROR, error)
+            if error.args[0] == errno.EINTR:
+                return
+            for fileno in self._fd_handlers.keys():
+                self._dispatch(fileno, ERROR, error=error)
+            return
 
-        # Build our events bit mask
-        events = 0
-        if read:
-            events |= READ
-        if write:
-            events |= WRITE
-        if error:
-            events |= ERROR
+        # Build our events bit masks
+        fd_events = dict()
+        for fileno in read:
+            fd_events[fileno] = fd_events.get(fileno, 0) | READ
+        for fileno in write:
+            fd_events[fileno] = fd_events.get(fileno, 0) | WRITE
+        for fileno in error:
+            fd_events[fileno] = fd_events.get(fileno, 0) | ERROR
 
-        if events:
-            self._handler(self.fileno, events, write_only=write_only)
+        for fileno, events in fd_events.items():
+            self._dispatch(fileno, events, write_only=write_only)
+
+    def process_tick_callbacks(self):
+        """Call the handlers added for the end of the loop iteration, handlers
+        added while processing them are called at the end of the next one.
+
+        """
+        callbacks, self._tick_callbacks = self._tick_callbacks, list()
+        for handler in callbacks:
+            handler()
 
     def process_timeouts(self):
         """Process the self._timeouts event stack"""
         start_time = time.time()
         for timeout_id in self._timeouts.keys():
+            if timeout_id not in self._timeouts:
+                continue
             if self._timeouts[timeout_id]['timestamp'] <= start_time:
                 handler = self._timeouts[timeout_id]['handler']
                 del self._timeouts[timeout_id]
                 handler()
 
+    def remove_handler(self, fileno):
+        """Remove the handler for the file descriptor
+
+        :param int fileno: The file descriptor
+
+        """
+        self._fd_handlers.pop(fileno, None)
+        self._fd_events.pop(fileno, None)
+
     def remove_timeout(self, timeout_id):
         """Remove a timeout if it's still in the timeout stack
 
@@ -253,7 +453,7 @@ class SelectPoller(object):
         while self.open:
             self.poll()
             self.process_timeouts()
-            self._manage_event_state()
+            self.process_tick_callbacks()
 
     def update_handler(self, fileno, events):
         """Set the events to the current events
@@ -262,26 +462,69 @@ class SelectPoller(object):
         :param int events: The event mask
 
         """
-        self.events = events
+        if fileno in self._fd_handlers:
+            self._fd_events[fileno] = events
+
+    def _dispatch(self, fileno, events, error=None, write_only=False):
+        """Call the handler registered for the file descriptor, if it is still
+        registered. Handlers may remove themselves or others while events are
+        being dispatched.
+
+        :param int fileno: The file descriptor
+        :param int events: The events that fired
+        :param error: The error raised by the poller, if any
+        :param bool write_only: Only process write events
+
+        """
+        handler = self._fd_handlers.get(fileno)
+        if not handler:
+            return
+        if error is not None:
+            return handler(fileno, events, error)
+        handler(fileno, events, write_only=write_only)
+
+    def _poll_timeout(self):
+        """Return how many seconds the poller may block for, never blocking
+        past the next timeout's deadline.
+
+        :rtype: float
+
+        """
+        if self._tick_callbacks:
+            return 0
+        if not self._timeouts:
+            return self.TIMEOUT
+        deadline = min(value['timestamp'] for value in self._timeouts.values())
+        return max(0, min(self.TIMEOUT, deadline - time.time()))
 
 
 class KQueuePoller(SelectPoller):
     """KQueuePoller works on BSD based systems and is faster than select"""
-    def __init__(self, fileno, handler, events, state_manager):
-        """Create an instance of the KQueuePoller
+    def __init__(self):
+        """Create an instance of the KQueuePoller"""
+        super(KQueuePoller, self).__init__()
+        self._kqueue = select.kqueue()
+
+    def add_handler(self, fileno, handler, events):
+        """Add a handler for the file descriptor and events
 
         :param int fileno: The file descriptor to check events for
         :param method handler: What is called when an event happens
         :param int events: The events to look for
-        :param method state_manager: The method to manage state
 
         """
-        super(KQueuePoller, self).__init__(fileno, handler, events,
-                                           state_manager)
-        self.events = 0
-        self._kqueue = select.kqueue()
+        self._fd_handlers[fileno] = handler
+        self._fd_events[fileno] = 0
         self.update_handler(fileno, events)
-        self._manage_event_state = state_manager
+
+    def remove_handler(self, fileno):
+        """Remove the handler for the file descriptor
+
+        :param int fileno: The file descriptor
+
+        """
+        self.update_handler(fileno, 0)
+        super(KQueuePoller, self).remove_handler(fileno)
 
     def update_handler(self, fileno, events):
         """Set the events to the current events
@@ -290,41 +533,38 @@ class KQueuePoller(SelectPoller):
         :param int events: The event mask
 
         """
+        if fileno not in self._fd_handlers:
+            return
+        current = self._fd_events[fileno]
+
         # No need to update if our events are the same
-        if self.events == events:
+        if current == events:
             return
 
         kevents = list()
         if not events & READ:
-            if self.events & READ:
+            if current & READ:
                 kevents.append(select.kevent(fileno,
                                              filter=select.KQ_FILTER_READ,
                                              flags=select.KQ_EV_DELETE))
         else:
-            if not self.events & READ:
+            if not current & READ:
                 kevents.append(select.kevent(fileno,
                                              filter=select.KQ_FILTER_READ,
                                              flags=select.KQ_EV_ADD))
         if not events & WRITE:
-            if self.events & WRITE:
+            if current & WRITE:
                 kevents.append(select.kevent(fileno,
                                              filter=select.KQ_FILTER_WRITE,
                                              flags=select.KQ_EV_DELETE))
         else:
-            if not self.events & WRITE:
+            if not current & WRITE:
                 kevents.append(select.kevent(fileno,
                                              filter=select.KQ_FILTER_WRITE,
                                              flags=select.KQ_EV_ADD))
         for event in kevents:
             self._kqueue.control([event], 0)
-        self.events = events
-
-    def start(self):
-        """Start the main poller loop. It will loop here until self.closed"""
-        while self.open:
-            self.poll()
-            self.process_timeouts()
-            self._manage_event_state()
+        self._fd_events[fileno] = events
 
     def poll(self, write_only=False):
         """Check to see if the events that are cared about have fired.
@@ -333,21 +573,30 @@ class KQueuePoller(SelectPoller):
             the adapter can write.
 
         """
-        events = 0
+        fd_events = dict()
         try:
-            kevents = self._kqueue.control(None, 1000, SelectPoller.TIMEOUT)
+            kevents = self._kqueue.control(None, 1000, self._poll_timeout())
         except OSError, error:
-            return self._handler(self.fileno, ERROR, error)
+            if error.errno == errno.EINTR:
+                return
+            for fileno in self._fd_handlers.keys():
+                self._dispatch(fileno, ERROR, error=error)
+            return
         for event in kevents:
-            if event.filter == select.KQ_FILTER_READ and READ & self.events:
+            fileno = event.ident
+            wanted = self._fd_events.get(fileno, 0)
+            events = fd_events.get(fileno, 0)
+            if event.filter == select.KQ_FILTER_READ and READ & wanted:
                 events |= READ
-            if event.filter == select.KQ_FILTER_WRITE and WRITE & self.events:
+            if event.filter == select.KQ_FILTER_WRITE and WRITE & wanted:
                 events |= WRITE
-            if event.flags & select.KQ_EV_ERROR and ERROR & self.events:
+            if event.flags & select.KQ_EV_ERROR and ERROR & wanted:
                 events |= ERROR
-        if events:
-            LOGGER.debug("Calling %s(%i)", self._handler, events)
-            self._handler(self.fileno, events, write_only=write_only)
+            if events:
+                fd_events[fileno] = events
+        for fileno, events in fd_events.items():
+            LOGGER.debug("Calling handler for fd %i (%i)", fileno, events)
+            self._dispatch(fileno, events, write_only=write_only)
 
 
 class PollPoller(SelectPoller):
@@ -355,18 +604,36 @@ class PollPoller(SelectPoller):
     certain scenarios.  Both are faster than select.
 
     """
-    def __init__(self, fileno, handler, events, state_manager):
-        """Create an instance of the KQueuePoller
+    def __init__(self):
+        """Create an instance of the PollPoller"""
+        super(PollPoller, self).__init__()
+        self._poll = self._create_poller()
+
+    def add_handler(self, fileno, handler, events):
+        """Add a handler for the file descriptor and events
 
         :param int fileno: The file descriptor to check events for
         :param method handler: What is called when an event happens
         :param int events: The events to look for
-        :param method state_manager: The method to manage state
 
         """
-        super(PollPoller, self).__init__(fileno, handler, events, state_manager)
-        self._poll = select.poll()
-        self._poll.register(fileno, self.events)
+        super(PollPoller, self).add_handler(fileno, handler, events)
+        self._poll.register(fileno, events)
+
+    def remove_handler(self, fileno):
+        """Remove the handler for the file descriptor
+
+        :param int fileno: The file descriptor
+
+        """
+        if fileno not in self._fd_handlers:
+            return
+        super(PollPoller, self).remove_handler(fileno)
+        try:
+            LOGGER.info("Unregistering poller on fd %d", fileno)
+            self._poll.unregister(fileno)
+        except (IOError, KeyError), err:
+            LOGGER.debug("Got %r while unregistering fd %d", err, fileno)
 
     def update_handler(self, fileno, events):
         """Set the events to the current events
@@ -375,24 +642,10 @@ class PollPoller(SelectPoller):
         :param int events: The event mask
 
         """
-        self.events = events
-        self._poll.modify(fileno, self.events)
-
-    def start(self):
-        """Start the main poller loop. It will loop here until self.closed"""
-        was_open = self.open
-        while self.open:
-            self.poll()
-            self.process_timeouts()
-            self._manage_event_state()
-        if not was_open:
+        if fileno not in self._fd_handlers:
             return
-        try:
-            LOGGER.info("Unregistering poller on fd %d" % self.fileno)
-            self.update_handler(self.fileno, 0)
-            self._poll.unregister(self.fileno)
-        except IOError, err:
-            LOGGER.debug("Got IOError while shutting down poller: %s", err)
+        self._fd_events[fileno] = events
+        self._poll.modify(fileno, events)
 
     def poll(self, write_only=False):
         """Poll until TIMEOUT waiting for an event
@@ -400,12 +653,36 @@ class PollPoller(SelectPoller):
         :param write_only bool: Only process write events
 
         """
-        events = self._poll.poll(int(SelectPoller.TIMEOUT * 1000))
+        if not self._fd_handlers:
+            if not write_only:
+                time.sleep(self._poll_timeout())
+            return
+        try:
+            events = self._poll.poll(self._poll_timeout_value())
+        except (IOError, select.error), error:
+            if error.args[0] == errno.EINTR:
+                return
+            raise
         if events:
-            LOGGER.debug("Calling %s with %d events",
-                         self._handler, len(events))
+            LOGGER.debug("Calling handlers for %d events", len(events))
             for fileno, event in events:
-                self._handler(fileno, event, write_only=write_only)
+                self._dispatch(fileno, event, write_only=write_only)
+
+    def _create_poller(self):
+        """Return the poll object used to watch the file descriptors.
+
+        :rtype: select.poll
+
+        """
+        return select.poll()
+
+    def _poll_timeout_value(self):
+        """Return the poll timeout in the unit poll expects, milliseconds.
+
+        :rtype: int
+
+        """
+        return int(self._poll_timeout() * 1000)
 
 
 class EPollPoller(PollPoller):
@@ -413,28 +690,18 @@ class EPollPoller(PollPoller):
     certain scenarios. Both are faster than select.
 
     """
-    def __init__(self, fileno, handler, events, state_manager):
-        """Create an instance of the KQueuePoller
+    def _create_poller(self):
+        """Return the epoll object used to watch the file descriptors.
 
-        :param int fileno: The file descriptor to check events for
-        :param method handler: What is called when an event happens
-        :param int events: The events to look for
-        :param method state_manager: The method to manage state
+        :rtype: select.epoll
 
         """
-        super(EPollPoller, self).__init__(fileno, handler, events,
-                                          state_manager)
-        self._poll = select.epoll()
-        self._poll.register(fileno, self.events)
+        return select.epoll()
 
-    def poll(self, write_only=False):
-        """Poll until TIMEOUT waiting for an event
+    def _poll_timeout_value(self):
+        """Return the poll timeout in the unit epoll expects, seconds.
 
-        :param write_only bool: Only process write events
+        :rtype: float
 
         """
-        events = self._poll.poll(SelectPoller.TIMEOUT)
-        if events:
-            LOGGER.debug("Calling %s", self._handler)
-            for fileno, event in events:
-                self._handler(fileno, event, write_only=write_only)
+        return self._poll_timeout()
@@ -12,18 +12,33 @@ class TornadoConnection(base_connection.BaseConnection):
     will stop taking requests.
 
     """
+    CONNECT_ON_IOLOOP = True
+    NON_BLOCKING_SOCKET = True
+
     def __init__(self, parameters=None,
                  on_open_callback=None,
                  stop_ioloop_on_close=False,
-                 custom_ioloop=None):
+                 custom_ioloop=None,
+                 reconnection_strategy=None):
         self._ioloop = custom_ioloop or ioloop.IOLoop.instance()
         super(TornadoConnection, self).__init__(parameters, on_open_callback,
-                                                stop_ioloop_on_close)
+                                                stop_ioloop_on_close,
+                                                reconnection_strategy)
 
     def _adapter_connect(self):
-        """Connect to the RabbitMQ broker"""
-        super(TornadoConnection, self)._adapter_connect()
+        """Connect to the RabbitMQ broker, returning True when connected.
+
+        :rtype: bool
+
+        """
         self.ioloop = self._ioloop
+        if not super(TornadoConnection, self)._adapter_connect():
+            return False
+        self._adapter_connected()
+        return True
+
+    def _adapter_connected(self):
+        """Watch the connected socket and start the protocol handshake"""
         self.ioloop.add_handler(self.socket.fileno(),
                                 self._handle_events,
                                 self.event_state)
@@ -31,8 +46,9 @@ class TornadoConnection(base_connection.BaseConnection):
 
     def _adapter_disconnect(self):
         """Disconnect from the RabbitMQ broker"""
+        if self.socket:
+            self.ioloop.remove_handler(self.socket.fileno())
         super(TornadoConnection, self)._adapter_disconnect()
-        self.ioloop.remove_handler(self.socket.fileno())
 
     def add_timeout(self, deadline, callback_method):
         """Add the callback_method to the IOLoop timer to fire after deadline
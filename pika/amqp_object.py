@@ -10,26 +10,75 @@ class AMQPObject(object):
     """
     NAME = 'AMQPObject'
     INDEX = None
+    __slots__ = ()
 
     def __repr__(self):
         items = list()
-        for key, value in self.__dict__.iteritems():
+        for key, value in self._attributes():
             if getattr(self.__class__, key, None) != value:
                 items.append('%s=%s' % (key, value))
         if not items:
             return "<%s>" % self.NAME
         return "<%s(%s)>" % (self.NAME, items)
 
+    def __getstate__(self):
+        """Return the attributes that are set, so objects with __slots__ can
+        be pickled with any protocol.
+
+        :rtype: dict
+
+        """
+        return dict(self._attributes())
+
+    def __setstate__(self, state):
+        """Set the attributes from the state returned by __getstate__.
+
+        :param dict state: The attribute names and values
+
+        """
+        for key, value in state.iteritems():
+            setattr(self, key, value)
+
+    def _attributes(self):
+        """Return the names and values of the attributes that are set, in
+        the __slots__ of the classes from the base class down and then in the
+        __dict__ of the object if it has one.
+
+        :rtype: list
+
+        """
+        attributes = list()
+        for cls in reversed(self.__class__.__mro__):
+            for key in cls.__dict__.get('__slots__', ()):
+                if hasattr(self, key):
+                    attributes.append((key, getattr(self, key)))
+        attributes.extend(getattr(self, '__dict__', {}).iteritems())
+        return attributes
+
 
 class Class(AMQPObject):
     """Is extended by AMQP classes"""
     NAME = 'Unextended Class'
+    __slots__ = ()
 
 
 class Method(AMQPObject):
     """Is extended by AMQP methods"""
     NAME = 'Unextended Method'
     synchronous = False
+    __slots__ = ('_properties', '_body')
+
+    @classmethod
+    def from_bytes(cls, encoded, offset=0):
+        """Return the method decoded from encoded at offset. The method is
+        created without running __init__, as decode sets every field.
+
+        :param str encoded: The encoded data
+        :param int offset: The offset of the method's fields
+        :rtype: pika.amqp_object.Method
+
+        """
+        return cls.__new__(cls).decode(encoded, offset)
 
     def _set_content(self, properties, body):
         """If the method is a content frame, set the properties and body to
@@ -62,3 +111,17 @@ class Method(AMQPObject):
 class Properties(AMQPObject):
     """Class to encompass message properties (AMQP Basic.Properties)"""
     NAME = 'Unextended Properties'
+    __slots__ = ()
+
+    @classmethod
+    def from_bytes(cls, encoded, offset=0):
+        """Return the properties decoded from encoded at offset. The
+        properties are created without running __init__, as decode sets
+        every field.
+
+        :param str encoded: The encoded data
+        :param int offset: The offset of the property flags
+        :rtype: pika.amqp_object.Properties
+
+        """
+        return cls.__new__(cls).decode(encoded, offset)
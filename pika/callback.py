@@ -20,6 +20,13 @@ def _name_or_value(value):
     :rtype: str
 
     """
+    # Channel numbers and string keys are the common case, avoid the
+    # TypeError raised by issubclass for them
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, long)):
+        return str(value)
+
     # Is it subclass of AMQPObject
     try:
         if issubclass(value, amqp_object.AMQPObject):
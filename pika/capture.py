@@ -0,0 +1,244 @@
+"""Record the bytes a connection reads from and writes to its socket, and
+replay the recording offline.
+
+A capture is enabled with the capture connection parameter. The file starts
+with MAGIC followed by a record for each socket connection, read and write,
+a RECORD header with the kind, the time and the length of the data, then the
+data. The bytes are recorded as the connection sees them, after SSL
+decryption and before encryption.
+
+replay feeds the reads of a capture to a connection without a socket as fast
+as it can decode and dispatch them, so profiles and benchmarks can run on the
+frames, sizes and interleaving of a real workload.
+
+"""
+import logging
+import struct
+import time
+
+from pika import connection
+from pika import exceptions
+from pika import frame
+from pika import spec
+
+LOGGER = logging.getLogger(__name__)
+
+MAGIC = 'PIKACAP1'
+
+# The kind, the time and the length of the data of a record
+RECORD = struct.Struct('>cdI')
+
+CONNECTED = 'c'
+READ = 'r'
+WRITTEN = 'w'
+
+
+class CaptureWriter(object):
+    """Appends the records of a connection to a capture file"""
+
+    def __init__(self, path):
+        """Open the capture file at path, appending to it if it exists.
+
+        :param str path: The path of the capture file
+
+        """
+        self.path = path
+        self._file = open(path, 'ab')
+        if not self._file.tell():
+            self._file.write(MAGIC)
+
+    def connected(self, endpoint):
+        """Record that the connection connected to the endpoint.
+
+        :param tuple endpoint: The host and port connected to
+
+        """
+        self.write(CONNECTED, '%s:%i' % endpoint)
+
+    def write(self, kind, value):
+        """Record the data read or written.
+
+        :param str kind: READ, WRITTEN or CONNECTED
+        :param str value: The data
+
+        """
+        self._file.write(RECORD.pack(kind, time.time(), len(value)))
+        self._file.write(value)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def read_capture(path):
+    """Iterate over the records of the capture file at path.
+
+    :param str path: The path of the capture file
+    :rtype: iter of tuple(kind, timestamp, data)
+    :raises: InvalidCaptureError
+
+    """
+    with open(path, 'rb') as handle:
+        if handle.read(len(MAGIC)) != MAGIC:
+            raise exceptions.InvalidCaptureError('%s is not a capture' % path)
+        while True:
+            header = handle.read(RECORD.size)
+            if not header:
+                return
+            if len(header) < RECORD.size:
+                raise exceptions.InvalidCaptureError('Truncated record')
+            kind, timestamp, length = RECORD.unpack(header)
+            value = handle.read(length)
+            if len(value) < length:
+                raise exceptions.InvalidCaptureError('Truncated record')
+            yield kind, timestamp, value
+
+
+def streams(path, kind=READ):
+    """Return the bytes read, or written, by each socket connection in the
+    capture file at path.
+
+    :param str path: The path of the capture file
+    :param str kind: READ or WRITTEN
+    :rtype: list
+
+    """
+    values = list()
+    for record_kind, timestamp_unused, value in read_capture(path):
+        if record_kind == CONNECTED:
+            values.append(list())
+        elif record_kind == kind and values:
+            values[-1].append(value)
+    return [''.join(value) for value in values]
+
+
+class ReplayConnection(connection.Connection):
+    """A connection without a socket. The frames it writes are discarded and
+    its timers never fire.
+
+    """
+    def add_timeout(self, deadline, callback_method):
+        pass
+
+    def remove_timeout(self, timeout_id):
+        pass
+
+    def _adapter_connect(self):
+        self.endpoint = ('replay', 0)
+        self._on_connected()
+        return True
+
+    def _adapter_disconnect(self):
+        pass
+
+    def _flush_outbound(self):
+        while self.outbound_buffer.size:
+            self.outbound_buffer.consume(self.outbound_buffer.size)
+            self._fill_outbound_buffer()
+
+
+class Replayer(object):
+    """Replays the socket connections of a capture. The channels and
+    consumers the connection opened are opened when their Channel.Open and
+    Basic.Consume are found in the data written, so deliveries are
+    dispatched to a consumer as they were when the capture was recorded.
+
+    """
+    def __init__(self, on_message=None, profiler=None):
+        """Create a new replayer.
+
+        :param method on_message: The consumer callback of every consumer,
+                                  called with the channel, method, header
+                                  and body of each delivery
+        :param pika.profiling.PhaseProfiler profiler: Enabled on each
+                                                      replayed connection
+
+        """
+        self.on_message = on_message or self._on_message
+        self.profiler = profiler
+        self.connections = list()
+        self.reads = 0
+        self.bytes_read = 0
+        self.duration = 0.0
+        self._connection = None
+        self._written = ''
+
+    @property
+    def frames(self):
+        """The number of frames read by the replayed connections"""
+        return sum(value.frames_received for value in self.connections)
+
+    def replay(self, path):
+        """Replay the capture file at path, timing the reads.
+
+        :param str path: The path of the capture file
+
+        """
+        for kind, timestamp_unused, value in read_capture(path):
+            if kind == READ and self._connection:
+                self.reads += 1
+                self.bytes_read += len(value)
+                start = time.time()
+                self._connection._on_data_available(value)
+                self.duration += time.time() - start
+            elif kind == WRITTEN and self._connection:
+                self._on_written(value)
+            elif kind == CONNECTED:
+                self._connection = ReplayConnection()
+                if self.profiler:
+                    self._connection.enable_profiler(self.profiler)
+                self._written = ''
+                self.connections.append(self._connection)
+
+    def _on_message(self, channel, method, header, body):
+        pass
+
+    def _on_written(self, value):
+        """Open the channels and consumers opened by the frames written.
+
+        :param str value: The data written
+
+        """
+        self._written += value
+        offset = 0
+        while offset < len(self._written):
+            consumed, value = frame.decode_frame(self._written, offset)
+            if not consumed:
+                break
+            offset += consumed
+            if isinstance(value, frame.Method):
+                self._on_method_written(value)
+        self._written = self._written[offset:]
+
+    def _on_method_written(self, value):
+        """Open the channel or consumer opened by the method frame written.
+
+        :param pika.frame.Method value: The method frame
+
+        """
+        method = value.method
+        if isinstance(method, spec.Channel.Open):
+            LOGGER.debug('Opening channel %i', value.channel_number)
+            self._connection.channel(None, value.channel_number)
+        elif (isinstance(method, spec.Basic.Consume) and
+              value.channel_number in self._connection._channels):
+            LOGGER.debug('Consuming from %s', method.queue)
+            self._connection._channels[value.channel_number].basic_consume(
+                self.on_message, method.queue, method.no_ack,
+                method.exclusive, method.consumer_tag)
+
+
+def replay(path, on_message=None):
+    """Replay the capture file at path, returning the Replayer with the
+    number of reads, frames and bytes replayed and the time taken.
+
+    :param str path: The path of the capture file
+    :param method on_message: The consumer callback of every consumer
+    :rtype: Replayer
+
+    """
+    replayer = Replayer(on_message)
+    replayer.replay(path)
+    return replayer
@@ -3,16 +3,29 @@ implementing the methods and behaviors for an AMQP Channel.
 
 """
 import collections
+import functools
 import logging
+import time
 
 import pika.frame as frame
 import pika.exceptions as exceptions
+import pika.metrics as metrics
+import pika.profiling as profiling
 import pika.spec as spec
 from pika.utils import is_callable
 
 LOGGER = logging.getLogger(__name__)
 MAX_CHANNELS = 32768
 
+# The replies the recorded topology methods wait for when they are replayed
+_RECOVERY_REPLIES = {spec.Basic.Consume: spec.Basic.ConsumeOk,
+                     spec.Basic.Qos: spec.Basic.QosOk,
+                     spec.Confirm.Select: spec.Confirm.SelectOk,
+                     spec.Exchange.Bind: spec.Exchange.BindOk,
+                     spec.Exchange.Declare: spec.Exchange.DeclareOk,
+                     spec.Queue.Bind: spec.Queue.BindOk,
+                     spec.Queue.Declare: spec.Queue.DeclareOk}
+
 
 class Channel(object):
     """A Channel is the primary communication method for interacting with
@@ -27,6 +40,9 @@ class Channel(object):
     OPEN = 2
     CLOSING = 3
 
+    # The number of marshaled Basic.Publish frames kept for reuse
+    PUBLISH_FRAME_CACHE_SIZE = 128
+
     def __init__(self, connection, channel_number, on_open_callback=None):
         """Create a new instance of the Channel
 
@@ -48,6 +64,9 @@ class Channel(object):
         self._blocking = None
         self._flow = None
 
+        # Commands issued while the channel is opening, sent once it is open
+        self._opening_queue = collections.deque()
+
         self._on_open_callback = on_open_callback
         self._state = self.CLOSED
         self._cancelled = list()
@@ -55,9 +74,24 @@ class Channel(object):
         self._pending = dict()
         self._on_get_ok_callback = None
         self._on_flow_ok_callback = None
+
+        # Marshaled Basic.Publish frames by destination, in the current and
+        # the old generation of the cache
+        self._publish_frames = dict()
+        self._publish_frames_old = dict()
         self._reply_code = None
         self._reply_text = None
 
+        # Topology recorded to be replayed when the connection reconnects
+        self._topology = list()
+        self._declaring = collections.deque()
+        self._generated_names = dict()
+        self._recovering = False
+        self._replay = collections.deque()
+
+        # Counters and histograms of the messages and methods of the channel
+        self.metrics = metrics.ChannelMetrics(self)
+
     def add_callback(self, callback, replies, one_shot=True):
         """Pass in a callback handler and a list replies from the
         RabbitMQ broker which you'd like the callback notified of. Callbacks
@@ -101,7 +135,7 @@ class Channel(object):
         :param method callback: The method to call on callback
 
         """
-        self.callbacks.add(self.channel_number, spec.Basic.Return, callback,
+        self.callbacks.add(self.channel_number, '_on_basic_return', callback,
                            one_shot=False)
 
     def basic_ack(self, delivery_tag=0, multiple=False):
@@ -123,6 +157,7 @@ class Channel(object):
         """
         if not self.is_open:
             raise exceptions.ChannelClosed()
+        self.metrics.acks += 1
         return self._rpc(spec.Basic.Ack(delivery_tag, multiple))
 
     def basic_cancel(self, callback=None, consumer_tag='', nowait=False):
@@ -154,12 +189,23 @@ class Channel(object):
                   [spec.Basic.CancelOk])
 
     def basic_consume(self, callback, queue='', no_ack=False,
-                      exclusive=False, consumer_tag=None):
+                      exclusive=False, consumer_tag=None, on_start=None,
+                      on_chunk=None, on_end=None):
         """Sends the AMQP command Basic.Consume to the broker and binds messages
         for the consumer_tag to the consumer callback. If you do not pass in
         a consumer_tag, one will be automatically generated for you. Returns
         the consumer tag.
 
+        Pass on_chunk and on_end to stream the bodies of large messages
+        instead of receiving each message whole. on_start is called with the
+        channel, method, properties and body size of each message, on_chunk
+        with the channel and a memoryview of each body frame as it arrives
+        and on_end with the channel and the method once the body is complete.
+        Only one frame of a body is held in memory at a time. callback is not
+        used for a streaming consumer and may be None. A message that is
+        being streamed when the connection is lost does not get an on_end
+        call, the broker redelivers it if it was not acknowledged.
+
         For more information on basic_consume, see:
         http://www.rabbitmq.com/amqp-0-9-1-reference.html#basic.consume
 
@@ -168,9 +214,20 @@ class Channel(object):
         :param bool no_ack: Tell the broker to not expect a response
         :param bool exclusive: Don't allow other consumers on the queue
         :param str|unicode consumer_tag: Specify your own consumer tag
+        :param method on_start: The method to call when a streamed message
+            starts
+        :param method on_chunk: The method to call with each body frame of a
+            streamed message
+        :param method on_end: The method to call when a streamed message ends
 
         """
-        self._validate_channel_and_callback(callback)
+        if on_chunk or on_end:
+            if not (is_callable(on_chunk) and is_callable(on_end)):
+                raise ValueError('on_chunk and on_end are both required to '
+                                 'stream message bodies')
+            self._validate_channel_and_callback(on_start)
+        else:
+            self._validate_channel_and_callback(callback)
         # If a consumer tag was not passed, create one
         consumer_tag = consumer_tag or 'ctag%i.%i' % (self.channel_number,
                                                       len(self._consumers) +
@@ -181,6 +238,11 @@ class Channel(object):
 
         self._consumers[consumer_tag] = callback
         self._pending[consumer_tag] = list()
+        if on_chunk:
+            self.frame_dispatcher.streams[consumer_tag] = (
+                functools.partial(self._on_stream_start, on_start),
+                functools.partial(on_chunk, self),
+                functools.partial(on_end, self))
         self._rpc(spec.Basic.Consume(queue=queue,
                                      consumer_tag=consumer_tag,
                                      no_ack=no_ack,
@@ -233,33 +295,75 @@ class Channel(object):
         """
         if not self.is_open:
             raise exceptions.ChannelClosed()
+        self.metrics.nacks += 1
         return self._rpc(spec.Basic.Nack(delivery_tag, multiple, requeue))
 
     def basic_publish(self, exchange, routing_key, body,
-                      properties=None, mandatory=False, immediate=False):
+                      properties=None, mandatory=False, immediate=False,
+                      body_size=None):
         """Publish to the channel with the given exchange, routing key and body.
         For more information on basic_publish and what the parameters do, see:
 
         http://www.rabbitmq.com/amqp-0-9-1-reference.html#basic.publish
 
+        The body may also be a file-like object or an iterator of strings,
+        with body_size set to the number of bytes to send. The body is then
+        read a frame at a time as the outbound buffer drains instead of
+        being held in memory, regular files are read through mmap.
+
         :param str exchange: The exchange name
         :param str routing_key: The routing key
-        :param str body: The message body
+        :param str|file|iter body: The message body
         :param pika.spec.Properties properties: Basic.properties
         :param bool mandatory: The mandatory flag
         :param bool immediate: The immediate flag
+        :param int body_size: The size of a file-like or iterator body
 
         """
-        if not self.is_open:
+        if not (self.is_open or self.is_opening):
             raise exceptions.ChannelClosed()
         if immediate:
             LOGGER.warning('The immediate flag is deprecated in RabbitMQ')
         properties = properties or spec.BasicProperties()
-        self._send_method(spec.Basic.Publish(exchange=exchange,
-                                             routing_key=routing_key,
-                                             mandatory=mandatory,
-                                             immediate=immediate),
-                          (properties, body))
+        content = ((properties, body) if body_size is None else
+                   (properties, body, body_size))
+        self.metrics.publishes += 1
+        if self.metrics.unconfirmed is not None:
+            self.metrics.unconfirmed.append(time.time())
+        self._send_method(self._publish_frame(exchange, routing_key,
+                                              mandatory, immediate),
+                          content)
+
+    def basic_publish_multi(self, exchange, routing_keys, body,
+                            properties=None, mandatory=False,
+                            immediate=False):
+        """Publish the same message to the exchange once for each of the
+        routing keys. The content header and body frames are marshaled once
+        and the same frames are sent after the Basic.Publish frame of each
+        routing key, so the cost of encoding the message does not grow with
+        the number of routing keys.
+
+        :param str exchange: The exchange name
+        :param list routing_keys: The routing keys to publish with
+        :param str body: The message body
+        :param pika.spec.Properties properties: Basic.properties
+        :param bool mandatory: The mandatory flag
+        :param bool immediate: The immediate flag
+
+        """
+        if not (self.is_open or self.is_opening):
+            raise exceptions.ChannelClosed()
+        if immediate:
+            LOGGER.warning('The immediate flag is deprecated in RabbitMQ')
+        content = self.connection._content_frames(
+            self.channel_number, properties or spec.BasicProperties(), body)
+        for routing_key in routing_keys:
+            self.metrics.publishes += 1
+            if self.metrics.unconfirmed is not None:
+                self.metrics.unconfirmed.append(time.time())
+            self._send_method(self._publish_frame(exchange, routing_key,
+                                                  mandatory, immediate),
+                              content)
 
     def basic_qos(self, callback=None, prefetch_size=0, prefetch_count=0,
                   all_channels=False):
@@ -311,6 +415,7 @@ class Channel(object):
         """
         if not self.is_open:
             raise exceptions.ChannelClosed()
+        self.metrics.rejects += 1
         return self._rpc(spec.Basic.Reject(delivery_tag, requeue))
 
     def basic_recover(self, callback=None, requeue=False):
@@ -385,6 +490,12 @@ class Channel(object):
                                callback,
                                False)
 
+        # Time the confirmation of the messages published from now on
+        self.metrics.confirm_mode()
+        for reply in (spec.Basic.Ack, spec.Basic.Nack):
+            self.callbacks.add(self.channel_number, reply,
+                               self._on_confirmation, False)
+
         # Send the RPC command
         self._rpc(spec.Confirm.Select(nowait),
                   self._on_confirm_select_ok,
@@ -533,6 +644,15 @@ class Channel(object):
         """
         return self._state == self.CLOSING
 
+    @property
+    def is_opening(self):
+        """Returns True if the channel is opening.
+
+        :rtype: bool
+
+        """
+        return self._state == self.OPENING
+
     @property
     def is_open(self):
         """Returns True if the channel is open.
@@ -542,6 +662,26 @@ class Channel(object):
         """
         return self._state == self.OPEN
 
+    def on_remote_close(self, method_frame):
+        """Invoked by the connection when it was closed, closing the channel
+        without a Channel.Close handshake. A channel that was open remembers
+        it should replay its topology if it is recovered.
+
+        :param pika.frame.Method method_frame: The Connection.Close frame or
+                                               None if the socket was lost
+
+        """
+        LOGGER.debug('Channel %i closed by the connection: %r',
+                     self.channel_number, method_frame)
+        self._recovering = self.is_open
+        self._set_state(self.CLOSED)
+        self.frame_dispatcher.reset()
+        self._opening_queue.clear()
+        self._blocked.clear()
+        self._blocking = None
+        self._declaring.clear()
+        self._replay.clear()
+
     def open(self):
         """Open the channel"""
         self._set_state(self.OPENING)
@@ -633,6 +773,18 @@ class Channel(object):
                                            arguments or dict()), callback,
                          [spec.Queue.UnbindOk])
 
+    def set_zero_copy_bodies(self, enabled=True):
+        """Pass message bodies to the consumers and Basic.Get callbacks of the
+        channel as memoryview objects instead of str. Large bodies are then
+        assembled in a single buffer allocated for the body size instead of
+        being joined from their frames. Use memoryview.tobytes() where a str
+        is needed.
+
+        :param bool enabled: Pass bodies as memoryview objects
+
+        """
+        self.frame_dispatcher.zero_copy = enabled
+
     def tx_commit(self, callback=None):
         """Commit a transaction
 
@@ -671,18 +823,31 @@ class Channel(object):
         """
         # Add a callback for Basic.Deliver
         self.callbacks.add(self.channel_number,
-                           spec.Basic.Deliver,
+                           '_on_basic_deliver',
                            self._on_basic_deliver,
                            False,
                            self.frame_dispatcher)
 
-        # Add a callback for Basic.Get
+        # Add a callback for Basic.GetOk
         self.callbacks.add(self.channel_number,
-                           spec.Basic.Get,
+                           '_on_basic_get',
                            self._on_basic_get_ok,
                            False,
                            self.frame_dispatcher)
 
+        # Track the names of server-named queues
+        self.callbacks.add(self.channel_number,
+                           spec.Queue.DeclareOk,
+                           self._on_queue_declare_ok,
+                           False)
+
+        # Count the messages returned by the broker
+        self.callbacks.add(self.channel_number,
+                           '_on_basic_return',
+                           self._on_basic_return,
+                           False,
+                           self.frame_dispatcher)
+
         # Add a callback for Basic.GetEmpty
         self.callbacks.add(self.channel_number,
                            spec.Basic.GetEmpty,
@@ -701,6 +866,46 @@ class Channel(object):
                            self._on_close,
                            False)
 
+    def _forget_topology(self, method):
+        """Remove the recorded topology the method deletes or undoes.
+
+        :param pika.amqp_object.Method method: The method being sent
+
+        """
+        if isinstance(method, spec.Exchange.Delete):
+            name = method.exchange
+            self._remove_records(
+                lambda r: ((isinstance(r, spec.Exchange.Declare) and
+                            r.exchange == name) or
+                           (isinstance(r, spec.Exchange.Bind) and
+                            name in (r.destination, r.source)) or
+                           (isinstance(r, spec.Queue.Bind) and
+                            r.exchange == name)))
+        elif isinstance(method, spec.Queue.Delete):
+            name = method.queue
+            self._remove_records(
+                lambda r: ((isinstance(r, spec.Queue.Declare) and
+                            name in (r.queue,
+                                     self._generated_names.get(id(r)))) or
+                           (isinstance(r, (spec.Queue.Bind,
+                                           spec.Basic.Consume)) and
+                            r.queue == name)))
+        elif isinstance(method, spec.Queue.Unbind):
+            self._remove_records(
+                lambda r: (isinstance(r, spec.Queue.Bind) and
+                           (r.queue, r.exchange, r.routing_key) ==
+                           (method.queue, method.exchange, method.routing_key)))
+        elif isinstance(method, spec.Exchange.Unbind):
+            self._remove_records(
+                lambda r: (isinstance(r, spec.Exchange.Bind) and
+                           (r.destination, r.source, r.routing_key) ==
+                           (method.destination, method.source,
+                            method.routing_key)))
+        elif isinstance(method, spec.Basic.Cancel):
+            self._remove_records(
+                lambda r: (isinstance(r, spec.Basic.Consume) and
+                           r.consumer_tag == method.consumer_tag))
+
     def _add_pending_msg(self, consumer_tag, method_frame,  header_frame, body):
         self._pending[consumer_tag].append((self, method_frame.method,
                                             header_frame.properties, body))
@@ -730,6 +935,9 @@ class Channel(object):
         self._cancelled.append(method_frame.method.consumer_tag)
         if method_frame.method.consumer_tag in self._consumers:
             del self._consumers[method_frame.method.consumer_tag]
+        self.frame_dispatcher.streams.pop(method_frame.method.consumer_tag,
+                                          None)
+        self._forget_topology(method_frame.method)
 
     def _on_basic_cancel_ok(self, method_frame):
         """Called in response to a frame from the Broker when the
@@ -743,6 +951,8 @@ class Channel(object):
                 del self._consumers[method_frame.method.consumer_tag]
             if method_frame.method.consumer_tag in self._pending:
                 del self._pending[method_frame.method.consumer_tag]
+            self.frame_dispatcher.streams.pop(
+                method_frame.method.consumer_tag, None)
         if self.is_closing and not len(self._consumers):
             self._shutdown()
 
@@ -753,9 +963,10 @@ class Channel(object):
 
         :param pika.frame.Method method_frame: The method frame received
         :param pika.frame.Header header_frame: The header frame received
-        :param str body: The body received
+        :param str|memoryview body: The body received
 
         """
+        self.metrics.deliveries += 1
         consumer_tag = method_frame.method.consumer_tag
         if consumer_tag in self._cancelled:
             LOGGER.debug('Rejected message for cancelled consumer')
@@ -763,13 +974,30 @@ class Channel(object):
         if consumer_tag not in self._consumers:
             return self._add_pending_msg(consumer_tag, method_frame,
                                          header_frame, body)
-        while self._pending[consumer_tag]:
+        profiler = self.connection.profiler
+        if profiler:
+            previous = profiler.enter(profiling.CALLBACK)
+        try:
+            while self._pending[consumer_tag]:
+                self._consumers[consumer_tag](
+                    self, *self._get_pending_msg(consumer_tag))
             self._consumers[consumer_tag](self,
-                                          *self._get_pending_msg(consumer_tag))
-        self._consumers[consumer_tag](self,
-                                      method_frame.method,
-                                      header_frame.properties,
-                                      body)
+                                          method_frame.method,
+                                          header_frame.properties,
+                                          body)
+        finally:
+            if profiler:
+                profiler.leave(previous)
+
+    def _on_basic_return(self, method_frame, header_frame, body):
+        """Count a message returned by the broker.
+
+        :param pika.frame.Method method_frame: The method frame received
+        :param pika.frame.Header header_frame: The header frame received
+        :param str|memoryview body: The body received
+
+        """
+        self.metrics.returns += 1
 
     def _on_basic_get_empty(self, method_frame):
         """When we receive an empty reply do nothing but log it
@@ -784,14 +1012,22 @@ class Channel(object):
 
         :param pika.frame.Method method_frame: The method frame received
         :param pika.frame.Header header_frame: The header frame received
-        :param str body: The body received
+        :param str|memoryview body: The body received
 
         """
+        self.metrics.gets += 1
         if self._on_get_ok_callback:
-            self._on_get_ok_callback(self,
-                                     method_frame.method,
-                                     header_frame.properties,
-                                     body)
+            profiler = self.connection.profiler
+            if profiler:
+                previous = profiler.enter(profiling.CALLBACK)
+            try:
+                self._on_get_ok_callback(self,
+                                         method_frame.method,
+                                         header_frame.properties,
+                                         body)
+            finally:
+                if profiler:
+                    profiler.leave(previous)
             self._basic_get_ok_callback = None
         else:
             LOGGER.error('Basic.GetOk received with no active callback')
@@ -803,8 +1039,27 @@ class Channel(object):
 
         """
         LOGGER.warning('Received Channel.Close, closing: %r', method_frame)
-        self._send_method(spec.Channel.CloseOk())
+        # Not queued behind the commands of a channel that is still opening
+        self.connection._send_method(self.channel_number,
+                                     spec.Channel.CloseOk())
         self._set_state(self.CLOSED)
+        self._opening_queue.clear()
+        if self._recovering:
+            LOGGER.error('Channel %i closed while replaying its topology',
+                         self.channel_number)
+            self._recovering = False
+            self.connection._on_channel_recovered(self)
+
+    def _on_confirmation(self, method_frame):
+        """Time the confirmation of the messages a Basic.Ack or Basic.Nack
+        from the broker confirms.
+
+        :param pika.frame.Method method_frame: The method frame received
+
+        """
+        method = method_frame.method
+        self.metrics.confirmed(method.delivery_tag, method.multiple,
+                               isinstance(method, spec.Basic.Ack))
 
     def _on_confirm_select_ok(self, method_frame):
         """Called when the broker sends a Confirm.SelectOk frame
@@ -847,9 +1102,49 @@ class Channel(object):
 
         """
         self._set_state(self.OPEN)
+        self.connection._handshake_stage('channel_open_ok')
+        if self._recovering:
+            return self._replay_topology()
+        self._send_opening_queue()
         if self._on_open_callback:
             self._on_open_callback(self)
 
+    def _on_queue_declare_ok(self, method_frame):
+        """Track the names the broker generates for server-named queues so
+        the recorded bindings and consumers follow the queue when it is
+        redeclared under a new name after reconnecting.
+
+        :param pika.frame.Method method_frame: The Queue.DeclareOk frame
+
+        """
+        if not self._declaring:
+            return
+        declare = self._declaring.popleft()
+        if declare.queue:
+            return
+        previous = self._generated_names.get(id(declare))
+        name = method_frame.method.queue
+        self._generated_names[id(declare)] = name
+        if previous and previous != name:
+            LOGGER.debug('Server-named queue %s is now %s', previous, name)
+            for record in self._topology:
+                if getattr(record, 'queue', None) == previous:
+                    record.queue = name
+
+    def _on_stream_start(self, on_start, method, properties, body_size):
+        """Count the start of a streamed delivery and pass it on to the
+        consumer's start callback if it has one.
+
+        :param method on_start: The consumer's start callback or None
+        :param pika.spec.Basic.Deliver method: The delivery method
+        :param pika.spec.BasicProperties properties: The message properties
+        :param int body_size: The size of the message body
+
+        """
+        self.metrics.deliveries += 1
+        if on_start:
+            on_start(self, method, properties, body_size)
+
     def _on_synchronous_complete(self, method_frame):
         """This is called when a synchronous command is completed. It will undo
         the blocking state and send all the frames that stacked up while we
@@ -863,6 +1158,91 @@ class Channel(object):
         while self._blocked and not self.blocking:
             self._rpc(*self._blocked.popleft())
 
+    def _record_topology(self, method):
+        """Record the topology, QoS, confirmation mode and consumers the
+        method sets up so they can be replayed when the connection recovers.
+
+        :param pika.amqp_object.Method method: The method being sent
+
+        """
+        if isinstance(method, spec.Queue.Declare):
+            if not method.nowait:
+                self._declaring.append(method)
+            if method.passive:
+                return
+            if method.queue:
+                self._remove_records(
+                    lambda r: (isinstance(r, spec.Queue.Declare) and
+                               r.queue == method.queue))
+        elif isinstance(method, spec.Exchange.Declare):
+            if method.passive:
+                return
+            self._remove_records(
+                lambda r: (isinstance(r, spec.Exchange.Declare) and
+                           r.exchange == method.exchange))
+        elif isinstance(method, spec.Basic.Qos):
+            self._remove_records(lambda r: isinstance(r, spec.Basic.Qos))
+        elif isinstance(method, spec.Confirm.Select):
+            self._remove_records(lambda r: isinstance(r, spec.Confirm.Select))
+        elif not isinstance(method, (spec.Basic.Consume, spec.Exchange.Bind,
+                                     spec.Queue.Bind)):
+            return self._forget_topology(method)
+        self._topology.append(method)
+
+    def _recover(self):
+        """Reopen the channel after the connection has reconnected. A channel
+        that was open replays the recorded topology and consumers once it is
+        open, a channel that was still opening calls its on_open_callback.
+        The callbacks registered when the channel was first opened are kept.
+
+        """
+        LOGGER.info('Recovering channel %i', self.channel_number)
+        self.metrics.reset()
+        self._set_state(self.OPENING)
+        self._rpc(spec.Channel.Open(), self._on_open_ok, [spec.Channel.OpenOk])
+
+    def _remove_records(self, match):
+        """Remove the recorded methods the match function returns True for.
+
+        :param method match: Called with each recorded method
+
+        """
+        self._topology = [record for record in self._topology
+                          if not match(record)]
+
+    def _replay_next(self, method_frame_unused=None):
+        """Send the recorded methods in order, waiting for the reply of each
+        synchronous method before sending the next one. Lets the connection
+        know once the channel has fully recovered.
+
+        """
+        while self._replay:
+            method = self._replay.popleft()
+            LOGGER.debug('Replaying %r on channel %i', method,
+                         self.channel_number)
+            nowait = getattr(method, 'nowait', False)
+            if isinstance(method, spec.Queue.Declare) and not nowait:
+                self._declaring.append(method)
+            reply = _RECOVERY_REPLIES.get(method.__class__)
+            if reply and not nowait:
+                self.callbacks.add(self.channel_number, reply,
+                                   self._replay_next)
+                return self._send_method(method)
+            self._send_method(method)
+        self._recovering = False
+        self._send_opening_queue()
+        self.connection._on_channel_recovered(self)
+
+    def _replay_topology(self):
+        """Replay the recorded topology, QoS settings and consumers on the
+        reopened channel.
+
+        """
+        LOGGER.info('Replaying %i recorded methods on channel %i',
+                    len(self._topology), self.channel_number)
+        self._replay = collections.deque(self._topology)
+        self._replay_next()
+
     def _rpc(self, method_frame, callback=None, acceptable_replies=None):
         """Shortcut wrapper to the Connection's rpc command using its callback
         stack, passing in our channel number.
@@ -891,12 +1271,17 @@ class Channel(object):
         if callback and not is_callable(callback):
             raise TypeError("callback should be None, a function or method.")
 
+        # Remember what to replay if the connection reconnects
+        if self.connection.reconnection.can_reconnect:
+            self._record_topology(method_frame)
+
         # Block until a response frame is received for synchronous frames
         if method_frame.synchronous:
             self.blocking = method_frame.NAME
 
         # If acceptable replies are set, add callbacks
         if acceptable_replies:
+            self.metrics.rpc_sent(method_frame.NAME, acceptable_replies)
             for reply in acceptable_replies or list():
                 self.callbacks.add(self.channel_number,
                                    reply,
@@ -908,17 +1293,72 @@ class Channel(object):
 
         self._send_method(method_frame)
 
+    def _publish_frame(self, exchange, routing_key, mandatory, immediate):
+        """Return the marshaled Basic.Publish frame for the destination,
+        creating it if it is not cached. The cache is kept in two
+        generations of half of PUBLISH_FRAME_CACHE_SIZE frames each: frames
+        are created in or promoted to the current generation, which becomes
+        the old generation once it is full, dropping the frames that were
+        not used since. A cache hit is a single dict lookup.
+
+        :param str exchange: The exchange name
+        :param str routing_key: The routing key
+        :param bool mandatory: The mandatory flag
+        :param bool immediate: The immediate flag
+        :rtype: pika.frame.MarshaledMethod
+
+        """
+        key = (exchange, routing_key, mandatory, immediate)
+        method_frame = self._publish_frames.get(key)
+        if method_frame is not None:
+            return method_frame
+        method_frame = self._publish_frames_old.pop(key, None)
+        if method_frame is None:
+            method_frame = frame.MarshaledMethod(
+                self.channel_number,
+                spec.Basic.Publish(exchange=exchange,
+                                   routing_key=routing_key,
+                                   mandatory=mandatory,
+                                   immediate=immediate))
+        if len(self._publish_frames) >= self.PUBLISH_FRAME_CACHE_SIZE // 2:
+            self._publish_frames_old = self._publish_frames
+            self._publish_frames = dict()
+        self._publish_frames[key] = method_frame
+        return method_frame
+
     def _send_method(self, method_frame, content=None):
         """Shortcut wrapper to send a method through our connection, passing in
         the channel number
 
         :param pika.object.Method method_frame: The method frame to send
         :param tuple content: If set, is a content frame, is tuple of
-                              properties and body.
+                              properties and body, and the body size if
+                              the body is a file-like object or iterator.
 
         """
+        if self.is_opening and not isinstance(method_frame, spec.Channel.Open):
+            LOGGER.debug('Queueing %r until channel %i is open',
+                         method_frame, self.channel_number)
+            self._opening_queue.append((method_frame, content))
+            return
         self.connection._send_method(self.channel_number, method_frame, content)
 
+    def _send_opening_queue(self):
+        """Send the commands queued while the channel was opening in a single
+        write.
+
+        """
+        if not self._opening_queue:
+            return
+        LOGGER.debug('Sending %i queued commands on channel %i',
+                     len(self._opening_queue), self.channel_number)
+        self.connection._cork()
+        try:
+            while self._opening_queue:
+                self._send_method(*self._opening_queue.popleft())
+        finally:
+            self.connection._uncork()
+
     def _set_state(self, CONNECTION_STATE):
         self._state = CONNECTION_STATE
 
@@ -932,7 +1372,7 @@ class Channel(object):
                                              self._reply_text, 0, 0))
 
     def _validate_channel_and_callback(self, callback):
-        if not self.is_open:
+        if not (self.is_open or self.is_opening):
             raise exceptions.ChannelClosed()
         if callback is not None and not is_callable(callback):
             raise ValueError('callback must be a function or method')
@@ -1,6 +1,16 @@
 """Core connection objects"""
+import collections
 import logging
+import mmap
+import os
 import platform
+import stat
+import time
+
+try:
+    memoryview
+except NameError:
+    memoryview = None
 
 from pika import __version__
 from pika import callback
@@ -9,6 +19,9 @@ from pika import credentials as pika_credentials
 from pika import exceptions
 from pika import frame
 from pika import heartbeat
+from pika import metrics
+from pika import profiling
+from pika import reconnection_strategies
 from pika import utils
 from pika import simplebuffer
 from pika import spec
@@ -40,7 +53,9 @@ class ConnectionParameters(object):
                  connection_attempts=1,
                  retry_delay=2.0,
                  socket_timeout=DEFAULT_SOCKET_TIMEOUT,
-                 locale=DEFAULT_LOCALE):
+                 locale=DEFAULT_LOCALE,
+                 endpoints=None,
+                 capture=None):
         """Create a new ConnectionParameters instance.
 
         :param str host: Hostname or IP Address to connect to.
@@ -61,7 +76,9 @@ class ConnectionParameters(object):
         :param bool ssl: Enable SSL
             Defaults to False
         :param dict ssl_options: Arguments passed to ssl.wrap_socket as
-            described at http://docs.python.org/dev/library/ssl.html
+            described at http://docs.python.org/dev/library/ssl.html. Where
+            available, an ssl.SSLContext built from the options is shared
+            by all connections using the same options
         :param int connection_attempts: Maximum number of retry attempts.
             None for infinite. Defaults to 1
         :param int|float retry_delay: Time to wait in seconds, before the next
@@ -70,6 +87,12 @@ class ConnectionParameters(object):
             Defaults to 0.25
         :param str locale: Set the locale value
             Defaults to en_US
+        :param list endpoints: Brokers to connect to as hostnames or
+            (hostname, port) tuples, port defaulting to the port parameter.
+            The addresses of all endpoints are tried in parallel, the first
+            to connect is used. Defaults to [(host, port)]
+        :param str capture: The path of a file to record the bytes read from
+            and written to the socket in, see pika.capture. Defaults to None
 
         :raises: InvalidFrameSize
         :raises: TypeError
@@ -107,6 +130,9 @@ class ConnectionParameters(object):
         if (not isinstance(socket_timeout, int) and
             not isinstance(socket_timeout, float)):
             raise TypeError("socket_timeout must be a float or int")
+        if capture is not None and not isinstance(capture, str):
+            raise TypeError("capture must be either None or str")
+        endpoints = self._validate_endpoints(endpoints or [(host, port)], port)
 
         # Assign the values
         self.host = host
@@ -122,6 +148,31 @@ class ConnectionParameters(object):
         self.connection_attempts = connection_attempts
         self.retry_delay = retry_delay
         self.socket_timeout = socket_timeout
+        self.endpoints = endpoints
+        self.capture = capture
+
+    def _validate_endpoints(self, endpoints, default_port):
+        """Validate the endpoints, returning them as (host, port) tuples.
+
+        :param list endpoints: Hostnames or (hostname, port) tuples
+        :param int default_port: The port for endpoints without one
+        :rtype: list
+        :raises: TypeError
+
+        """
+        if not isinstance(endpoints, (list, tuple)):
+            raise TypeError("endpoints must be a list")
+        validated = list()
+        for endpoint in endpoints:
+            if isinstance(endpoint, str):
+                endpoint = (endpoint, default_port)
+            if (not isinstance(endpoint, tuple) or len(endpoint) != 2 or
+                not isinstance(endpoint[0], str) or
+                not isinstance(endpoint[1], int)):
+                raise TypeError("endpoints must be hostnames or "
+                                "(hostname, port) tuples")
+            validated.append(endpoint)
+        return validated
 
     def _validate_credentials(self, credentials):
         """Validate the credentials passed in are using a valid object type.
@@ -151,8 +202,19 @@ class Connection(object):
     CONNECTION_OPEN = 5
     CONNECTION_CLOSING = 6
 
+    # Methods sent ahead of the frames queued on other channels as long as
+    # nothing is queued on their own channel
+    PRIORITY_METHODS = (spec.Basic.Ack, spec.Basic.Nack, spec.Basic.Reject)
+
+    # The bytes of a file mapped at a time when publishing from a file
+    MMAP_WINDOW = 8388608
+
+    # The pika.profiling.PhaseProfiler timing the hot path, while enabled
+    profiler = None
+
     def __init__(self, parameters=None,
-                 on_open_callback=None):
+                 on_open_callback=None,
+                 reconnection_strategy=None):
         """Connection initialization expects a ConnectionParameters object and
         a callback function to notify when we have successfully connected
         to the AMQP Broker.
@@ -161,11 +223,26 @@ class Connection(object):
         :type parameters: pika.connection.ConnectionParameters
         :param on_open_callback: The method to call when the connection is open
         :type on_open_callback: method
+        :param reconnection_strategy: Reconnect when the connection is lost
+        :type reconnection_strategy:
+            pika.reconnection_strategies.ReconnectionStrategy
 
         """
         # Define our callback dictionary
         self.callbacks = callback.CallbackManager()
 
+        # Decides if and when to reconnect when the connection is lost
+        self.reconnection = (reconnection_strategy or
+                             reconnection_strategies.NullReconnectionStrategy())
+        self._close_requested = False
+        self._reconnect_timer = None
+        self._reconnecting = False
+        self._recovery = dict()
+        self._pending_recoveries = 0
+
+        # Counters and histograms, kept across reconnections
+        self.metrics = metrics.ConnectionMetrics(self)
+
         # On connection callback
         if on_open_callback:
             self.add_on_open_callback(on_open_callback)
@@ -202,6 +279,16 @@ class Connection(object):
         """
         self.callbacks.add(0, '_on_connection_open', callback_method, False)
 
+    def add_on_recovery_callback(self, callback_method):
+        """Add a callback notification when the connection has reconnected and
+        the channels have restored their topology and consumers.
+
+        :param method callback_method: The callback when recovery is complete
+
+        """
+        self.callbacks.add(0, '_on_connection_recovered', callback_method,
+                           False)
+
     def add_timeout(self, deadline, callback_method):
         """Adapters should override to call the callback after the
         specified number of seconds have elapsed, using a timer, or a
@@ -219,17 +306,31 @@ class Connection(object):
         specify but it is recommended that you let Pika manage the channel
         numbers.
 
+        Channels may be requested while the connection is being opened, their
+        Channel.Open is then sent in the same write as Connection.TuneOk and
+        Connection.Open. Commands issued on a channel that is still opening
+        are queued and sent as soon as it is open.
+
         :param method on_open_callback: The callback when the channel is opened
         :param int channel_number: The channel number to use, defaults to the
                                    next available.
+        :rtype: pika.channel.Channel
+        :raises: ConnectionClosed
 
         """
+        if self.is_closed or self.is_closing:
+            raise exceptions.ConnectionClosed
         if not channel_number:
             channel_number = self._next_channel_number()
         self._channels[channel_number] = self._create_channel(channel_number,
                                                               on_open_callback)
         self._add_channel_callbacks(channel_number)
-        self._channels[channel_number].open()
+        if self.is_open:
+            self._channels[channel_number].open()
+        else:
+            self._channels[channel_number]._set_state(channel.Channel.OPENING)
+            self._pending_channels.append(channel_number)
+        return self._channels[channel_number]
 
     def close(self, reply_code=200, reply_text='Normal shutdown'):
         """Disconnect from RabbitMQ. If there are any open channels, it will
@@ -241,6 +342,10 @@ class Connection(object):
         :param str reply_text: The text reason for the close
 
         """
+        self._close_requested = True
+        if self._reconnect_timer:
+            self.remove_timeout(self._reconnect_timer)
+            self._reconnect_timer = None
         if self.is_closing or self.is_closed:
             LOGGER.warning("Invoked while closing or closed")
             return
@@ -254,6 +359,31 @@ class Connection(object):
         if self._has_open_channels:
             return self._close_channels(reply_code, reply_text)
 
+    def disable_profiler(self):
+        """Stop timing the phases of the hot path, returning the profiler
+        with the times measured.
+
+        :rtype: pika.profiling.PhaseProfiler|None
+
+        """
+        profiler, self.profiler = self.profiler, None
+        if profiler:
+            profiler.stop()
+        return profiler
+
+    def enable_profiler(self, profiler=None):
+        """Start timing the time spent reading, decoding, dispatching, in
+        consumer callbacks and writing. Pass a profiler disabled before to
+        add to its times.
+
+        :param pika.profiling.PhaseProfiler profiler: The profiler to use
+        :rtype: pika.profiling.PhaseProfiler
+
+        """
+        self.profiler = profiler or profiling.PhaseProfiler()
+        self.profiler.start()
+        return self.profiler
+
     def remove_timeout(self, callback_method):
         """Adapters should override to call the callback after the
         specified number of seconds have elapsed, using a timer, or a
@@ -278,6 +408,19 @@ class Connection(object):
     # Connections state properties
     #
 
+    @property
+    def handshake_durations(self):
+        """Return the seconds each stage of the last connection handshake
+        took as a list of (stage, seconds) tuples, measured from the previous
+        stage. See handshake_times for the stages.
+
+        :rtype: list
+
+        """
+        stages = sorted(self.handshake_times.items(), key=lambda item: item[1])
+        return [(stages[offset][0], stages[offset][1] - stages[offset - 1][1])
+                for offset in range(1, len(stages))]
+
     @property
     def is_closed(self):
         """
@@ -347,8 +490,10 @@ class Connection(object):
     #
 
     def _adapter_connect(self):
-        """Subclasses should override to set up the outbound socket connection.
+        """Subclasses should override to set up the outbound socket connection,
+        returning True once connected or False if the attempt was deferred.
 
+        :rtype: bool
         :raises: NotImplementedError
 
         """
@@ -395,12 +540,76 @@ class Connection(object):
         self.callbacks.add(0, spec.Connection.Tune, self._on_connection_tune)
 
     def _append_frame_buffer(self, bytes):
-        """Append the bytes to the frame buffer.
+        """Append the bytes to the frame buffer, dropping the bytes already
+        consumed from it.
 
         :param str bytes: The bytes to append to the frame buffer
 
         """
-        self._frame_buffer += bytes
+        if self._frame_offset == self._frame_end:
+            self._frame_buffer = bytes
+        else:
+            self._frame_buffer = (self._frame_buffer[self._frame_offset:
+                                                     self._frame_end] + bytes)
+        self._frame_offset = 0
+        self._frame_end = len(self._frame_buffer)
+
+    def _body_chunks(self, body, body_size):
+        """Return an iterator of the pieces of a body published from a
+        file-like object or iterator, each at most a body frame long. Regular
+        files are mapped into memory a window at a time, other file-like
+        objects are read from and the chunks of iterators are split or
+        joined up to the body frame length. A body already in memory is
+        sliced.
+
+        :param file|iter|str body: The body to send
+        :param int body_size: The number of bytes of the body
+        :rtype: iter
+
+        """
+        if (isinstance(body, (str, buffer, bytearray)) or
+            (memoryview and isinstance(body, memoryview))):
+            return self._slice_chunks(body)
+        if not hasattr(body, 'read'):
+            return self._iter_chunks(body)
+        try:
+            fileno, position = body.fileno(), body.tell()
+            stats = os.fstat(fileno)
+        except (AttributeError, EnvironmentError, ValueError):
+            return self._read_chunks(body, body_size)
+        if (not stat.S_ISREG(stats.st_mode) or
+            stats.st_size < position + body_size):
+            return self._read_chunks(body, body_size)
+        return self._mmap_chunks(body, fileno, position, body_size)
+
+    def _body_frames(self, channel_number, body, body_size):
+        """Generate the marshaled body frames of a message published from a
+        file-like object or iterator, reading the body as the frames are
+        asked for.
+
+        :param int channel_number: The channel number for the frames
+        :param file|iter body: The body to send
+        :param int body_size: The number of bytes of the body
+        :raises: ValueError if the body is not body_size bytes long
+
+        """
+        sent = 0
+        for chunk in self._body_chunks(body, body_size):
+            if not chunk:
+                continue
+            sent += len(chunk)
+            if sent > body_size:
+                raise ValueError('Body is longer than body_size %i' %
+                                 body_size)
+            marshaled_frame = frame.Body(channel_number, chunk).marshal()
+            self.bytes_sent += len(marshaled_frame)
+            self.frames_sent += 1
+            self.metrics.frames_sent[spec.FRAME_BODY] += 1
+            self.metrics.bytes_sent[spec.FRAME_BODY] += len(marshaled_frame)
+            yield marshaled_frame
+        if sent < body_size:
+            raise ValueError('Body ended after %i of body_size %i bytes' %
+                             (sent, body_size))
 
     @property
     def _buffer_size(self):
@@ -473,9 +682,36 @@ class Connection(object):
 
         """
         LOGGER.debug('Attempting connection')
+        self._handshake_stage('connect')
+        self.reconnection.on_connect_attempt(self)
         self._set_connection_state(self.CONNECTION_INIT)
-        self._adapter_connect()
-        LOGGER.debug('Connected')
+        if self._adapter_connect():
+            LOGGER.debug('Connected to %s:%i', *self.endpoint)
+
+    def _cork(self):
+        """Hold back writes to the socket until _uncork is called, so that
+        several frames go out in a single write. Calls may be nested.
+
+        """
+        self._corked += 1
+
+    def _content_frames(self, channel_number, properties, body):
+        """Return the content header and body frames of a message, marshaled
+        once so they can be sent with several method frames.
+
+        :param int channel_number: The channel number for the frames
+        :param pika.spec.BasicProperties properties: The message properties
+        :param str body: The message body
+        :rtype: list
+
+        """
+        frames = [frame.Marshaled(frame.Header(channel_number, len(body),
+                                               properties))]
+        for offset in xrange(0, len(body), self._body_max_length):
+            frames.append(frame.Marshaled(frame.Body(
+                channel_number,
+                body[offset:offset + self._body_max_length])))
+        return frames
 
     def _create_channel(self, channel_number, on_open_callback):
         """Create a new channel using the specified channel number and calling
@@ -505,7 +741,7 @@ class Connection(object):
 
         """
         if value.channel_number in self._channels:
-            return self._channels[value.channel_number].transport.deliver(value)
+            return self._channels[value.channel_number].deliver(value)
         if self._is_basic_deliver_frame(value):
             self._reject_out_of_band_delivery(value.channel_number,
                                               value.method.delivery_tag)
@@ -520,10 +756,10 @@ class Connection(object):
 
         """
         avg_frame_size = self.bytes_sent / self.frames_sent
-        if self.outbound_buffer.size > (avg_frame_size * self._backpressure):
-            LOGGER.warning(BACKPRESSURE_WARNING,
-                           self.outbound_buffer.size,
-                           int(self.outbound_buffer.size / avg_frame_size))
+        pending = self.outbound_buffer.size + self._outbound_queued_bytes
+        if pending > (avg_frame_size * self._backpressure):
+            LOGGER.warning(BACKPRESSURE_WARNING, pending,
+                           int(pending / avg_frame_size))
             self.callbacks.process(0, 'backpressure', self)
 
     def _ensure_closed(self):
@@ -531,6 +767,40 @@ class Connection(object):
         if self.is_open:
             self.close()
 
+    def _fill_outbound_buffer(self):
+        """Move queued frames to the outbound buffer until it holds frame_max
+        bytes. Frames in the priority lane go first, then the channels with
+        queued frames take turns one frame at a time, so a large message on
+        one channel does not hold back the others. The body frames of
+        messages published from a file or iterator are only read when it is
+        their turn. A body that cannot be read or is not body_size bytes long
+        closes the connection, as the broker is left waiting for the rest of
+        the message. Adapters call this after writing from the outbound
+        buffer.
+
+        """
+        watermark = self._buffer_size
+        while self._outbound_queued and self.outbound_buffer.size < watermark:
+            if self._priority_frames:
+                value = self._priority_frames.popleft()
+                self._outbound_queued -= 1
+                self._outbound_queued_bytes -= len(value)
+            else:
+                channel_number = self._outbound_channels.popleft()
+                queue = self._outbound_queues[channel_number]
+                try:
+                    value = self._next_queued_frame(queue)
+                except (EnvironmentError, ValueError), error:
+                    self._on_body_error(channel_number, error)
+                    continue
+                if queue:
+                    self._outbound_channels.append(channel_number)
+                else:
+                    del self._outbound_queues[channel_number]
+                if value is None:
+                    continue
+            self.outbound_buffer.write(value)
+
     def _flush_outbound(self):
         """Adapters should override to flush the contents of outbound_buffer
         out along the socket.
@@ -540,6 +810,31 @@ class Connection(object):
         """
         raise NotImplementedError
 
+    def _iter_chunks(self, body):
+        """Split or join the chunks of an iterator into pieces of up to the
+        body frame length.
+
+        :param iter body: The chunks of the body
+        :rtype: iter
+
+        """
+        max_length = self._body_max_length
+        pending, pending_size = list(), 0
+        for chunk in body:
+            if pending_size + len(chunk) < max_length:
+                pending.append(chunk)
+                pending_size += len(chunk)
+                continue
+            pending.append(chunk)
+            chunk = ''.join(pending)
+            offset = 0
+            while len(chunk) - offset >= max_length:
+                yield chunk[offset:offset + max_length]
+                offset += max_length
+            pending, pending_size = [chunk[offset:]], len(chunk) - offset
+        if pending_size:
+            yield ''.join(pending)
+
     def _get_body_frame_max_length(self):
         """Calculate the maximum amount of bytes that can be in a body frame.
 
@@ -573,6 +868,15 @@ class Connection(object):
         """
         return bool(self._channels)
 
+    def _handshake_stage(self, stage):
+        """Record when a stage of the connection handshake was first reached.
+
+        :param str stage: The stage reached
+
+        """
+        if stage not in self.handshake_times:
+            self.handshake_times[stage] = time.time()
+
     def _has_pending_callbacks(self, value):
         """Return true if there are any callbacks pending for the specified
         frame.
@@ -592,13 +896,33 @@ class Connection(object):
         # Outbound buffer for buffering writes until we're able to send them
         self.outbound_buffer = simplebuffer.SimpleBuffer()
 
-        # Inbound buffer for decoding frames
+        # Inbound buffer for decoding frames, the offset of the first byte
+        # that has not been decoded yet and the offset after the last byte
         self._frame_buffer = ''
+        self._frame_offset = 0
+        self._frame_end = 0
 
         # Connection state, server properties and channels all change on
         # each connection
+        self.endpoint = (self.params.host, self.params.port)
         self.server_properties = None
         self._channels = dict()
+        self._pending_channels = list()
+
+        # Writes are held while corked and flushed when uncorked
+        self._corked = 0
+
+        # Frames waiting for room in the outbound buffer, by channel, and the
+        # round robin order of the channels with frames waiting
+        self._outbound_queues = dict()
+        self._outbound_channels = collections.deque()
+        self._priority_frames = collections.deque()
+        self._outbound_queued = 0
+        self._outbound_queued_bytes = 0
+
+        # When each stage of the connection handshake was reached:
+        # connect, connected, start, tune, open_ok and channel_open_ok
+        self.handshake_times = dict()
 
         # Data used for Heartbeat checking and back-pressure detection
         self.bytes_sent = 0
@@ -656,6 +980,62 @@ class Connection(object):
         """
         return  isinstance(value, frame.ProtocolHeader)
 
+    def _mmap_chunks(self, body, fileno, position, body_size):
+        """Slice the body of a message published from a regular file out of
+        MMAP_WINDOW sized maps of the file, leaving the file positioned after
+        the body.
+
+        :param file body: The file the body is read from
+        :param int fileno: The file descriptor of the file
+        :param int position: The offset in the file the body starts at
+        :param int body_size: The number of bytes of the body
+        :rtype: iter
+
+        """
+        max_length = self._body_max_length
+        end = position + body_size
+        while position < end:
+            offset = position - position % mmap.ALLOCATIONGRANULARITY
+            length = min(self.MMAP_WINDOW, end - offset)
+            window = mmap.mmap(fileno, length, access=mmap.ACCESS_READ,
+                               offset=offset)
+            try:
+                while position < offset + length:
+                    start = position - offset
+                    chunk = window[start:min(start + max_length, length)]
+                    position += len(chunk)
+                    yield chunk
+            finally:
+                window.close()
+        body.seek(end)
+
+    def _next_queued_frame(self, queue):
+        """Remove and return the next marshaled frame of a channel's queue.
+        When a message published from a file or iterator is at the head of
+        the queue, its next body frame is read instead and None is returned
+        once the body is exhausted. A body that fails to read is dropped.
+
+        :param collections.deque queue: The queue of the channel
+        :rtype: str|None
+
+        """
+        value = queue[0]
+        if isinstance(value, str):
+            queue.popleft()
+            self._outbound_queued -= 1
+            self._outbound_queued_bytes -= len(value)
+            return value
+        try:
+            value = next(value, None)
+        except Exception:
+            queue.popleft()
+            self._outbound_queued -= 1
+            raise
+        if value is None:
+            queue.popleft()
+            self._outbound_queued -= 1
+        return value
+
     def _next_channel_number(self):
         """Return the next available channel number or raise on exception.
 
@@ -669,6 +1049,48 @@ class Connection(object):
             return 1
         return max(self._channels.keys()) + 1
 
+    def _on_channel_recovered(self, channel):
+        """Invoked by a channel when it has reopened and replayed its
+        recorded topology and consumers. Once all channels have recovered the
+        reconnection strategy and the recovery callbacks are notified.
+
+        :param pika.channel.Channel channel: The recovered channel or None
+                                             if there were none to recover
+
+        """
+        if channel:
+            self._pending_recoveries -= 1
+        if self._pending_recoveries > 0:
+            return
+        self.reconnection.on_recovery_complete(self)
+        self.callbacks.process(0, '_on_connection_recovered', self, self)
+
+    def _on_body_error(self, channel_number, error):
+        """Called when the body of a message published from a file or
+        iterator failed to read or did not match its body_size. The frames
+        still queued on the channel are dropped and the connection is closed
+        with a FRAME_ERROR, since the message can not be completed. The
+        connection's closing attribute holds the reason when the close
+        callbacks are called.
+
+        :param int channel_number: The channel the message was published on
+        :param Exception error: The error raised reading the body
+
+        """
+        LOGGER.error('Failed to send the body of a message on channel %i: '
+                     '%s', channel_number, error)
+        for value in self._outbound_queues.pop(channel_number):
+            self._outbound_queued -= 1
+            if isinstance(value, str):
+                self._outbound_queued_bytes -= len(value)
+        if self.is_closing or self.is_closed:
+            return
+        self._set_connection_state(self.CONNECTION_CLOSING)
+        self.closing = (spec.FRAME_ERROR,
+                        'Body of message on channel %i: %s' %
+                        (channel_number, error))
+        self._on_close_ready()
+
     def _on_close_ready(self):
         """Called when the Connection is in a state that it can close after
         a close has been requested. This happens, for example, when all of the
@@ -686,6 +1108,7 @@ class Connection(object):
         connected and we can notify our connection strategy.
         """
         self._set_connection_state(self.CONNECTION_PROTOCOL)
+        self._handshake_stage('connected')
 
         # Start the communication with the RabbitMQ Broker
         self._send_frame(frame.ProtocolHeader())
@@ -704,15 +1127,23 @@ class Connection(object):
             self.closing = (method_frame.method.reply_code,
                             method_frame.method.reply_text)
         LOGGER.warning("Disconnected from RabbitMQ at %s:%i (%s): %s",
-                        self.params.host, self.params.port,
+                        self.endpoint[0], self.endpoint[1],
                         self.closing[0], self.closing[1])
+        if self.heartbeat:
+            self.heartbeat.stop()
+            self.heartbeat = None
         if not from_adapter:
             self._adapter_disconnect()
         self._set_connection_state(self.CONNECTION_CLOSED)
+        should_reconnect = self._should_reconnect
+        if should_reconnect:
+            self._save_channels_for_recovery()
         for channel in self._channels:
             self._channels[channel].on_remote_close(method_frame)
         self._process_connection_closed_callbacks()
         self._remove_connection_callbacks()
+        if should_reconnect:
+            self.reconnection.on_connection_closed(self)
 
     def _on_connection_open(self, method_frame):
         """
@@ -727,6 +1158,16 @@ class Connection(object):
 
         # We're now connected at the AMQP level
         self._set_connection_state(self.CONNECTION_OPEN)
+        self._handshake_stage('open_ok')
+        LOGGER.debug('Handshake stage durations: %r', self.handshake_durations)
+        self.reconnection.on_connection_open(self)
+        self.metrics.connects += 1
+
+        # Restore the channels if this is a reconnection
+        if self._reconnecting:
+            self._reconnecting = False
+            self.metrics.reconnects += 1
+            return self._recover_channels()
 
         # Call our initial callback that we're open
         self.callbacks.process(0, '_on_connection_open', self, self)
@@ -740,6 +1181,7 @@ class Connection(object):
 
         """
         self._set_connection_state(self.CONNECTION_START)
+        self._handshake_stage('start')
         if self._is_protocol_header_frame(method_frame):
             raise exceptions.UnexpectedFrameError
         self._check_for_protocol_mismatch(method_frame)
@@ -751,12 +1193,14 @@ class Connection(object):
         """Once the Broker sends back a Connection.Tune, we will set our tuning
         variables that have been returned to us and kick off the Heartbeat
         monitor if required, send our TuneOk and then the Connection. Open rpc
-        call on channel 0.
+        call on channel 0. The Channel.Open frames of the channels requested
+        while connecting are pipelined behind them in the same write.
 
         :param pika.frame.Method method_frame: The frame received
 
         """
         self._set_connection_state(self.CONNECTION_TUNE)
+        self._handshake_stage('tune')
 
         # Get our max channels, frames and heartbeat interval
         self.params.channel_max = self._combine(self.params.channel_max,
@@ -772,11 +1216,18 @@ class Connection(object):
         # Create a new heartbeat checker if needed
         self.heartbeat = self._create_heartbeat_checker()
 
-        # Send the TuneOk response with what we've agreed upon
-        self._send_connection_tune_ok()
+        self._cork()
+        try:
+            # Send the TuneOk response with what we've agreed upon
+            self._send_connection_tune_ok()
+
+            # Send the Connection.Open RPC call for the vhost
+            self._send_connection_open()
 
-        # Send the Connection.Open RPC call for the vhost
-        self._send_connection_open()
+            # Open the channels requested while connecting
+            self._open_pending_channels()
+        finally:
+            self._uncork()
 
     def _on_data_available(self, data_in):
         """This is called by our Adapter, passing in the data from the socket.
@@ -786,23 +1237,53 @@ class Connection(object):
 
         """
         self._append_frame_buffer(data_in)
-        while self._frame_buffer:
+        self._process_frame_buffer()
+
+    def _process_frame_buffer(self):
+        """Decode and process the complete frames in the frame buffer."""
+        if self.profiler:
+            return self._process_frames_profiled(self.profiler)
+        frames_received = self.metrics.frames_received
+        bytes_received = self.metrics.bytes_received
+        while self._frame_offset < self._frame_end:
             consumed_count, frame_value = self._read_frame()
             if not frame_value:
                 return
             self._trim_frame_buffer(consumed_count)
+            frames_received[frame_value.frame_type] += 1
+            bytes_received[frame_value.frame_type] += consumed_count
             self._process_frame(frame_value)
 
+    def _open_pending_channels(self):
+        """Send Channel.Open for the channels that were requested before the
+        connection was open.
+
+        """
+        pending, self._pending_channels = self._pending_channels, list()
+        for channel_number in pending:
+            if channel_number in self._channels:
+                LOGGER.debug('Pipelining Channel.Open for channel %i',
+                             channel_number)
+                self._channels[channel_number].open()
+
     def _process_callbacks(self, frame_value):
         """Process the callbacks for the frame if the frame is a method frame
-        and if it has any callbacks pending.
+        and if it has any callbacks pending. Content carrying methods are left
+        for the channel's frame dispatcher to assemble. The round trip of the
+        method a reply on a channel answers is timed first, as callbacks for
+        the same reply to several methods are only added once.
 
         :param pika.frame.Method frame_value: The frame to process
         :rtype: bool
 
         """
-        if (self._is_method_frame(frame_value) and
-            self._has_pending_callbacks(frame_value)):
+        if (not self._is_method_frame(frame_value) or
+            spec.has_content(frame_value.method.INDEX)):
+            return False
+        if frame_value.channel_number in self._channels:
+            self._channels[frame_value.channel_number].metrics.rpc_replied(
+                frame_value.method)
+        if self._has_pending_callbacks(frame_value):
             self.callbacks.process(frame_value.channel_number,  # Prefix
                                    frame_value.method,          # Key
                                    self,                        # Caller
@@ -817,6 +1298,31 @@ class Connection(object):
         """
         self.callbacks.process(0, '_on_connection_closed', self, self)
 
+    def _process_frames_profiled(self, profiler):
+        """Decode and process the frames in the frame buffer like
+        _on_data_available, timing the decoding and the dispatch of each
+        frame.
+
+        :param pika.profiling.PhaseProfiler profiler: The enabled profiler
+
+        """
+        frames_received = self.metrics.frames_received
+        bytes_received = self.metrics.bytes_received
+        previous = profiler.phase
+        try:
+            while self._frame_offset < self._frame_end:
+                profiler.enter(profiling.DECODE)
+                consumed_count, frame_value = self._read_frame()
+                if not frame_value:
+                    return
+                self._trim_frame_buffer(consumed_count)
+                frames_received[frame_value.frame_type] += 1
+                bytes_received[frame_value.frame_type] += consumed_count
+                profiler.enter(profiling.DISPATCH)
+                self._process_frame(frame_value)
+        finally:
+            profiler.leave(previous)
+
     def _process_frame(self, frame_value):
         """Process an inbound frame from the socket.
 
@@ -847,13 +1353,67 @@ class Connection(object):
         elif frame_value.channel_number > 0:
             self._deliver_frame_to_channel(frame_value)
 
+    def _reconnect(self):
+        """Invoked by the IOLoop timer scheduled by the reconnection strategy
+        to connect to the broker again.
+
+        """
+        self._reconnect_timer = None
+        if self._close_requested:
+            return
+        LOGGER.info('Reconnecting to %s:%i', *self.endpoint)
+        self._reconnecting = True
+        self.metrics.reconnect_attempts += 1
+        self._init_connection_state()
+        try:
+            self._connect()
+        except exceptions.AMQPConnectionError, error:
+            self._on_connect_failed(error)
+
+    def _on_connect_failed(self, error):
+        """Invoked when an attempt to connect from the IOLoop failed with no
+        attempts left. When reconnecting, the reconnection strategy decides
+        whether to try again, otherwise the failure is reported to the close
+        callbacks.
+
+        :param pika.exceptions.AMQPConnectionError error: The failure
+
+        """
+        if not self._reconnecting:
+            LOGGER.error('Could not connect: %r', error)
+            self.closing = (0, 'Could not connect: %r' % error)
+            self._set_connection_state(self.CONNECTION_CLOSED)
+            return self._process_connection_closed_callbacks()
+        self.reconnection.on_connect_attempt_failure(self, error)
+        if not self.reconnection.can_reconnect:
+            self._reconnecting = False
+            return self._on_reconnect_failed(error)
+        self.reconnection.on_connection_closed(self)
+
+    def _on_reconnect_failed(self, error):
+        """Invoked when the reconnection strategy gave up reconnecting. The
+        failure is reported to the close callbacks instead of being raised
+        from the IOLoop timer that made the last attempt.
+
+        :param pika.exceptions.AMQPConnectionError error: The last failure
+
+        """
+        LOGGER.error('Gave up reconnecting to %s:%i: %r',
+                     self.endpoint[0], self.endpoint[1], error)
+        self._recovery = dict()
+        self.closing = (0, 'Gave up reconnecting: %r' % error)
+        self._set_connection_state(self.CONNECTION_CLOSED)
+        self._process_connection_closed_callbacks()
+
     def _read_frame(self):
-        """Try and read from the frame buffer and decode a frame.
+        """Try and read from the frame buffer at the frame offset and decode a
+        frame.
 
         :rtype tuple: (int, pika.frame.Frame)
 
         """
-        return frame.decode_frame(self._frame_buffer)
+        return frame.decode_frame(self._frame_buffer, self._frame_offset,
+                                  self._frame_end)
 
     def _reject_out_of_band_delivery(self, channel_number, delivery_tag):
         """Reject a delivery on the specified channel number and delivery tag
@@ -867,6 +1427,38 @@ class Connection(object):
                        channel_number, delivery_tag)
         self._send_method(channel_number, spec.Basic.Reject(delivery_tag))
 
+    def _read_chunks(self, body, body_size):
+        """Read the body of a message published from a file-like object up
+        to a body frame length at a time.
+
+        :param file body: The file-like object to read from
+        :param int body_size: The number of bytes of the body
+        :rtype: iter
+
+        """
+        remaining = body_size
+        while remaining:
+            chunk = body.read(min(remaining, self._body_max_length))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    def _recover_channels(self):
+        """Reopen the channels that were open or opening when the connection
+        was lost, replaying their recorded topology and consumers.
+
+        """
+        recovery, self._recovery = self._recovery, dict()
+        self._pending_recoveries = len([was_open for channel_obj, was_open
+                                        in recovery.values() if was_open])
+        LOGGER.info('Recovering %i channel(s)', len(recovery))
+        for channel_number, (channel_obj, was_open) in recovery.items():
+            self._channels[channel_number] = channel_obj
+            channel_obj._recover()
+        if not self._pending_recoveries:
+            self._on_channel_recovered(None)
+
     def _remove_callback(self, channel_number, method_frame):
         """Remove the specified method_frame callback if it is set for the
         specified channel number.
@@ -921,6 +1513,29 @@ class Connection(object):
         # Send the rpc call to RabbitMQ
         self._send_method(channel_number, method_frame)
 
+    def _save_channels_for_recovery(self):
+        """Remember the channels that are open or opening so they can be
+        restored once the connection has been reestablished.
+
+        """
+        for channel_number, channel_obj in self._channels.items():
+            if channel_obj.is_closing:
+                continue
+            if channel_obj.is_open or channel_obj.is_opening:
+                self._recovery[channel_number] = (channel_obj,
+                                                  channel_obj.is_open)
+
+    def _schedule_reconnect(self, delay):
+        """Schedule a reconnection attempt in delay seconds, invoked by the
+        reconnection strategy.
+
+        :param int|float delay: The number of seconds to wait
+
+        """
+        if self._close_requested:
+            return
+        self._reconnect_timer = self.add_timeout(delay, self._reconnect)
+
     def _send_connection_close(self, reply_code, reply_text):
         """Send a Connection.Close method frame.
 
@@ -955,9 +1570,52 @@ class Connection(object):
                                                     self.params.frame_max,
                                                     self.params.heartbeat))
 
+    def _queue_body_frames(self, channel_number, body_frames):
+        """Queue the generator of the body frames of a message published from
+        a file or iterator behind the frames already queued on its channel,
+        and move what fits to the outbound buffer.
+
+        :param int channel_number: The channel number of the frames
+        :param generator body_frames: The generator of marshaled body frames
+
+        """
+        if channel_number not in self._outbound_queues:
+            self._outbound_queues[channel_number] = collections.deque()
+            self._outbound_channels.append(channel_number)
+        self._outbound_queues[channel_number].append(body_frames)
+        self._outbound_queued += 1
+        self._fill_outbound_buffer()
+
+    def _queue_frame(self, frame_value, marshaled_frame):
+        """Queue the frame until there is room in the outbound buffer. Frames
+        on channel 0 and the PRIORITY_METHODS of channels with nothing queued
+        go to the priority lane, the others to the queue of their channel so
+        the frames of each channel stay in order.
+
+        :param frame_value: The frame to queue
+        :type frame_value:  pika.frame.Frame|pika.frame.ProtocolHeader
+        :param str marshaled_frame: The marshaled frame
+
+        """
+        channel_number = getattr(frame_value, 'channel_number', 0)
+        if (not channel_number or
+            (channel_number not in self._outbound_queues and
+             isinstance(frame_value, frame.Method) and
+             isinstance(frame_value.method, self.PRIORITY_METHODS))):
+            self._priority_frames.append(marshaled_frame)
+        else:
+            if channel_number not in self._outbound_queues:
+                self._outbound_queues[channel_number] = collections.deque()
+                self._outbound_channels.append(channel_number)
+            self._outbound_queues[channel_number].append(marshaled_frame)
+        self._outbound_queued += 1
+        self._outbound_queued_bytes += len(marshaled_frame)
+
     def _send_frame(self, frame_value):
         """This appends the fully generated frame to send to the broker to the
-        output buffer which will be then sent via the connection adapter.
+        output buffer which will be then sent via the connection adapter. Once
+        the outbound buffer holds frame_max bytes, frames are queued by
+        channel and moved to the buffer as it drains.
 
         :param frame_value: The frame to write
         :type frame_value:  pika.frame.Frame|pika.frame.ProtocolHeader
@@ -968,32 +1626,93 @@ class Connection(object):
         marshaled_frame = frame_value.marshal()
         self.bytes_sent += len(marshaled_frame)
         self.frames_sent += 1
-        self.outbound_buffer.write(marshaled_frame)
-        LOGGER.debug('Added %i bytes to the outbound buffer', len(marshaled_frame))
-        self._flush_outbound()
+        self.metrics.frames_sent[frame_value.frame_type] += 1
+        self.metrics.bytes_sent[frame_value.frame_type] += len(marshaled_frame)
+        if (self._outbound_queued or
+            self.outbound_buffer.size >= self._buffer_size):
+            self._queue_frame(frame_value, marshaled_frame)
+        else:
+            self.outbound_buffer.write(marshaled_frame)
+            LOGGER.debug('Added %i bytes to the outbound buffer',
+                         len(marshaled_frame))
+        if not self._corked:
+            self._flush_outbound()
         self._detect_backpressure()
 
+    def _send_frames(self, frames):
+        """Send the frames of a message, queueing all of them before writing
+        any of them.
+
+        :param list frames: The frames to send
+
+        """
+        self._cork()
+        try:
+            for value in frames:
+                self._send_frame(value)
+        finally:
+            self._uncork()
+
     def _send_method(self, channel_number, method_frame, content=None):
         """Constructs a RPC method frame and then sends it to the broker.
 
         :param int channel_number: The channel number for the frame
-        :param pika.object.Method method_frame: The method frame to send
-        :param tuple content: If set, is a content frame, is tuple of
-                              properties and body.
+        :param method_frame: The method to send, or its frame if it is
+                             marshaled ahead of time
+        :type method_frame: pika.object.Method|pika.frame.MarshaledMethod
+        :param tuple|list content: If set, is a content frame, is tuple of
+                                   properties and body, and the body size if
+                                   the body is a file-like object or
+                                   iterator, or the list of the content
+                                   frames from _content_frames.
 
         """
         LOGGER.debug('Sending on channel %i: %r', channel_number, method_frame)
-        self._send_frame(frame.Method(channel_number, method_frame))
-        if isinstance(content, tuple):
-            self._send_frame(frame.Header(channel_number,
-                                          len(content[1]),
-                                           content[0]))
-            if content[1]:
+        if not isinstance(method_frame, frame.Method):
+            method_frame = frame.Method(channel_number, method_frame)
+        if isinstance(content, list):
+            return self._send_frames([method_frame] + content)
+        if not isinstance(content, tuple):
+            return self._send_frame(method_frame)
+        body_size = content[2] if len(content) > 2 else None
+        if body_size is None:
+            if hasattr(content[1], 'read') or not hasattr(content[1],
+                                                          '__len__'):
+                raise ValueError('body_size is required to publish a body '
+                                 'from a file or iterator')
+            body_size = len(content[1])
+        # Queue all of the message's frames before writing any of them, so
+        # nothing invoked by a flush can send frames in between
+        self._cork()
+        try:
+            self._send_frame(method_frame)
+            self._send_frame(frame.Header(channel_number, body_size,
+                                          content[0]))
+            if len(content) > 2:
+                if body_size:
+                    self._queue_body_frames(
+                        channel_number,
+                        self._body_frames(channel_number, content[1],
+                                          body_size))
+            elif content[1]:
                 body_buf = simplebuffer.SimpleBuffer(content[1])
                 while body_buf:
                     piece_len = min(len(body_buf), self._body_max_length)
                     piece = body_buf.read_and_consume(piece_len)
                     self._send_frame(frame.Body(channel_number, piece))
+        finally:
+            self._uncork()
+
+    @property
+    def _should_reconnect(self):
+        """Returns True if the connection was lost without being asked to
+        close and the reconnection strategy will reconnect.
+
+        :rtype: bool
+
+        """
+        return (not self._close_requested and
+                self.reconnection.can_reconnect)
 
     def _set_connection_state(self, connection_state):
         """Set the connection state.
@@ -1015,13 +1734,37 @@ class Connection(object):
         if hasattr(self.server_properties, 'capabilities'):
             del self.server_properties['capabilities']
 
+    def _slice_chunks(self, body):
+        """Slice a body held in memory into pieces of up to the body frame
+        length.
+
+        :param str|buffer|bytearray|memoryview body: The body to send
+        :rtype: iter
+
+        """
+        max_length = self._body_max_length
+        for offset in xrange(0, len(body), max_length):
+            chunk = body[offset:offset + max_length]
+            yield chunk.tobytes() if hasattr(chunk, 'tobytes') else str(chunk)
+
+    def _uncork(self):
+        """Release a _cork call, flushing the held writes once the outermost
+        call is released.
+
+        """
+        self._corked -= 1
+        if not self._corked and self.outbound_buffer.size:
+            self._flush_outbound()
+
     def _trim_frame_buffer(self, byte_count):
-        """Trim the leading N bytes off the frame buffer and increment the
-        counter that keeps track of how many bytes have been read/used from the
-        socket.
+        """Mark the leading N bytes of the frame buffer as consumed and
+        increment the counter that keeps track of how many bytes have been
+        read/used from the socket. The consumed bytes are dropped when more
+        data is appended, instead of copying the rest of the buffer for every
+        frame.
 
         :param int byte_count: The number of bytes consumed
 
         """
-        self._frame_buffer = self._frame_buffer[byte_count:]
+        self._frame_offset += byte_count
         self.bytes_received += byte_count
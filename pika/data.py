@@ -1,143 +1,371 @@
-"""AMQP Table Encoding/Decoding"""
+"""AMQP Table Encoding/Decoding
+
+Field values are encoded and decoded through tables of encoders by Python
+type and decoders by field kind, with precompiled structs. Nested tables
+and arrays are walked with an explicit stack instead of recursion. The
+field kinds are those of the AMQP 0-9-1 errata that RabbitMQ implements,
+so 's' is a signed 16-bit integer rather than a short string.
+
+"""
 import struct
 import decimal
 import calendar
 from datetime import datetime
-from pika.exceptions import *
+from pika import exceptions
 
+OCTET = struct.Struct('B')
+LONG = struct.Struct('>I')
 
-def encode_table(pieces, table):
-    table = table or dict()
-    length_index = len(pieces)
-    pieces.append(None)  # placeholder
-    tablesize = 0
-    for (key, value) in table.iteritems():
-        pieces.append(struct.pack('B', len(key)))
-        pieces.append(key)
-        tablesize = tablesize + 1 + len(key)
-        tablesize += encode_value(pieces, value)
+_BYTE = struct.Struct('>b')
+_SHORT = struct.Struct('>h')
+_USHORT = struct.Struct('>H')
+_INT = struct.Struct('>i')
+_LONGLONG = struct.Struct('>q')
+_ULONGLONG = struct.Struct('>Q')
+_FLOAT = struct.Struct('>f')
+_DOUBLE = struct.Struct('>d')
+_DECIMAL = struct.Struct('>Bi')
 
-    pieces[length_index] = struct.pack('>I', tablesize)
-    return tablesize + 4
+_LONGSTR = struct.Struct('>cI')
+_TYPED_INT = struct.Struct('>ci')
+_TYPED_LONGLONG = struct.Struct('>cq')
+_TYPED_DOUBLE = struct.Struct('>cd')
+_TYPED_DECIMAL = struct.Struct('>cBi')
+_TYPED_TIMESTAMP = struct.Struct('>cQ')
 
+_INT_MIN = -2 ** 31
+_INT_MAX = 2 ** 31 - 1
 
-def encode_value(pieces, value):
-    if isinstance(value, basestring):
-        value = value.encode('utf8')
-        pieces.append(struct.pack('>cI', 'S', len(value)))
-        pieces.append(value)
-        return 5 + len(value)
-    elif isinstance(value, bool):
-        pieces.append(struct.pack('>cB', 't', int(value)))
-        return 2
-    elif isinstance(value, int):
-        pieces.append(struct.pack('>ci', 'I', value))
+# The number of decoded short strings kept by decode_shortstr
+SHORTSTR_CACHE_SIZE = 1024
+
+_shortstrs = dict()
+_shortstrs_old = dict()
+
+
+def _encode_str(pieces, value):
+    pieces.append(_LONGSTR.pack('S', len(value)))
+    pieces.append(value)
+    return 5 + len(value)
+
+
+def _encode_unicode(pieces, value):
+    return _encode_str(pieces, value.encode('utf8'))
+
+
+def _encode_bool(pieces, value):
+    pieces.append('t\x01' if value else 't\x00')
+    return 2
+
+
+def _encode_int(pieces, value):
+    if _INT_MIN <= value <= _INT_MAX:
+        pieces.append(_TYPED_INT.pack('I', value))
         return 5
-    elif isinstance(value, long):
-        pieces.append(struct.pack('>cq', 'l', value))
-        return 9
-    elif isinstance(value, decimal.Decimal):
-        value = value.normalize()
-        if value._exp < 0:
-            decimals = -value._exp
-            raw = int(value * (decimal.Decimal(10) ** decimals))
-            pieces.append(struct.pack('>cBi', 'D', decimals, raw))
-        else:
-            # per spec, the "decimals" octet is unsigned (!)
-            pieces.append(struct.pack('>cBi', 'D', 0, int(value)))
-        return 6
-    elif isinstance(value, datetime):
-        pieces.append(struct.pack('>cQ', 'T',
-                                  calendar.timegm(value.utctimetuple())))
-        return 9
-    elif isinstance(value, dict):
-        pieces.append(struct.pack('>c', 'F'))
-        return 1 + encode_table(pieces, value)
-    elif isinstance(value, list):
-        p = []
-        for v in value:
-            encode_value(p, v)
-        piece = ''.join(p)
-        pieces.append(struct.pack('>cI', 'A', len(piece)))
-        pieces.append(piece)
-        return 5 + len(piece)
+    pieces.append(_TYPED_LONGLONG.pack('l', value))
+    return 9
+
+
+def _encode_long(pieces, value):
+    pieces.append(_TYPED_LONGLONG.pack('l', value))
+    return 9
+
+
+def _encode_float(pieces, value):
+    pieces.append(_TYPED_DOUBLE.pack('d', value))
+    return 9
+
+
+def _encode_decimal(pieces, value):
+    value = value.normalize()
+    if value._exp < 0:
+        decimals = -value._exp
+        raw = int(value * (decimal.Decimal(10) ** decimals))
+        pieces.append(_TYPED_DECIMAL.pack('D', decimals, raw))
     else:
-        raise InvalidTableError("Unsupported field kind during encoding",
-                                pieces, value)
+        # per spec, the "decimals" octet is unsigned (!)
+        pieces.append(_TYPED_DECIMAL.pack('D', 0, int(value)))
+    return 6
 
 
-def decode_table(encoded, offset):
-    result = {}
-    tablesize = struct.unpack_from('>I', encoded, offset)[0]
+def _encode_datetime(pieces, value):
+    pieces.append(_TYPED_TIMESTAMP.pack('T',
+                                        calendar.timegm(value.utctimetuple())))
+    return 9
+
+
+def _encode_none(pieces, value):
+    pieces.append('V')
+    return 1
+
+
+def _encode_bytearray(pieces, value):
+    pieces.append(_LONGSTR.pack('x', len(value)))
+    pieces.append(str(value))
+    return 5 + len(value)
+
+
+# The encoders of the field values that are not tables or arrays, by type
+ENCODERS = {str: _encode_str,
+            unicode: _encode_unicode,
+            bool: _encode_bool,
+            int: _encode_int,
+            long: _encode_long,
+            float: _encode_float,
+            decimal.Decimal: _encode_decimal,
+            datetime: _encode_datetime,
+            type(None): _encode_none,
+            bytearray: _encode_bytearray}
+
+# The field kinds of tables and arrays, by type
+CONTAINERS = {dict: 'F', list: 'A', tuple: 'A'}
+
+
+def _encoder(pieces, value):
+    """Return the encoder or container kind for a value whose type is a
+    subclass of one of the types that can be encoded.
+
+    :raises: InvalidTableError
+
+    """
+    for base in type(value).__mro__:
+        if base in ENCODERS:
+            return ENCODERS[base]
+        if base in CONTAINERS:
+            return CONTAINERS[base]
+    raise exceptions.InvalidTableError("Unsupported field kind during "
+                                       "encoding", pieces, value)
+
+
+def encode_table(pieces, table):
+    return _encode_container(pieces, table or dict())
+
+
+def encode_value(pieces, value):
+    encoder = ENCODERS.get(type(value)) or CONTAINERS.get(type(value))
+    if encoder is None:
+        encoder = _encoder(pieces, value)
+    if not isinstance(encoder, str):
+        return encoder(pieces, value)
+    pieces.append(encoder)
+    return 1 + _encode_container(pieces, value)
+
+
+def _encode_container(pieces, container):
+    """Append the encoded table or array to pieces, walking nested tables
+    and arrays with a stack. Returns the number of bytes appended.
+
+    :param list pieces: The encoded pieces
+    :param dict|list container: The table or array to encode
+    :rtype: int
+
+    """
+    encoders = ENCODERS
+    containers = CONTAINERS
+    stack = list()
+    is_table = isinstance(container, dict)
+    items = container.iteritems() if is_table else iter(container)
+    index = len(pieces)
+    pieces.append(None)  # placeholder
+    size = 0
+    while True:
+        for item in items:
+            if is_table:
+                key, value = item
+                if isinstance(key, unicode):
+                    key = key.encode('utf8')
+                pieces.append(OCTET.pack(len(key)))
+                pieces.append(key)
+                size += 1 + len(key)
+            else:
+                value = item
+            encoder = encoders.get(type(value)) or containers.get(type(value))
+            if encoder is None:
+                encoder = _encoder(pieces, value)
+            if not isinstance(encoder, str):
+                size += encoder(pieces, value)
+                continue
+            pieces.append(encoder)
+            stack.append((items, index, size + 1, is_table))
+            is_table = encoder == 'F'
+            items = value.iteritems() if is_table else iter(value)
+            index = len(pieces)
+            pieces.append(None)  # placeholder
+            size = 0
+            break
+        else:
+            pieces[index] = LONG.pack(size)
+            size += 4
+            if not stack:
+                return size
+            items, index, parent_size, is_table = stack.pop()
+            size += parent_size
+
+
+def _decode_str(encoded, offset, length):
+    value = encoded[offset:offset + length].decode('utf8')
+    try:
+        value = str(value)
+    except UnicodeEncodeError:
+        pass
+    return value
+
+
+def _decode_longstr(encoded, offset):
+    length = LONG.unpack_from(encoded, offset)[0]
+    offset += 4
+    return _decode_str(encoded, offset, length), offset + length
+
+
+def _decode_bool(encoded, offset):
+    return encoded[offset] != '\x00', offset + 1
+
+
+def _decode_struct(unpack, size):
+    """Return a decoder for a value unpacked by a precompiled struct"""
+    def decoder(encoded, offset):
+        return unpack(encoded, offset)[0], offset + size
+    return decoder
+
+
+def _decode_longlong(encoded, offset):
+    return long(_LONGLONG.unpack_from(encoded, offset)[0]), offset + 8
+
+
+def _decode_decimal(encoded, offset):
+    decimals, raw = _DECIMAL.unpack_from(encoded, offset)
+    return (decimal.Decimal(raw) * (decimal.Decimal(10) ** -decimals),
+            offset + 5)
+
+
+def _decode_timestamp(encoded, offset):
+    return (datetime.utcfromtimestamp(_ULONGLONG.unpack_from(encoded,
+                                                             offset)[0]),
+            offset + 8)
+
+
+def _decode_bytes(encoded, offset):
+    length = LONG.unpack_from(encoded, offset)[0]
     offset += 4
-    limit = offset + tablesize
-    while offset < limit:
-        keylen = struct.unpack_from('B', encoded, offset)[0]
-        offset += 1
-        key = encoded[offset: offset + keylen]
-        offset += keylen
-        value, offset = decode_value(encoded, offset)
-        result[key] = value
-    return result, offset
+    return bytearray(encoded[offset:offset + length]), offset + length
+
+
+def _decode_void(encoded, offset):
+    return None, offset
+
+
+# The decoders of the field values that are not tables or arrays, by kind
+DECODERS = {'S': _decode_longstr,
+            't': _decode_bool,
+            'b': _decode_struct(_BYTE.unpack_from, 1),
+            'B': _decode_struct(OCTET.unpack_from, 1),
+            's': _decode_struct(_SHORT.unpack_from, 2),
+            'u': _decode_struct(_USHORT.unpack_from, 2),
+            'I': _decode_struct(_INT.unpack_from, 4),
+            'i': _decode_struct(LONG.unpack_from, 4),
+            'l': _decode_longlong,
+            'L': _decode_struct(_ULONGLONG.unpack_from, 8),
+            'f': _decode_struct(_FLOAT.unpack_from, 4),
+            'd': _decode_struct(_DOUBLE.unpack_from, 8),
+            'D': _decode_decimal,
+            'T': _decode_timestamp,
+            'x': _decode_bytes,
+            'V': _decode_void}
+
+
+def decode_table(encoded, offset):
+    return _decode_container(encoded, offset, True)
 
 
 def decode_value(encoded, offset):
     kind = encoded[offset]
     offset += 1
-    if kind == 'S':
-        length = struct.unpack_from('>I', encoded, offset)[0]
-        offset += 4
-        value = encoded[offset: offset + length].decode('utf8')
-        try:
-            value = str(value)
-        except UnicodeEncodeError:
-            pass
-        offset += length
-    elif kind == 's':
-        length = struct.unpack_from('B', encoded, offset)[0]
-        offset += 1
-        value = encoded[offset: offset + length].decode('utf8')
-        try:
-            value = str(value)
-        except UnicodeEncodeError:
-            pass
-        offset += length
-    elif kind == 't':
-        value = struct.unpack_from('>B', encoded, offset)[0]
-        value = bool(value)
-        offset += 1
-    elif kind == 'I':
-        value = struct.unpack_from('>i', encoded, offset)[0]
-        offset += 4
-    elif kind == 'l':
-        value = long(struct.unpack_from('>q', encoded, offset)[0])
-        offset += 8
-    elif kind == 'D':
-        decimals = struct.unpack_from('B', encoded, offset)[0]
-        offset += 1
-        raw = struct.unpack_from('>i', encoded, offset)[0]
-        offset += 4
-        value = decimal.Decimal(raw) * (decimal.Decimal(10) ** -decimals)
-    elif kind == 'T':
-        value = datetime.utcfromtimestamp(struct.unpack_from('>Q', encoded,
-                                                             offset)[0])
-        offset += 8
-    elif kind == 'F':
-        (value, offset) = decode_table(encoded, offset)
-    elif kind == 'A':
-        length = struct.unpack_from('>I', encoded, offset)[0]
-        offset += 4
-        offset_end = offset + length
-        value = []
-        while offset < offset_end:
-            v, offset = decode_value(encoded, offset)
-            value.append(v)
-    elif kind == 'V':
-        value = None
-    else:
-        raise InvalidTableError("Unsupported field kind %s during decoding" % \
-                                kind)
-    return value, offset
+    decoder = DECODERS.get(kind)
+    if decoder is not None:
+        return decoder(encoded, offset)
+    if kind == 'F':
+        return _decode_container(encoded, offset, True)
+    if kind == 'A':
+        return _decode_container(encoded, offset, False)
+    raise exceptions.InvalidTableError("Unsupported field kind %s during "
+                                       "decoding" % kind)
+
+
+def _decode_container(encoded, offset, is_table):
+    """Decode the table or array at offset, walking nested tables and arrays
+    with a stack. Returns the decoded value and the offset after it.
+
+    :param str encoded: The encoded data
+    :param int offset: The offset of the table or array
+    :param bool is_table: Decode a table rather than an array
+    :rtype: tuple
+
+    """
+    decoders = DECODERS
+    stack = list()
+    result = dict() if is_table else list()
+    top = result
+    limit = offset + 4 + LONG.unpack_from(encoded, offset)[0]
+    offset += 4
+    while True:
+        while offset < limit:
+            if is_table:
+                length = ord(encoded[offset])
+                key = encoded[offset + 1:offset + 1 + length]
+                offset += 1 + length
+            kind = encoded[offset]
+            offset += 1
+            decoder = decoders.get(kind)
+            if decoder is not None:
+                value, offset = decoder(encoded, offset)
+            elif kind == 'F' or kind == 'A':
+                value = dict() if kind == 'F' else list()
+            else:
+                raise exceptions.InvalidTableError("Unsupported field kind %s "
+                                                   "during decoding" % kind)
+            if is_table:
+                result[key] = value
+            else:
+                result.append(value)
+            if decoder is None:
+                stack.append((result, limit, is_table))
+                result, is_table = value, kind == 'F'
+                limit = offset + 4 + LONG.unpack_from(encoded, offset)[0]
+                offset += 4
+        if not stack:
+            return top, offset
+        result, limit, is_table = stack.pop()
+
+
+def decode_shortstr(encoded, offset):
+    """Decode the short string at offset, returning the same str or unicode
+    object for every occurrence of a value. The consumer tags, exchanges,
+    routing keys and content types of deliveries come from a small set of
+    values, so they are decoded once instead of for every message. The
+    cache is kept in two generations of half of SHORTSTR_CACHE_SIZE values
+    each, like the publish frames of a channel, so values that stop
+    recurring are dropped.
+
+    :param str encoded: The encoded data
+    :param int offset: The offset of the short string's length octet
+    :rtype: tuple
+
+    """
+    global _shortstrs, _shortstrs_old
+    length = ord(encoded[offset])
+    offset += 1
+    raw = encoded[offset:offset + length]
+    value = _shortstrs.get(raw)
+    if value is not None:
+        return value, offset + length
+    value = _shortstrs_old.pop(raw, None)
+    if value is None:
+        value = _decode_str(raw, 0, length)
+    if len(_shortstrs) >= SHORTSTR_CACHE_SIZE // 2:
+        _shortstrs_old = _shortstrs
+        _shortstrs = dict()
+    _shortstrs[raw] = value
+    return value, offset + length
 
 
 def validate_type(field_name, value, data_type):
@@ -145,19 +373,22 @@ def validate_type(field_name, value, data_type):
     Validate the data types passed into the RPC Command
     """
     if data_type == 'bit' and not isinstance(value, bool):
-        raise InvalidRPCParameterType("%s must be a bool" % field_name)
+        raise exceptions.InvalidRPCParameterType("%s must be a bool" %
+                                                 field_name)
 
     if data_type == 'shortstr' and not isinstance(value, basestring):
-        raise InvalidRPCParameterType("%s must be a str or unicode" %
-                                      field_name)
+        raise exceptions.InvalidRPCParameterType("%s must be a str or "
+                                                 "unicode" % field_name)
 
     if data_type == 'longstr' and not isinstance(value, basestring):
-        raise InvalidRPCParameterType("%s must be a str or unicode" %
-                                      field_name)
+        raise exceptions.InvalidRPCParameterType("%s must be a str or "
+                                                 "unicode" % field_name)
 
     if data_type == 'short' and not isinstance(value, int):
-        raise InvalidRPCParameterType("%s must be a int" % field_name)
+        raise exceptions.InvalidRPCParameterType("%s must be a int" %
+                                                 field_name)
 
     if data_type == 'long' and not (isinstance(value, long) or
                                     isinstance(value, int)):
-        raise InvalidRPCParameterType("%s must be a long" % field_name)
+        raise exceptions.InvalidRPCParameterType("%s must be a long" %
+                                                 field_name)
@@ -1,5 +1,4 @@
 """Pika specific exceptions"""
-from pika import spec
 
 
 class AMQPError(Exception):
@@ -118,13 +117,19 @@ class CallbackReplyAlreadyRegistered(ChannelTransportError):
 
 class InvalidMinimumFrameSize(ProtocolSyntaxError):
     def __repr__(self):
+        from pika import spec
         return "AMQP Minimum Frame Size is %i Bytes" % spec.FRAME_MIN_SIZE
 
 
 class InvalidMaximumFrameSize(ProtocolSyntaxError):
     def __repr__(self):
+        from pika import spec
         return "AMQP Maximum Frame Size is %i Bytes" % spec.FRAME_MAX_SIZE
 
 
 class InvalidRPCParameterType(Exception):
     pass
+
+
+class InvalidCaptureError(Exception):
+    pass
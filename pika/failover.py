@@ -0,0 +1,327 @@
+"""A publisher that keeps a warm standby connection open to a second broker
+so that publishing can fail over without waiting for a new connection to be
+established and negotiated.
+
+Both connections share one IOLoop. Messages are published on the active
+connection with publisher confirms enabled. When the active connection is
+lost, the publisher switches to the standby and publishes the messages that
+were not yet confirmed again, in order. The lost connection reconnects in the
+background using its reconnection strategy and becomes the new standby, the
+publisher does not switch back to avoid flapping between brokers.
+
+Example::
+
+    def on_ready(publisher):
+        publisher.publish('exchange', 'routing.key', 'body')
+
+    publisher = FailoverPublisher(
+        ConnectionParameters('rabbit1', heartbeat_interval=5),
+        ConnectionParameters('rabbit2', heartbeat_interval=5),
+        on_ready)
+    publisher.ioloop.start()
+
+"""
+import collections
+import logging
+import time
+
+from pika import exceptions
+from pika import reconnection_strategies
+from pika import spec
+from pika.adapters import select_connection
+
+LOGGER = logging.getLogger(__name__)
+
+
+class FailoverPublisher(object):
+    """Publishes on a primary connection while keeping a standby connection
+    open, switching to the standby when the active connection is lost.
+
+    """
+    def __init__(self, primary, standby, on_ready_callback=None,
+                 custom_ioloop=None, reconnection_strategy=None):
+        """Create a new FailoverPublisher, connecting to both brokers.
+
+        :param pika.connection.ConnectionParameters primary: The connection
+            parameters for the broker to publish to
+        :param pika.connection.ConnectionParameters standby: The connection
+            parameters for the standby broker
+        :param method on_ready_callback: Called with the publisher once the
+            first connection can be published on
+        :param pika.adapters.select_connection.IOLoop custom_ioloop: The
+            IOLoop to run both connections on
+        :param class reconnection_strategy: The reconnection strategy class to
+            create for each connection, defaults to SimpleReconnectionStrategy
+
+        """
+        self.ioloop = custom_ioloop or select_connection.IOLoop()
+        self.failovers = 0
+        self.last_failover_time = None
+        self._on_ready_callback = on_ready_callback
+        self._strategy = (reconnection_strategy or
+                          reconnection_strategies.SimpleReconnectionStrategy)
+        self._active = None
+        self._backlog = collections.deque()
+        self._closing = False
+        self._links = [_Link(self, 'primary', primary),
+                       _Link(self, 'standby', standby)]
+        for link in self._links:
+            link.connect()
+
+    @property
+    def active(self):
+        """Return the name of the connection being published on, None if
+        neither connection is ready.
+
+        :rtype: str
+
+        """
+        return self._active.name if self._active else None
+
+    @property
+    def unconfirmed(self):
+        """Return the number of messages waiting to be confirmed or sent.
+
+        :rtype: int
+
+        """
+        return (len(self._backlog) +
+                sum([len(link.unconfirmed) for link in self._links]))
+
+    def close(self):
+        """Close both connections, the unconfirmed messages are discarded."""
+        self._closing = True
+        self._active = None
+        for link in self._links:
+            link.close()
+
+    def publish(self, exchange, routing_key, body, properties=None,
+                mandatory=False):
+        """Publish a message on the active connection. If neither connection
+        is ready, the message is held and published once one is.
+
+        :param str exchange: The exchange name
+        :param str routing_key: The routing key
+        :param str body: The message body
+        :param pika.spec.BasicProperties properties: Basic.properties
+        :param bool mandatory: The mandatory flag
+
+        """
+        if self._closing:
+            raise exceptions.ConnectionClosed()
+        message = (exchange, routing_key, body, properties, mandatory)
+        if not self._active:
+            self._backlog.append(message)
+            return
+        self._active.publish(message)
+
+    def _on_link_lost(self, link, unconfirmed):
+        """Invoked by a link when its connection was lost, failing over to the
+        other link if this was the active one and publishing the unconfirmed
+        messages again.
+
+        :param _Link link: The link that was lost
+        :param list unconfirmed: The messages that were not confirmed
+
+        """
+        if self._closing:
+            return
+        if link is self._active:
+            self._active = None
+            for other in self._links:
+                if other is not link and other.ready:
+                    self._active = other
+                    self.failovers += 1
+                    self.last_failover_time = time.time()
+                    LOGGER.warning('Failed over from %s to %s, republishing '
+                                   '%i unconfirmed messages', link.name,
+                                   other.name, len(unconfirmed))
+        self._backlog.extendleft(reversed(unconfirmed))
+        self._flush_backlog()
+
+    def _on_link_ready(self, link):
+        """Invoked by a link when it can be published on. If no link is active
+        it becomes the active one. The primary takes over from the standby
+        if it only became ready after the standby did at startup.
+
+        :param _Link link: The link that is ready
+
+        """
+        if self._closing:
+            return
+        if self._active:
+            if link is self._links[0] and not self.failovers:
+                LOGGER.info('Switching to the primary connection')
+                self._active = link
+            return
+        LOGGER.info('Publishing on the %s connection', link.name)
+        self._active = link
+        self._flush_backlog()
+        if self._on_ready_callback:
+            callback, self._on_ready_callback = self._on_ready_callback, None
+            callback(self)
+
+    def _flush_backlog(self):
+        """Publish the held messages on the active link"""
+        while self._backlog and self._active:
+            self._active.publish(self._backlog.popleft())
+
+
+class _Link(object):
+    """A connection and channel for the FailoverPublisher, tracking the
+    messages published on it until they are confirmed.
+
+    """
+    def __init__(self, publisher, name, parameters):
+        """Create a new link
+
+        :param FailoverPublisher publisher: The publisher using the link
+        :param str name: The name used when logging
+        :param pika.connection.ConnectionParameters parameters: Connection
+            parameters for the broker
+
+        """
+        self.publisher = publisher
+        self.name = name
+        self.parameters = parameters
+        self.connection = None
+        self.channel = None
+        self.confirms = False
+        self.ready = False
+        self.unconfirmed = dict()
+        self._delivery_tag = 0
+        if not parameters.heartbeat:
+            LOGGER.warning('No heartbeat_interval for the %s connection, a '
+                           'dead connection may go unnoticed', name)
+
+    def close(self):
+        """Close the connection"""
+        self.ready = False
+        if self.connection and self.connection.is_open:
+            self.connection.close()
+
+    def connect(self):
+        """Connect to the broker, trying again after retry_delay seconds if
+        the broker can not be reached.
+
+        """
+        try:
+            self.connection = select_connection.SelectConnection(
+                self.parameters, self._on_connection_open,
+                stop_ioloop_on_close=False,
+                custom_ioloop=self.publisher.ioloop,
+                reconnection_strategy=self.publisher._strategy())
+        except exceptions.AMQPConnectionError, error:
+            LOGGER.error('Could not connect the %s connection: %r',
+                         self.name, error)
+            self.publisher.ioloop.add_timeout(self.parameters.retry_delay,
+                                              self.connect)
+            return
+        self.connection.add_on_close_callback(self._on_connection_closed)
+        self.connection.add_on_recovery_callback(self._on_recovered)
+
+    def publish(self, message):
+        """Publish the message, remembering it until it is confirmed.
+
+        :param tuple message: The exchange, routing key, body, properties and
+                              mandatory flag
+
+        """
+        exchange, routing_key, body, properties, mandatory = message
+        try:
+            self.channel.basic_publish(exchange, routing_key, body, properties,
+                                       mandatory)
+        except (exceptions.ChannelClosed, exceptions.ConnectionClosed):
+            if self.ready:
+                # The broker closed the channel, open a new one
+                self._lost()
+                if self.connection.is_open:
+                    self.connection.channel(self._on_channel_open)
+        if not self.ready:
+            # The connection was lost while writing, fail the message over
+            return self.publisher.publish(*message)
+        if self.confirms:
+            self._delivery_tag += 1
+            self.unconfirmed[self._delivery_tag] = message
+
+    def _lost(self):
+        """Stop publishing on the link, handing the unconfirmed messages back
+        to the publisher.
+
+        """
+        self.ready = False
+        self._delivery_tag = 0
+        unconfirmed = [self.unconfirmed[tag]
+                       for tag in sorted(self.unconfirmed)]
+        self.unconfirmed = dict()
+        self.publisher._on_link_lost(self, unconfirmed)
+
+    def _on_channel_open(self, channel):
+        """Enable publisher confirms on the new channel if the broker supports
+        them.
+
+        :param pika.channel.Channel channel: The open channel
+
+        """
+        self.channel = channel
+        self.confirms = (self.connection.publisher_confirms and
+                         self.connection.basic_nack)
+        if not self.confirms:
+            LOGGER.warning('The %s broker does not support publisher '
+                           'confirms, messages can be lost on failover',
+                           self.name)
+            return self._on_recovered(self.connection)
+        channel.confirm_delivery(self._on_delivery_confirmation)
+
+    def _on_connection_closed(self, connection):
+        """Invoked when the connection was lost or closed, handing the
+        unconfirmed messages back to the publisher.
+
+        :param pika.connection.Connection connection: The closed connection
+
+        """
+        LOGGER.warning('The %s connection was closed', self.name)
+        self._lost()
+
+    def _on_connection_open(self, connection):
+        """Open the channel to publish on.
+
+        :param pika.connection.Connection connection: The open connection
+
+        """
+        connection.channel(self._on_channel_open)
+
+    def _on_delivery_confirmation(self, method_frame):
+        """Invoked for Confirm.SelectOk, Basic.Ack and Basic.Nack. Acked
+        messages are forgotten, nacked messages are published again.
+
+        :param pika.frame.Method method_frame: The frame received
+
+        """
+        method = method_frame.method
+        if isinstance(method, spec.Confirm.SelectOk):
+            return self._on_recovered(self.connection)
+        if method.multiple:
+            tags = [tag for tag in self.unconfirmed
+                    if tag <= method.delivery_tag]
+        else:
+            tags = [method.delivery_tag]
+        messages = [self.unconfirmed.pop(tag) for tag in sorted(tags)
+                    if tag in self.unconfirmed]
+        if isinstance(method, spec.Basic.Nack):
+            LOGGER.warning('%i messages nacked by the %s broker, republishing',
+                           len(messages), self.name)
+            for message in messages:
+                self.publisher.publish(*message)
+
+    def _on_recovered(self, connection):
+        """Invoked once the channel can be published on, after opening or
+        after recovering from a lost connection.
+
+        :param pika.connection.Connection connection: The connection
+
+        """
+        if self.ready:
+            return
+        self.ready = True
+        self.publisher._on_link_ready(self)
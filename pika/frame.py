@@ -8,6 +8,21 @@ from pika import spec
 
 LOGGER = logging.getLogger(__name__)
 
+FRAME_END = chr(spec.FRAME_END)
+
+# Frames that are always the same, marshaled once
+HEARTBEAT = struct.pack('>BHI', spec.FRAME_HEARTBEAT, 0, 0) + FRAME_END
+PROTOCOL_HEADER = 'AMQP' + struct.pack('BBBB', 0, *spec.PROTOCOL_VERSION)
+
+# The frame type, channel number and frame size of a frame
+_FRAME_HEADER = struct.Struct('>BHL')
+
+# The method id of a method frame
+_METHOD_ID = struct.Struct('>I')
+
+# The class id, weight and body size of a content header frame
+_CONTENT_HEADER = struct.Struct('>HHQ')
+
 
 class Frame(amqp_object.AMQPObject):
     """Base Frame object mapping. Defines a behavior for all child classes for
@@ -16,6 +31,8 @@ class Frame(amqp_object.AMQPObject):
 
     """
     NAME = 'Frame'
+    __slots__ = ('frame_type', 'channel_number')
+
     def __init__(self, frame_type, channel_number):
         """
         Parameters:
@@ -34,7 +51,7 @@ class Frame(amqp_object.AMQPObject):
         return struct.pack('>BHI',
                            self.frame_type,
                            self.channel_number,
-                           len(payload)) + payload + chr(spec.FRAME_END)
+                           len(payload)) + payload + FRAME_END
 
     def marshal(self):
         """To be ended by child classes
@@ -51,6 +68,7 @@ class Method(Frame):
 
     """
     NAME = 'METHOD'
+    __slots__ = ('method',)
 
     def __init__(self, channel_number, method):
         """
@@ -71,12 +89,65 @@ class Method(Frame):
         return self._marshal(pieces)
 
 
+class MarshaledMethod(Method):
+    """A method frame that is marshaled once when it is created, for method
+    frames that are sent over and over again such as the Basic.Publish
+    frames of the destinations a channel publishes to. The method must not
+    be changed once the frame is created.
+
+    """
+    __slots__ = ('_marshaled',)
+
+    def __init__(self, channel_number, method):
+        """
+        Parameters:
+
+        - channel_number: int
+        - method: a spec.Class.Method object
+        """
+        Method.__init__(self, channel_number, method)
+        self._marshaled = Method.marshal(self)
+
+    def marshal(self):
+        """
+        Return the AMQP binary encoded value of the frame
+        """
+        return self._marshaled
+
+
+class Marshaled(Frame):
+    """A frame that is marshaled once when it is created, so that the same
+    marshaled frame can be sent several times, such as the content frames of
+    a message published to several routing keys.
+
+    """
+    NAME = 'Marshaled'
+    __slots__ = ('_marshaled',)
+
+    def __init__(self, frame_value):
+        """
+        Parameters:
+
+        - frame_value: a pika.frame.Frame object
+        """
+        Frame.__init__(self, frame_value.frame_type,
+                       frame_value.channel_number)
+        self._marshaled = frame_value.marshal()
+
+    def marshal(self):
+        """
+        Return the AMQP binary encoded value of the frame
+        """
+        return self._marshaled
+
+
 class Header(Frame):
     """Header frame object mapping. AMQP content header frames are mapped
     on top of this class for creating or accessing their data and attributes.
 
     """
     NAME = 'Header'
+    __slots__ = ('body_size', 'properties')
 
     def __init__(self, channel_number, body_size, props):
         """
@@ -107,6 +178,7 @@ class Body(Frame):
 
     """
     NAME = 'Body'
+    __slots__ = ('fragment',)
 
     def __init__(self, channel_number, fragment):
         """
@@ -131,6 +203,7 @@ class Heartbeat(Frame):
 
     """
     NAME = 'Heartbeat'
+    __slots__ = ()
 
     def __init__(self):
         Frame.__init__(self, spec.FRAME_HEARTBEAT, 0)
@@ -139,7 +212,7 @@ class Heartbeat(Frame):
         """
         Return the AMQP binary encoded value of the frame
         """
-        return self._marshal(list())
+        return HEARTBEAT
 
 
 class ProtocolHeader(amqp_object.AMQPObject):
@@ -148,6 +221,7 @@ class ProtocolHeader(amqp_object.AMQPObject):
 
     """
     NAME = 'ProtocolHeader'
+    __slots__ = ('frame_type', 'major', 'minor', 'revision')
 
     def __init__(self, major=None, minor=None, revision=None):
         """
@@ -169,6 +243,8 @@ class ProtocolHeader(amqp_object.AMQPObject):
         Return the full AMQP wire protocol frame data representation of the
         ProtocolHeader frame
         """
+        if (self.major, self.minor, self.revision) == spec.PROTOCOL_VERSION:
+            return PROTOCOL_HEADER
         return 'AMQP' + struct.pack('BBBB', 0,
                                     self.major,
                                     self.minor,
@@ -183,25 +259,46 @@ class Dispatcher(object):
     2) Header Frame
     3) Body Frame(s)
 
-    The way that content handler works is to assign the active frame type to
-    the self._handler variable. When we receive a header frame that is either
-    a Basic.Deliver, Basic.GetOk, or Basic.Return, we will assign the handler
-    to the ContentHandler._handle_header_frame. This will fire the next time
-    we are called and parse out the attributes required to receive the body
-    frames and assemble the content to be returned. We will then assign the
-    self._handler to ContentHandler._handle_body_frame.
-
-    _handle_body_frame has two methods inside of it, handle and finish.
-    handle will be invoked until the requirements set by the header frame have
-    been met at which point it will call the finish method. This calls
-    the callback manager with the method frame, header frame and assembled
-    body and then reset the self._handler to the _handle_method_frame method.
+    The dispatcher is a small state machine that assembles the content of one
+    message at a time, it expects a method frame, then a header frame and
+    then body frames until the body size given by the header frame has been
+    received. The assembled method frame, header frame and body are then
+    passed to the callback registered for the method in CONTENT_CALLBACKS
+    and the dispatcher expects the next method frame. The state is kept in
+    slots that are reused for every message.
+
+    With zero_copy set, bodies are passed on as memoryview objects. Bodies
+    that span several frames are copied into a bytearray allocated for the
+    body size given by the header frame, straight from the connection's read
+    buffer, so the fragments do not need to be kept around and joined.
+
+    Deliveries for the consumer tags in streams are not assembled. The
+    start callback of the consumer's (start, chunk, end) tuple is called
+    with the method, the properties and the body size when the header frame
+    arrives, the chunk callback with a memoryview of each body frame as it
+    arrives and the end callback with the method once the whole body has
+    been received, so only one frame of the body is held at a time.
+
     """
+    __slots__ = ['callbacks', 'zero_copy', 'streams', '_state',
+                 '_method_frame', '_header_frame', '_body_size', '_received',
+                 '_fragments', '_body', '_stream']
+
+    METHOD = 0
+    HEADER = 1
+    BODY = 2
+
+    # The callback key for each content carrying method, by method INDEX
+    CONTENT_CALLBACKS = {spec.Basic.Deliver.INDEX: '_on_basic_deliver',
+                         spec.Basic.GetOk.INDEX: '_on_basic_get',
+                         spec.Basic.Return.INDEX: '_on_basic_return'}
 
     def __init__(self, callback_manager):
-        # We start with Method frames always
-        self._handler = self._handle_method_frame
         self.callbacks = callback_manager
+        self.zero_copy = False
+        self.streams = dict()
+        self._fragments = list()
+        self.reset()
 
     def process(self, frame_value):
         """
@@ -209,7 +306,63 @@ class Dispatcher(object):
         setup in the rpc process and that don't have explicit reply types
         defined. This includes Basic.Publish, Basic.GetOk and Basic.Return
         """
-        self._handler(frame_value)
+        if self._state == self.BODY:
+            self._handle_body_frame(frame_value)
+        elif self._state == self.HEADER:
+            self._handle_header_frame(frame_value)
+        else:
+            self._handle_method_frame(frame_value)
+
+    def reset(self):
+        """Discard any partially assembled content, expecting a method frame
+        next. Invoked when the connection the frames arrive on is lost.
+
+        """
+        self._state = self.METHOD
+        self._method_frame = None
+        self._header_frame = None
+        self._body_size = 0
+        self._received = 0
+        self._body = None
+        self._stream = None
+        del self._fragments[:]
+
+    def _finish(self, body):
+        """Reset the state for the next message and pass the assembled
+        content to the callback for its method.
+
+        :param str|memoryview body: The message body
+
+        """
+        method_frame, header_frame = self._method_frame, self._header_frame
+        self.reset()
+        self.callbacks.process(method_frame.channel_number,
+                               self.CONTENT_CALLBACKS[
+                                   method_frame.method.INDEX],
+                               self,
+                               method_frame,
+                               header_frame,
+                               body)
+
+    def _assemble_body(self, fragment, offset):
+        """Copy the fragment into the body buffer at offset, allocating the
+        buffer for the first fragment of a body that spans several frames.
+        A body sent in a single frame is passed on as a view of the fragment,
+        copied out of the read buffer first if the fragment is a view of it.
+
+        :param str|memoryview fragment: The body fragment
+        :param int offset: The offset of the fragment in the body
+
+        """
+        if self._body is None:
+            if self._received == self._body_size:
+                if fragment.__class__ is memoryview:
+                    fragment = fragment.tobytes()
+                return self._finish(memoryview(fragment))
+            self._body = bytearray(self._body_size)
+        self._body[offset:self._received] = fragment
+        if self._received == self._body_size:
+            self._finish(memoryview(self._body))
 
     def _handle_method_frame(self, frame_value):
         """
@@ -220,172 +373,211 @@ class Dispatcher(object):
         if not isinstance(frame_value, Method):
             raise exceptions.UnexpectedFrameError(frame_value)
 
-        # If the frame is a content related frame go deal with the content
-        # By getting the content header frame
-        if spec.has_content(frame_value.method.INDEX):
-            self._handler = self._handle_header_frame(frame_value)
-
         # We were passed a frame we don't know how to deal with
-        else:
+        if frame_value.method.INDEX not in self.CONTENT_CALLBACKS:
             raise NotImplementedError(repr(frame_value.method))
 
+        self._method_frame = frame_value
+        self._state = self.HEADER
+
     def _handle_header_frame(self, frame_value):
         """
-        Receive a header frame and process that, setting the next handler
-        to the body frame handler
-        """
-
-        def handler(header_frame):
-            # Make sure it's a header frame
-            if not isinstance(header_frame, Header):
-                raise exceptions.UnexpectedFrameError(header_frame)
-
-            # Call the handle body frame including our header frame
-            self._handle_body_frame(frame_value, header_frame)
-
-        return handler
-
-    def _handle_body_frame(self, method_frame, header_frame):
-        """
-        Receive body frames. We'll keep receiving them in handler until we've
-        received the body size specified in the header frame. When done
-        call our finish function which will call our transports callbacks
-        """
-        seen_so_far = [0]
-        body_fragments = list()
-
-        def handler(body_frame):
-            # Make sure it's a body frame
-            if not isinstance(body_frame, Body):
-                raise exceptions.UnexpectedFrameError(body_frame)
-
-            # Increment our counter so we know when we've had enough
-            seen_so_far[0] += len(body_frame.fragment)
-
-            # Append the fragment to our list
-            body_fragments.append(body_frame.fragment)
-
-            # Did we get enough bytes? If so finish
-            if seen_so_far[0] == header_frame.body_size:
-                finish()
-            elif seen_so_far[0] < header_frame.body_size:
-                LOGGER.debug('Received message Body frame, %i of %i bytes of '
-                             'message body received.',
-                             seen_so_far[0], header_frame.body_size)
-            # Did we get too many bytes?
-            elif seen_so_far[0] > header_frame.body_size:
-                error = 'Received %i and only expected %i' % \
-                        (seen_so_far[0], header_frame.body_size)
-                raise exceptions.BodyTooLongError(error)
-
-        def finish():
-            # We're done so set our handler back to the method frame
-            self._handler = self._handle_method_frame
-
-            # Get our method name
-            method = method_frame.method.__class__.__name__
-            if method == 'Deliver':
-                key = '_on_basic_deliver'
-            elif method == 'GetOk':
-                key = '_on_basic_get'
-            elif method == 'Return':
-                key = '_on_basic_return'
-            else:
-                raise Exception('Unimplemented Content Return Key')
-
-            # Check for a processing callback for our method name
-            self.callbacks.process(method_frame.channel_number,  # Prefix
-                                   key,                          # Key
-                                   self,                         # Caller
-                                   method_frame,                 # Arg 1
-                                   header_frame,                 # Arg 2
-                                   ''.join(body_fragments))      # Arg 3
-
-        # If we don't have a header frame body size, finish. Otherwise keep
-        # going and keep our handler function as the frame handler
-        if not header_frame.body_size:
-            finish()
-        else:
-            self._handler = handler
+        Receive a header frame and process that, expecting body frames next
+        unless the message has no body
+        """
+        if not isinstance(frame_value, Header):
+            raise exceptions.UnexpectedFrameError(frame_value)
+        self._header_frame = frame_value
+        if self.streams:
+            consumer_tag = getattr(self._method_frame.method, 'consumer_tag',
+                                   None)
+            if consumer_tag in self.streams:
+                return self._start_stream(self.streams[consumer_tag])
+        if not frame_value.body_size:
+            return self._finish(memoryview('') if self.zero_copy else '')
+        self._body_size = frame_value.body_size
+        self._state = self.BODY
+
+    def _start_stream(self, stream):
+        """Pass the start of a streamed delivery to the consumer's start
+        callback, ending the stream right away if the message has no body.
+
+        :param tuple stream: The consumer's start, chunk and end callbacks
 
+        """
+        on_start, on_chunk, on_end = stream
+        if on_start:
+            on_start(self._method_frame.method,
+                     self._header_frame.properties,
+                     self._header_frame.body_size)
+        if not self._header_frame.body_size:
+            method = self._method_frame.method
+            self.reset()
+            return on_end(method)
+        self._body_size = self._header_frame.body_size
+        self._stream = stream
+        self._state = self.BODY
+
+    def _stream_body_frame(self, fragment):
+        """Pass a body frame of a streamed delivery to the consumer's chunk
+        callback and the method to its end callback after the last frame.
+
+        :param str fragment: The body fragment
 
-def decode_frame(data_in):
+        """
+        self._received += len(fragment)
+        if self._received > self._body_size:
+            raise exceptions.BodyTooLongError(
+                'Received %i and only expected %i' %
+                (self._received, self._body_size))
+        on_start, on_chunk, on_end = self._stream
+        on_chunk(memoryview(fragment))
+        if self._received == self._body_size:
+            method = self._method_frame.method
+            self.reset()
+            on_end(method)
+
+    def _handle_body_frame(self, frame_value):
+        """
+        Receive body frames until we've received the body size specified in
+        the header frame. A body sent in a single frame is passed on as is,
+        without joining fragments.
+        """
+        if not isinstance(frame_value, Body):
+            raise exceptions.UnexpectedFrameError(frame_value)
+        fragment = frame_value.fragment
+
+        # A fragment that is a view of the connection's read buffer is only
+        # copied into the body of a zero-copy channel, anything else gets a
+        # copy of its own before the buffer is read into again
+        if fragment.__class__ is memoryview and (self._stream or
+                                                 not self.zero_copy):
+            fragment = fragment.tobytes()
+        if self._stream:
+            return self._stream_body_frame(fragment)
+        offset = self._received
+        self._received += len(fragment)
+
+        if self.zero_copy and self._received <= self._body_size:
+            return self._assemble_body(fragment, offset)
+
+        if self._received == self._body_size:
+            if not self._fragments:
+                return self._finish(fragment)
+            self._fragments.append(fragment)
+            return self._finish(''.join(self._fragments))
+
+        # Did we get too many bytes?
+        if self._received > self._body_size:
+            error = 'Received %i and only expected %i' % \
+                    (self._received, self._body_size)
+            raise exceptions.BodyTooLongError(error)
+
+        self._fragments.append(fragment)
+        LOGGER.debug('Received message Body frame, %i of %i bytes of '
+                     'message body received.',
+                     self._received, self._body_size)
+
+
+def decode_frame(data_in, offset=0, end=None):
     """
-    Receives raw socket data and attempts to turn it into a frame.
+    Receives raw socket data and attempts to turn it into a frame, starting
+    at offset and stopping at end, the length of data_in by default. The
+    data may also be a bytearray the socket was read into: the payload of a
+    method or header frame is copied out of it to be decoded and a body
+    frame's fragment is a memoryview of it, valid until the next read.
     Returns bytes used to make the frame and the frame
     """
+    if end is None:
+        end = len(data_in)
+
     # Look to see if it's a protocol header frame
-    try:
-        if data_in[0:4] == 'AMQP':
-            major, minor, revision = struct.unpack_from('BBB', data_in, 5)
-            return 8, ProtocolHeader(major, minor, revision)
-    except IndexError:
-        # We didn't get a full frame
-        return 0, None
-    except struct.error:
-        # We didn't get a full frame
-        return 0, None
+    if data_in.startswith('AMQP', offset, end):
+        if offset + 8 > end:
+            # We didn't get a full frame
+            return 0, None
+        major, minor, revision = struct.unpack_from('BBB', data_in,
+                                                    offset + 5)
+        return 8, ProtocolHeader(major, minor, revision)
 
     # Get the Frame Type, Channel Number and Frame Size
     try:
         frame_type, channel_number, frame_size = \
-            struct.unpack('>BHL', data_in[0:7])
+            _FRAME_HEADER.unpack_from(data_in, offset)
     except struct.error:
         # We didn't get a full frame
         return 0, None
 
     # Get the frame data
-    frame_end = spec.FRAME_HEADER_SIZE +\
+    frame_end = offset +\
+                spec.FRAME_HEADER_SIZE +\
                 frame_size +\
                 spec.FRAME_END_SIZE
 
     # We don't have all of the frame yet
-    if frame_end > len(data_in):
+    if frame_end > end:
         return 0, None
+    consumed = frame_end - offset
+
+    # A str is decoded in place, the body frames slicing their fragment out
+    # of it
+    if data_in.__class__ is str:
+
+        # The Frame termination chr is wrong
+        if data_in[frame_end - 1] != FRAME_END:
+            raise exceptions.InvalidFrameError("Invalid FRAME_END marker")
+        offset += spec.FRAME_HEADER_SIZE
 
-    # The Frame termination chr is wrong
-    if data_in[frame_end - 1] != chr(spec.FRAME_END):
-        raise exceptions.InvalidFrameError("Invalid FRAME_END marker")
+    else:
 
-    # Get the raw frame data
-    frame_data = data_in[spec.FRAME_HEADER_SIZE:frame_end - 1]
+        # Indexing a bytearray returns the byte value
+        if data_in[frame_end - 1] != spec.FRAME_END:
+            raise exceptions.InvalidFrameError("Invalid FRAME_END marker")
+
+        # The fragment of a body frame is a view of the read buffer, which
+        # the Dispatcher copies from once, into the body of a zero-copy
+        # channel or to a str otherwise
+        if frame_type == spec.FRAME_BODY:
+            return consumed, Body(channel_number, memoryview(data_in)[
+                offset + spec.FRAME_HEADER_SIZE:frame_end - 1])
+
+        # The payload of the other frames is copied out once to a str,
+        # which the method or properties are decoded from
+        data_in = str(buffer(data_in, offset + spec.FRAME_HEADER_SIZE,
+                             frame_size))
+        offset, frame_end = 0, frame_size + spec.FRAME_END_SIZE
 
     if frame_type == spec.FRAME_METHOD:
 
         # Get the Method ID from the frame data
-        method_id = struct.unpack_from('>I', frame_data)[0]
+        method_id = _METHOD_ID.unpack_from(data_in, offset)[0]
 
-        # Get a Method object for this method_id
-        method = spec.methods[method_id]()
-
-        # Decode the content
-        method.decode(frame_data, 4)
+        # Decode a Method object for this method_id
+        method = spec.methods[method_id].from_bytes(data_in, offset + 4)
 
         # Return the amount of data consumed and the Method object
-        return frame_end, Method(channel_number, method)
+        return consumed, Method(channel_number, method)
 
     elif frame_type == spec.FRAME_HEADER:
 
         # Return the header class and body size
-        class_id, weight, body_size = struct.unpack_from('>HHQ', frame_data)
-
-        # Get the Properties type
-        properties = spec.props[class_id]()
+        class_id, weight, body_size = _CONTENT_HEADER.unpack_from(data_in,
+                                                                  offset)
 
-        # Decode the properties
-        out = properties.decode(frame_data[12:])
+        # Decode the properties of the Properties type
+        properties = spec.props[class_id].from_bytes(data_in, offset + 12)
 
         # Return a Header frame
-        return frame_end, Header(channel_number, body_size, properties)
+        return consumed, Header(channel_number, body_size, properties)
 
     elif frame_type == spec.FRAME_BODY:
 
         # Return the amount of data consumed and the Body frame w/ data
-        return frame_end, Body(channel_number, frame_data)
+        return consumed, Body(channel_number, data_in[offset:frame_end - 1])
 
     elif frame_type == spec.FRAME_HEARTBEAT:
 
         # Return the amount of data and a Heartbeat frame
-        return frame_end, Heartbeat()
+        return consumed, Heartbeat()
 
     raise exceptions.InvalidFrameError("Unknown frame type: %i" % frame_type)
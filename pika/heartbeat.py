@@ -35,6 +35,7 @@ class HeartbeatChecker(object):
         self._heartbeat_frames_received = 0
         self._heartbeat_frames_sent = 0
         self._idle_byte_intervals = 0
+        self._timer = None
 
         # Setup the timer to fire in _interval seconds
         self._setup_timer()
@@ -97,6 +98,13 @@ class HeartbeatChecker(object):
         # Update the timer to fire again
         self._start_timer()
 
+    def stop(self):
+        """Stop the heartbeat checker, removing its pending timer"""
+        if self._timer:
+            LOGGER.debug('Removing timeout for next heartbeat interval')
+            self._connection.remove_timeout(self._timer)
+            self._timer = None
+
     def _close_connection(self):
         """Close the connection with the AMQP Connection-Forced value."""
         LOGGER.info('Connection is idle, %i stale byte intervals',
@@ -136,7 +144,8 @@ class HeartbeatChecker(object):
         every interval seconds.
 
         """
-        self._connection.add_timeout(self._interval, self.send_and_check)
+        self._timer = self._connection.add_timeout(self._interval,
+                                                   self.send_and_check)
 
     def _start_timer(self):
         """If the connection still has this object set for heartbeats, add a
@@ -0,0 +1,73 @@
+"""Packages whose public names are imported from their modules the first time
+they are read, so that importing the package does not import the adapters,
+the spec and the standard library modules they use.
+
+"""
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Replaces a package in sys.modules, reading the names it does not have
+    from the modules they are defined in when they are first read.
+
+    """
+    def __init__(self, module, names, optional=()):
+        """Create the replacement for module.
+
+        :param module module: The package being replaced
+        :param dict names: The module each public name is imported from, or
+                           the module itself for the name of a module
+        :param tuple optional: The names that are None if their module
+                               can not be imported
+
+        """
+        types.ModuleType.__init__(self, module.__name__, module.__doc__)
+        self.__dict__.update(module.__dict__)
+        self.__all__ = sorted(names)
+        # The functions of the package keep module.__dict__ as their globals
+        self._module = module
+        self._names = names
+        self._optional = optional
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(self._names))
+
+    def __getattr__(self, name):
+        """Import the name from its module and keep it on the package. A name
+        that is the last part of its module's name is the module itself.
+
+        :param str name: The attribute name
+        :raises: AttributeError
+
+        """
+        if name not in self._names:
+            raise AttributeError("'module' object has no attribute '%s'" %
+                                 name)
+        path = self._names[name]
+        try:
+            __import__(path)
+        except ImportError:
+            if name not in self._optional:
+                raise
+            value = None
+        else:
+            value = sys.modules[path]
+            if path.rsplit('.', 1)[-1] != name:
+                value = getattr(value, name)
+        setattr(self, name, value)
+        return value
+
+
+def install(name, names, optional=()):
+    """Replace the package name in sys.modules with a LazyModule, called at
+    the end of the package's __init__.
+
+    :param str name: The package name
+    :param dict names: The module each public name is imported from, or
+                       the module itself for the name of a module
+    :param tuple optional: The names that are None if their module can not
+                           be imported
+
+    """
+    sys.modules[name] = LazyModule(sys.modules[name], names, optional)
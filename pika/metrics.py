@@ -0,0 +1,427 @@
+"""Counters and latency histograms kept by every connection and channel.
+
+Connection.metrics counts the frames and bytes sent and received by frame
+type and the connections and reconnections made, and Channel.metrics the
+messages published, delivered, acknowledged, rejected and returned, the
+round trip time of each synchronous method and the time the broker took to
+confirm each message published in confirm mode. The counters are plain
+attributes incremented where the frames and messages are handled, the
+buffer depths are read when a snapshot is taken.
+
+snapshot returns the values as a dict, render_prometheus as the Prometheus
+text exposition format, to be served or written by the application.
+
+"""
+import bisect
+import collections
+import time
+
+from pika import spec
+
+# The upper bounds of the histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+FRAME_TYPES = {-1: 'protocol_header',
+               spec.FRAME_METHOD: 'method',
+               spec.FRAME_HEADER: 'header',
+               spec.FRAME_BODY: 'body',
+               spec.FRAME_HEARTBEAT: 'heartbeat'}
+
+# The counters of a channel, in the order they are rendered
+CHANNEL_COUNTERS = ('publishes', 'deliveries', 'gets', 'acks', 'nacks',
+                    'rejects', 'returns', 'confirms_acked', 'confirms_nacked')
+
+
+class Histogram(object):
+    """Counts the values observed in buckets with upper bounds"""
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """Create a new histogram.
+
+        :param tuple buckets: The sorted upper bounds of the buckets
+
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Count the value in the first bucket with an upper bound equal to
+        or greater than it.
+
+        :param float value: The value observed
+
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        """Return the count, the sum and the cumulative count of each
+        bucket, the last bucket being the count.
+
+        :rtype: dict
+
+        """
+        cumulative = list()
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return {'count': self.count, 'sum': self.sum, 'buckets': cumulative}
+
+
+class ChannelMetrics(object):
+    """The counters and histograms of a channel"""
+
+    def __init__(self, channel, buckets=DEFAULT_BUCKETS):
+        """Create the metrics of the channel.
+
+        :param pika.channel.Channel channel: The channel
+        :param tuple buckets: The upper bounds of the histogram buckets
+
+        """
+        self._channel = channel
+        self.buckets = buckets
+        for name in CHANNEL_COUNTERS:
+            setattr(self, name, 0)
+        self.rpc = dict()
+        self.confirm_latency = Histogram(buckets)
+
+        # The time each message not yet confirmed was published, None if
+        # the channel is not in confirm mode, and the delivery tag of the
+        # first of them
+        self.unconfirmed = None
+        self._first_tag = 1
+
+        # The name of each synchronous method waiting for its reply, the
+        # reply classes it accepts and when it was sent, in the order they
+        # were sent
+        self._rpcs = collections.deque()
+
+    def confirm_mode(self):
+        """Start timing the confirmation of the messages published, the
+        broker numbering them from 1.
+
+        """
+        self.unconfirmed = collections.deque()
+        self._first_tag = 1
+
+    def confirm(self, acked, latency):
+        """Count a message confirmed by the broker.
+
+        :param bool acked: If the broker acked the message
+        :param float latency: The seconds since the message was published
+
+        """
+        if acked:
+            self.confirms_acked += 1
+        else:
+            self.confirms_nacked += 1
+        self.confirm_latency.observe(latency)
+
+    def confirmed(self, delivery_tag, multiple, acked):
+        """Count the messages a Basic.Ack or Basic.Nack from the broker
+        confirms.
+
+        :param int delivery_tag: The delivery tag confirmed
+        :param bool multiple: If all the messages up to the tag are confirmed
+        :param bool acked: If the messages were acked
+
+        """
+        unconfirmed = self.unconfirmed
+        if not unconfirmed:
+            return
+        now = time.time()
+        index = delivery_tag - self._first_tag
+        if multiple and not delivery_tag:
+            index = len(unconfirmed) - 1
+        if index < 0 or index >= len(unconfirmed):
+            return
+        if multiple:
+            for offset in xrange(index + 1):
+                published = unconfirmed.popleft()
+                if published is not None:
+                    self.confirm(acked, now - published)
+            self._first_tag += index + 1
+            return
+        published, unconfirmed[index] = unconfirmed[index], None
+        if published is not None:
+            self.confirm(acked, now - published)
+        while unconfirmed and unconfirmed[0] is None:
+            unconfirmed.popleft()
+            self._first_tag += 1
+
+    def reset(self):
+        """Forget the methods and messages sent before the channel was
+        reopened, their replies will not arrive.
+
+        """
+        self._rpcs.clear()
+        if self.unconfirmed is not None:
+            # The broker numbers the messages published from 1 again
+            self.confirm_mode()
+
+    def rpc_sent(self, name, replies):
+        """Start timing the round trip of the synchronous method. The broker
+        replies to the methods sent on a channel in order.
+
+        :param str name: The name of the method, such as Queue.Declare
+        :param list replies: The reply classes the method accepts
+
+        """
+        self._rpcs.append((name, tuple(replies), time.time()))
+
+    def rpc_replied(self, method):
+        """Observe the round trip time of the oldest synchronous method
+        waiting for a reply of the class of method. Methods that are not the
+        reply of a method sent are ignored.
+
+        :param pika.amqp_object.Method method: The method received
+
+        """
+        for index, (name, replies, sent) in enumerate(self._rpcs):
+            if isinstance(method, replies):
+                break
+        else:
+            return
+        del self._rpcs[index]
+        if name not in self.rpc:
+            self.rpc[name] = Histogram(self.buckets)
+        self.rpc[name].observe(time.time() - sent)
+
+    @property
+    def pending_frames(self):
+        """The commands waiting for the channel to open or for the reply of
+        a synchronous method before they are sent.
+
+        """
+        return (len(getattr(self._channel, '_blocked', ())) +
+                len(getattr(self._channel, '_opening_queue', ())))
+
+    def snapshot(self):
+        """Return the values of the counters, gauges and histograms.
+
+        :rtype: dict
+
+        """
+        values = dict((name, getattr(self, name)) for name in CHANNEL_COUNTERS)
+        values['pending_frames'] = self.pending_frames
+        values['unconfirmed'] = len(self.unconfirmed or ())
+        values['confirm_latency'] = self.confirm_latency.snapshot()
+        values['rpc'] = dict((name, histogram.snapshot())
+                             for name, histogram in self.rpc.items())
+        return values
+
+
+class ConnectionMetrics(object):
+    """The counters of a connection, kept across reconnections, and the
+    metrics of its channels.
+
+    """
+    def __init__(self, connection):
+        """Create the metrics of the connection.
+
+        :param pika.connection.Connection connection: The connection
+
+        """
+        self._connection = connection
+        self.frames_sent = dict.fromkeys(FRAME_TYPES, 0)
+        self.bytes_sent = dict.fromkeys(FRAME_TYPES, 0)
+        self.frames_received = dict.fromkeys(FRAME_TYPES, 0)
+        self.bytes_received = dict.fromkeys(FRAME_TYPES, 0)
+        self.connects = 0
+        self.reconnect_attempts = 0
+        self.reconnects = 0
+
+    @property
+    def channels(self):
+        """The metrics of the open channels by channel number
+
+        :rtype: dict
+
+        """
+        return dict((number, value.metrics) for number, value in
+                    getattr(self._connection, '_channels', dict()).items())
+
+    def snapshot(self):
+        """Return the values of the counters and gauges of the connection
+        and of its open channels.
+
+        :rtype: dict
+
+        """
+        connection = self._connection
+        buffer_value = getattr(connection, 'outbound_buffer', None)
+        values = {'connects': self.connects,
+                  'reconnect_attempts': self.reconnect_attempts,
+                  'reconnects': self.reconnects,
+                  'outbound_buffer_bytes':
+                      buffer_value.size if buffer_value else 0,
+                  'outbound_queued_frames':
+                      getattr(connection, '_outbound_queued', 0),
+                  'outbound_queued_bytes':
+                      getattr(connection, '_outbound_queued_bytes', 0),
+                  'channels': dict((number, value.snapshot()) for
+                                   number, value in self.channels.items())}
+        for name in ('frames_sent', 'bytes_sent', 'frames_received',
+                     'bytes_received'):
+            values[name] = dict((FRAME_TYPES[frame_type], count) for
+                                frame_type, count in
+                                getattr(self, name).items())
+        return values
+
+    def render_prometheus(self, prefix='pika'):
+        """Return a snapshot in the Prometheus text exposition format.
+
+        :param str prefix: The prefix of the metric names
+        :rtype: str
+
+        """
+        return render_prometheus(self.snapshot(), prefix)
+
+
+def _labels(labels):
+    """Return the labels of a sample, sorted by name.
+
+    :param dict labels: The label values by name
+    :rtype: str
+
+    """
+    if not labels:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (name,
+                                          str(value).replace('\\', '\\\\')
+                                                    .replace('"', '\\"'))
+                             for name, value in sorted(labels.items()))
+
+
+def _number(value):
+    """Format the sample value.
+
+    :param int|float value: The value
+    :rtype: str
+
+    """
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Families(object):
+    """Collects the samples of the metric families to render"""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.families = collections.OrderedDict()
+
+    def add(self, name, kind, description, labels, value):
+        """Add a counter or gauge sample.
+
+        :param str name: The metric name, without the prefix
+        :param str kind: counter or gauge
+        :param str description: The help text
+        :param dict labels: The label values by name
+        :param int|float value: The value
+
+        """
+        samples = self._family(name, kind, description)
+        samples.append('%s_%s%s %s' % (self.prefix, name, _labels(labels),
+                                       _number(value)))
+
+    def add_histogram(self, name, description, labels, snapshot):
+        """Add the samples of a histogram snapshot.
+
+        :param str name: The metric name, without the prefix
+        :param str description: The help text
+        :param dict labels: The label values by name
+        :param dict snapshot: The Histogram.snapshot value
+
+        """
+        samples = self._family(name, 'histogram', description)
+        for bound, count in snapshot['buckets']:
+            bucket_labels = dict(labels, le=_number(float(bound)))
+            samples.append('%s_%s_bucket%s %i' % (self.prefix, name,
+                                                  _labels(bucket_labels),
+                                                  count))
+        samples.append('%s_%s_sum%s %s' % (self.prefix, name, _labels(labels),
+                                           _number(float(snapshot['sum']))))
+        samples.append('%s_%s_count%s %i' % (self.prefix, name,
+                                             _labels(labels),
+                                             snapshot['count']))
+
+    def render(self):
+        lines = list()
+        for name, (kind, description, samples) in self.families.items():
+            lines.append('# HELP %s_%s %s' % (self.prefix, name, description))
+            lines.append('# TYPE %s_%s %s' % (self.prefix, name, kind))
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+    def _family(self, name, kind, description):
+        if name not in self.families:
+            self.families[name] = (kind, description, list())
+        return self.families[name][2]
+
+
+def render_prometheus(snapshot, prefix='pika'):
+    """Render a ConnectionMetrics snapshot in the Prometheus text exposition
+    format.
+
+    :param dict snapshot: The ConnectionMetrics.snapshot value
+    :param str prefix: The prefix of the metric names
+    :rtype: str
+
+    """
+    families = _Families(prefix)
+    for direction in ('sent', 'received'):
+        for frame_type, count in sorted(snapshot['frames_' + direction]
+                                        .items()):
+            families.add('frames_%s_total' % direction, 'counter',
+                         'Frames %s by frame type' % direction,
+                         {'type': frame_type}, count)
+        for frame_type, count in sorted(snapshot['bytes_' + direction]
+                                        .items()):
+            families.add('bytes_%s_total' % direction, 'counter',
+                         'Bytes %s by frame type' % direction,
+                         {'type': frame_type}, count)
+    families.add('connects_total', 'counter', 'Connections opened', None,
+                 snapshot['connects'])
+    families.add('reconnect_attempts_total', 'counter',
+                 'Attempts to reconnect', None,
+                 snapshot['reconnect_attempts'])
+    families.add('reconnects_total', 'counter', 'Connections reopened', None,
+                 snapshot['reconnects'])
+    families.add('outbound_buffer_bytes', 'gauge',
+                 'Bytes in the outbound buffer', None,
+                 snapshot['outbound_buffer_bytes'])
+    families.add('outbound_queued_frames', 'gauge',
+                 'Frames waiting for room in the outbound buffer', None,
+                 snapshot['outbound_queued_frames'])
+    families.add('outbound_queued_bytes', 'gauge',
+                 'Bytes waiting for room in the outbound buffer', None,
+                 snapshot['outbound_queued_bytes'])
+    for number, channel in sorted(snapshot['channels'].items()):
+        labels = {'channel': number}
+        for name in CHANNEL_COUNTERS:
+            families.add('channel_%s_total' % name, 'counter',
+                         'Channel %s' % name.replace('_', ' '), labels,
+                         channel[name])
+        families.add('channel_pending_frames', 'gauge',
+                     'Commands waiting to be sent on the channel', labels,
+                     channel['pending_frames'])
+        families.add('channel_unconfirmed', 'gauge',
+                     'Messages published waiting for a confirmation', labels,
+                     channel['unconfirmed'])
+        families.add_histogram('channel_confirm_seconds',
+                               'Seconds from publish to confirmation', labels,
+                               channel['confirm_latency'])
+        for name, histogram in sorted(channel['rpc'].items()):
+            families.add_histogram('channel_rpc_seconds',
+                                   'Round trip seconds of synchronous '
+                                   'methods', dict(labels, method=name),
+                                   histogram)
+    return families.render()
@@ -0,0 +1,140 @@
+"""Time the phases of the connection's hot path: reading from the socket,
+decoding frames, dispatching them, the consumer callbacks and writing to the
+socket.
+
+A PhaseProfiler is enabled on a connection at runtime with
+Connection.enable_profiler. The connection then switches the profiler to
+the phase it enters and back to the phase it was in when it leaves it, and
+the time between two switches is added to the phase that was current, so
+the time of a consumer callback is not counted in the dispatch of its frame
+and a frame written from a callback is counted as writing. The time spent
+in none of the phases, waiting in the IOLoop, running timers or publishing
+from the application, is reported as other.
+
+A disabled profiler costs the connection a single attribute check for each
+read, write and delivery.
+
+"""
+import time
+
+READ = 'read'
+DECODE = 'decode'
+DISPATCH = 'dispatch'
+CALLBACK = 'callback'
+WRITE = 'write'
+OTHER = 'other'
+
+# The phases in the order they are reported
+PHASES = (READ, DECODE, DISPATCH, CALLBACK, WRITE)
+
+
+class PhaseProfiler(object):
+    """Accumulates the wall time spent in each phase"""
+
+    def __init__(self, timer=time.time):
+        """Create a new profiler, started.
+
+        :param method timer: Returns the current time in seconds
+
+        """
+        self.timer = timer
+        self.reset()
+
+    def enter(self, phase):
+        """Switch to the phase, returning the phase that was current to pass
+        to leave.
+
+        :param str phase: The phase entered
+        :rtype: str|None
+
+        """
+        now = self.timer()
+        previous = self.phase
+        if previous is not None:
+            self.times[previous] += now - self._since
+        self.counts[phase] += 1
+        self.phase = phase
+        self._since = now
+        return previous
+
+    def leave(self, previous):
+        """Switch back to the phase that was current before enter.
+
+        :param str|None previous: The phase enter returned
+
+        """
+        now = self.timer()
+        if self.phase is not None:
+            self.times[self.phase] += now - self._since
+        self.phase = previous
+        self._since = now
+
+    @property
+    def elapsed(self):
+        """The seconds the profiler has been running
+
+        :rtype: float
+
+        """
+        if self._started is None:
+            return self._elapsed
+        return self._elapsed + self.timer() - self._started
+
+    def reset(self):
+        """Forget the times measured."""
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(PHASES, 0)
+        self.phase = None
+        self._since = self.timer()
+        self._started = self._since
+        self._elapsed = 0.0
+
+    def start(self):
+        """Start timing again after stop."""
+        if self._started is None:
+            self._started = self.timer()
+
+    def stop(self):
+        """Stop timing, keeping the times measured."""
+        if self._started is not None:
+            self._elapsed += self.timer() - self._started
+            self._started = None
+
+    def snapshot(self):
+        """Return the seconds spent and the times entered of each phase,
+        with the seconds spent in none of them as other.
+
+        :rtype: dict
+
+        """
+        elapsed = self.elapsed
+        values = dict((phase, {'seconds': self.times[phase],
+                               'count': self.counts[phase]})
+                      for phase in PHASES)
+        other = max(0.0, elapsed - sum(self.times.values()))
+        values[OTHER] = {'seconds': other, 'count': 0}
+        return {'elapsed': elapsed, 'phases': values}
+
+    def report(self):
+        """Return the snapshot as a table of the seconds spent in each
+        phase, their share of the time elapsed, the times the phase was
+        entered and the microseconds spent per entry.
+
+        :rtype: str
+
+        """
+        values = self.snapshot()
+        elapsed = values['elapsed']
+        lines = ['%-10s %12s %7s %10s %10s' % ('phase', 'seconds', 'share',
+                                               'entries', 'us/entry')]
+        for phase in PHASES + (OTHER,):
+            seconds = values['phases'][phase]['seconds']
+            count = values['phases'][phase]['count']
+            lines.append(('%-10s %12.6f %6.1f%% %10s %10s' %
+                          (phase, seconds,
+                           seconds / elapsed * 100 if elapsed else 0.0,
+                           count if phase != OTHER else '',
+                           '%.1f' % (seconds / count * 1000000) if count
+                           else '')).rstrip())
+        lines.append('%-10s %12.6f' % ('elapsed', elapsed))
+        return '\n'.join(lines)
@@ -0,0 +1,198 @@
+"""Reconnection strategies are consulted by the connection when the
+connection to RabbitMQ is lost without the application asking for it. A
+strategy decides if and when to reconnect. When a connection reconnects, it
+reopens the channels that were open and replays the topology, QoS settings
+and consumers they recorded.
+
+Reconnection is driven by the adapter's IOLoop timers and requires one of
+the asynchronous adapters (SelectConnection or TornadoConnection).
+
+"""
+import collections
+import logging
+import random
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ReconnectionStrategy(object):
+    """Base class for reconnection strategies, its hooks are invoked by the
+    connection as it connects, opens and closes. The default implementation
+    never reconnects.
+
+    """
+    can_reconnect = False
+
+    def on_connect_attempt(self, connection):
+        """Invoked when the connection starts to connect to the broker.
+
+        :param pika.connection.Connection connection: The connection
+
+        """
+        pass
+
+    def on_connect_attempt_failure(self, connection, error):
+        """Invoked when a reconnection attempt could not reach the broker.
+
+        :param pika.connection.Connection connection: The connection
+        :param pika.exceptions.AMQPConnectionError error: The failure
+
+        """
+        pass
+
+    def on_connection_open(self, connection):
+        """Invoked when the connection has been opened with the broker.
+
+        :param pika.connection.Connection connection: The connection
+
+        """
+        pass
+
+    def on_connection_closed(self, connection):
+        """Invoked when the connection was closed without the application
+        requesting it. Strategies that reconnect should schedule the attempt
+        here.
+
+        :param pika.connection.Connection connection: The connection
+
+        """
+        pass
+
+    def on_recovery_complete(self, connection):
+        """Invoked once the channels of a reconnected connection are open
+        and have replayed their recorded topology and consumers.
+
+        :param pika.connection.Connection connection: The connection
+
+        """
+        pass
+
+
+class NullReconnectionStrategy(ReconnectionStrategy):
+    """Never reconnect, the default strategy for all connections."""
+    pass
+
+
+class SimpleReconnectionStrategy(ReconnectionStrategy):
+    """Reconnect using a jittered exponential backoff. The first attempt is
+    made after initial_delay seconds, each consecutive failure multiplies the
+    delay by multiplier up to max_delay. A random jitter of up to jitter times
+    the delay is added so that a fleet of clients does not reconnect in lock
+    step after a broker restart.
+
+    The strategy keeps timing metrics for the recoveries it drives:
+
+    - reconnects: The number of successful reconnections
+    - attempts: The number of failed attempts since the last disconnect
+    - last_reconnect_time: Seconds from disconnect to Connection.OpenOk
+    - last_recovery_time: Seconds from disconnect to the channels, topology
+      and consumers being restored
+    - recovery_times: The recovery times of the most recent recoveries
+
+    """
+    HISTORY_SIZE = 100
+
+    def __init__(self, initial_delay=1.0, max_delay=30.0, multiplier=2.0,
+                 jitter=0.5, max_attempts=None):
+        """Create a new instance of the SimpleReconnectionStrategy
+
+        :param int|float initial_delay: Seconds to wait before the first
+                                        reconnection attempt
+        :param int|float max_delay: Upper bound for the delay in seconds
+        :param int|float multiplier: Backoff multiplier per failed attempt
+        :param float jitter: Maximum random fraction added to each delay
+        :param int max_attempts: Give up after this many consecutive failed
+                                 attempts, None to retry forever
+
+        """
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.max_attempts = max_attempts
+        self.attempts = 0
+        self.reconnects = 0
+        self.current_delay = initial_delay
+        self.disconnected_at = None
+        self.last_reconnect_time = None
+        self.last_recovery_time = None
+        self.recovery_times = collections.deque(maxlen=self.HISTORY_SIZE)
+
+    @property
+    def can_reconnect(self):
+        """Returns True if the strategy has reconnection attempts left.
+
+        :rtype: bool
+
+        """
+        return self.max_attempts is None or self.attempts < self.max_attempts
+
+    def next_delay(self):
+        """Return the jittered delay for the next attempt and back off the
+        delay for the attempt after it.
+
+        :rtype: float
+
+        """
+        delay = self.current_delay * (1 + random.random() * self.jitter)
+        self.current_delay = min(self.max_delay,
+                                 self.current_delay * self.multiplier)
+        return min(delay, self.max_delay * (1 + self.jitter))
+
+    def on_connect_attempt_failure(self, connection, error):
+        """Log the failed attempt, the next one is scheduled by
+        on_connection_closed.
+
+        :param pika.connection.Connection connection: The connection
+        :param pika.exceptions.AMQPConnectionError error: The failure
+
+        """
+        LOGGER.warning('Reconnection attempt %i failed: %r',
+                       self.attempts, error)
+
+    def on_connection_open(self, connection):
+        """Reset the backoff and record how long reconnecting took.
+
+        :param pika.connection.Connection connection: The connection
+
+        """
+        if self.disconnected_at is not None:
+            self.reconnects += 1
+            self.last_reconnect_time = time.time() - self.disconnected_at
+            LOGGER.info('Reconnected after %.3f seconds and %i attempts',
+                        self.last_reconnect_time, self.attempts)
+        self.attempts = 0
+        self.current_delay = self.initial_delay
+
+    def on_connection_closed(self, connection):
+        """Schedule the next reconnection attempt on the connection's IOLoop.
+
+        :param pika.connection.Connection connection: The connection
+
+        """
+        if self.disconnected_at is None:
+            self.disconnected_at = time.time()
+        if not self.can_reconnect:
+            LOGGER.error('Giving up reconnecting after %i attempts',
+                         self.attempts)
+            return
+        self.attempts += 1
+        delay = self.next_delay()
+        LOGGER.info('Reconnecting in %.3f seconds (attempt %i)',
+                    delay, self.attempts)
+        connection._schedule_reconnect(delay)
+
+    def on_recovery_complete(self, connection):
+        """Record how long the full recovery took.
+
+        :param pika.connection.Connection connection: The connection
+
+        """
+        if self.disconnected_at is None:
+            return
+        self.last_recovery_time = time.time() - self.disconnected_at
+        self.recovery_times.append(self.last_recovery_time)
+        self.disconnected_at = None
+        LOGGER.info('Recovered channels and topology in %.3f seconds',
+                    self.last_recovery_time)
@@ -0,0 +1,89 @@
+"""Resolve broker endpoints to socket addresses, caching the results so that
+reconnecting and failing over between endpoints does not block on DNS for
+every attempt.
+
+"""
+import logging
+import socket
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Resolver(object):
+    """Resolves host and port pairs to the addresses to connect to, IPv6 and
+    IPv4 alike, keeping the results for ttl seconds. If a lookup fails while
+    a stale result is cached, the stale result is used.
+
+    """
+    TTL = 30
+
+    def __init__(self, ttl=TTL):
+        """Create a new instance of the Resolver
+
+        :param int|float ttl: Seconds to cache the addresses for a host
+
+        """
+        self.ttl = ttl
+        self._cache = dict()
+
+    def clear(self):
+        """Remove all of the cached addresses"""
+        self._cache = dict()
+
+    def resolve(self, host, port):
+        """Return the addresses for host and port as a list of
+        (family, socktype, proto, sockaddr) tuples in the order returned by
+        the system resolver.
+
+        :param str host: The hostname or IP address
+        :param int port: The TCP port
+        :rtype: list
+        :raises: socket.gaierror
+
+        """
+        key = (host, port)
+        now = time.time()
+        expires, addresses = self._cache.get(key, (0, None))
+        if addresses and expires > now:
+            return addresses
+        try:
+            result = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM,
+                                        socket.IPPROTO_TCP)
+        except socket.gaierror, error:
+            if not addresses:
+                raise
+            LOGGER.warning('Could not resolve %s (%s), using cached addresses',
+                           host, error)
+            return addresses
+        addresses = [(family, socktype, proto, sockaddr)
+                     for family, socktype, proto, name, sockaddr in result]
+        LOGGER.debug('Resolved %s:%i to %r', host, port, addresses)
+        self._cache[key] = (now + self.ttl, addresses)
+        return addresses
+
+
+def interleave(candidates):
+    """Reorder the connection candidates so that address families alternate,
+    starting with the family of the first candidate, as described in
+    RFC 8305 section 4. Candidates are (endpoint, address) tuples where the
+    address is a (family, socktype, proto, sockaddr) tuple.
+
+    :param list candidates: The candidates to reorder
+    :rtype: list
+
+    """
+    families = list()
+    by_family = dict()
+    for candidate in candidates:
+        family = candidate[1][0]
+        if family not in by_family:
+            families.append(family)
+            by_family[family] = list()
+        by_family[family].append(candidate)
+    ordered = list()
+    while any(by_family.values()):
+        for family in families:
+            if by_family[family]:
+                ordered.append(by_family[family].pop(0))
+    return ordered
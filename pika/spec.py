@@ -10,6 +10,8 @@ import struct
 from pika import amqp_object
 from pika import data
 
+# The delivery tag and bit fields of Basic.Deliver and Basic.Ack
+_LONGLONG_OCTET = struct.Struct('>QB')
 
 PROTOCOL_VERSION = (0, 9, 1)
 PORT = 5672
@@ -53,6 +55,7 @@ class Connection(amqp_object.Class):
 
         INDEX = 0x000A000A  # 10, 10; 655370
         NAME = 'Connection.Start'
+        __slots__ = ('version_major', 'version_minor', 'server_properties', 'mechanisms', 'locales')
 
         def __init__(self, version_major=0, version_minor=9, server_properties=None, mechanisms='PLAIN', locales='en_US'):
             self.version_major = version_major
@@ -110,6 +113,7 @@ class Connection(amqp_object.Class):
 
         INDEX = 0x000A000B  # 10, 11; 655371
         NAME = 'Connection.StartOk'
+        __slots__ = ('client_properties', 'mechanism', 'response', 'locale')
 
         def __init__(self, client_properties=None, mechanism='PLAIN', response=None, locale='en_US'):
             self.client_properties = client_properties
@@ -123,14 +127,7 @@ class Connection(amqp_object.Class):
 
         def decode(self, encoded, offset=0):
             (self.client_properties, offset) = data.decode_table(encoded, offset)
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.mechanism = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.mechanism = str(self.mechanism)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.mechanism, offset = data.decode_shortstr(encoded, offset)
             length = struct.unpack_from('>I', encoded, offset)[0]
             offset += 4
             self.response = encoded[offset:offset + length].decode('utf8')
@@ -139,14 +136,7 @@ class Connection(amqp_object.Class):
             except UnicodeEncodeError:
                 pass
             offset += length
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.locale = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.locale = str(self.locale)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.locale, offset = data.decode_shortstr(encoded, offset)
             return self
 
         def encode(self):
@@ -173,6 +163,7 @@ class Connection(amqp_object.Class):
 
         INDEX = 0x000A0014  # 10, 20; 655380
         NAME = 'Connection.Secure'
+        __slots__ = ('challenge',)
 
         def __init__(self, challenge=None):
             self.challenge = challenge
@@ -205,6 +196,7 @@ class Connection(amqp_object.Class):
 
         INDEX = 0x000A0015  # 10, 21; 655381
         NAME = 'Connection.SecureOk'
+        __slots__ = ('response',)
 
         def __init__(self, response=None):
             self.response = response
@@ -237,6 +229,7 @@ class Connection(amqp_object.Class):
 
         INDEX = 0x000A001E  # 10, 30; 655390
         NAME = 'Connection.Tune'
+        __slots__ = ('channel_max', 'frame_max', 'heartbeat')
 
         def __init__(self, channel_max=0, frame_max=0, heartbeat=0):
             self.channel_max = channel_max
@@ -267,6 +260,7 @@ class Connection(amqp_object.Class):
 
         INDEX = 0x000A001F  # 10, 31; 655391
         NAME = 'Connection.TuneOk'
+        __slots__ = ('channel_max', 'frame_max', 'heartbeat')
 
         def __init__(self, channel_max=0, frame_max=0, heartbeat=0):
             self.channel_max = channel_max
@@ -297,6 +291,7 @@ class Connection(amqp_object.Class):
 
         INDEX = 0x000A0028  # 10, 40; 655400
         NAME = 'Connection.Open'
+        __slots__ = ('virtual_host', 'capabilities', 'insist')
 
         def __init__(self, virtual_host='/', capabilities='', insist=False):
             self.virtual_host = virtual_host
@@ -308,22 +303,8 @@ class Connection(amqp_object.Class):
             return True
 
         def decode(self, encoded, offset=0):
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.virtual_host = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.virtual_host = str(self.virtual_host)
-            except UnicodeEncodeError:
-                pass
-            offset += length
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.capabilities = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.capabilities = str(self.capabilities)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.virtual_host, offset = data.decode_shortstr(encoded, offset)
+            self.capabilities, offset = data.decode_shortstr(encoded, offset)
             bit_buffer = struct.unpack_from('B', encoded, offset)[0]
             offset += 1
             self.insist = (bit_buffer & (1 << 0)) != 0
@@ -351,6 +332,7 @@ class Connection(amqp_object.Class):
 
         INDEX = 0x000A0029  # 10, 41; 655401
         NAME = 'Connection.OpenOk'
+        __slots__ = ('known_hosts',)
 
         def __init__(self, known_hosts=''):
             self.known_hosts = known_hosts
@@ -360,14 +342,7 @@ class Connection(amqp_object.Class):
             return False
 
         def decode(self, encoded, offset=0):
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.known_hosts = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.known_hosts = str(self.known_hosts)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.known_hosts, offset = data.decode_shortstr(encoded, offset)
             return self
 
         def encode(self):
@@ -383,6 +358,7 @@ class Connection(amqp_object.Class):
 
         INDEX = 0x000A0032  # 10, 50; 655410
         NAME = 'Connection.Close'
+        __slots__ = ('reply_code', 'reply_text', 'class_id', 'method_id')
 
         def __init__(self, reply_code=None, reply_text='', class_id=None, method_id=None):
             self.reply_code = reply_code
@@ -397,14 +373,7 @@ class Connection(amqp_object.Class):
         def decode(self, encoded, offset=0):
             self.reply_code = struct.unpack_from('>H', encoded, offset)[0]
             offset += 2
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.reply_text = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.reply_text = str(self.reply_text)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.reply_text, offset = data.decode_shortstr(encoded, offset)
             self.class_id = struct.unpack_from('>H', encoded, offset)[0]
             offset += 2
             self.method_id = struct.unpack_from('>H', encoded, offset)[0]
@@ -427,6 +396,7 @@ class Connection(amqp_object.Class):
 
         INDEX = 0x000A0033  # 10, 51; 655411
         NAME = 'Connection.CloseOk'
+        __slots__ = ()
 
         def __init__(self):
             pass
@@ -452,6 +422,7 @@ class Channel(amqp_object.Class):
 
         INDEX = 0x0014000A  # 20, 10; 1310730
         NAME = 'Channel.Open'
+        __slots__ = ('out_of_band',)
 
         def __init__(self, out_of_band=''):
             self.out_of_band = out_of_band
@@ -461,14 +432,7 @@ class Channel(amqp_object.Class):
             return True
 
         def decode(self, encoded, offset=0):
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.out_of_band = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.out_of_band = str(self.out_of_band)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.out_of_band, offset = data.decode_shortstr(encoded, offset)
             return self
 
         def encode(self):
@@ -484,6 +448,7 @@ class Channel(amqp_object.Class):
 
         INDEX = 0x0014000B  # 20, 11; 1310731
         NAME = 'Channel.OpenOk'
+        __slots__ = ('channel_id',)
 
         def __init__(self, channel_id=''):
             self.channel_id = channel_id
@@ -516,6 +481,7 @@ class Channel(amqp_object.Class):
 
         INDEX = 0x00140014  # 20, 20; 1310740
         NAME = 'Channel.Flow'
+        __slots__ = ('active',)
 
         def __init__(self, active=None):
             self.active = active
@@ -542,6 +508,7 @@ class Channel(amqp_object.Class):
 
         INDEX = 0x00140015  # 20, 21; 1310741
         NAME = 'Channel.FlowOk'
+        __slots__ = ('active',)
 
         def __init__(self, active=None):
             self.active = active
@@ -568,6 +535,7 @@ class Channel(amqp_object.Class):
 
         INDEX = 0x00140028  # 20, 40; 1310760
         NAME = 'Channel.Close'
+        __slots__ = ('reply_code', 'reply_text', 'class_id', 'method_id')
 
         def __init__(self, reply_code=None, reply_text='', class_id=None, method_id=None):
             self.reply_code = reply_code
@@ -582,14 +550,7 @@ class Channel(amqp_object.Class):
         def decode(self, encoded, offset=0):
             self.reply_code = struct.unpack_from('>H', encoded, offset)[0]
             offset += 2
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.reply_text = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.reply_text = str(self.reply_text)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.reply_text, offset = data.decode_shortstr(encoded, offset)
             self.class_id = struct.unpack_from('>H', encoded, offset)[0]
             offset += 2
             self.method_id = struct.unpack_from('>H', encoded, offset)[0]
@@ -612,6 +573,7 @@ class Channel(amqp_object.Class):
 
         INDEX = 0x00140029  # 20, 41; 1310761
         NAME = 'Channel.CloseOk'
+        __slots__ = ()
 
         def __init__(self):
             pass
@@ -637,6 +599,7 @@ class Access(amqp_object.Class):
 
         INDEX = 0x001E000A  # 30, 10; 1966090
         NAME = 'Access.Request'
+        __slots__ = ('realm', 'exclusive', 'passive', 'active', 'write', 'read')
 
         def __init__(self, realm='/data', exclusive=False, passive=True, active=True, write=True, read=True):
             self.realm = realm
@@ -651,14 +614,7 @@ class Access(amqp_object.Class):
             return True
 
         def decode(self, encoded, offset=0):
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.realm = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.realm = str(self.realm)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.realm, offset = data.decode_shortstr(encoded, offset)
             bit_buffer = struct.unpack_from('B', encoded, offset)[0]
             offset += 1
             self.exclusive = (bit_buffer & (1 << 0)) != 0
@@ -693,6 +649,7 @@ class Access(amqp_object.Class):
 
         INDEX = 0x001E000B  # 30, 11; 1966091
         NAME = 'Access.RequestOk'
+        __slots__ = ('ticket',)
 
         def __init__(self, ticket=1):
             self.ticket = ticket
@@ -721,6 +678,7 @@ class Exchange(amqp_object.Class):
 
         INDEX = 0x0028000A  # 40, 10; 2621450
         NAME = 'Exchange.Declare'
+        __slots__ = ('ticket', 'exchange', 'type', 'passive', 'durable', 'auto_delete', 'internal', 'nowait', 'arguments')
 
         def __init__(self, ticket=0, exchange=None, type='direct', passive=False, durable=False, auto_delete=False, internal=False, nowait=False, arguments={}):
             self.ticket = ticket
@@ -740,22 +698,8 @@ class Exchange(amqp_object.Class):
         def decode(self, encoded, offset=0):
             self.ticket = struct.unpack_from('>H', encoded, offset)[0]
             offset += 2
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.exchange = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.exchange = str(self.exchange)
-            except UnicodeEncodeError:
-                pass
-            offset += length
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.type = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.type = str(self.type)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.exchange, offset = data.decode_shortstr(encoded, offset)
+            self.type, offset = data.decode_shortstr(encoded, offset)
             bit_buffer = struct.unpack_from('B', encoded, offset)[0]
             offset += 1
             self.passive = (bit_buffer & (1 << 0)) != 0
@@ -798,6 +742,7 @@ class Exchange(amqp_object.Class):
 
         INDEX = 0x0028000B  # 40, 11; 2621451
         NAME = 'Exchange.DeclareOk'
+        __slots__ = ()
 
         def __init__(self):
             pass
@@ -817,6 +762,7 @@ class Exchange(amqp_object.Class):
 
         INDEX = 0x00280014  # 40, 20; 2621460
         NAME = 'Exchange.Delete'
+        __slots__ = ('ticket', 'exchange', 'if_unused', 'nowait')
 
         def __init__(self, ticket=0, exchange=None, if_unused=False, nowait=False):
             self.ticket = ticket
@@ -831,14 +777,7 @@ class Exchange(amqp_object.Class):
         def decode(self, encoded, offset=0):
             self.ticket = struct.unpack_from('>H', encoded, offset)[0]
             offset += 2
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.exchange = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.exchange = str(self.exchange)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.exchange, offset = data.decode_shortstr(encoded, offset)
             bit_buffer = struct.unpack_from('B', encoded, offset)[0]
             offset += 1
             self.if_unused = (bit_buffer & (1 << 0)) != 0
@@ -865,6 +804,7 @@ class Exchange(amqp_object.Class):
 
         INDEX = 0x00280015  # 40, 21; 2621461
         NAME = 'Exchange.DeleteOk'
+        __slots__ = ()
 
         def __init__(self):
             pass
@@ -884,6 +824,7 @@ class Exchange(amqp_object.Class):
 
         INDEX = 0x0028001E  # 40, 30; 2621470
         NAME = 'Exchange.Bind'
+        __slots__ = ('ticket', 'destination', 'source', 'routing_key', 'nowait', 'arguments')
 
         def __init__(self, ticket=0, destination=None, source=None, routing_key='', nowait=False, arguments={}):
             self.ticket = ticket
@@ -900,30 +841,9 @@ class Exchange(amqp_object.Class):
         def decode(self, encoded, offset=0):
             self.ticket = struct.unpack_from('>H', encoded, offset)[0]
             offset += 2
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.destination = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.destination = str(self.destination)
-            except UnicodeEncodeError:
-                pass
-            offset += length
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.source = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.source = str(self.source)
-            except UnicodeEncodeError:
-                pass
-            offset += length
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.routing_key = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.routing_key = str(self.routing_key)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.destination, offset = data.decode_shortstr(encoded, offset)
+            self.source, offset = data.decode_shortstr(encoded, offset)
+            self.routing_key, offset = data.decode_shortstr(encoded, offset)
             bit_buffer = struct.unpack_from('B', encoded, offset)[0]
             offset += 1
             self.nowait = (bit_buffer & (1 << 0)) != 0
@@ -959,6 +879,7 @@ class Exchange(amqp_object.Class):
 
         INDEX = 0x0028001F  # 40, 31; 2621471
         NAME = 'Exchange.BindOk'
+        __slots__ = ()
 
         def __init__(self):
             pass
@@ -978,6 +899,7 @@ class Exchange(amqp_object.Class):
 
         INDEX = 0x00280028  # 40, 40; 2621480
         NAME = 'Exchange.Unbind'
+        __slots__ = ('ticket', 'destination', 'source', 'routing_key', 'nowait', 'arguments')
 
         def __init__(self, ticket=0, destination=None, source=None, routing_key='', nowait=False, arguments={}):
             self.ticket = ticket
@@ -994,30 +916,9 @@ class Exchange(amqp_object.Class):
         def decode(self, encoded, offset=0):
             self.ticket = struct.unpack_from('>H', encoded, offset)[0]
             offset += 2
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.destination = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.destination = str(self.destination)
-            except UnicodeEncodeError:
-                pass
-            offset += length
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.source = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.source = str(self.source)
-            except UnicodeEncodeError:
-                pass
-            offset += length
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.routing_key = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.routing_key = str(self.routing_key)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.destination, offset = data.decode_shortstr(encoded, offset)
+            self.source, offset = data.decode_shortstr(encoded, offset)
+            self.routing_key, offset = data.decode_shortstr(encoded, offset)
             bit_buffer = struct.unpack_from('B', encoded, offset)[0]
             offset += 1
             self.nowait = (bit_buffer & (1 << 0)) != 0
@@ -1053,6 +954,7 @@ class Exchange(amqp_object.Class):
 
         INDEX = 0x00280033  # 40, 51; 2621491
         NAME = 'Exchange.UnbindOk'
+        __slots__ = ()
 
         def __init__(self):
             pass
@@ -1078,6 +980,7 @@ class Queue(amqp_object.Class):
 
         INDEX = 0x0032000A  # 50, 10; 3276810
         NAME = 'Queue.Declare'
+        __slots__ = ('ticket', 'queue', 'passive', 'durable', 'exclusive', 'auto_delete', 'nowait', 'arguments')
 
         def __init__(self, ticket=0, queue='', passive=False, durable=False, exclusive=False, auto_delete=False, nowait=False, arguments={}):
             self.ticket = ticket
@@ -1096,14 +999,7 @@ class Queue(amqp_object.Class):
         def decode(self, encoded, offset=0):
             self.ticket = struct.unpack_from('>H', encoded, offset)[0]
             offset += 2
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.queue = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.queue = str(self.queue)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.queue, offset = data.decode_shortstr(encoded, offset)
             bit_buffer = struct.unpack_from('B', encoded, offset)[0]
             offset += 1
             self.passive = (bit_buffer & (1 << 0)) != 0
@@ -1141,6 +1037,7 @@ class Queue(amqp_object.Class):
 
         INDEX = 0x0032000B  # 50, 11; 3276811
         NAME = 'Queue.DeclareOk'
+        __slots__ = ('queue', 'message_count', 'consumer_count')
 
         def __init__(self, queue=None, message_count=None, consumer_count=None):
             self.queue = queue
@@ -1152,14 +1049,7 @@ class Queue(amqp_object.Class):
             return False
 
         def decode(self, encoded, offset=0):
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.queue = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.queue = str(self.queue)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.queue, offset = data.decode_shortstr(encoded, offset)
             self.message_count = struct.unpack_from('>I', encoded, offset)[0]
             offset += 4
             self.consumer_count = struct.unpack_from('>I', encoded, offset)[0]
@@ -1181,6 +1071,7 @@ class Queue(amqp_object.Class):
 
         INDEX = 0x00320014  # 50, 20; 3276820
         NAME = 'Queue.Bind'
+        __slots__ = ('ticket', 'queue', 'exchange', 'routing_key', 'nowait', 'arguments')
 
         def __init__(self, ticket=0, queue='', exchange=None, routing_key='', nowait=False, arguments={}):
             self.ticket = ticket
@@ -1197,30 +1088,9 @@ class Queue(amqp_object.Class):
         def decode(self, encoded, offset=0):
             self.ticket = struct.unpack_from('>H', encoded, offset)[0]
             offset += 2
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.queue = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.queue = str(self.queue)
-            except UnicodeEncodeError:
-                pass
-            offset += length
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.exchange = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.exchange = str(self.exchange)
-            except UnicodeEncodeError:
-                pass
-            offset += length
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.routing_key = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.routing_key = str(self.routing_key)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.queue, offset = data.decode_shortstr(encoded, offset)
+            self.exchange, offset = data.decode_shortstr(encoded, offset)
+            self.routing_key, offset = data.decode_shortstr(encoded, offset)
             bit_buffer = struct.unpack_from('B', encoded, offset)[0]
             offset += 1
             self.nowait = (bit_buffer & (1 << 0)) != 0
@@ -1256,6 +1126,7 @@ class Queue(amqp_object.Class):
 
         INDEX = 0x00320015  # 50, 21; 3276821
         NAME = 'Queue.BindOk'
+        __slots__ = ()
 
         def __init__(self):
             pass
@@ -1275,6 +1146,7 @@ class Queue(amqp_object.Class):
 
         INDEX = 0x0032001E  # 50, 30; 3276830
         NAME = 'Queue.Purge'
+        __slots__ = ('ticket', 'queue', 'nowait')
 
         def __init__(self, ticket=0, queue='', nowait=False):
             self.ticket = ticket
@@ -1288,14 +1160,7 @@ class Queue(amqp_object.Class):
         def decode(self, encoded, offset=0):
             self.ticket = struct.unpack_from('>H', encoded, offset)[0]
             offset += 2
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.queue = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.queue = str(self.queue)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.queue, offset = data.decode_shortstr(encoded, offset)
             bit_buffer = struct.unpack_from('B', encoded, offset)[0]
             offset += 1
             self.nowait = (bit_buffer & (1 << 0)) != 0
@@ -1319,6 +1184,7 @@ class Queue(amqp_object.Class):
 
         INDEX = 0x0032001F  # 50, 31; 3276831
         NAME = 'Queue.PurgeOk'
+        __slots__ = ('message_count',)
 
         def __init__(self, message_count=None):
             self.message_count = message_count
@@ -1341,6 +1207,7 @@ class Queue(amqp_object.Class):
 
         INDEX = 0x00320028  # 50, 40; 3276840
         NAME = 'Queue.Delete'
+        __slots__ = ('ticket', 'queue', 'if_unused', 'if_empty', 'nowait')
 
         def __init__(self, ticket=0, queue='', if_unused=False, if_empty=False, nowait=False):
             self.ticket = ticket
@@ -1356,14 +1223,7 @@ class Queue(amqp_object.Class):
         def decode(self, encoded, offset=0):
             self.ticket = struct.unpack_from('>H', encoded, offset)[0]
             offset += 2
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.queue = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.queue = str(self.queue)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.queue, offset = data.decode_shortstr(encoded, offset)
             bit_buffer = struct.unpack_from('B', encoded, offset)[0]
             offset += 1
             self.if_unused = (bit_buffer & (1 << 0)) != 0
@@ -1393,6 +1253,7 @@ class Queue(amqp_object.Class):
 
         INDEX = 0x00320029  # 50, 41; 3276841
         NAME = 'Queue.DeleteOk'
+        __slots__ = ('message_count',)
 
         def __init__(self, message_count=None):
             self.message_count = message_count
@@ -1415,6 +1276,7 @@ class Queue(amqp_object.Class):
 
         INDEX = 0x00320032  # 50, 50; 3276850
         NAME = 'Queue.Unbind'
+        __slots__ = ('ticket', 'queue', 'exchange', 'routing_key', 'arguments')
 
         def __init__(self, ticket=0, queue='', exchange=None, routing_key='', arguments={}):
             self.ticket = ticket
@@ -1430,30 +1292,9 @@ class Queue(amqp_object.Class):
         def decode(self, encoded, offset=0):
             self.ticket = struct.unpack_from('>H', encoded, offset)[0]
             offset += 2
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.queue = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.queue = str(self.queue)
-            except UnicodeEncodeError:
-                pass
-            offset += length
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.exchange = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.exchange = str(self.exchange)
-            except UnicodeEncodeError:
-                pass
-            offset += length
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.routing_key = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.routing_key = str(self.routing_key)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.queue, offset = data.decode_shortstr(encoded, offset)
+            self.exchange, offset = data.decode_shortstr(encoded, offset)
+            self.routing_key, offset = data.decode_shortstr(encoded, offset)
             (self.arguments, offset) = data.decode_table(encoded, offset)
             return self
 
@@ -1482,6 +1323,7 @@ class Queue(amqp_object.Class):
 
         INDEX = 0x00320033  # 50, 51; 3276851
         NAME = 'Queue.UnbindOk'
+        __slots__ = ()
 
         def __init__(self):
             pass
@@ -1507,6 +1349,7 @@ class Basic(amqp_object.Class):
 
         INDEX = 0x003C000A  # 60, 10; 3932170
         NAME = 'Basic.Qos'
+        __slots__ = ('prefetch_size', 'prefetch_count', 'global_')
 
         def __init__(self, prefetch_size=0, prefetch_count=0, global_=False):
             self.prefetch_size = prefetch_size
@@ -1541,6 +1384,7 @@ class Basic(amqp_object.Class):
 
         INDEX = 0x003C000B  # 60, 11; 3932171
         NAME = 'Basic.QosOk'
+        __slots__ = ()
 
         def __init__(self):
             pass
@@ -1560,6 +1404,7 @@ class Basic(amqp_object.Class):
 
         INDEX = 0x003C0014  # 60, 20; 3932180
         NAME = 'Basic.Consume'
+        __slots__ = ('ticket', 'queue', 'consumer_tag', 'no_local', 'no_ack', 'exclusive', 'nowait', 'arguments')
 
         def __init__(self, ticket=0, queue='', consumer_tag='', no_local=False, no_ack=False, exclusive=False, nowait=False, arguments={}):
             self.ticket = ticket
@@ -1578,22 +1423,8 @@ class Basic(amqp_object.Class):
         def decode(self, encoded, offset=0):
             self.ticket = struct.unpack_from('>H', encoded, offset)[0]
             offset += 2
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.queue = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.queue = str(self.queue)
-            except UnicodeEncodeError:
-                pass
-            offset += length
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.consumer_tag = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.consumer_tag = str(self.consumer_tag)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.queue, offset = data.decode_shortstr(encoded, offset)
+            self.consumer_tag, offset = data.decode_shortstr(encoded, offset)
             bit_buffer = struct.unpack_from('B', encoded, offset)[0]
             offset += 1
             self.no_local = (bit_buffer & (1 << 0)) != 0
@@ -1633,6 +1464,7 @@ class Basic(amqp_object.Class):
 
         INDEX = 0x003C0015  # 60, 21; 3932181
         NAME = 'Basic.ConsumeOk'
+        __slots__ = ('consumer_tag',)
 
         def __init__(self, consumer_tag=None):
             self.consumer_tag = consumer_tag
@@ -1642,14 +1474,7 @@ class Basic(amqp_object.Class):
             return False
 
         def decode(self, encoded, offset=0):
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.consumer_tag = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.consumer_tag = str(self.consumer_tag)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.consumer_tag, offset = data.decode_shortstr(encoded, offset)
             return self
 
         def encode(self):
@@ -1665,6 +1490,7 @@ class Basic(amqp_object.Class):
 
         INDEX = 0x003C001E  # 60, 30; 3932190
         NAME = 'Basic.Cancel'
+        __slots__ = ('consumer_tag', 'nowait')
 
         def __init__(self, consumer_tag=None, nowait=False):
             self.consumer_tag = consumer_tag
@@ -1675,14 +1501,7 @@ class Basic(amqp_object.Class):
             return True
 
         def decode(self, encoded, offset=0):
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.consumer_tag = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.consumer_tag = str(self.consumer_tag)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.consumer_tag, offset = data.decode_shortstr(encoded, offset)
             bit_buffer = struct.unpack_from('B', encoded, offset)[0]
             offset += 1
             self.nowait = (bit_buffer & (1 << 0)) != 0
@@ -1705,6 +1524,7 @@ class Basic(amqp_object.Class):
 
         INDEX = 0x003C001F  # 60, 31; 3932191
         NAME = 'Basic.CancelOk'
+        __slots__ = ('consumer_tag',)
 
         def __init__(self, consumer_tag=None):
             self.consumer_tag = consumer_tag
@@ -1714,14 +1534,7 @@ class Basic(amqp_object.Class):
             return False
 
         def decode(self, encoded, offset=0):
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.consumer_tag = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.consumer_tag = str(self.consumer_tag)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.consumer_tag, offset = data.decode_shortstr(encoded, offset)
             return self
 
         def encode(self):
@@ -1737,6 +1550,7 @@ class Basic(amqp_object.Class):
 
         INDEX = 0x003C0028  # 60, 40; 3932200
         NAME = 'Basic.Publish'
+        __slots__ = ('ticket', 'exchange', 'routing_key', 'mandatory', 'immediate')
 
         def __init__(self, ticket=0, exchange='', routing_key='', mandatory=False, immediate=False):
             self.ticket = ticket
@@ -1752,22 +1566,8 @@ class Basic(amqp_object.Class):
         def decode(self, encoded, offset=0):
             self.ticket = struct.unpack_from('>H', encoded, offset)[0]
             offset += 2
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.exchange = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.exchange = str(self.exchange)
-            except UnicodeEncodeError:
-                pass
-            offset += length
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.routing_key = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.routing_key = str(self.routing_key)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.exchange, offset = data.decode_shortstr(encoded, offset)
+            self.routing_key, offset = data.decode_shortstr(encoded, offset)
             bit_buffer = struct.unpack_from('B', encoded, offset)[0]
             offset += 1
             self.mandatory = (bit_buffer & (1 << 0)) != 0
@@ -1799,6 +1599,7 @@ class Basic(amqp_object.Class):
 
         INDEX = 0x003C0032  # 60, 50; 3932210
         NAME = 'Basic.Return'
+        __slots__ = ('reply_code', 'reply_text', 'exchange', 'routing_key')
 
         def __init__(self, reply_code=None, reply_text='', exchange=None, routing_key=None):
             self.reply_code = reply_code
@@ -1813,30 +1614,9 @@ class Basic(amqp_object.Class):
         def decode(self, encoded, offset=0):
             self.reply_code = struct.unpack_from('>H', encoded, offset)[0]
             offset += 2
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.reply_text = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.reply_text = str(self.reply_text)
-            except UnicodeEncodeError:
-                pass
-            offset += length
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.exchange = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.exchange = str(self.exchange)
-            except UnicodeEncodeError:
-                pass
-            offset += length
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.routing_key = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.routing_key = str(self.routing_key)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.reply_text, offset = data.decode_shortstr(encoded, offset)
+            self.exchange, offset = data.decode_shortstr(encoded, offset)
+            self.routing_key, offset = data.decode_shortstr(encoded, offset)
             return self
 
         def encode(self):
@@ -1863,6 +1643,7 @@ class Basic(amqp_object.Class):
 
         INDEX = 0x003C003C  # 60, 60; 3932220
         NAME = 'Basic.Deliver'
+        __slots__ = ('consumer_tag', 'delivery_tag', 'redelivered', 'exchange', 'routing_key')
 
         def __init__(self, consumer_tag=None, delivery_tag=None, redelivered=False, exchange=None, routing_key=None):
             self.consumer_tag = consumer_tag
@@ -1875,36 +1656,26 @@ class Basic(amqp_object.Class):
         def synchronous(self):
             return False
 
+        @classmethod
+        def from_bytes(cls, encoded, offset=0):
+            self = cls.__new__(cls)
+            self.consumer_tag, offset = data.decode_shortstr(encoded, offset)
+            self.delivery_tag, bit_buffer = \
+                _LONGLONG_OCTET.unpack_from(encoded, offset)
+            self.redelivered = (bit_buffer & 1) != 0
+            self.exchange, offset = data.decode_shortstr(encoded, offset + 9)
+            self.routing_key, offset = data.decode_shortstr(encoded, offset)
+            return self
+
         def decode(self, encoded, offset=0):
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.consumer_tag = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.consumer_tag = str(self.consumer_tag)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.consumer_tag, offset = data.decode_shortstr(encoded, offset)
             self.delivery_tag = struct.unpack_from('>Q', encoded, offset)[0]
             offset += 8
             bit_buffer = struct.unpack_from('B', encoded, offset)[0]
             offset += 1
             self.redelivered = (bit_buffer & (1 << 0)) != 0
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.exchange = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.exchange = str(self.exchange)
-            except UnicodeEncodeError:
-                pass
-            offset += length
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.routing_key = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.routing_key = str(self.routing_key)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.exchange, offset = data.decode_shortstr(encoded, offset)
+            self.routing_key, offset = data.decode_shortstr(encoded, offset)
             return self
 
         def encode(self):
@@ -1935,6 +1706,7 @@ class Basic(amqp_object.Class):
 
         INDEX = 0x003C0046  # 60, 70; 3932230
         NAME = 'Basic.Get'
+        __slots__ = ('ticket', 'queue', 'no_ack')
 
         def __init__(self, ticket=0, queue='', no_ack=False):
             self.ticket = ticket
@@ -1948,14 +1720,7 @@ class Basic(amqp_object.Class):
         def decode(self, encoded, offset=0):
             self.ticket = struct.unpack_from('>H', encoded, offset)[0]
             offset += 2
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.queue = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.queue = str(self.queue)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.queue, offset = data.decode_shortstr(encoded, offset)
             bit_buffer = struct.unpack_from('B', encoded, offset)[0]
             offset += 1
             self.no_ack = (bit_buffer & (1 << 0)) != 0
@@ -1979,6 +1744,7 @@ class Basic(amqp_object.Class):
 
         INDEX = 0x003C0047  # 60, 71; 3932231
         NAME = 'Basic.GetOk'
+        __slots__ = ('delivery_tag', 'redelivered', 'exchange', 'routing_key', 'message_count')
 
         def __init__(self, delivery_tag=None, redelivered=False, exchange=None, routing_key=None, message_count=None):
             self.delivery_tag = delivery_tag
@@ -1997,22 +1763,8 @@ class Basic(amqp_object.Class):
             bit_buffer = struct.unpack_from('B', encoded, offset)[0]
             offset += 1
             self.redelivered = (bit_buffer & (1 << 0)) != 0
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.exchange = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.exchange = str(self.exchange)
-            except UnicodeEncodeError:
-                pass
-            offset += length
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.routing_key = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.routing_key = str(self.routing_key)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.exchange, offset = data.decode_shortstr(encoded, offset)
+            self.routing_key, offset = data.decode_shortstr(encoded, offset)
             self.message_count = struct.unpack_from('>I', encoded, offset)[0]
             offset += 4
             return self
@@ -2041,6 +1793,7 @@ class Basic(amqp_object.Class):
 
         INDEX = 0x003C0048  # 60, 72; 3932232
         NAME = 'Basic.GetEmpty'
+        __slots__ = ('cluster_id',)
 
         def __init__(self, cluster_id=''):
             self.cluster_id = cluster_id
@@ -2050,14 +1803,7 @@ class Basic(amqp_object.Class):
             return False
 
         def decode(self, encoded, offset=0):
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.cluster_id = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.cluster_id = str(self.cluster_id)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.cluster_id, offset = data.decode_shortstr(encoded, offset)
             return self
 
         def encode(self):
@@ -2073,6 +1819,7 @@ class Basic(amqp_object.Class):
 
         INDEX = 0x003C0050  # 60, 80; 3932240
         NAME = 'Basic.Ack'
+        __slots__ = ('delivery_tag', 'multiple')
 
         def __init__(self, delivery_tag=0, multiple=False):
             self.delivery_tag = delivery_tag
@@ -2082,6 +1829,14 @@ class Basic(amqp_object.Class):
         def synchronous(self):
             return False
 
+        @classmethod
+        def from_bytes(cls, encoded, offset=0):
+            self = cls.__new__(cls)
+            self.delivery_tag, bit_buffer = \
+                _LONGLONG_OCTET.unpack_from(encoded, offset)
+            self.multiple = (bit_buffer & 1) != 0
+            return self
+
         def decode(self, encoded, offset=0):
             self.delivery_tag = struct.unpack_from('>Q', encoded, offset)[0]
             offset += 8
@@ -2103,6 +1858,7 @@ class Basic(amqp_object.Class):
 
         INDEX = 0x003C005A  # 60, 90; 3932250
         NAME = 'Basic.Reject'
+        __slots__ = ('delivery_tag', 'requeue')
 
         def __init__(self, delivery_tag=None, requeue=True):
             self.delivery_tag = delivery_tag
@@ -2133,6 +1889,7 @@ class Basic(amqp_object.Class):
 
         INDEX = 0x003C0064  # 60, 100; 3932260
         NAME = 'Basic.RecoverAsync'
+        __slots__ = ('requeue',)
 
         def __init__(self, requeue=False):
             self.requeue = requeue
@@ -2159,6 +1916,7 @@ class Basic(amqp_object.Class):
 
         INDEX = 0x003C006E  # 60, 110; 3932270
         NAME = 'Basic.Recover'
+        __slots__ = ('requeue',)
 
         def __init__(self, requeue=False):
             self.requeue = requeue
@@ -2185,6 +1943,7 @@ class Basic(amqp_object.Class):
 
         INDEX = 0x003C006F  # 60, 111; 3932271
         NAME = 'Basic.RecoverOk'
+        __slots__ = ()
 
         def __init__(self):
             pass
@@ -2204,6 +1963,7 @@ class Basic(amqp_object.Class):
 
         INDEX = 0x003C0078  # 60, 120; 3932280
         NAME = 'Basic.Nack'
+        __slots__ = ('delivery_tag', 'multiple', 'requeue')
 
         def __init__(self, delivery_tag=0, multiple=False, requeue=True):
             self.delivery_tag = delivery_tag
@@ -2244,6 +2004,7 @@ class Tx(amqp_object.Class):
 
         INDEX = 0x005A000A  # 90, 10; 5898250
         NAME = 'Tx.Select'
+        __slots__ = ()
 
         def __init__(self):
             pass
@@ -2263,6 +2024,7 @@ class Tx(amqp_object.Class):
 
         INDEX = 0x005A000B  # 90, 11; 5898251
         NAME = 'Tx.SelectOk'
+        __slots__ = ()
 
         def __init__(self):
             pass
@@ -2282,6 +2044,7 @@ class Tx(amqp_object.Class):
 
         INDEX = 0x005A0014  # 90, 20; 5898260
         NAME = 'Tx.Commit'
+        __slots__ = ()
 
         def __init__(self):
             pass
@@ -2301,6 +2064,7 @@ class Tx(amqp_object.Class):
 
         INDEX = 0x005A0015  # 90, 21; 5898261
         NAME = 'Tx.CommitOk'
+        __slots__ = ()
 
         def __init__(self):
             pass
@@ -2320,6 +2084,7 @@ class Tx(amqp_object.Class):
 
         INDEX = 0x005A001E  # 90, 30; 5898270
         NAME = 'Tx.Rollback'
+        __slots__ = ()
 
         def __init__(self):
             pass
@@ -2339,6 +2104,7 @@ class Tx(amqp_object.Class):
 
         INDEX = 0x005A001F  # 90, 31; 5898271
         NAME = 'Tx.RollbackOk'
+        __slots__ = ()
 
         def __init__(self):
             pass
@@ -2364,6 +2130,7 @@ class Confirm(amqp_object.Class):
 
         INDEX = 0x0055000A  # 85, 10; 5570570
         NAME = 'Confirm.Select'
+        __slots__ = ('nowait',)
 
         def __init__(self, nowait=False):
             self.nowait = nowait
@@ -2390,6 +2157,7 @@ class Confirm(amqp_object.Class):
 
         INDEX = 0x0055000B  # 85, 11; 5570571
         NAME = 'Confirm.SelectOk'
+        __slots__ = ()
 
         def __init__(self):
             pass
@@ -2411,6 +2179,7 @@ class BasicProperties(amqp_object.Properties):
     CLASS = Basic
     INDEX = 0x003C  # 60
     NAME = 'BasicProperties'
+    __slots__ = ('content_type', 'content_encoding', 'headers', 'delivery_mode', 'priority', 'correlation_id', 'reply_to', 'expiration', 'message_id', 'timestamp', 'type', 'user_id', 'app_id', 'cluster_id')
 
     FLAG_CONTENT_TYPE = (1 << 15)
     FLAG_CONTENT_ENCODING = (1 << 14)
@@ -2454,25 +2223,11 @@ class BasicProperties(amqp_object.Properties):
                 break
             flagword_index += 1
         if flags & BasicProperties.FLAG_CONTENT_TYPE:
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.content_type = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.content_type = str(self.content_type)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.content_type, offset = data.decode_shortstr(encoded, offset)
         else:
             self.content_type = None
         if flags & BasicProperties.FLAG_CONTENT_ENCODING:
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.content_encoding = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.content_encoding = str(self.content_encoding)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.content_encoding, offset = data.decode_shortstr(encoded, offset)
         else:
             self.content_encoding = None
         if flags & BasicProperties.FLAG_HEADERS:
@@ -2501,25 +2256,11 @@ class BasicProperties(amqp_object.Properties):
         else:
             self.correlation_id = None
         if flags & BasicProperties.FLAG_REPLY_TO:
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.reply_to = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.reply_to = str(self.reply_to)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.reply_to, offset = data.decode_shortstr(encoded, offset)
         else:
             self.reply_to = None
         if flags & BasicProperties.FLAG_EXPIRATION:
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.expiration = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.expiration = str(self.expiration)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.expiration, offset = data.decode_shortstr(encoded, offset)
         else:
             self.expiration = None
         if flags & BasicProperties.FLAG_MESSAGE_ID:
@@ -2539,47 +2280,19 @@ class BasicProperties(amqp_object.Properties):
         else:
             self.timestamp = None
         if flags & BasicProperties.FLAG_TYPE:
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.type = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.type = str(self.type)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.type, offset = data.decode_shortstr(encoded, offset)
         else:
             self.type = None
         if flags & BasicProperties.FLAG_USER_ID:
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.user_id = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.user_id = str(self.user_id)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.user_id, offset = data.decode_shortstr(encoded, offset)
         else:
             self.user_id = None
         if flags & BasicProperties.FLAG_APP_ID:
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.app_id = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.app_id = str(self.app_id)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.app_id, offset = data.decode_shortstr(encoded, offset)
         else:
             self.app_id = None
         if flags & BasicProperties.FLAG_CLUSTER_ID:
-            length = struct.unpack_from('B', encoded, offset)[0]
-            offset += 1
-            self.cluster_id = encoded[offset:offset + length].decode('utf8')
-            try:
-                self.cluster_id = str(self.cluster_id)
-            except UnicodeEncodeError:
-                pass
-            offset += length
+            self.cluster_id, offset = data.decode_shortstr(encoded, offset)
         else:
             self.cluster_id = None
         return self
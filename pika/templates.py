@@ -0,0 +1,175 @@
+"""Templates for the BasicProperties of messages that share most of their
+properties, encoding the shared properties once.
+
+"""
+import struct
+
+from pika import data
+from pika import spec
+
+# The BasicProperties fields in the order they are encoded in
+FIELDS = [(name[5:].lower(), getattr(spec.BasicProperties, name))
+          for name in sorted([name for name in dir(spec.BasicProperties)
+                              if name.startswith('FLAG_')],
+                             key=lambda name: -getattr(spec.BasicProperties,
+                                                       name))]
+
+
+def _encode_octet(pieces, value):
+    pieces.append(chr(value))
+
+
+def _encode_shortstr(pieces, value):
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    pieces.append(chr(len(value)))
+    pieces.append(value)
+
+
+def _encode_timestamp(pieces, value):
+    pieces.append(struct.pack('>Q', value))
+
+
+# The encoders of the fields that are not short strings
+ENCODERS = {'delivery_mode': _encode_octet,
+            'headers': data.encode_table,
+            'priority': _encode_octet,
+            'timestamp': _encode_timestamp}
+
+
+class PropertiesTemplate(object):
+    """Encodes the BasicProperties that every message published with the
+    template shares once, so that only the fields that change from message
+    to message are encoded for each message. The properties passed to
+    basic_publish are created by the template:
+
+        template = pika.PropertiesTemplate(
+            pika.BasicProperties(content_type='application/json',
+                                 delivery_mode=2, app_id='orders'))
+        channel.basic_publish('', 'orders', body,
+                              template.properties(message_id=message_id,
+                                                  timestamp=time.time()))
+
+    The shared properties must not be changed once the template is created.
+
+    """
+    # The fields that are set for each message unless told otherwise
+    VARIABLE_FIELDS = ('correlation_id', 'message_id', 'timestamp')
+
+    def __init__(self, properties, variable_fields=VARIABLE_FIELDS):
+        """Create a template for the properties, with the fields named in
+        variable_fields set for each message.
+
+        :param pika.spec.BasicProperties properties: The shared properties
+        :param tuple variable_fields: The fields set for each message
+        :raises: ValueError
+
+        """
+        names = [name for name, flag in FIELDS]
+        for name in variable_fields:
+            if name not in names:
+                raise ValueError('Unknown BasicProperties field %r' % name)
+        self.shared = properties
+        self.variable_fields = tuple([name for name in names
+                                      if name in variable_fields])
+        self._defaults = dict([(name, getattr(properties, name))
+                               for name in self.variable_fields])
+        self._flags = 0
+        self._layout = list()
+        constant = dict()
+        for name, flag in FIELDS:
+            if name in variable_fields:
+                self._layout.append((self._encode_constant(constant), name,
+                                     flag, ENCODERS.get(name,
+                                                        _encode_shortstr)))
+                constant = dict()
+            elif getattr(properties, name) is not None:
+                self._flags |= flag
+                constant[name] = getattr(properties, name)
+        self._tail = self._encode_constant(constant)
+
+    def encode(self, properties):
+        """Return the encoded properties, encoding only the variable fields.
+
+        :param TemplateProperties properties: The properties of a message
+        :rtype: list
+
+        """
+        flags = self._flags
+        pieces = [None]
+        for constant, name, flag, encoder in self._layout:
+            if constant:
+                pieces.append(constant)
+            value = getattr(properties, name)
+            if value is not None:
+                flags |= flag
+                encoder(pieces, value)
+        if self._tail:
+            pieces.append(self._tail)
+        pieces[0] = struct.pack('>H', flags)
+        return pieces
+
+    def properties(self, **values):
+        """Return the properties of a message, with the variable fields set
+        from the keyword arguments and defaulting to the shared properties.
+
+        :rtype: TemplateProperties
+        :raises: ValueError
+
+        """
+        if not self._defaults.viewkeys() >= values.viewkeys():
+            raise ValueError('%r are not variable fields of the template' %
+                             sorted(values.viewkeys() -
+                                    self._defaults.viewkeys()))
+        return TemplateProperties(self, values)
+
+    @staticmethod
+    def _encode_constant(values):
+        """Return the encoded bytes of a run of shared fields.
+
+        :param dict values: The values of the fields
+        :rtype: str
+
+        """
+        if not values:
+            return ''
+        return ''.join(spec.BasicProperties(**values).encode()[1:])
+
+
+class TemplateProperties(spec.BasicProperties):
+    """The BasicProperties of a message created by a PropertiesTemplate.
+    The variable fields are set on the object, the shared fields are read
+    from the template and encoded by it.
+
+    """
+    __slots__ = ('_template',)
+
+    def __init__(self, template, values):
+        """Create the properties of a message, reading the fields that are
+        not in values from the template's shared properties.
+
+        :param PropertiesTemplate template: The template
+        :param dict values: The values of the variable fields
+
+        """
+        for name, value in template._defaults.iteritems():
+            setattr(self, name, values.get(name, value))
+        self._template = template
+
+    def __getattr__(self, name):
+        """Return the value of a shared field from the template.
+
+        :param str name: The field name
+
+        """
+        if name.startswith('__') or name == '_template':
+            raise AttributeError(name)
+        return getattr(self._template.shared, name)
+
+    def encode(self):
+        """Return the encoded properties.
+
+        :rtype: list
+
+        """
+        return self._template.encode(self)
@@ -3,12 +3,15 @@ Tests for pika.callback
 
 """
 import mock
+import pickle
 try:
     import unittest2 as unittest
 except ImportError:
     import unittest
 
 from pika import amqp_object
+from pika import frame
+from pika import spec
 
 
 class AMQPObjectTests(unittest.TestCase):
@@ -21,11 +24,37 @@ class AMQPObjectTests(unittest.TestCase):
         self.assertEqual(repr(obj), '<AMQPObject>')
 
     def test_repr_items(self):
-        obj = amqp_object.AMQPObject()
+        class Unslotted(amqp_object.AMQPObject):
+            pass
+        obj = Unslotted()
         setattr(obj, 'foo', 'bar')
         setattr(obj, 'baz', 'qux')
         self.assertEqual(repr(obj), "<AMQPObject(['foo=bar', 'baz=qux'])>")
 
+    def test_no_dict(self):
+        self.assertFalse(hasattr(amqp_object.AMQPObject(), '__dict__'))
+
+    def test_repr_slots(self):
+        class Slotted(amqp_object.AMQPObject):
+            __slots__ = ('foo', 'baz')
+        obj = Slotted()
+        obj.foo = 'bar'
+        self.assertEqual(repr(obj), "<AMQPObject(['foo=bar'])>")
+        obj.baz = 'qux'
+        self.assertEqual(repr(obj), "<AMQPObject(['foo=bar', 'baz=qux'])>")
+
+    def test_pickle_protocol_0(self):
+        obj = spec.BasicProperties(content_type='x', headers={'a': 1})
+        value = pickle.loads(pickle.dumps(obj, 0))
+        self.assertEqual((value.content_type, value.headers,
+                          value.delivery_mode), ('x', {'a': 1}, None))
+
+    def test_pickle_protocol_2(self):
+        obj = frame.Header(1, 10, spec.BasicProperties(content_type='x'))
+        value = pickle.loads(pickle.dumps(obj, 2))
+        self.assertEqual((value.channel_number, value.body_size,
+                          value.properties.content_type), (1, 10, 'x'))
+
 
 class ClassTests(unittest.TestCase):
 
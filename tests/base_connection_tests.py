@@ -0,0 +1,188 @@
+"""
+Tests for the socket reads and SSL handling of
+pika.adapters.base_connection.BaseConnection
+
+"""
+import errno
+import mock
+import socket
+import ssl
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from pika import connection
+from pika import frame
+from pika import metrics
+from pika.adapters import base_connection
+
+
+class SSLTests(unittest.TestCase):
+
+    def setUp(self):
+        self.obj = base_connection.BaseConnection.__new__(
+            base_connection.BaseConnection)
+        self.obj.params = connection.ConnectionParameters(ssl=True)
+        self.obj.endpoint = ('localhost', 5671)
+        self.obj.socket = mock.Mock()
+        patcher = mock.patch.object(base_connection.BaseConnection,
+                                    'SSL_CONTEXTS', dict())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @unittest.skipUnless(hasattr(ssl, 'SSLContext'), 'No ssl.SSLContext')
+    def test_context_shared_for_same_options(self):
+        context = self.obj._get_ssl_context()
+        other = base_connection.BaseConnection.__new__(
+            base_connection.BaseConnection)
+        other.params = connection.ConnectionParameters(ssl=True)
+        self.assertIs(other._get_ssl_context(), context)
+
+    @unittest.skipUnless(hasattr(ssl, 'SSLContext'), 'No ssl.SSLContext')
+    def test_context_options(self):
+        self.obj.params.ssl_options = {'cert_reqs': ssl.CERT_NONE,
+                                       'ciphers': 'HIGH'}
+        context = self.obj._get_ssl_context()
+        self.assertEqual(context.verify_mode, ssl.CERT_NONE)
+        self.assertEqual(len(self.obj.SSL_CONTEXTS), 1)
+
+    def test_wrap_socket_passes_other_options(self):
+        context = mock.Mock()
+        self.obj._get_ssl_context = mock.Mock(return_value=context)
+        self.obj.params.ssl_options = {'certfile': 'cert.pem',
+                                       'suppress_ragged_eofs': False}
+        sock = mock.Mock()
+        self.obj._wrap_socket(sock)
+        context.wrap_socket.assert_called_once_with(
+            sock, do_handshake_on_connect=True, suppress_ragged_eofs=False)
+
+    def test_read_ssl_drains_pending(self):
+        self.obj.socket.read.side_effect = ['abc', 'de', 'f']
+        self.obj.socket.pending.side_effect = [2, 2, 1, 0]
+        self.assertEqual(self.obj._read_ssl(), 'abcdef')
+
+    def test_read_ssl_single_record(self):
+        self.obj.socket.read.return_value = 'abc'
+        self.obj.socket.pending.return_value = 0
+        self.assertEqual(self.obj._read_ssl(), 'abc')
+        self.assertEqual(self.obj.socket.read.call_count, 1)
+
+
+class ReadTests(unittest.TestCase):
+
+    def setUp(self):
+        self.obj = base_connection.BaseConnection.__new__(
+            base_connection.BaseConnection)
+        self.obj.params = connection.ConnectionParameters()
+        self.obj.NON_BLOCKING_SOCKET = True
+        self.obj._read_size = 4096
+        self.obj._read_buffer = bytearray(8192)
+        self.obj._read_view = memoryview(self.obj._read_buffer)
+        self.obj._frame_buffer = self.obj._read_buffer
+        self.obj._frame_offset = self.obj._frame_end = 0
+        self.obj.socket = mock.Mock()
+        self.reads = list()
+        self.obj.socket.recv_into.side_effect = self._recv_into
+
+    def _recv_into(self, buffer, size):
+        data = self.reads.pop(0)
+        if isinstance(data, Exception):
+            raise data
+        data = data[:size]
+        buffer[:len(data)] = data
+        return len(data)
+
+    def _read(self):
+        return self.obj._read_socket().tobytes()
+
+    def test_partial_read_returns(self):
+        self.reads = ['abc', 'd']
+        self.assertEqual(self._read(), 'abc')
+        self.assertEqual(self.reads, ['d'])
+
+    def test_read_into_frame_buffer(self):
+        self.obj._frame_offset = self.obj._frame_end = 10
+        self.reads = ['abc']
+        self._read()
+        self.assertEqual((self.obj._frame_offset, self.obj._frame_end),
+                         (0, 3))
+        self.assertEqual(self.obj._frame_buffer[:3], 'abc')
+
+    def test_full_read_grows_and_reads_again(self):
+        self.reads = ['a' * 4096, 'b' * 3000]
+        self.assertEqual(self._read(), 'a' * 4096 + 'b' * 3000)
+        self.assertEqual(self.obj._read_size, 8192)
+
+    def test_reads_until_would_block(self):
+        self.reads = ['a' * 4096, socket.error(errno.EAGAIN, 'again')]
+        self.assertEqual(self._read(), 'a' * 4096)
+        self.assertEqual(self.reads, list())
+
+    def test_blocking_socket_read_once(self):
+        self.obj.NON_BLOCKING_SOCKET = False
+        self.reads = ['a' * 4096, 'b']
+        self.assertEqual(self._read(), 'a' * 4096)
+        self.assertEqual(self.reads, ['b'])
+
+    def test_stops_at_read_budget(self):
+        self.obj.READ_BUDGET = 8192
+        self.obj.READ_SIZE_MAX = 4096
+        self.reads = ['a' * 4096, 'b' * 4096, 'c' * 4096]
+        self.assertEqual(len(self._read()), 8192)
+        self.assertEqual(self.reads, ['c' * 4096])
+
+    def test_small_reads_shrink(self):
+        self.obj._read_size = 16384
+        self.reads = ['a']
+        self._read()
+        self.assertEqual(self.obj._read_size, 8192)
+
+    def test_shrink_bounded_by_minimum(self):
+        self.reads = ['a']
+        self._read()
+        self.assertEqual(self.obj._read_size, self.obj.READ_SIZE_MIN)
+
+    def test_first_read_error_raised(self):
+        self.reads = [socket.error(errno.ECONNRESET, 'reset')]
+        self.assertRaises(socket.error, self.obj._read_socket)
+
+    def test_later_read_error_returns_data(self):
+        self.reads = ['a' * 4096, socket.error(errno.ECONNRESET, 'reset')]
+        self.assertEqual(self._read(), 'a' * 4096)
+
+    def test_closed_socket_returns_empty(self):
+        self.reads = ['']
+        self.assertEqual(self._read(), '')
+
+    def test_pending_bytes_moved_to_start(self):
+        self.obj._read_buffer[6000:6003] = 'abc'
+        self.obj._frame_offset, self.obj._frame_end = 6000, 6003
+        self.reads = ['d']
+        self.assertEqual(self._read(), 'd')
+        self.assertEqual(self.obj._frame_buffer[:4], 'abcd')
+        self.assertEqual(len(self.obj._frame_buffer), 8192)
+
+    def test_frame_buffer_grows(self):
+        self.obj._read_buffer[100:8000] = 'a' * 7900
+        self.obj._frame_offset, self.obj._frame_end = 100, 8000
+        self.reads = ['b']
+        self._read()
+        self.assertEqual(len(self.obj._frame_buffer), 16384)
+        self.assertEqual(self.obj._frame_buffer[:7901], 'a' * 7900 + 'b')
+        self.assertIs(self.obj._read_buffer, self.obj._frame_buffer)
+
+    def test_appended_bytes_copied_into_frame_buffer(self):
+        self.obj._append_frame_buffer('abc')
+        self.assertEqual(self.obj._frame_buffer[:self.obj._frame_end], 'abc')
+
+    def test_frames_decoded_from_frame_buffer(self):
+        data = frame.Body(1, 'body').marshal()
+        self.obj._process_frame = mock.Mock()
+        self.obj.metrics = metrics.ConnectionMetrics(self.obj)
+        self.obj.bytes_received = 0
+        self.reads = [data * 2]
+        self.obj._on_data_available(self.obj._read_socket())
+        self.assertEqual([call[0][0].fragment for call in
+                          self.obj._process_frame.call_args_list],
+                         ['body', 'body'])
@@ -0,0 +1,151 @@
+"""
+Tests for pika.capture and the capture of BaseConnection reads and writes
+
+"""
+import mock
+import os
+import shutil
+import tempfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from pika import capture
+from pika import connection
+from pika import exceptions
+from pika import frame
+from pika import spec
+from pika.adapters import base_connection
+
+
+class CaptureTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'capture')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+class CaptureFileTests(CaptureTestCase):
+
+    def _write(self, *records):
+        writer = capture.CaptureWriter(self.path)
+        writer.connected(('localhost', 5672))
+        for kind, value in records:
+            writer.write(kind, value)
+        writer.close()
+
+    def test_records_read_back(self):
+        self._write((capture.WRITTEN, 'AMQP'), (capture.READ, 'abc'))
+        self.assertEqual([(kind, value) for kind, timestamp, value in
+                          capture.read_capture(self.path)],
+                         [(capture.CONNECTED, 'localhost:5672'),
+                          (capture.WRITTEN, 'AMQP'),
+                          (capture.READ, 'abc')])
+
+    def test_appends_to_existing_capture(self):
+        self._write((capture.READ, 'abc'))
+        self._write((capture.READ, 'def'))
+        self.assertEqual(capture.streams(self.path), ['abc', 'def'])
+
+    def test_streams_written(self):
+        self._write((capture.WRITTEN, 'AM'), (capture.READ, 'abc'),
+                    (capture.WRITTEN, 'QP'))
+        self.assertEqual(capture.streams(self.path, capture.WRITTEN),
+                         ['AMQP'])
+
+    def test_not_a_capture(self):
+        with open(self.path, 'wb') as handle:
+            handle.write('AMQP\x00\x00\x09\x01')
+        self.assertRaises(exceptions.InvalidCaptureError, list,
+                          capture.read_capture(self.path))
+
+    def test_truncated_record(self):
+        self._write((capture.READ, 'abcdef'))
+        with open(self.path, 'rb+') as handle:
+            handle.truncate(os.path.getsize(self.path) - 2)
+        self.assertRaises(exceptions.InvalidCaptureError, list,
+                          capture.read_capture(self.path))
+
+
+class ReplayTests(CaptureTestCase):
+
+    def setUp(self):
+        super(ReplayTests, self).setUp()
+        writer = capture.CaptureWriter(self.path)
+        writer.connected(('localhost', 5672))
+        writer.write(capture.WRITTEN, frame.ProtocolHeader().marshal())
+        writer.write(capture.READ, self._marshal(
+            0, spec.Connection.Start(server_properties={'product': 'test'},
+                                     mechanisms='PLAIN', locales='en_US')))
+        writer.write(capture.READ, self._marshal(
+            0, spec.Connection.Tune(0, 131072, 0)))
+        writer.write(capture.READ, self._marshal(0,
+                                                 spec.Connection.OpenOk()))
+        writer.write(capture.WRITTEN, self._marshal(1, spec.Channel.Open()))
+        writer.write(capture.READ, self._marshal(1, spec.Channel.OpenOk()))
+        writer.write(capture.WRITTEN, self._marshal(
+            1, spec.Basic.Consume(queue='test', consumer_tag='ctag1.0')))
+        writer.write(capture.READ, ''.join([
+            self._marshal(1, spec.Basic.ConsumeOk('ctag1.0')),
+            self._marshal(1, spec.Basic.Deliver('ctag1.0', 1, False, '',
+                                                'test')),
+            frame.Header(1, 5, spec.BasicProperties()).marshal(),
+            frame.Body(1, 'hello').marshal()]))
+        writer.close()
+
+    def _marshal(self, channel_number, method):
+        return frame.Method(channel_number, method).marshal()
+
+    def test_deliveries_dispatched_to_consumer(self):
+        received = list()
+        capture.replay(self.path, lambda channel, method, header, body:
+                       received.append((method.delivery_tag, body)))
+        self.assertEqual(received, [(1, 'hello')])
+
+    def test_counts(self):
+        replayer = capture.replay(self.path)
+        self.assertEqual((len(replayer.connections), replayer.reads,
+                          replayer.frames), (1, 5, 8))
+
+    def test_connection_open(self):
+        replayer = capture.replay(self.path)
+        self.assertTrue(replayer.connections[0].is_open)
+
+
+class CaptureTapTests(CaptureTestCase):
+
+    def setUp(self):
+        super(CaptureTapTests, self).setUp()
+        self.obj = base_connection.BaseConnection.__new__(
+            base_connection.BaseConnection)
+        self.obj.params = connection.ConnectionParameters(capture=self.path)
+        self.obj.endpoint = ('localhost', 5672)
+        self.obj.socket = mock.Mock()
+        self.obj._start_capture()
+
+    def _records(self):
+        self.obj._stop_capture()
+        return [(kind, value) for kind, timestamp, value in
+                capture.read_capture(self.path)]
+
+    def test_reads_recorded(self):
+        self.obj._read_socket = mock.Mock(return_value='abc')
+        self.obj._on_data_available = mock.Mock()
+        self.obj._handle_read()
+        self.assertEqual(self._records()[1:], [(capture.READ, 'abc')])
+
+    def test_bytes_written_recorded(self):
+        self.obj.outbound_buffer = mock.Mock(size=6)
+        self.obj.outbound_buffer.read.return_value = 'abcdef'
+        self.obj.socket.send.return_value = 4
+        self.obj._fill_outbound_buffer = mock.Mock()
+        self.obj._handle_write()
+        self.assertEqual(self._records()[1:], [(capture.WRITTEN, 'abcd')])
+
+    def test_capture_parameter_type(self):
+        self.assertRaises(TypeError, connection.ConnectionParameters,
+                          capture=1)
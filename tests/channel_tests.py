@@ -0,0 +1,170 @@
+"""
+Tests for the streaming consumers, the publish frame cache and the multi
+publish of pika.channel.Channel
+
+"""
+import mock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from pika import callback
+from pika import channel
+from pika import connection
+from pika import exceptions
+from pika import frame
+from pika import reconnection_strategies
+from pika import spec
+
+
+class StreamingConsumerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = mock.Mock(spec=connection.Connection)
+        self.conn.callbacks = callback.CallbackManager()
+        self.conn.reconnection = \
+            reconnection_strategies.NullReconnectionStrategy()
+        self.obj = channel.Channel(self.conn, 1)
+        self.obj.open()
+        self.obj._on_open_ok(None)
+        self.on_start = mock.Mock()
+        self.on_chunk = mock.Mock()
+        self.on_end = mock.Mock()
+        self.chunks = list()
+        self.on_chunk.side_effect = \
+            lambda chan, chunk: self.chunks.append(chunk.tobytes())
+        self.consumer_tag = self.obj.basic_consume(
+            None, 'queue', on_start=self.on_start, on_chunk=self.on_chunk,
+            on_end=self.on_end)
+        self.method = spec.Basic.Deliver(self.consumer_tag, 1)
+        self.properties = spec.BasicProperties()
+
+    def _deliver(self, *fragments):
+        body_size = sum([len(value) for value in fragments])
+        self.obj.frame_dispatcher.process(frame.Method(1, self.method))
+        self.obj.frame_dispatcher.process(frame.Header(1, body_size,
+                                                       self.properties))
+        for fragment in fragments:
+            self.obj.frame_dispatcher.process(frame.Body(1, fragment))
+
+    def test_chunks_streamed(self):
+        self._deliver('ab', 'cd')
+        self.on_start.assert_called_once_with(self.obj, self.method,
+                                              self.properties, 4)
+        self.assertEqual(self.chunks, ['ab', 'cd'])
+        self.on_end.assert_called_once_with(self.obj, self.method)
+
+    def test_chunk_passed_before_body_complete(self):
+        self.obj.frame_dispatcher.process(frame.Method(1, self.method))
+        self.obj.frame_dispatcher.process(frame.Header(1, 4, self.properties))
+        self.obj.frame_dispatcher.process(frame.Body(1, 'ab'))
+        self.assertEqual(self.chunks, ['ab'])
+        self.assertFalse(self.on_end.called)
+
+    def test_empty_body(self):
+        self._deliver()
+        self.assertTrue(self.on_start.called)
+        self.assertFalse(self.on_chunk.called)
+        self.on_end.assert_called_once_with(self.obj, self.method)
+
+    def test_other_consumers_not_streamed(self):
+        on_message = mock.Mock()
+        consumer_tag = self.obj.basic_consume(on_message, 'other')
+        self.method = spec.Basic.Deliver(consumer_tag, 2)
+        self._deliver('ab', 'cd')
+        on_message.assert_called_once_with(self.obj, self.method,
+                                           self.properties, 'abcd')
+        self.assertFalse(self.on_chunk.called)
+
+    def test_stream_removed_on_cancel(self):
+        self.obj._on_basic_cancel(frame.Method(1, spec.Basic.Cancel(
+            self.consumer_tag)))
+        self.assertEqual(self.obj.frame_dispatcher.streams, dict())
+
+    def test_on_end_required(self):
+        self.assertRaises(ValueError, self.obj.basic_consume, None, 'queue',
+                          on_chunk=self.on_chunk)
+
+
+class PublishFrameCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = mock.Mock(spec=connection.Connection)
+        self.conn.callbacks = callback.CallbackManager()
+        self.conn.reconnection = \
+            reconnection_strategies.NullReconnectionStrategy()
+        self.obj = channel.Channel(self.conn, 1)
+        self.obj.PUBLISH_FRAME_CACHE_SIZE = 4
+        self.obj.open()
+        self.obj._on_open_ok(None)
+
+    def _sent_frame(self):
+        return self.conn._send_method.call_args[0][1]
+
+    def test_publish_sends_marshaled_frame(self):
+        self.obj.basic_publish('ex', 'rk', 'body')
+        value = self._sent_frame()
+        self.assertIsInstance(value, frame.MarshaledMethod)
+        self.assertEqual(value.marshal(), frame.Method(
+            1, spec.Basic.Publish(exchange='ex', routing_key='rk')).marshal())
+
+    def test_frame_reused(self):
+        self.obj.basic_publish('ex', 'rk', 'body')
+        value = self._sent_frame()
+        self.obj.basic_publish('ex', 'rk', 'other')
+        self.assertIs(self._sent_frame(), value)
+
+    def test_flags_in_key(self):
+        self.obj.basic_publish('ex', 'rk', 'body')
+        value = self._sent_frame()
+        self.obj.basic_publish('ex', 'rk', 'body', mandatory=True)
+        self.assertIsNot(self._sent_frame(), value)
+        self.assertTrue(self._sent_frame().method.mandatory)
+
+    def test_recently_used_frames_kept(self):
+        first = self.obj._publish_frame('ex', 'a', False, False)
+        for routing_key in 'bcd':
+            self.obj._publish_frame('ex', routing_key, False, False)
+            self.assertIs(self.obj._publish_frame('ex', 'a', False, False),
+                          first)
+
+    def test_unused_frames_dropped(self):
+        for routing_key in 'abcdef':
+            self.obj._publish_frame('ex', routing_key, False, False)
+        self.assertEqual(len(self.obj._publish_frames) +
+                         len(self.obj._publish_frames_old), 4)
+        self.assertNotIn(('ex', 'a', False, False),
+                         self.obj._publish_frames_old)
+
+
+class PublishMultiTests(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = mock.Mock(spec=connection.Connection)
+        self.conn.callbacks = callback.CallbackManager()
+        self.conn.reconnection = \
+            reconnection_strategies.NullReconnectionStrategy()
+        self.obj = channel.Channel(self.conn, 1)
+        self.obj.open()
+        self.obj._on_open_ok(None)
+        self.conn._send_method.reset_mock()
+
+    def test_content_marshaled_once(self):
+        self.obj.basic_publish_multi('ex', ['a', 'b', 'c'], 'body')
+        self.assertEqual(self.conn._content_frames.call_count, 1)
+        contents = [call[0][2] for call in
+                    self.conn._send_method.call_args_list]
+        self.assertEqual(len(contents), 3)
+        self.assertTrue(all([value is self.conn._content_frames.return_value
+                             for value in contents]))
+
+    def test_routing_keys(self):
+        self.obj.basic_publish_multi('ex', ['a', 'b'], 'body')
+        self.assertEqual([call[0][1].method.routing_key for call in
+                          self.conn._send_method.call_args_list], ['a', 'b'])
+
+    def test_closed_channel(self):
+        self.obj._set_state(self.obj.CLOSED)
+        self.assertRaises(exceptions.ChannelClosed,
+                          self.obj.basic_publish_multi, 'ex', ['a'], 'body')
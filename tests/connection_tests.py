@@ -0,0 +1,390 @@
+"""
+Tests for pika.connection.Connection handshake pipelining, the outbound
+frame scheduling and publishing from files and iterators
+
+"""
+import mock
+import StringIO
+import tempfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from pika import callback
+from pika import channel
+from pika import connection
+from pika import exceptions
+from pika import frame
+from pika import reconnection_strategies
+from pika import spec
+
+
+class PipelinedHandshakeTests(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch.object(connection.Connection, '_connect'):
+            self.obj = connection.Connection()
+        self.obj.endpoint = ('localhost', 5672)
+        self.obj._flush_outbound = mock.Mock()
+        self.obj._detect_backpressure = mock.Mock()
+        self.obj._set_connection_state(self.obj.CONNECTION_START)
+
+    def _tune(self):
+        self.obj._on_connection_tune(
+            frame.Method(0, spec.Connection.Tune(0, 131072, 0)))
+
+    def _sent(self):
+        frames = list()
+        data = self.obj.outbound_buffer.read()
+        while data:
+            consumed, value = frame.decode_frame(data)
+            frames.append(value.method.__class__)
+            data = data[consumed:]
+        return frames
+
+    def test_channel_before_open_is_opening(self):
+        chan = self.obj.channel(None)
+        self.assertTrue(chan.is_opening)
+        self.assertEqual(self.obj._pending_channels, [chan.channel_number])
+
+    def test_channel_on_closed_connection_raises(self):
+        self.obj._set_connection_state(self.obj.CONNECTION_CLOSED)
+        self.assertRaises(exceptions.ConnectionClosed, self.obj.channel, None)
+        self.assertEqual(self.obj._channels, dict())
+
+    def test_channel_on_closing_connection_raises(self):
+        self.obj._set_connection_state(self.obj.CONNECTION_CLOSING)
+        self.assertRaises(exceptions.ConnectionClosed, self.obj.channel, None)
+
+    def test_tune_flushes_once(self):
+        self.obj.channel(None)
+        self._tune()
+        self.obj._flush_outbound.assert_called_once_with()
+
+    def test_tune_sends_pending_channel_open(self):
+        self.obj.channel(None)
+        self._tune()
+        self.assertEqual(self._sent(), [spec.Connection.TuneOk,
+                                        spec.Connection.Open,
+                                        spec.Channel.Open])
+
+    def test_uncork_without_data_does_not_flush(self):
+        self.obj._cork()
+        self.obj._uncork()
+        self.assertFalse(self.obj._flush_outbound.called)
+
+    def test_nested_cork_flushes_on_outermost(self):
+        self.obj._cork()
+        self.obj._cork()
+        self.obj._send_frame(frame.Heartbeat())
+        self.obj._uncork()
+        self.assertFalse(self.obj._flush_outbound.called)
+        self.obj._uncork()
+        self.obj._flush_outbound.assert_called_once_with()
+
+    def test_handshake_durations_order(self):
+        self.obj.handshake_times = {'connect': 1.0, 'start': 1.5,
+                                    'connected': 1.25}
+        self.assertEqual(self.obj.handshake_durations,
+                         [('connected', 0.25), ('start', 0.25)])
+
+
+class ChannelOpeningQueueTests(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = mock.Mock(spec=connection.Connection)
+        self.conn.callbacks = callback.CallbackManager()
+        self.conn.reconnection = \
+            reconnection_strategies.NullReconnectionStrategy()
+        self.obj = channel.Channel(self.conn, 1)
+        self.obj.open()
+
+    def test_commands_queued_while_opening(self):
+        self.obj.basic_publish('ex', 'rk', 'body')
+        self.assertEqual(self.conn._send_method.call_count, 1)
+        self.assertEqual(len(self.obj._opening_queue), 1)
+
+    def test_open_ok_sends_queue_before_callback(self):
+        def on_open(chan):
+            self.assertEqual(self.conn._send_method.call_count, 2)
+        self.obj._on_open_callback = on_open
+        self.obj.basic_publish('ex', 'rk', 'body')
+        self.obj._on_open_ok(None)
+        self.assertEqual(len(self.obj._opening_queue), 0)
+        self.conn._cork.assert_called_once_with()
+        self.conn._uncork.assert_called_once_with()
+
+    def test_remote_close_discards_queue(self):
+        self.obj.basic_publish('ex', 'rk', 'body')
+        self.obj.on_remote_close(None)
+        self.assertEqual(len(self.obj._opening_queue), 0)
+
+    def test_close_ok_not_queued_while_opening(self):
+        self.obj.basic_publish('ex', 'rk', 'body')
+        self.obj._on_close(frame.Method(1, spec.Channel.Close(404, 'NOT_FOUND',
+                                                              50, 10)))
+        channel_number, method = self.conn._send_method.call_args[0]
+        self.assertEqual((channel_number, method.__class__),
+                         (1, spec.Channel.CloseOk))
+        self.assertEqual(len(self.obj._opening_queue), 0)
+
+
+class OutboundSchedulerTests(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch.object(connection.Connection, '_connect'):
+            self.obj = connection.Connection(
+                connection.ConnectionParameters(frame_max=4096))
+        self.obj._flush_outbound = mock.Mock()
+        self.obj._detect_backpressure = mock.Mock()
+        self.obj._set_connection_state(self.obj.CONNECTION_OPEN)
+        self.obj._body_max_length = 1024
+
+    def _drain(self):
+        frames = list()
+        while self.obj.outbound_buffer.size:
+            data = self.obj.outbound_buffer.read()
+            self.obj.outbound_buffer.consume(len(data))
+            while data:
+                consumed, value = frame.decode_frame(data)
+                frames.append(value)
+                data = data[consumed:]
+            self.obj._fill_outbound_buffer()
+        return frames
+
+    def _publish(self, channel_number, body):
+        self.obj._send_method(channel_number,
+                              spec.Basic.Publish(routing_key='rk'),
+                              (spec.BasicProperties(), body))
+
+    def _summary(self, frames):
+        return [(value.channel_number, value.__class__.__name__)
+                for value in frames]
+
+    def test_small_writes_not_queued(self):
+        self._publish(1, 'body')
+        self.assertEqual(self.obj._outbound_queued, 0)
+
+    def test_channels_take_turns(self):
+        self._publish(1, 'x' * 8192)
+        self._publish(2, 'y')
+        frames = self._drain()
+        channels = [value.channel_number for value in frames]
+        self.assertTrue(channels.index(2) < len(channels) - 1)
+        self.assertEqual(channels.count(1), 10)
+        self.assertEqual(channels.count(2), 3)
+
+    def test_channel_frames_stay_in_order(self):
+        self._publish(1, 'x' * 8192)
+        self._publish(2, 'y')
+        self._publish(1, 'z')
+        frames = [value for value in self._drain()
+                  if value.channel_number == 1]
+        self.assertEqual([value.__class__ for value in frames],
+                         [frame.Method, frame.Header] + [frame.Body] * 8 +
+                         [frame.Method, frame.Header, frame.Body])
+        self.assertEqual(frames[-1].fragment, 'z')
+
+    def test_heartbeat_jumps_queue(self):
+        self._publish(1, 'x' * 8192)
+        self.obj._send_frame(frame.Heartbeat())
+        types = [value.__class__ for value in self._drain()]
+        # Sent right after what was in the outbound buffer, ahead of the
+        # queued body frames
+        self.assertEqual(types.index(frame.Heartbeat), 6)
+        self.assertEqual(types[7:], [frame.Body] * 4)
+
+    def test_ack_jumps_other_channels(self):
+        self._publish(1, 'x' * 8192)
+        self.obj._send_method(2, spec.Basic.Ack(1))
+        self.assertEqual(len(self.obj._priority_frames), 1)
+
+    def test_ack_behind_own_channel(self):
+        self._publish(1, 'x' * 8192)
+        self.obj._send_method(1, spec.Basic.Ack(1))
+        self.assertEqual(len(self.obj._priority_frames), 0)
+        self.assertEqual(self._summary(self._drain())[-1], (1, 'Method'))
+
+    def test_message_flushed_once(self):
+        self._publish(1, 'x' * 2048)
+        self.obj._flush_outbound.assert_called_once_with()
+
+    def test_reset_on_init_connection_state(self):
+        self._publish(1, 'x' * 8192)
+        self.obj._init_connection_state()
+        self.assertEqual(self.obj._outbound_queued, 0)
+        self.assertEqual(self.obj._outbound_queues, dict())
+
+
+
+class StreamedPublishTests(OutboundSchedulerTests):
+
+    def _publish_stream(self, channel_number, body, body_size):
+        self.obj._send_method(channel_number,
+                              spec.Basic.Publish(routing_key='rk'),
+                              (spec.BasicProperties(), body, body_size))
+
+    def _body(self, frames, channel_number=1):
+        return ''.join([value.fragment for value in frames
+                        if isinstance(value, frame.Body) and
+                        value.channel_number == channel_number])
+
+    def test_file_read_as_buffer_drains(self):
+        body = StringIO.StringIO('x' * 102400)
+        self._publish_stream(1, body, 102400)
+        self.assertTrue(body.tell() <= self.obj._buffer_size)
+        self.assertEqual(self._body(self._drain()), 'x' * 102400)
+        self.assertEqual(self.obj._outbound_queues, dict())
+
+    def test_regular_file_mapped(self):
+        body = tempfile.TemporaryFile()
+        body.write('skip' + 'abcd' * 2500)
+        body.seek(4)
+        self._publish_stream(1, body, 10000)
+        frames = self._drain()
+        self.assertEqual(self._body(frames), 'abcd' * 2500)
+        self.assertEqual(max([len(value.fragment) for value in frames
+                              if isinstance(value, frame.Body)]), 1024)
+        self.assertEqual(body.tell(), 10004)
+
+    def test_mapped_across_windows(self):
+        self.obj.MMAP_WINDOW = 8192
+        body = tempfile.TemporaryFile()
+        body.write(''.join([chr(value % 256) for value in range(20000)]))
+        body.seek(0)
+        self._publish_stream(1, body, 20000)
+        self.assertEqual(self._body(self._drain()),
+                         ''.join([chr(value % 256) for value in range(20000)]))
+
+    def test_iterator_chunks_joined_and_split(self):
+        self._publish_stream(1, iter(['a' * 10, 'b' * 3000, 'c']), 3011)
+        frames = [value for value in self._drain()
+                  if isinstance(value, frame.Body)]
+        self.assertEqual([len(value.fragment) for value in frames],
+                         [1024, 1024, 963])
+        self.assertEqual(self._body(frames), 'a' * 10 + 'b' * 3000 + 'c')
+
+    def test_other_channels_take_turns(self):
+        self._publish_stream(1, StringIO.StringIO('x' * 20480), 20480)
+        self._publish(2, 'y')
+        channels = [value.channel_number for value in self._drain()]
+        self.assertTrue(channels.index(2) < len(channels) - 1)
+
+    def test_empty_body_sends_no_body_frames(self):
+        for body in (tempfile.TemporaryFile(), iter([])):
+            self._publish_stream(1, body, 0)
+        self.assertEqual(self._summary(self._drain()),
+                         [(1, 'Method'), (1, 'Header')] * 2)
+
+    def test_body_in_memory_sliced(self):
+        for body in ('x' * 3000, bytearray('x' * 3000),
+                     memoryview('x' * 3000), buffer('x' * 3000)):
+            self._publish_stream(1, body, 3000)
+            frames = [value for value in self._drain()
+                      if isinstance(value, frame.Body)]
+            self.assertEqual([len(value.fragment) for value in frames],
+                             [1024, 1024, 952])
+            self.assertEqual(self._body(frames), 'x' * 3000)
+
+    def test_body_size_required(self):
+        self.assertRaises(ValueError, self._publish, 1,
+                          StringIO.StringIO('x'))
+
+    def test_short_body_closes_connection(self):
+        self._publish_stream(2, iter(['y' * 2048] * 4), 8192)
+        self._publish_stream(1, StringIO.StringIO('x' * 10), 20)
+        self._publish(1, 'z')
+        frames = self._drain()
+        self.assertEqual(self._body(frames), 'x' * 10)
+        self.assertEqual(self._body(frames, 2), 'y' * 8192)
+        self.assertIsInstance(frames[-1].method, spec.Connection.Close)
+        self.assertEqual(frames[-1].method.reply_code, spec.FRAME_ERROR)
+        self.assertEqual(self.obj._outbound_queued, 0)
+        self.assertEqual(self.obj._outbound_queued_bytes, 0)
+        self.assertTrue(self.obj.is_closing)
+
+    def test_short_body_reported_to_close_callbacks(self):
+        on_closed = mock.Mock()
+        self.obj.add_on_close_callback(on_closed)
+        self.obj._adapter_disconnect = mock.Mock()
+        self.obj.endpoint = ('localhost', 5672)
+        self._publish_stream(1, StringIO.StringIO('x' * 10), 20)
+        self._drain()
+        self.obj._on_connection_closed(
+            frame.Method(0, spec.Connection.CloseOk()))
+        on_closed.assert_called_once_with(self.obj)
+        self.assertEqual(self.obj.closing,
+                         (spec.FRAME_ERROR, 'Body of message on channel 1: '
+                          'Body ended after 10 of body_size 20 bytes'))
+
+    def test_long_body_closes_connection(self):
+        self._publish_stream(1, iter(['x' * 30]), 20)
+        self._drain()
+        self.assertEqual(self.obj.closing[0], spec.FRAME_ERROR)
+
+
+
+class ContentFramesTests(OutboundSchedulerTests):
+
+    def test_same_bytes_as_publish(self):
+        properties = spec.BasicProperties(content_type='text/plain')
+        self.obj._send_method(1, spec.Basic.Publish(routing_key='rk'),
+                              (properties, 'x' * 3000))
+        expected = self.obj.outbound_buffer.read()
+        self.obj.outbound_buffer.flush()
+        self.obj._send_method(1, spec.Basic.Publish(routing_key='rk'),
+                              self.obj._content_frames(1, properties,
+                                                       'x' * 3000))
+        self.assertEqual(self.obj.outbound_buffer.read(), expected)
+
+    def test_frames(self):
+        frames = self.obj._content_frames(1, spec.BasicProperties(),
+                                          'x' * 3000)
+        self.assertEqual(len(frames), 4)
+        self.assertTrue(all([isinstance(value, frame.Marshaled)
+                             for value in frames]))
+
+    def test_empty_body(self):
+        self.assertEqual(len(self.obj._content_frames(
+            1, spec.BasicProperties(), '')), 1)
+
+    def test_queued_frames_shared(self):
+        frames = self.obj._content_frames(1, spec.BasicProperties(),
+                                          'x' * 8192)
+        for routing_key in ('a', 'b'):
+            self.obj._send_method(1, spec.Basic.Publish(
+                routing_key=routing_key), frames)
+        queued = list(self.obj._outbound_queues[1])
+        self.assertIs(queued[-1], frames[-1].marshal())
+
+
+class FrameBufferTests(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch.object(connection.Connection, '_connect'):
+            self.obj = connection.Connection()
+        self.obj._set_connection_state(self.obj.CONNECTION_OPEN)
+        self.obj._process_frame = mock.Mock()
+        self.data = frame.Heartbeat().marshal()
+
+    def _frames(self):
+        return [call[0][0] for call in self.obj._process_frame.call_args_list]
+
+    def test_frames_in_one_read(self):
+        self.obj._on_data_available(self.data * 3)
+        self.assertEqual(len(self._frames()), 3)
+        self.assertEqual(self.obj.bytes_received, len(self.data) * 3)
+
+    def test_consumed_buffer_not_sliced(self):
+        self.obj._on_data_available(self.data * 2)
+        self.assertEqual(self.obj._frame_offset, len(self.data) * 2)
+        self.obj._on_data_available(self.data)
+        self.assertEqual(self.obj._frame_buffer, self.data)
+
+    def test_partial_frame_across_reads(self):
+        self.obj._on_data_available(self.data + self.data[:3])
+        self.assertEqual(len(self._frames()), 1)
+        self.obj._on_data_available(self.data[3:])
+        self.assertEqual(len(self._frames()), 2)
+        self.assertEqual(self.obj._frame_buffer[self.obj._frame_offset:], '')
@@ -0,0 +1,211 @@
+"""
+Tests for pika.data
+
+"""
+import decimal
+import struct
+from datetime import datetime
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from pika import data
+from pika import exceptions
+from pika import spec
+
+
+def encode(table):
+    pieces = list()
+    size = data.encode_table(pieces, table)
+    value = ''.join(pieces)
+    assert size == len(value)
+    return value
+
+
+class EncodeTests(unittest.TestCase):
+
+    def test_empty_table(self):
+        self.assertEqual(encode(None), '\x00\x00\x00\x00')
+
+    def test_str(self):
+        self.assertEqual(encode({'a': 'bc'}),
+                         '\x00\x00\x00\x09\x01aS\x00\x00\x00\x02bc')
+
+    def test_unicode(self):
+        self.assertEqual(encode({u'a': u'\xe9'}),
+                         '\x00\x00\x00\x09\x01aS\x00\x00\x00\x02\xc3\xa9')
+
+    def test_bool(self):
+        self.assertEqual(encode({'a': True}), '\x00\x00\x00\x04\x01at\x01')
+
+    def test_int(self):
+        self.assertEqual(encode({'a': -1}),
+                         '\x00\x00\x00\x07\x01aI\xff\xff\xff\xff')
+
+    def test_int_too_large_for_long_int(self):
+        self.assertEqual(encode({'a': 2 ** 31})[7:],
+                         struct.pack('>q', 2 ** 31))
+        self.assertEqual(encode({'a': 2 ** 31})[6], 'l')
+
+    def test_long(self):
+        self.assertEqual(encode({'a': 1L}),
+                         '\x00\x00\x00\x0b\x01al' + struct.pack('>q', 1))
+
+    def test_float(self):
+        self.assertEqual(encode({'a': 1.5}),
+                         '\x00\x00\x00\x0b\x01ad' + struct.pack('>d', 1.5))
+
+    def test_void(self):
+        self.assertEqual(encode({'a': None}), '\x00\x00\x00\x03\x01aV')
+
+    def test_byte_array(self):
+        self.assertEqual(encode({'a': bytearray('\x00\x01')}),
+                         '\x00\x00\x00\x09\x01ax\x00\x00\x00\x02\x00\x01')
+
+    def test_nested_table_and_array(self):
+        self.assertEqual(encode({'a': [1, {'b': 'c'}]}),
+                         '\x00\x00\x00\x19\x01aA\x00\x00\x00\x12'
+                         'I\x00\x00\x00\x01'
+                         'F\x00\x00\x00\x08\x01bS\x00\x00\x00\x01c')
+
+    def test_subclass(self):
+        class Name(str):
+            pass
+        self.assertEqual(encode({'a': Name('bc')}), encode({'a': 'bc'}))
+
+    def test_unsupported_type(self):
+        self.assertRaises(exceptions.InvalidTableError, encode,
+                          {'a': object()})
+
+
+class DecodeTests(unittest.TestCase):
+
+    def decode(self, kind, value):
+        encoded = 'x' + struct.pack('>I', 3 + len(value)) + '\x01a' + kind + \
+                  value
+        table, offset = data.decode_table(encoded, 1)
+        self.assertEqual(offset, len(encoded))
+        return table['a']
+
+    def test_short_short_ints(self):
+        self.assertEqual(self.decode('b', '\xff'), -1)
+        self.assertEqual(self.decode('B', '\xff'), 255)
+
+    def test_short_ints(self):
+        self.assertEqual(self.decode('s', '\xff\xfe'), -2)
+        self.assertEqual(self.decode('u', '\xff\xfe'), 65534)
+
+    def test_long_ints(self):
+        self.assertEqual(self.decode('I', '\xff\xff\xff\xfe'), -2)
+        self.assertEqual(self.decode('i', '\xff\xff\xff\xfe'), 2 ** 32 - 2)
+
+    def test_long_long_ints(self):
+        self.assertEqual(self.decode('l', '\xff' * 8), -1)
+        self.assertEqual(self.decode('L', '\xff' * 8), 2 ** 64 - 1)
+
+    def test_floats(self):
+        self.assertEqual(self.decode('f', struct.pack('>f', 0.5)), 0.5)
+        self.assertEqual(self.decode('d', struct.pack('>d', 0.1)), 0.1)
+
+    def test_byte_array(self):
+        value = self.decode('x', '\x00\x00\x00\x02\xff\x00')
+        self.assertIsInstance(value, bytearray)
+        self.assertEqual(value, bytearray('\xff\x00'))
+
+    def test_void(self):
+        self.assertIsNone(self.decode('V', ''))
+
+    def test_unicode_str(self):
+        self.assertEqual(self.decode('S', '\x00\x00\x00\x02\xc3\xa9'),
+                         u'\xe9')
+
+    def test_unsupported_kind(self):
+        self.assertRaises(exceptions.InvalidTableError, self.decode, 'Z', '')
+
+    def test_decode_value(self):
+        self.assertEqual(data.decode_value('xu\x00\x01', 1), (1, 4))
+
+
+class RoundTripTests(unittest.TestCase):
+
+    def round_trip(self, table):
+        encoded = encode(table)
+        self.assertEqual(data.decode_table(encoded, 0), (table, len(encoded)))
+
+    def test_scalars(self):
+        self.round_trip({'str': 'value', 'bool': False, 'int': 42,
+                         'long': 2 ** 40, 'float': 0.25, 'void': None,
+                         'bytes': bytearray('\x00\xff'),
+                         'decimal': decimal.Decimal('1.25'),
+                         'timestamp': datetime(2012, 1, 2, 3, 4, 5)})
+
+    def test_x_death(self):
+        self.round_trip({'x-death': [{'count': 3L, 'reason': 'expired',
+                                      'queue': 'work',
+                                      'time': datetime(2012, 1, 2, 3, 4, 5),
+                                      'exchange': 'events',
+                                      'routing-keys': ['a.b', 'a.c']},
+                                     {'count': 1L, 'reason': 'rejected',
+                                      'queue': 'retry',
+                                      'time': datetime(2012, 1, 2, 3, 4, 6),
+                                      'exchange': '',
+                                      'routing-keys': ['work']}]})
+
+    def test_deeply_nested(self):
+        table = {'a': 'end'}
+        for depth in range(2000):
+            table = {'a': [table]}
+        encoded = encode(table)
+        value, offset = data.decode_table(encoded, 0)
+        self.assertEqual(offset, len(encoded))
+        for depth in range(2000):
+            value = value['a'][0]
+        self.assertEqual(value, {'a': 'end'})
+
+    def test_empty_containers(self):
+        self.round_trip({'table': {}, 'array': [], 'nested': [[], {}]})
+
+    def test_decode_after_offset(self):
+        encoded = encode({'a': [1, 2]})
+        self.assertEqual(data.decode_table('xx' + encoded + 'yy', 2),
+                         ({'a': [1, 2]}, len(encoded) + 2))
+
+
+class DecodeShortstrTests(unittest.TestCase):
+
+    def test_value_and_offset(self):
+        self.assertEqual(data.decode_shortstr('xx\x02ab', 2), ('ab', 5))
+
+    def test_unicode(self):
+        self.assertEqual(data.decode_shortstr('\x02\xc3\xa9', 0),
+                         (u'\xe9', 3))
+
+    def test_same_object_returned(self):
+        value = data.decode_shortstr('\x0ashortstr-1', 0)[0]
+        self.assertIs(data.decode_shortstr('x\x0ashortstr-1', 1)[0], value)
+
+    def test_deliver_fields_shared(self):
+        encoded = ''.join(spec.Basic.Deliver('ctag', 1, False, 'ex',
+                                             'rk').encode())
+        first = spec.Basic.Deliver().decode(encoded)
+        second = spec.Basic.Deliver().decode(encoded)
+        self.assertIs(first.routing_key, second.routing_key)
+        self.assertIs(first.consumer_tag, second.consumer_tag)
+
+    def test_cache_bounded(self):
+        for index in range(data.SHORTSTR_CACHE_SIZE * 2):
+            data.decode_shortstr(chr(10) + '%010i' % index, 0)
+        self.assertTrue(len(data._shortstrs) + len(data._shortstrs_old) <=
+                        data.SHORTSTR_CACHE_SIZE)
+
+    def test_recurring_value_kept(self):
+        value = data.decode_shortstr('\x0ashortstr-2', 0)[0]
+        for index in range(data.SHORTSTR_CACHE_SIZE * 2):
+            data.decode_shortstr(chr(10) + '%010i' % index, 0)
+            self.assertIs(data.decode_shortstr('\x0ashortstr-2', 0)[0],
+                          value)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Tests for pika.failover
+
+"""
+import mock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from pika import connection
+from pika import exceptions
+from pika import failover
+from pika import frame
+from pika import spec
+
+
+class FailoverPublisherTests(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('pika.adapters.select_connection.SelectConnection')
+        self.connection_class = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.on_ready = mock.Mock()
+        self.obj = failover.FailoverPublisher(
+            connection.ConnectionParameters('primary', heartbeat_interval=5),
+            connection.ConnectionParameters('standby', heartbeat_interval=5),
+            self.on_ready, custom_ioloop=mock.Mock())
+        self.primary, self.standby = self.obj._links
+        for link in self.obj._links:
+            link.connection = mock.Mock()
+            link.connection.publisher_confirms = True
+            link.connection.basic_nack = True
+            link._on_channel_open(mock.Mock())
+            link._on_delivery_confirmation(
+                frame.Method(1, spec.Confirm.SelectOk()))
+
+    def _published(self, link):
+        return [call[0][2] for call in link.channel.basic_publish.call_args_list]
+
+    def test_connects_both(self):
+        self.assertEqual(self.connection_class.call_count, 2)
+
+    def test_primary_is_active(self):
+        self.assertEqual(self.obj.active, 'primary')
+
+    def test_on_ready_callback(self):
+        self.on_ready.assert_called_once_with(self.obj)
+
+    def test_primary_takes_over_from_standby_at_startup(self):
+        obj = failover.FailoverPublisher(
+            connection.ConnectionParameters('primary'),
+            connection.ConnectionParameters('standby'),
+            custom_ioloop=mock.Mock())
+        obj._on_link_ready(obj._links[1])
+        obj._on_link_ready(obj._links[0])
+        self.assertEqual(obj.active, 'primary')
+
+    def test_publish_tracks_unconfirmed(self):
+        self.obj.publish('ex', 'rk', 'body')
+        self.assertEqual(self.primary.unconfirmed,
+                         {1: ('ex', 'rk', 'body', None, False)})
+
+    def test_ack_forgets_message(self):
+        self.obj.publish('ex', 'rk', 'one')
+        self.obj.publish('ex', 'rk', 'two')
+        self.primary._on_delivery_confirmation(
+            frame.Method(1, spec.Basic.Ack(2, multiple=True)))
+        self.assertEqual(self.obj.unconfirmed, 0)
+
+    def test_nack_republishes(self):
+        self.obj.publish('ex', 'rk', 'one')
+        self.primary._on_delivery_confirmation(
+            frame.Method(1, spec.Basic.Nack(1)))
+        self.assertEqual(self._published(self.primary), ['one', 'one'])
+
+    def test_failover_republishes_unconfirmed_in_order(self):
+        for body in ('one', 'two', 'three'):
+            self.obj.publish('ex', 'rk', body)
+        self.primary._on_delivery_confirmation(
+            frame.Method(1, spec.Basic.Ack(1)))
+        self.primary._on_connection_closed(self.primary.connection)
+        self.assertEqual(self.obj.active, 'standby')
+        self.assertEqual(self.obj.failovers, 1)
+        self.assertEqual(self._published(self.standby), ['two', 'three'])
+        self.assertEqual(self.primary.unconfirmed, dict())
+
+    def test_publish_held_without_ready_connection(self):
+        self.standby.ready = False
+        self.primary._on_connection_closed(self.primary.connection)
+        self.obj.publish('ex', 'rk', 'held')
+        self.assertEqual(self.obj.unconfirmed, 1)
+        self.standby._on_recovered(self.standby.connection)
+        self.assertEqual(self._published(self.standby), ['held'])
+
+    def test_connection_lost_while_publishing(self):
+        def lost(*args):
+            self.primary._on_connection_closed(self.primary.connection)
+            raise exceptions.ConnectionClosed
+        self.primary.channel.basic_publish.side_effect = lost
+        self.obj.publish('ex', 'rk', 'body')
+        self.assertEqual(self._published(self.standby), ['body'])
+        self.assertEqual(self.standby.unconfirmed,
+                         {1: ('ex', 'rk', 'body', None, False)})
+
+    def test_recovered_primary_becomes_standby(self):
+        self.primary._on_connection_closed(self.primary.connection)
+        self.primary._on_recovered(self.primary.connection)
+        self.assertEqual(self.obj.active, 'standby')
+
+    def test_publish_after_close_raises(self):
+        self.obj.close()
+        self.assertRaises(exceptions.ConnectionClosed, self.obj.publish,
+                          'ex', 'rk', 'body')
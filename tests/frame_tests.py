@@ -0,0 +1,300 @@
+"""
+Tests for pika.frame.Dispatcher
+
+"""
+import mock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from pika import callback
+from pika import exceptions
+from pika import frame
+from pika import spec
+
+
+class DispatcherTests(unittest.TestCase):
+
+    def setUp(self):
+        self.callbacks = callback.CallbackManager()
+        self.obj = frame.Dispatcher(self.callbacks)
+        self.on_deliver = mock.Mock()
+        self.callbacks.add(1, '_on_basic_deliver', self.on_deliver, False,
+                           self.obj)
+        self.method = frame.Method(1, spec.Basic.Deliver('ctag', 1))
+
+    def _deliver(self, *fragments):
+        self.header = frame.Header(1, sum([len(value) for value in fragments]),
+                                   spec.BasicProperties())
+        self.obj.process(self.method)
+        self.obj.process(self.header)
+        for fragment in fragments:
+            self.obj.process(frame.Body(1, fragment))
+
+    def test_single_body_frame(self):
+        self._deliver('body')
+        self.on_deliver.assert_called_once_with(self.method, self.header,
+                                                'body')
+
+    def test_body_frames_joined(self):
+        self._deliver('a', 'b', 'c')
+        self.on_deliver.assert_called_once_with(self.method, self.header,
+                                                'abc')
+
+    def test_empty_body(self):
+        self._deliver()
+        self.on_deliver.assert_called_once_with(self.method, self.header, '')
+
+    def test_state_reused_between_messages(self):
+        self._deliver('a', 'b')
+        self._deliver('c')
+        self.assertEqual([call[0][2] for call in
+                          self.on_deliver.call_args_list], ['ab', 'c'])
+        self.assertEqual(self.obj._fragments, [])
+
+    def test_get_ok_callback(self):
+        on_get = mock.Mock()
+        self.callbacks.add(1, '_on_basic_get', on_get, False, self.obj)
+        self.method = frame.Method(1, spec.Basic.GetOk(1))
+        self._deliver('body')
+        self.assertTrue(on_get.called)
+        self.assertFalse(self.on_deliver.called)
+
+    def test_body_too_long(self):
+        self.obj.process(self.method)
+        self.obj.process(frame.Header(1, 2, spec.BasicProperties()))
+        self.assertRaises(exceptions.BodyTooLongError, self.obj.process,
+                          frame.Body(1, 'abc'))
+
+    def test_unexpected_frame(self):
+        self.obj.process(self.method)
+        self.assertRaises(exceptions.UnexpectedFrameError, self.obj.process,
+                          frame.Body(1, 'abc'))
+
+    def test_method_without_content(self):
+        self.assertRaises(NotImplementedError, self.obj.process,
+                          frame.Method(1, spec.Basic.Ack(1)))
+
+    def test_reset_discards_partial_content(self):
+        self.obj.process(self.method)
+        self.obj.process(frame.Header(1, 10, spec.BasicProperties()))
+        self.obj.process(frame.Body(1, 'abc'))
+        self.obj.reset()
+        self._deliver('new')
+        self.on_deliver.assert_called_once_with(self.method, self.header,
+                                                'new')
+
+    def test_zero_copy_single_body_frame(self):
+        self.obj.zero_copy = True
+        self._deliver('body')
+        body = self.on_deliver.call_args[0][2]
+        self.assertIsInstance(body, memoryview)
+        self.assertEqual(body.tobytes(), 'body')
+
+    def test_zero_copy_body_frames_assembled(self):
+        self.obj.zero_copy = True
+        self._deliver('ab', 'cd', 'e')
+        body = self.on_deliver.call_args[0][2]
+        self.assertIsInstance(body, memoryview)
+        self.assertEqual(body.tobytes(), 'abcde')
+
+    def test_zero_copy_empty_body(self):
+        self.obj.zero_copy = True
+        self._deliver()
+        self.assertEqual(self.on_deliver.call_args[0][2].tobytes(), '')
+
+    def test_zero_copy_buffer_not_reused(self):
+        self.obj.zero_copy = True
+        self._deliver('a', 'b')
+        self._deliver('c', 'd')
+        self.assertEqual([call[0][2].tobytes() for call in
+                          self.on_deliver.call_args_list], ['ab', 'cd'])
+
+    def _deliver_views(self, *fragments):
+        # Fragments decoded from the read buffer, which the next read
+        # overwrites
+        self.header = frame.Header(1, sum([len(value) for value in fragments]),
+                                   spec.BasicProperties())
+        self.obj.process(self.method)
+        self.obj.process(self.header)
+        read_buffer = bytearray(max([len(value) for value in fragments]))
+        for fragment in fragments:
+            read_buffer[:len(fragment)] = fragment
+            self.obj.process(frame.Body(1, memoryview(read_buffer)[
+                :len(fragment)]))
+            read_buffer[:] = 'x' * len(read_buffer)
+
+    def test_views_copied(self):
+        self._deliver_views('ab', 'c')
+        self._deliver_views('body')
+        self.assertEqual([call[0][2] for call in
+                          self.on_deliver.call_args_list], ['abc', 'body'])
+
+    def test_zero_copy_views_copied_into_body(self):
+        self.obj.zero_copy = True
+        self._deliver_views('ab', 'cd', 'e')
+        self._deliver_views('body')
+        self.assertEqual([call[0][2].tobytes() for call in
+                          self.on_deliver.call_args_list], ['abcde', 'body'])
+
+
+class DecodeFrameTests(unittest.TestCase):
+
+    def test_decode_at_offset(self):
+        data = frame.Heartbeat().marshal()
+        value = frame.Body(1, 'body').marshal()
+        consumed, result = frame.decode_frame(data + value, len(data))
+        self.assertEqual(consumed, len(value))
+        self.assertEqual(result.fragment, 'body')
+
+    def test_partial_frame_at_offset(self):
+        data = frame.Heartbeat().marshal()
+        self.assertEqual(frame.decode_frame(data + data[:5], len(data)),
+                         (0, None))
+
+    def test_decode_from_bytearray(self):
+        data = frame.Method(1, spec.Queue.Declare(queue='q')).marshal()
+        consumed, result = frame.decode_frame(bytearray(data + 'AMQP'), 0,
+                                              len(data))
+        self.assertEqual(consumed, len(data))
+        self.assertEqual(result.method.queue.__class__, str)
+
+    def test_body_from_bytearray(self):
+        data = bytearray(frame.Heartbeat().marshal() +
+                         frame.Body(1, 'ab').marshal())
+        result = frame.decode_frame(data, 8)[1]
+        self.assertEqual((result.fragment.tobytes(),
+                          result.fragment.__class__), ('ab', memoryview))
+        data[15] = 'x'
+        self.assertEqual(result.fragment.tobytes(), 'xb')
+
+    def test_partial_frame_before_end(self):
+        data = frame.Heartbeat().marshal()
+        self.assertEqual(frame.decode_frame(bytearray(data * 2), 0, 5),
+                         (0, None))
+
+
+class StreamTests(unittest.TestCase):
+
+    def setUp(self):
+        self.obj = frame.Dispatcher(callback.CallbackManager())
+        self.on_chunk = mock.Mock()
+        self.on_end = mock.Mock()
+        self.obj.streams['ctag'] = (None, self.on_chunk, self.on_end)
+        self.obj.process(frame.Method(1, spec.Basic.Deliver('ctag', 1)))
+        self.obj.process(frame.Header(1, 4, spec.BasicProperties()))
+
+    def test_fragments_not_kept(self):
+        self.obj.process(frame.Body(1, 'ab'))
+        self.assertEqual(self.obj._fragments, [])
+        self.assertIsInstance(self.on_chunk.call_args[0][0], memoryview)
+
+    def test_state_reset_after_end(self):
+        self.obj.process(frame.Body(1, 'abcd'))
+        self.assertTrue(self.on_end.called)
+        self.assertIsNone(self.obj._stream)
+        self.assertEqual(self.obj._state, self.obj.METHOD)
+
+    def test_body_too_long(self):
+        self.assertRaises(exceptions.BodyTooLongError, self.obj.process,
+                          frame.Body(1, 'abcde'))
+
+    def test_view_copied_for_chunk(self):
+        read_buffer = bytearray('abcd')
+        self.obj.process(frame.Body(1, memoryview(read_buffer)))
+        read_buffer[:] = 'xxxx'
+        self.assertEqual(self.on_chunk.call_args[0][0].tobytes(), 'abcd')
+
+
+class MarshalTests(unittest.TestCase):
+
+    def test_heartbeat(self):
+        self.assertEqual(frame.Heartbeat().marshal(),
+                         frame.Frame(spec.FRAME_HEARTBEAT, 0)._marshal([]))
+
+    def test_protocol_header(self):
+        self.assertEqual(frame.ProtocolHeader().marshal(),
+                         'AMQP\x00\x00\x09\x01')
+        self.assertEqual(frame.ProtocolHeader(0, 8, 2).marshal(),
+                         'AMQP\x00\x00\x08\x02')
+
+    def test_marshaled_method(self):
+        method = spec.Basic.Publish(exchange='ex', routing_key='rk')
+        value = frame.MarshaledMethod(1, method)
+        self.assertEqual(value.marshal(), frame.Method(1, method).marshal())
+        self.assertIsInstance(value, frame.Method)
+
+
+class SlotsTests(unittest.TestCase):
+
+    def test_frames_have_no_dict(self):
+        for value in (frame.Method(1, spec.Basic.Ack(1)),
+                      frame.Header(1, 0, spec.BasicProperties()),
+                      frame.Body(1, ''), frame.Heartbeat(),
+                      frame.ProtocolHeader(),
+                      frame.MarshaledMethod(1, spec.Basic.Ack(1))):
+            self.assertFalse(hasattr(value, '__dict__'), value)
+
+    def test_spec_objects_have_no_dict(self):
+        for value in spec.methods.values() + spec.props.values():
+            self.assertFalse(hasattr(value(), '__dict__'), value)
+
+    def test_repr(self):
+        self.assertEqual(repr(frame.Body(1, 'ab')),
+                         "<Body(['frame_type=3', 'channel_number=1', "
+                         "'fragment=ab'])>")
+        self.assertEqual(repr(spec.Basic.Ack(2)),
+                         "<Basic.Ack(['delivery_tag=2', 'multiple=False'])>")
+
+
+class FromBytesTests(unittest.TestCase):
+
+    def _decoded(self, method):
+        return frame.decode_frame(frame.Method(1, method).marshal())[1].method
+
+    def test_deliver(self):
+        method = self._decoded(spec.Basic.Deliver('ctag', 2 ** 40, True,
+                                                  'ex', 'rk'))
+        self.assertEqual((method.consumer_tag, method.delivery_tag,
+                          method.redelivered, method.exchange,
+                          method.routing_key),
+                         ('ctag', 2 ** 40, True, 'ex', 'rk'))
+
+    def test_deliver_not_redelivered(self):
+        self.assertFalse(self._decoded(spec.Basic.Deliver('ctag', 1, False,
+                                                          'ex',
+                                                          'rk')).redelivered)
+
+    def test_ack(self):
+        method = self._decoded(spec.Basic.Ack(7, True))
+        self.assertEqual((method.delivery_tag, method.multiple), (7, True))
+        self.assertFalse(self._decoded(spec.Basic.Ack(7, False)).multiple)
+
+    def test_matches_decode(self):
+        for method in (spec.Basic.Deliver('ctag', 1, True, 'ex', 'rk'),
+                       spec.Basic.Ack(3, True),
+                       spec.Queue.DeclareOk('queue', 1, 2),
+                       spec.Basic.Nack(4, True, False)):
+            encoded = ''.join(method.encode())
+            self.assertEqual(repr(method.from_bytes(encoded)),
+                             repr(method.__class__().decode(encoded)))
+
+    def test_init_not_called(self):
+        value = frame.Method(1, spec.Basic.Deliver('ctag', 1, False, 'ex',
+                                                   'rk')).marshal()
+        with mock.patch('pika.spec.Basic.Deliver.__init__') as init:
+            frame.decode_frame(value)
+        self.assertFalse(init.called)
+
+    def test_properties(self):
+        properties = spec.BasicProperties(content_type='text/plain',
+                                          delivery_mode=2)
+        value = frame.decode_frame(frame.Header(1, 10,
+                                                properties).marshal())[1]
+        self.assertEqual(value.body_size, 10)
+        self.assertEqual(repr(value.properties), repr(properties))
+
+    def test_body_at_offset(self):
+        data = frame.Heartbeat().marshal() + frame.Body(1, 'ab').marshal()
+        self.assertEqual(frame.decode_frame(data, 8)[1].fragment, 'ab')
@@ -0,0 +1,97 @@
+"""
+Tests for pika.lazy
+
+"""
+import os
+import subprocess
+import sys
+import types
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from pika import lazy
+
+
+class LazyModuleTests(unittest.TestCase):
+
+    def setUp(self):
+        self.module = types.ModuleType('package', 'The docstring')
+        self.module.value = 1
+        self.obj = lazy.LazyModule(self.module,
+                                   {'OrderedDict': 'collections',
+                                    'collections': 'collections',
+                                    'Missing': 'pika.missing_module'},
+                                   optional=('Missing',))
+
+    def test_attributes_copied(self):
+        self.assertEqual((self.obj.__name__, self.obj.__doc__,
+                          self.obj.value), ('package', 'The docstring', 1))
+
+    def test_name_imported_on_read(self):
+        import collections
+        self.assertIs(self.obj.OrderedDict, collections.OrderedDict)
+        self.assertIn('OrderedDict', self.obj.__dict__)
+
+    def test_module_imported_on_read(self):
+        import collections
+        self.assertIs(self.obj.collections, collections)
+
+    def test_optional_name_none(self):
+        self.assertIsNone(self.obj.Missing)
+
+    def test_required_import_error_raised(self):
+        obj = lazy.LazyModule(self.module, {'Missing': 'pika.missing_module'})
+        self.assertRaises(ImportError, getattr, obj, 'Missing')
+
+    def test_unknown_name(self):
+        self.assertRaises(AttributeError, getattr, self.obj, 'unknown')
+
+    def test_dir(self):
+        self.assertTrue(set(['OrderedDict', 'value']) <= set(dir(self.obj)))
+
+    def test_all(self):
+        self.assertEqual(self.obj.__all__,
+                         ['Missing', 'OrderedDict', 'collections'])
+
+
+class ImportTests(unittest.TestCase):
+
+    def _run(self, statement):
+        return subprocess.check_output(
+            [sys.executable, '-c', statement],
+            cwd=os.path.join(os.path.dirname(__file__), '..'))
+
+    def _loaded(self, statement):
+        return self._run('import sys; %s; '
+                         'print " ".join(sorted(sys.modules))' %
+                         statement).split()
+
+    def test_import_pika_loads_no_adapters_or_spec(self):
+        loaded = self._loaded('import pika')
+        for name in ('pika.spec', 'pika.connection', 'pika.adapters',
+                     'asyncore', 'ssl'):
+            self.assertNotIn(name, loaded)
+
+    def test_public_names(self):
+        loaded = self._loaded('import pika; pika.SelectConnection; '
+                              'pika.BasicProperties')
+        self.assertIn('pika.adapters.select_connection', loaded)
+        self.assertNotIn('pika.adapters.asyncore_connection', loaded)
+
+    def test_submodules(self):
+        self.assertEqual(self._run('import pika; '
+                                   'print pika.spec.Basic.__name__, '
+                                   'pika.exceptions.AMQPConnectionError.'
+                                   '__name__').split(),
+                         ['Basic', 'AMQPConnectionError'])
+
+    def test_import_star_exports(self):
+        exported = self._run('from pika import *; '
+                             'print " ".join(sorted(dir()))').split()
+        for name in ('BlockingConnection', 'BasicProperties', 'adapters',
+                     'amqp_object', 'callback', 'channel', 'connection',
+                     'credentials', 'data', 'exceptions', 'frame',
+                     'heartbeat', 'simplebuffer', 'spec', 'struct', 'utils'):
+            self.assertIn(name, exported)
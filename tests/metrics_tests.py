@@ -0,0 +1,197 @@
+"""
+Tests for pika.metrics and the counters kept by connections and channels
+
+"""
+import mock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from pika import callback
+from pika import channel
+from pika import connection
+from pika import frame
+from pika import metrics
+from pika import reconnection_strategies
+from pika import spec
+
+
+class HistogramTests(unittest.TestCase):
+
+    def test_buckets_are_cumulative(self):
+        histogram = metrics.Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.snapshot(),
+                         {'count': 4, 'sum': 2.65,
+                          'buckets': [(0.1, 2), (1.0, 3),
+                                      (float('inf'), 4)]})
+
+
+class ChannelMetricsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = mock.Mock(spec=connection.Connection)
+        self.conn.callbacks = callback.CallbackManager()
+        self.conn.reconnection = \
+            reconnection_strategies.NullReconnectionStrategy()
+        self.conn.publisher_confirms = True
+        self.conn.basic_nack = True
+        self.obj = channel.Channel(self.conn, 1)
+        self.obj.open()
+        self._receive(spec.Channel.OpenOk())
+
+    def _receive(self, method):
+        self.conn.callbacks.process(1, method, self.conn,
+                                    frame.Method(1, method))
+
+    def _publish(self, count):
+        for index in range(count):
+            self.obj.basic_publish('ex', 'rk', 'body')
+
+    def test_counts_messages(self):
+        self._publish(2)
+        self.obj.basic_ack(1)
+        self.obj.basic_nack(2)
+        self.obj.basic_reject(3)
+        values = self.obj.metrics.snapshot()
+        self.assertEqual((values['publishes'], values['acks'],
+                          values['nacks'], values['rejects']), (2, 1, 1, 1))
+
+    def test_counts_returns(self):
+        self.obj.deliver(frame.Method(1, spec.Basic.Return(312, 'NO_ROUTE',
+                                                           'ex', 'rk')))
+        self.obj.deliver(frame.Header(1, 0, spec.BasicProperties()))
+        self.assertEqual(self.obj.metrics.returns, 1)
+
+    def test_counts_streamed_deliveries(self):
+        on_end = mock.Mock()
+        self.obj.basic_consume(None, 'queue', consumer_tag='ctag',
+                               on_chunk=mock.Mock(), on_end=on_end)
+        for value in (frame.Method(1, spec.Basic.Deliver('ctag', 1)),
+                      frame.Header(1, 4, spec.BasicProperties()),
+                      frame.Body(1, 'body'),
+                      frame.Method(1, spec.Basic.Deliver('ctag', 2)),
+                      frame.Header(1, 0, spec.BasicProperties())):
+            self.obj.frame_dispatcher.process(value)
+        self.assertEqual((self.obj.metrics.deliveries, on_end.call_count),
+                         (2, 2))
+
+    def test_pending_frames_while_opening(self):
+        value = channel.Channel(self.conn, 2)
+        value.open()
+        value.basic_publish('ex', 'rk', 'body')
+        self.assertEqual(value.metrics.snapshot()['pending_frames'], 1)
+
+    def test_confirms_multiple(self):
+        self.obj.confirm_delivery(nowait=True)
+        self._publish(3)
+        self._receive(spec.Basic.Ack(2, True))
+        self.assertEqual((self.obj.metrics.confirms_acked,
+                          len(self.obj.metrics.unconfirmed)), (2, 1))
+
+    def test_confirms_out_of_order(self):
+        self.obj.confirm_delivery(nowait=True)
+        self._publish(3)
+        self._receive(spec.Basic.Nack(2))
+        self._receive(spec.Basic.Ack(1))
+        values = self.obj.metrics.snapshot()
+        self.assertEqual((values['confirms_acked'], values['confirms_nacked'],
+                          values['unconfirmed'],
+                          values['confirm_latency']['count']), (1, 1, 1, 2))
+
+    def test_confirm_of_all_messages(self):
+        self.obj.confirm_delivery(nowait=True)
+        self._publish(3)
+        self._receive(spec.Basic.Ack(0, True))
+        self.assertEqual(self.obj.metrics.confirms_acked, 3)
+
+
+class RPCMetricsTests(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch.object(connection.Connection, '_connect'):
+            self.conn = connection.Connection()
+        self.conn._set_connection_state(self.conn.CONNECTION_OPEN)
+        self.conn._flush_outbound = mock.Mock()
+        self.obj = self.conn.channel(mock.Mock())
+        self._receive(spec.Channel.OpenOk())
+
+    def _receive(self, method):
+        self.conn._process_frame(frame.Method(1, method))
+
+    def test_rpc_round_trips(self):
+        self.obj.queue_declare(mock.Mock(), 'queue')
+        self.obj.queue_bind(mock.Mock(), 'queue', 'ex', 'rk')
+        self._receive(spec.Queue.DeclareOk('queue'))
+        self.assertEqual(sorted(self.obj.metrics.rpc),
+                         ['Channel.Open', 'Queue.Declare'])
+        self._receive(spec.Queue.BindOk())
+        self.assertEqual(self.obj.metrics.rpc['Queue.Bind'].count, 1)
+
+    def test_concurrent_rpcs_of_same_method(self):
+        self.obj.queue_declare(mock.Mock(), 'one')
+        self.obj.queue_declare(mock.Mock(), 'two')
+        self.obj.exchange_declare(mock.Mock(), 'ex')
+        self._receive(spec.Queue.DeclareOk('one'))
+        self._receive(spec.Queue.DeclareOk('two'))
+        self._receive(spec.Exchange.DeclareOk())
+        self.assertEqual((self.obj.metrics.rpc['Queue.Declare'].count,
+                          self.obj.metrics.rpc['Exchange.Declare'].count,
+                          len(self.obj.metrics._rpcs)), (2, 1, 0))
+
+    def test_reply_matched_to_its_method(self):
+        self.obj.queue_declare(mock.Mock(), 'queue')
+        self.obj.exchange_declare(mock.Mock(), 'ex')
+        self._receive(spec.Exchange.DeclareOk())
+        self.assertEqual(sorted(self.obj.metrics.rpc),
+                         ['Channel.Open', 'Exchange.Declare'])
+        self.assertEqual([value[0] for value in self.obj.metrics._rpcs],
+                         ['Queue.Declare'])
+
+
+class ConnectionMetricsTests(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch.object(connection.Connection, '_connect'):
+            self.obj = connection.Connection()
+        self.obj._set_connection_state(self.obj.CONNECTION_OPEN)
+        self.obj._flush_outbound = mock.Mock()
+
+    def test_frames_received_by_type(self):
+        self.obj._process_frame = mock.Mock()
+        data = frame.Heartbeat().marshal()
+        self.obj._on_data_available(data * 2)
+        self.assertEqual((self.obj.metrics.frames_received[8],
+                          self.obj.metrics.bytes_received[8]),
+                         (2, len(data) * 2))
+
+    def test_frames_sent_by_type(self):
+        self.obj._send_frame(frame.Heartbeat())
+        self.assertEqual(self.obj.metrics.snapshot()['frames_sent'],
+                         {'protocol_header': 0, 'method': 0, 'header': 0,
+                          'body': 0, 'heartbeat': 1})
+
+    def test_counters_kept_across_reconnections(self):
+        self.obj._send_frame(frame.Heartbeat())
+        self.obj.endpoint = ('localhost', 5672)
+        with mock.patch.object(connection.Connection, '_connect'):
+            self.obj._reconnect()
+        self.assertEqual((self.obj.metrics.frames_sent[8],
+                          self.obj.metrics.reconnect_attempts), (1, 1))
+
+    def test_render_prometheus(self):
+        self.obj._send_frame(frame.Heartbeat())
+        self.obj._channels[1] = mock.Mock(
+            metrics=metrics.ChannelMetrics(None))
+        self.obj._channels[1].metrics.rpc_sent('Queue.Declare',
+                                               [spec.Queue.DeclareOk])
+        self.obj._channels[1].metrics.rpc_replied(spec.Queue.DeclareOk())
+        text = self.obj.metrics.render_prometheus()
+        self.assertIn('pika_frames_sent_total{type="heartbeat"} 1\n', text)
+        self.assertIn('# TYPE pika_channel_rpc_seconds histogram\n', text)
+        self.assertIn('pika_channel_rpc_seconds_bucket{channel="1",'
+                      'le="+Inf",method="Queue.Declare"} 1\n', text)
+        self.assertIn('pika_channel_rpc_seconds_count{channel="1",'
+                      'method="Queue.Declare"} 1\n', text)
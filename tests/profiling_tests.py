@@ -0,0 +1,119 @@
+"""
+Tests for pika.profiling and the phases timed by connections and channels
+
+"""
+import mock
+import socket
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from pika import connection
+from pika import frame
+from pika import profiling
+from pika import spec
+from pika.adapters import base_connection
+
+
+class Timer(object):
+    """A timer advanced by the tests"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class PhaseProfilerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.timer = Timer()
+        self.obj = profiling.PhaseProfiler(self.timer)
+
+    def test_nested_phase_not_counted_in_outer_phase(self):
+        dispatch = self.obj.enter(profiling.DISPATCH)
+        self.timer.now = 1.0
+        callback = self.obj.enter(profiling.CALLBACK)
+        self.timer.now = 3.0
+        self.obj.leave(callback)
+        self.timer.now = 3.5
+        self.obj.leave(dispatch)
+        self.timer.now = 4.0
+        self.assertEqual((self.obj.times[profiling.DISPATCH],
+                          self.obj.times[profiling.CALLBACK]), (1.5, 2.0))
+        self.assertEqual(self.obj.snapshot()['phases'][profiling.OTHER],
+                         {'seconds': 0.5, 'count': 0})
+
+    def test_stopped_time_not_elapsed(self):
+        self.timer.now = 1.0
+        self.obj.stop()
+        self.timer.now = 5.0
+        self.obj.start()
+        self.timer.now = 6.0
+        self.assertEqual(self.obj.elapsed, 2.0)
+
+    def test_report(self):
+        previous = self.obj.enter(profiling.DECODE)
+        self.timer.now = 0.5
+        self.obj.leave(previous)
+        self.timer.now = 1.0
+        lines = self.obj.report().splitlines()
+        self.assertEqual(lines[2].split(),
+                         ['decode', '0.500000', '50.0%', '1', '500000.0'])
+        self.assertEqual(lines[-1].split(), ['elapsed', '1.000000'])
+
+
+class ConnectionPhaseTests(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch.object(connection.Connection, '_connect'):
+            self.obj = connection.Connection()
+        self.obj._set_connection_state(self.obj.CONNECTION_OPEN)
+        self.obj._process_frame = mock.Mock()
+        self.profiler = self.obj.enable_profiler()
+
+    def test_frames_decoded_and_dispatched(self):
+        self.obj._on_data_available(frame.Heartbeat().marshal() * 2)
+        self.assertEqual((self.profiler.counts[profiling.DECODE],
+                          self.profiler.counts[profiling.DISPATCH],
+                          self.profiler.phase), (2, 2, None))
+        self.assertEqual(self.obj.metrics.frames_received[8], 2)
+
+    def test_partial_frame_decoded(self):
+        self.obj._on_data_available(frame.Heartbeat().marshal()[:3])
+        self.assertEqual((self.profiler.counts[profiling.DECODE],
+                          self.profiler.counts[profiling.DISPATCH]), (1, 0))
+
+    def test_disable(self):
+        self.assertIs(self.obj.disable_profiler(), self.profiler)
+        self.obj._on_data_available(frame.Heartbeat().marshal())
+        self.assertEqual(self.profiler.counts[profiling.DECODE], 0)
+
+
+class AdapterPhaseTests(unittest.TestCase):
+
+    def setUp(self):
+        self.obj = base_connection.BaseConnection.__new__(
+            base_connection.BaseConnection)
+        self.obj.params = connection.ConnectionParameters()
+        self.obj.socket = mock.Mock()
+        self.obj._capture = None
+        self.profiler = self.obj.enable_profiler()
+
+    def test_read_timed(self):
+        self.obj._read_socket = mock.Mock(return_value='abc')
+        self.obj._on_data_available = mock.Mock()
+        self.obj._handle_read()
+        self.assertEqual((self.profiler.counts[profiling.READ],
+                          self.profiler.phase), (1, None))
+
+    def test_write_timed_on_error(self):
+        self.obj.outbound_buffer = mock.Mock(size=3)
+        self.obj.outbound_buffer.read.return_value = 'abc'
+        self.obj.socket.send.side_effect = socket.error(32, 'Broken pipe')
+        self.obj._handle_error = mock.Mock()
+        self.obj._handle_write()
+        self.assertEqual((self.profiler.counts[profiling.WRITE],
+                          self.profiler.phase), (1, None))
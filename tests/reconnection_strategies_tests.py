@@ -0,0 +1,238 @@
+"""
+Tests for pika.reconnection_strategies and channel topology recovery
+
+"""
+import mock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from pika import callback
+from pika import channel
+from pika import connection
+from pika import exceptions
+from pika import frame
+from pika import reconnection_strategies
+from pika import spec
+
+
+class NullReconnectionStrategyTests(unittest.TestCase):
+
+    def test_can_reconnect_false(self):
+        obj = reconnection_strategies.NullReconnectionStrategy()
+        self.assertFalse(obj.can_reconnect)
+
+    def test_on_connection_closed_does_not_schedule(self):
+        conn = mock.Mock(spec=connection.Connection)
+        obj = reconnection_strategies.NullReconnectionStrategy()
+        obj.on_connection_closed(conn)
+        self.assertFalse(conn.method_calls)
+
+
+class SimpleReconnectionStrategyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = mock.Mock()
+        self.obj = reconnection_strategies.SimpleReconnectionStrategy(
+            initial_delay=1, max_delay=8, multiplier=2, jitter=0,
+            max_attempts=3)
+
+    def test_can_reconnect_true(self):
+        self.assertTrue(self.obj.can_reconnect)
+
+    def test_can_reconnect_unlimited(self):
+        obj = reconnection_strategies.SimpleReconnectionStrategy()
+        obj.attempts = 1000
+        self.assertTrue(obj.can_reconnect)
+
+    def test_next_delay_backs_off(self):
+        delays = [self.obj.next_delay() for i in range(5)]
+        self.assertEqual(delays, [1, 2, 4, 8, 8])
+
+    def test_next_delay_jitter_bounds(self):
+        obj = reconnection_strategies.SimpleReconnectionStrategy(
+            initial_delay=1, jitter=0.5)
+        for i in range(50):
+            obj.current_delay = 1
+            delay = obj.next_delay()
+            self.assertTrue(1 <= delay <= 1.5)
+
+    def test_on_connection_closed_schedules_reconnect(self):
+        self.obj.on_connection_closed(self.conn)
+        self.conn._schedule_reconnect.assert_called_once_with(1)
+
+    def test_on_connection_closed_increments_attempts(self):
+        self.obj.on_connection_closed(self.conn)
+        self.obj.on_connection_closed(self.conn)
+        self.assertEqual(self.obj.attempts, 2)
+
+    def test_on_connection_closed_gives_up(self):
+        for i in range(4):
+            self.obj.on_connection_closed(self.conn)
+        self.assertEqual(self.conn._schedule_reconnect.call_count, 3)
+        self.assertFalse(self.obj.can_reconnect)
+
+    def test_on_connection_open_resets_backoff(self):
+        self.obj.on_connection_closed(self.conn)
+        self.obj.on_connection_closed(self.conn)
+        self.obj.on_connection_open(self.conn)
+        self.assertEqual(self.obj.attempts, 0)
+        self.assertEqual(self.obj.current_delay, 1)
+
+    def test_on_connection_open_records_reconnect(self):
+        self.obj.on_connection_closed(self.conn)
+        self.obj.on_connection_open(self.conn)
+        self.assertEqual(self.obj.reconnects, 1)
+        self.assertIsNotNone(self.obj.last_reconnect_time)
+
+    def test_on_connection_open_first_connect_not_counted(self):
+        self.obj.on_connection_open(self.conn)
+        self.assertEqual(self.obj.reconnects, 0)
+
+    def test_on_recovery_complete_records_time(self):
+        self.obj.on_connection_closed(self.conn)
+        self.obj.on_connection_open(self.conn)
+        self.obj.on_recovery_complete(self.conn)
+        self.assertEqual(len(self.obj.recovery_times), 1)
+        self.assertIsNone(self.obj.disconnected_at)
+
+
+class ChannelTopologyRecordingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = mock.Mock(spec=connection.Connection)
+        self.conn.callbacks = callback.CallbackManager()
+        self.conn.reconnection = \
+            reconnection_strategies.SimpleReconnectionStrategy()
+        self.conn.publisher_confirms = True
+        self.conn.basic_nack = True
+        self.obj = channel.Channel(self.conn, 1)
+        self.obj.open()
+        self.obj._on_open_ok(None)
+
+    def _types(self):
+        return [record.__class__ for record in self.obj._topology]
+
+    def test_not_recorded_without_reconnection(self):
+        self.conn.reconnection = \
+            reconnection_strategies.NullReconnectionStrategy()
+        self.obj.exchange_declare(exchange='ex')
+        self.assertEqual(self.obj._topology, [])
+
+    def test_records_declares_and_bindings(self):
+        self.obj.exchange_declare(exchange='ex')
+        self.obj.queue_declare(None, 'q')
+        self.obj.queue_bind(None, 'q', 'ex', 'rk')
+        self.assertEqual(self._types(), [spec.Exchange.Declare,
+                                         spec.Queue.Declare,
+                                         spec.Queue.Bind])
+
+    def test_passive_declare_not_recorded(self):
+        self.obj.queue_declare(None, 'q', passive=True)
+        self.obj.exchange_declare(exchange='ex', passive=True)
+        self.assertEqual(self.obj._topology, [])
+
+    def test_redeclare_replaces_record(self):
+        self.obj.queue_declare(None, 'q')
+        self.obj.queue_declare(None, 'q', durable=True)
+        self.assertEqual(len(self.obj._topology), 1)
+        self.assertTrue(self.obj._topology[0].durable)
+
+    def test_qos_replaces_previous(self):
+        self.obj.basic_qos(prefetch_count=1)
+        self.obj.basic_qos(prefetch_count=10)
+        self.assertEqual(len(self.obj._topology), 1)
+        self.assertEqual(self.obj._topology[0].prefetch_count, 10)
+
+    def test_queue_delete_forgets_queue(self):
+        self.obj.exchange_declare(exchange='ex')
+        self.obj.queue_declare(None, 'q')
+        self.obj.queue_bind(None, 'q', 'ex', 'rk')
+        self.obj.basic_consume(mock.Mock(), 'q')
+        self.obj.queue_delete(queue='q')
+        self.assertEqual(self._types(), [spec.Exchange.Declare])
+
+    def test_exchange_delete_forgets_bindings(self):
+        self.obj.exchange_declare(exchange='ex')
+        self.obj.queue_declare(None, 'q')
+        self.obj.queue_bind(None, 'q', 'ex', 'rk')
+        self.obj.exchange_delete(exchange='ex')
+        self.assertEqual(self._types(), [spec.Queue.Declare])
+
+    def test_queue_unbind_forgets_binding(self):
+        self.obj.queue_bind(None, 'q', 'ex', 'rk')
+        self.obj.queue_bind(None, 'q', 'ex', 'other')
+        self.obj.queue_unbind(queue='q', exchange='ex', routing_key='rk')
+        self.assertEqual(len(self.obj._topology), 1)
+        self.assertEqual(self.obj._topology[0].routing_key, 'other')
+
+    def test_basic_cancel_forgets_consumer(self):
+        consumer_tag = self.obj.basic_consume(mock.Mock(), 'q')
+        self.obj.basic_cancel(consumer_tag=consumer_tag)
+        self.assertEqual(self.obj._topology, [])
+
+    def test_server_named_queue_follows_new_name(self):
+        self.obj.queue_declare(None, '')
+        self.obj._on_queue_declare_ok(
+            frame.Method(1, spec.Queue.DeclareOk('amq.gen-1')))
+        self.obj.queue_bind(None, 'amq.gen-1', 'ex', 'rk')
+        self.obj.basic_consume(mock.Mock(), 'amq.gen-1')
+        self.obj.on_remote_close(None)
+        self.obj._recover()
+        self.obj._on_open_ok(None)
+        self.obj._on_queue_declare_ok(
+            frame.Method(1, spec.Queue.DeclareOk('amq.gen-2')))
+        self.assertEqual([record.queue for record in self.obj._topology],
+                         ['', 'amq.gen-2', 'amq.gen-2'])
+
+    def test_on_remote_close_marks_recovering(self):
+        self.obj.on_remote_close(None)
+        self.assertTrue(self.obj.is_closed)
+        self.assertTrue(self.obj._recovering)
+
+    def test_replay_waits_for_replies(self):
+        self.obj.exchange_declare(exchange='ex')
+        self.obj.queue_declare(None, 'q')
+        self.obj.on_remote_close(None)
+        self.obj._recover()
+        self.conn._send_method.reset_mock()
+        self.obj._on_open_ok(None)
+        self.assertEqual(self.conn._send_method.call_count, 1)
+        self.obj._replay_next()
+        self.assertEqual(self.conn._send_method.call_count, 2)
+        self.assertFalse(self.conn._on_channel_recovered.called)
+        self.obj._replay_next()
+        self.conn._on_channel_recovered.assert_called_once_with(self.obj)
+
+    def test_replay_does_not_call_on_open_callback(self):
+        on_open = mock.Mock()
+        self.obj._on_open_callback = on_open
+        self.obj.on_remote_close(None)
+        self.obj._recover()
+        self.obj._on_open_ok(None)
+        self.assertFalse(on_open.called)
+        self.conn._on_channel_recovered.assert_called_once_with(self.obj)
+
+
+class ReconnectGiveUpTests(unittest.TestCase):
+
+    def setUp(self):
+        strategy = reconnection_strategies.SimpleReconnectionStrategy(
+            max_attempts=1)
+        with mock.patch.object(connection.Connection, '_connect'):
+            self.obj = connection.Connection(
+                reconnection_strategy=strategy)
+        self.obj.endpoint = ('localhost', 5672)
+        self.obj._schedule_reconnect = mock.Mock()
+        strategy.on_connection_closed(self.obj)
+        self.on_close = mock.Mock()
+        self.obj.add_on_close_callback(self.on_close)
+
+    def test_failure_reported_to_close_callbacks(self):
+        with mock.patch.object(connection.Connection, '_connect',
+                               side_effect=exceptions.AMQPConnectionError(1)):
+            self.obj._reconnect()
+        self.on_close.assert_called_once_with(self.obj)
+        self.assertTrue(self.obj.is_closed)
+        self.assertIn('Gave up reconnecting', self.obj.closing[1])
@@ -0,0 +1,60 @@
+"""
+Tests for pika.resolver
+
+"""
+import socket
+import mock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from pika import resolver
+
+ADDRINFO = [(socket.AF_INET6, socket.SOCK_STREAM, 6, '', ('::1', 5672, 0, 0)),
+            (socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.1', 5672))]
+
+
+class ResolverTests(unittest.TestCase):
+
+    def setUp(self):
+        self.obj = resolver.Resolver(ttl=30)
+
+    @mock.patch('socket.getaddrinfo', return_value=ADDRINFO)
+    def test_resolve_returns_addresses(self, getaddrinfo):
+        self.assertEqual(self.obj.resolve('localhost', 5672),
+                         [(socket.AF_INET6, socket.SOCK_STREAM, 6,
+                           ('::1', 5672, 0, 0)),
+                          (socket.AF_INET, socket.SOCK_STREAM, 6,
+                           ('127.0.0.1', 5672))])
+
+    @mock.patch('socket.getaddrinfo', return_value=ADDRINFO)
+    def test_resolve_is_cached(self, getaddrinfo):
+        self.obj.resolve('localhost', 5672)
+        self.obj.resolve('localhost', 5672)
+        self.assertEqual(getaddrinfo.call_count, 1)
+
+    @mock.patch('socket.getaddrinfo', return_value=ADDRINFO)
+    def test_resolve_expires(self, getaddrinfo):
+        self.obj.ttl = 0
+        self.obj.resolve('localhost', 5672)
+        self.obj.resolve('localhost', 5672)
+        self.assertEqual(getaddrinfo.call_count, 2)
+
+    @mock.patch('socket.getaddrinfo', return_value=ADDRINFO)
+    def test_resolve_failure_uses_stale_addresses(self, getaddrinfo):
+        self.obj.ttl = 0
+        addresses = self.obj.resolve('localhost', 5672)
+        getaddrinfo.side_effect = socket.gaierror
+        self.assertEqual(self.obj.resolve('localhost', 5672), addresses)
+
+    @mock.patch('socket.getaddrinfo', side_effect=socket.gaierror)
+    def test_resolve_failure_raises(self, getaddrinfo):
+        self.assertRaises(socket.gaierror, self.obj.resolve, 'nowhere', 5672)
+
+    def test_interleave_alternates_families(self):
+        candidates = [('a', (socket.AF_INET6, 1)), ('b', (socket.AF_INET6, 1)),
+                      ('c', (socket.AF_INET, 1)), ('d', (socket.AF_INET, 1)),
+                      ('e', (socket.AF_INET, 1))]
+        self.assertEqual([c[0] for c in resolver.interleave(candidates)],
+                         ['a', 'c', 'b', 'd', 'e'])
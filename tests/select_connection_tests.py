@@ -0,0 +1,109 @@
+"""
+Tests for pika.adapters.select_connection auto-cork and tick callbacks
+
+"""
+import mock
+import socket
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from pika import connection
+from pika import frame
+from pika.adapters import select_connection
+
+
+class TickCallbackTests(unittest.TestCase):
+
+    def setUp(self):
+        self.obj = select_connection.SelectPoller()
+
+    def test_tick_callbacks_called_once(self):
+        handler = mock.Mock()
+        self.obj.add_tick_callback(handler)
+        self.obj.process_tick_callbacks()
+        self.obj.process_tick_callbacks()
+        handler.assert_called_once_with()
+
+    def test_callbacks_added_while_processing_wait(self):
+        later = mock.Mock()
+        self.obj.add_tick_callback(lambda: self.obj.add_tick_callback(later))
+        self.obj.process_tick_callbacks()
+        self.assertFalse(later.called)
+        self.obj.process_tick_callbacks()
+        later.assert_called_once_with()
+
+    def test_poll_timeout_zero_with_tick_callbacks(self):
+        self.obj.add_tick_callback(mock.Mock())
+        self.assertEqual(self.obj._poll_timeout(), 0)
+
+
+class IOLoopTests(unittest.TestCase):
+
+    def test_state_manager_accepted(self):
+        ioloop = select_connection.IOLoop(mock.Mock())
+        self.assertIsNotNone(ioloop.poller)
+
+
+class AutoCorkTests(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch.object(select_connection.SelectConnection,
+                               '_connect'):
+            self.obj = select_connection.SelectConnection(
+                connection.ConnectionParameters(), auto_cork=True,
+                custom_ioloop=mock.Mock())
+        self.obj.ioloop = self.obj._ioloop
+        self.obj.socket = mock.Mock()
+        self.obj.socket.send.side_effect = len
+        self.obj.socket.fileno.return_value = 5
+        self.obj._set_connection_state(self.obj.CONNECTION_OPEN)
+
+    def _send(self):
+        self.obj._send_frame(frame.Heartbeat())
+
+    def test_frames_held_until_end_of_tick(self):
+        self._send()
+        self._send()
+        self.assertFalse(self.obj.socket.send.called)
+        self.obj.ioloop.add_tick_callback.assert_called_once_with(
+            self.obj._write_corked)
+
+    def test_end_of_tick_writes_once(self):
+        self._send()
+        self._send()
+        self.obj._write_corked()
+        self.obj.socket.send.assert_called_once_with(
+            frame.Heartbeat().marshal() * 2)
+        self.assertFalse(self.obj.ioloop.update_handler.called)
+
+    def test_max_delay_writes_early(self):
+        self.obj.max_cork_delay = 0
+        self._send()
+        self._send()
+        self.assertEqual(self.obj.socket.send.call_count, 1)
+
+    def test_partial_write_waits_for_write_event(self):
+        self.obj.socket.send.side_effect = lambda data: 1
+        self._send()
+        self.obj._write_corked()
+        self.obj.ioloop.update_handler.assert_called_once_with(
+            5, self.obj.READ | self.obj.ERROR | self.obj.WRITE)
+
+    def test_no_backpressure_while_corked(self):
+        callback = mock.Mock()
+        self.obj.add_backpressure_callback(callback)
+        self.obj.set_backpressure_multiplier(1)
+        for i in range(5):
+            self._send()
+        self.assertFalse(callback.called)
+
+    @unittest.skipUnless(hasattr(socket, 'TCP_CORK'), 'No TCP_CORK')
+    def test_tcp_cork(self):
+        self.obj.tcp_cork = True
+        self._send()
+        self.obj._write_corked()
+        self.assertEqual(self.obj.socket.setsockopt.call_args_list,
+                         [mock.call(socket.SOL_TCP, socket.TCP_CORK, 1),
+                          mock.call(socket.SOL_TCP, socket.TCP_CORK, 0)])
@@ -0,0 +1,488 @@
+"""A minimal in-process AMQP 0-9-1 broker used to exercise the connection
+adapters without a running RabbitMQ. It speaks just enough of the protocol
+for the connection handshake, exchange and queue declaration, publishing,
+consuming, Basic.Get, acknowledgements, publisher confirms and QoS. Frames
+are encoded and decoded with pika.frame and pika.spec so the stub exercises
+the same codec the client does.
+
+It is not a message broker: there is no persistence, topic matching is
+treated as direct routing and the stub is only as careful with protocol
+errors as the tests need it to be.
+
+Run it on its own to serve clients from another process, such as the
+benchmarks, printing the port it listens on:
+
+    python tests/stub_broker.py [port]
+
+"""
+import collections
+import errno
+import logging
+import os
+import select
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pika import frame
+from pika import spec
+
+LOGGER = logging.getLogger(__name__)
+
+SERVER_PROPERTIES = {'product': 'Pika Stub Broker',
+                     'version': '0.0',
+                     'capabilities': {'basic.nack': True,
+                                      'consumer_cancel_notify': True,
+                                      'exchange_exchange_bindings': True,
+                                      'publisher_confirms': True}}
+
+
+class Message(object):
+    """A message held in a stub queue"""
+    __slots__ = ('exchange', 'routing_key', 'properties', 'body',
+                 'redelivered')
+
+    def __init__(self, exchange, routing_key, properties, body):
+        self.exchange = exchange
+        self.routing_key = routing_key
+        self.properties = properties
+        self.body = body
+        self.redelivered = False
+
+
+class Queue(object):
+    """A named stub queue with its round-robin list of consumers"""
+
+    def __init__(self, name):
+        self.name = name
+        self.messages = collections.deque()
+        self.consumers = list()
+        self.next_consumer = 0
+
+
+class ChannelState(object):
+    """Per channel state of a client connection"""
+
+    def __init__(self, number):
+        self.number = number
+        self.prefetch_count = 0
+        self.confirming = False
+        self.publish_seq = 0
+        self.delivery_tag = 0
+        self.unacked = collections.OrderedDict()
+        self.consumers = dict()
+        self.method = None
+        self.header = None
+        self.body = list()
+        self.received = 0
+
+    @property
+    def has_capacity(self):
+        return (not self.prefetch_count or
+                len(self.unacked) < self.prefetch_count)
+
+
+class ClientConnection(object):
+    """Server side of a single client connection"""
+
+    def __init__(self, broker, sock):
+        self.broker = broker
+        self.socket = sock
+        self.inbound = ''
+        self.outbound = list()
+        self.channels = dict()
+        self.frame_max = spec.FRAME_MAX_SIZE
+        self.closed = False
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def send(self, channel_number, method, properties=None, body=None):
+        self.outbound.append(frame.Method(channel_number, method).marshal())
+        if properties is not None:
+            self.outbound.append(frame.Header(channel_number, len(body),
+                                              properties).marshal())
+            limit = self.frame_max - 8
+            for offset in xrange(0, len(body), limit):
+                self.outbound.append(frame.Body(channel_number,
+                                                body[offset:offset +
+                                                     limit]).marshal())
+
+    def on_data(self, data):
+        self.inbound += data
+        offset = 0
+        while not self.closed:
+            if self.inbound[offset:offset + 4] == 'AMQP':
+                if len(self.inbound) - offset < 8:
+                    break
+                offset += 8
+                self.send(0, spec.Connection.Start(
+                    server_properties=SERVER_PROPERTIES))
+                continue
+            consumed, value = frame.decode_frame(self.inbound, offset)
+            if not value:
+                break
+            offset += consumed
+            self.on_frame(value)
+        self.inbound = self.inbound[offset:]
+
+    def on_frame(self, value):
+        if isinstance(value, frame.Heartbeat):
+            return
+        if value.channel_number == 0:
+            return self.on_connection_method(value.method)
+        channel = self.channels.get(value.channel_number)
+        if isinstance(value, frame.Method):
+            if isinstance(value.method, spec.Channel.Open):
+                self.channels[value.channel_number] = \
+                    ChannelState(value.channel_number)
+                return self.send(value.channel_number, spec.Channel.OpenOk())
+            if channel is None:
+                return
+            if isinstance(value.method, spec.Basic.Publish):
+                channel.method = value.method
+                channel.body = list()
+                channel.received = 0
+                return
+            return self.on_channel_method(channel, value.method)
+        if channel is None:
+            return
+        if channel.method is None:
+            # Content without a Basic.Publish, such as the rest of a message
+            # published before the channel was closed and opened again
+            return
+        if isinstance(value, frame.Header):
+            channel.header = value
+            if not value.body_size:
+                self.on_content(channel)
+        elif isinstance(value, frame.Body) and channel.header:
+            channel.body.append(value.fragment)
+            channel.received += len(value.fragment)
+            if channel.received >= channel.header.body_size:
+                self.on_content(channel)
+
+    def on_connection_method(self, method):
+        if isinstance(method, spec.Connection.StartOk):
+            self.send(0, spec.Connection.Tune(self.broker.channel_max,
+                                              self.broker.frame_max,
+                                              self.broker.heartbeat))
+        elif isinstance(method, spec.Connection.TuneOk):
+            self.frame_max = method.frame_max or self.frame_max
+        elif isinstance(method, spec.Connection.Open):
+            self.send(0, spec.Connection.OpenOk())
+        elif isinstance(method, spec.Connection.Close):
+            self.send(0, spec.Connection.CloseOk())
+            self.closed = True
+        elif isinstance(method, spec.Connection.CloseOk):
+            self.closed = True
+
+    def on_channel_method(self, channel, method):
+        broker = self.broker
+        number = channel.number
+        reply = None
+        if isinstance(method, spec.Channel.Close):
+            self.release_channel(channel)
+            reply = spec.Channel.CloseOk()
+        elif isinstance(method, spec.Channel.CloseOk):
+            self.release_channel(channel)
+        elif isinstance(method, spec.Exchange.Declare):
+            broker.exchanges.setdefault(method.exchange, method.type)
+            reply = spec.Exchange.DeclareOk()
+        elif isinstance(method, spec.Exchange.Delete):
+            broker.exchanges.pop(method.exchange, None)
+            reply = spec.Exchange.DeleteOk()
+        elif isinstance(method, spec.Exchange.Bind):
+            reply = spec.Exchange.BindOk()
+        elif isinstance(method, spec.Exchange.Unbind):
+            reply = spec.Exchange.UnbindOk()
+        elif isinstance(method, spec.Queue.Declare):
+            queue = broker.declare_queue(method.queue)
+            reply = spec.Queue.DeclareOk(queue.name, len(queue.messages),
+                                         len(queue.consumers))
+        elif isinstance(method, spec.Queue.Bind):
+            broker.bindings.add((method.exchange, method.routing_key,
+                                 method.queue))
+            reply = spec.Queue.BindOk()
+        elif isinstance(method, spec.Queue.Unbind):
+            broker.bindings.discard((method.exchange, method.routing_key,
+                                     method.queue))
+            reply = spec.Queue.UnbindOk()
+        elif isinstance(method, spec.Queue.Purge):
+            queue = broker.declare_queue(method.queue)
+            count = len(queue.messages)
+            queue.messages.clear()
+            reply = spec.Queue.PurgeOk(count)
+        elif isinstance(method, spec.Queue.Delete):
+            queue = broker.queues.pop(method.queue, None)
+            reply = spec.Queue.DeleteOk(len(queue.messages) if queue else 0)
+        elif isinstance(method, spec.Basic.Qos):
+            channel.prefetch_count = method.prefetch_count
+            reply = spec.Basic.QosOk()
+        elif isinstance(method, spec.Confirm.Select):
+            channel.confirming = True
+            reply = spec.Confirm.SelectOk()
+        elif isinstance(method, spec.Basic.Consume):
+            queue = broker.declare_queue(method.queue)
+            tag = method.consumer_tag or 'stub.ctag%i' % broker.next_id()
+            channel.consumers[tag] = (queue, method.no_ack)
+            queue.consumers.append((self, channel, tag))
+            reply = spec.Basic.ConsumeOk(tag)
+        elif isinstance(method, spec.Basic.Cancel):
+            self.cancel(channel, method.consumer_tag)
+            reply = spec.Basic.CancelOk(method.consumer_tag)
+        elif isinstance(method, spec.Basic.Get):
+            queue = broker.declare_queue(method.queue)
+            if not queue.messages:
+                reply = spec.Basic.GetEmpty()
+            else:
+                message = queue.messages.popleft()
+                channel.delivery_tag += 1
+                if not method.no_ack:
+                    channel.unacked[channel.delivery_tag] = (queue, message)
+                self.send(number,
+                          spec.Basic.GetOk(channel.delivery_tag,
+                                           message.redelivered,
+                                           message.exchange,
+                                           message.routing_key,
+                                           len(queue.messages)),
+                          message.properties, message.body)
+        elif isinstance(method, spec.Basic.Ack):
+            self.settle(channel, method.delivery_tag, method.multiple, None)
+        elif isinstance(method, spec.Basic.Nack):
+            self.settle(channel, method.delivery_tag, method.multiple,
+                        method.requeue)
+        elif isinstance(method, spec.Basic.Reject):
+            self.settle(channel, method.delivery_tag, False, method.requeue)
+        if reply is not None and not getattr(method, 'nowait', False):
+            self.send(number, reply)
+        broker.dispatch()
+
+    def on_content(self, channel):
+        method = channel.method
+        message = Message(method.exchange, method.routing_key,
+                          channel.header.properties, ''.join(channel.body))
+        channel.method = channel.header = None
+        channel.body = list()
+        for queue in self.broker.route(method.exchange, method.routing_key):
+            queue.messages.append(message)
+        if channel.confirming:
+            channel.publish_seq += 1
+            self.send(channel.number, spec.Basic.Ack(channel.publish_seq))
+        self.broker.messages_published += 1
+        self.broker.dispatch()
+
+    def cancel(self, channel, consumer_tag):
+        queue, no_ack = channel.consumers.pop(consumer_tag, (None, None))
+        if queue:
+            queue.consumers = [consumer for consumer in queue.consumers
+                               if consumer[2] != consumer_tag]
+
+    def settle(self, channel, delivery_tag, multiple, requeue):
+        if multiple:
+            tags = [tag for tag in channel.unacked if tag <= delivery_tag]
+        else:
+            tags = [delivery_tag] if delivery_tag in channel.unacked else []
+        for tag in tags:
+            queue, message = channel.unacked.pop(tag)
+            if requeue:
+                message.redelivered = True
+                queue.messages.appendleft(message)
+            self.broker.messages_settled += 1
+
+    def release_channel(self, channel):
+        for tag in channel.consumers.keys():
+            self.cancel(channel, tag)
+        for queue, message in channel.unacked.values():
+            message.redelivered = True
+            queue.messages.appendleft(message)
+        channel.unacked.clear()
+        self.channels.pop(channel.number, None)
+
+    def release(self):
+        for channel in self.channels.values():
+            self.release_channel(channel)
+
+
+class StubBroker(object):
+    """Listens on a local port and serves AMQP 0-9-1 clients from a
+    background thread. Use start() and stop(), or the context manager.
+
+    """
+    POLL_TIMEOUT = 0.05
+
+    def __init__(self, host='127.0.0.1', port=0, frame_max=131072,
+                 channel_max=0, heartbeat=0):
+        self.host = host
+        self.frame_max = frame_max
+        self.channel_max = channel_max
+        self.heartbeat = heartbeat
+        self.exchanges = {'': 'direct', 'amq.direct': 'direct',
+                          'amq.fanout': 'fanout', 'amq.topic': 'topic'}
+        self.queues = dict()
+        self.bindings = set()
+        self.clients = list()
+        self.messages_published = 0
+        self.messages_settled = 0
+        self._id = 0
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind((host, port))
+        self._listener.listen(64)
+        self.port = self._listener.getsockname()[1]
+        self._running = False
+        self._disconnect = False
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def next_id(self):
+        self._id += 1
+        return self._id
+
+    def declare_queue(self, name):
+        if not name:
+            name = 'stub.gen-%i' % self.next_id()
+        if name not in self.queues:
+            self.queues[name] = Queue(name)
+        return self.queues[name]
+
+    def route(self, exchange, routing_key):
+        if not exchange:
+            queue = self.queues.get(routing_key)
+            return [queue] if queue else []
+        fanout = self.exchanges.get(exchange) == 'fanout'
+        names = set(queue for source, key, queue in self.bindings
+                    if source == exchange and (fanout or key == routing_key))
+        return [self.queues[name] for name in names if name in self.queues]
+
+    def dispatch(self):
+        for queue in self.queues.values():
+            while queue.messages and queue.consumers:
+                delivered = False
+                for offset in xrange(len(queue.consumers)):
+                    index = (queue.next_consumer + offset) % \
+                            len(queue.consumers)
+                    client, channel, tag = queue.consumers[index]
+                    no_ack = channel.consumers[tag][1]
+                    if not no_ack and not channel.has_capacity:
+                        continue
+                    message = queue.messages.popleft()
+                    channel.delivery_tag += 1
+                    if not no_ack:
+                        channel.unacked[channel.delivery_tag] = (queue,
+                                                                 message)
+                    client.send(channel.number,
+                                spec.Basic.Deliver(tag, channel.delivery_tag,
+                                                   message.redelivered,
+                                                   message.exchange,
+                                                   message.routing_key),
+                                message.properties, message.body)
+                    queue.next_consumer = index + 1
+                    delivered = True
+                    break
+                if not delivered:
+                    break
+
+    def disconnect_clients(self):
+        """Drop every client socket without a Connection.Close, as a network
+        failure or a broker crash would.
+
+        """
+        self._disconnect = True
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join()
+        for client in list(self.clients):
+            self._drop(client)
+        self._listener.close()
+
+    def _drop(self, client):
+        client.release()
+        try:
+            client.socket.close()
+        except socket.error:
+            pass
+        if client in self.clients:
+            self.clients.remove(client)
+
+    def _run(self):
+        while self._running:
+            if self._disconnect:
+                self._disconnect = False
+                for client in list(self.clients):
+                    self._drop(client)
+            writers = [client for client in self.clients if client.outbound]
+            try:
+                readable, writable, _unused = \
+                    select.select([self._listener] + self.clients, writers,
+                                  [], self.POLL_TIMEOUT)
+            except (select.error, socket.error, ValueError):
+                continue
+            for client in writable:
+                self._write(client)
+            for source in readable:
+                if source is self._listener:
+                    sock, address_unused = self._listener.accept()
+                    sock.setblocking(0)
+                    # As RabbitMQ does, so that replies are not held back
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    self.clients.append(ClientConnection(self, sock))
+                    continue
+                try:
+                    data = source.socket.recv(262144)
+                except socket.error, error:
+                    if error.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+                        continue
+                    data = ''
+                if not data:
+                    self._drop(source)
+                    continue
+                source.on_data(data)
+                self._write(source)
+                if source.closed and not source.outbound:
+                    self._drop(source)
+
+    def _write(self, client):
+        while client.outbound:
+            data = ''.join(client.outbound)
+            try:
+                sent = client.socket.send(data)
+            except socket.error, error:
+                if error.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    client.outbound = [data]
+                    return
+                return self._drop(client)
+            client.outbound = [data[sent:]] if sent < len(data) else []
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    broker = StubBroker(port=int(sys.argv[1]) if len(sys.argv) > 1 else 0)
+    broker.start()
+    print broker.port
+    sys.stdout.flush()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        broker.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+End-to-end tests of BlockingConnection against the stub broker
+
+"""
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import pika
+from pika import spec
+
+from stub_broker import StubBroker
+
+
+class BlockingConnectionTests(unittest.TestCase):
+
+    CONSUME_TIMEOUT = 5
+
+    @classmethod
+    def setUpClass(cls):
+        cls.broker = StubBroker()
+        cls.broker.start()
+        cls.connection = pika.BlockingConnection(
+            pika.ConnectionParameters('127.0.0.1', cls.broker.port))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.connection.close()
+        cls.broker.stop()
+
+    def setUp(self):
+        self.channel = self.connection.channel()
+        self.queue = 'test.%s' % self._testMethodName
+        self.channel.queue_declare(queue=self.queue)
+
+    def tearDown(self):
+        self.channel.queue_delete(queue=self.queue)
+        self.channel.close()
+
+    def _consume(self, on_message):
+        """Consume from the test queue until on_message stops consuming, or
+        for at most CONSUME_TIMEOUT seconds.
+
+        """
+        timeout_id = self.connection.add_timeout(self.CONSUME_TIMEOUT,
+                                                 self.channel.stop_consuming)
+        self.channel.basic_consume(on_message, self.queue)
+        self.channel.start_consuming()
+        self.connection.remove_timeout(timeout_id)
+
+    def test_queue_declare_ok(self):
+        method = self.channel.queue_declare(queue=self.queue, passive=True)
+        self.assertIsInstance(method.method, spec.Queue.DeclareOk)
+
+    def test_consume_delivers_messages(self):
+        for index in range(3):
+            self.channel.basic_publish('', self.queue, 'message %i' % index)
+        received = list()
+
+        def on_message(channel, method, properties, body):
+            received.append(body)
+            channel.basic_ack(method.delivery_tag)
+            if len(received) == 3:
+                channel.stop_consuming()
+
+        self._consume(on_message)
+        self.assertEqual(received, ['message 0', 'message 1', 'message 2'])
+
+    def test_consume_acks_deliveries_received_with_consume_ok(self):
+        self.channel.basic_qos(prefetch_count=1)
+        for index in range(3):
+            self.channel.basic_publish('', self.queue, 'message %i' % index)
+        self.channel.queue_declare(queue=self.queue, passive=True)
+        received = list()
+
+        def on_message(channel, method, properties, body):
+            received.append(body)
+            channel.basic_ack(method.delivery_tag)
+            if len(received) == 3:
+                channel.stop_consuming()
+
+        self._consume(on_message)
+        self.assertEqual(received, ['message 0', 'message 1', 'message 2'])
+
+    def test_consume_delivers_properties(self):
+        properties = spec.BasicProperties(content_type='text/plain',
+                                          headers={'attempt': 1})
+        self.channel.basic_publish('', self.queue, 'body', properties)
+        received = list()
+
+        def on_message(channel, method, properties, body):
+            received.append(properties)
+            channel.basic_ack(method.delivery_tag)
+            channel.stop_consuming()
+
+        self._consume(on_message)
+        self.assertEqual((received[0].content_type, received[0].headers),
+                         ('text/plain', {'attempt': 1}))
+
+    def test_basic_get(self):
+        self.channel.basic_publish('', self.queue, 'body')
+        method, header, body = self.channel.basic_get(self.queue)
+        self.channel.basic_ack(method.delivery_tag)
+        self.assertEqual((method.NAME, body), ('Basic.GetOk', 'body'))
+
+    def test_basic_get_empty(self):
+        method, header, body = self.channel.basic_get(self.queue)
+        self.assertIsInstance(method, spec.Basic.GetEmpty)
+
+    def test_publisher_confirms(self):
+        self.channel.confirm_delivery()
+        self.assertTrue(self.channel.basic_publish('', self.queue, 'body'))
+
+    def test_prefetch_limits_unacked_deliveries(self):
+        self.channel.basic_qos(prefetch_count=2)
+        for index in range(5):
+            self.channel.basic_publish('', self.queue, 'message %i' % index)
+        received = list()
+
+        def on_message(channel, method, properties, body):
+            received.append(method.delivery_tag)
+            if len(received) == 2:
+                channel.stop_consuming()
+
+        self._consume(on_message)
+        self.assertEqual(
+            len(self.broker.queues[self.queue].messages), 3)
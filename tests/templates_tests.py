@@ -0,0 +1,77 @@
+"""
+Tests for pika.templates.PropertiesTemplate
+
+"""
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from pika import frame
+from pika import spec
+from pika import templates
+
+
+class PropertiesTemplateTests(unittest.TestCase):
+
+    SHARED = {'content_type': 'application/json',
+              'headers': {'tenant': 'acme', 'version': 2},
+              'delivery_mode': 2,
+              'app_id': 'orders'}
+
+    def setUp(self):
+        self.obj = templates.PropertiesTemplate(
+            spec.BasicProperties(**self.SHARED))
+
+    def _expected(self, **values):
+        values.update(self.SHARED)
+        return ''.join(spec.BasicProperties(**values).encode())
+
+    def test_encodes_like_basic_properties(self):
+        properties = self.obj.properties(correlation_id='c1',
+                                         message_id='m1', timestamp=1000)
+        self.assertEqual(''.join(properties.encode()),
+                         self._expected(correlation_id='c1',
+                                        message_id='m1', timestamp=1000))
+
+    def test_unset_variable_fields(self):
+        self.assertEqual(''.join(self.obj.properties().encode()),
+                         self._expected())
+        self.assertEqual(''.join(self.obj.properties(
+            message_id='m1').encode()), self._expected(message_id='m1'))
+
+    def test_unicode_value(self):
+        properties = self.obj.properties(message_id=u'm\xe9')
+        self.assertEqual(''.join(properties.encode()),
+                         self._expected(message_id=u'm\xe9'))
+
+    def test_other_variable_fields(self):
+        obj = templates.PropertiesTemplate(
+            spec.BasicProperties(**self.SHARED),
+            ('headers', 'priority', 'reply_to'))
+        properties = obj.properties(headers={'a': 'b'}, priority=5,
+                                    reply_to='rq')
+        values = dict(self.SHARED, headers={'a': 'b'}, priority=5,
+                      reply_to='rq')
+        self.assertEqual(''.join(properties.encode()),
+                         ''.join(spec.BasicProperties(**values).encode()))
+
+    def test_shared_fields_read_from_template(self):
+        properties = self.obj.properties(message_id='m1')
+        self.assertEqual(properties.content_type, 'application/json')
+        self.assertEqual(properties.message_id, 'm1')
+        self.assertIsNone(properties.correlation_id)
+        self.assertIsInstance(properties, spec.BasicProperties)
+
+    def test_header_frame(self):
+        properties = self.obj.properties(message_id='m1')
+        self.assertEqual(frame.Header(1, 10, properties).marshal(),
+                         frame.Header(1, 10, spec.BasicProperties(
+                             message_id='m1', **self.SHARED)).marshal())
+
+    def test_field_not_variable(self):
+        self.assertRaises(ValueError, self.obj.properties, app_id='other')
+
+    def test_unknown_field(self):
+        self.assertRaises(ValueError, templates.PropertiesTemplate,
+                          spec.BasicProperties(), ('nope',))
@@ -9,7 +9,7 @@ try:
 except ImportError:
     import unittest
 
-from pika import ConnectionParameters, BaseConnection
+from pika import ConnectionParameters, BaseConnection, SelectConnection
 from pika.exceptions import AMQPConnectionError
 
 
@@ -36,3 +36,84 @@ class ConnectionTests(unittest.TestCase):
         with self.assertRaises(AMQPConnectionError):
             BaseConnection(ConnectionParameters(socket_timeout=2.0))
         settimeout.assert_called_with(2.0)
+
+    def test_parameters_default_endpoints(self):
+        params = ConnectionParameters('rabbit', 5673)
+        self.assertEqual(params.endpoints, [('rabbit', 5673)])
+
+    def test_parameters_endpoints_default_port(self):
+        params = ConnectionParameters(endpoints=['a', ('b', 5673)])
+        self.assertEqual(params.endpoints, [('a', 5672), ('b', 5673)])
+
+    def test_parameters_invalid_endpoints(self):
+        self.assertRaises(TypeError, ConnectionParameters,
+                          endpoints=[('a', '5672')])
+
+    def test_parallel_connect_first_listening_endpoint_wins(self):
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        closed = socket.socket()
+        closed.bind(('127.0.0.1', 0))
+        port = closed.getsockname()[1]
+        closed.close()
+        with patch.object(BaseConnection, '_adapter_connect'):
+            conn = BaseConnection(ConnectionParameters(
+                endpoints=[('127.0.0.1', port),
+                           ('127.0.0.1', listener.getsockname()[1])]))
+        conn._create_and_connect_to_socket()
+        self.assertEqual(conn.endpoint,
+                         ('127.0.0.1', listener.getsockname()[1]))
+        conn.socket.close()
+        listener.close()
+
+    def test_parallel_connect_all_refused(self):
+        ports = list()
+        for i in range(2):
+            closed = socket.socket()
+            closed.bind(('127.0.0.1', 0))
+            ports.append(closed.getsockname()[1])
+            closed.close()
+        with patch.object(BaseConnection, '_adapter_connect'):
+            conn = BaseConnection(ConnectionParameters(
+                endpoints=[('127.0.0.1', port) for port in ports]))
+        self.assertRaises(socket.error, conn._create_and_connect_to_socket)
+
+    def _closed_ports(self, count):
+        ports = list()
+        for i in range(count):
+            closed = socket.socket()
+            closed.bind(('127.0.0.1', 0))
+            ports.append(closed.getsockname()[1])
+            closed.close()
+        return ports
+
+    def test_parallel_connect_on_ioloop(self):
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        endpoints = [('127.0.0.1', self._closed_ports(1)[0]),
+                     ('127.0.0.1', listener.getsockname()[1])]
+        with patch.object(SelectConnection, '_on_connected') as connected:
+            conn = SelectConnection(ConnectionParameters(endpoints=endpoints))
+            self.assertEqual(conn.connection_state, conn.CONNECTION_INIT)
+            timeout = conn.ioloop.add_timeout(5, conn.ioloop.stop)
+            connected.side_effect = lambda: (conn.remove_timeout(timeout),
+                                             conn.ioloop.stop())
+            conn.ioloop.start()
+        self.assertEqual((connected.call_count, conn.endpoint,
+                          conn._pending_connects),
+                         (1, endpoints[1], dict()))
+        conn.ioloop.remove_handler(conn.socket.fileno())
+        conn.socket.close()
+        listener.close()
+
+    def test_parallel_connect_on_ioloop_all_refused(self):
+        endpoints = [('127.0.0.1', port) for port in self._closed_ports(2)]
+        conn = SelectConnection(ConnectionParameters(endpoints=endpoints,
+                                                     connection_attempts=1))
+        timeout = conn.ioloop.add_timeout(5, conn.ioloop.stop)
+        conn.add_on_close_callback(lambda conn: conn.remove_timeout(timeout))
+        conn.ioloop.start()
+        self.assertTrue(conn.is_closed)
+        self.assertIn('Could not connect', conn.closing[1])
@@ -42,6 +42,30 @@ DRIVER_METHODS = {
     "Tx.Rollback": ["Tx.RollbackOk"]
     }
 
+# The shortstr fields that usually carry a new value in every message, which
+# are decoded without going through the data.decode_shortstr cache
+UNIQUE_SHORTSTRS = ('correlation_id', 'message_id')
+
+# The from_bytes of the methods decoded for every delivered or confirmed
+# message, decoding the fixed-size fields together with one precompiled
+# struct instead of going through the generic decode
+SPECIALIZED_FROM_BYTES = {
+    'Basic.Deliver': """\
+            self = cls.__new__(cls)
+            self.consumer_tag, offset = data.decode_shortstr(encoded, offset)
+            self.delivery_tag, bit_buffer = \\
+                _LONGLONG_OCTET.unpack_from(encoded, offset)
+            self.redelivered = (bit_buffer & 1) != 0
+            self.exchange, offset = data.decode_shortstr(encoded, offset + 9)
+            self.routing_key, offset = data.decode_shortstr(encoded, offset)
+            return self""",
+    'Basic.Ack': """\
+            self = cls.__new__(cls)
+            self.delivery_tag, bit_buffer = \\
+                _LONGLONG_OCTET.unpack_from(encoded, offset)
+            self.multiple = (bit_buffer & 1) != 0
+            return self"""}
+
 
 def fieldvalue(v):
     if isinstance(v, unicode):
@@ -87,7 +111,9 @@ def generate(specPath):
 
     def genSingleDecode(prefix, cLvalue, unresolved_domain):
         type = spec.resolveDomain(unresolved_domain)
-        if type == 'shortstr':
+        if type == 'shortstr' and cLvalue[5:] not in UNIQUE_SHORTSTRS:
+            print prefix + "%s, offset = data.decode_shortstr(encoded, offset)" % cLvalue
+        elif type == 'shortstr':
             print prefix + "length = struct.unpack_from('B', encoded, offset)[0]"
             print prefix + "offset += 1"
             print prefix + "%s = encoded[offset:offset + length].decode('utf8')" % cLvalue
@@ -260,6 +286,12 @@ def generate(specPath):
     def fieldDeclList(fields):
         return ''.join([", %s=%s" % (pyize(f.name), fieldvalue(f.defaultvalue)) for f in fields])
 
+    def fieldSlots(fields):
+        names = [repr(pyize(f.name)) for f in fields]
+        if len(names) == 1:
+            return '(%s,)' % names[0]
+        return '(%s)' % ', '.join(names)
+
     def fieldInitList(prefix, fields):
         if fields:
             return ''.join(["%sself.%s = %s\n" % (prefix, pyize(f.name), pyize(f.name)) \
@@ -279,6 +311,8 @@ import struct
 from pika import amqp_object
 from pika import data
 
+# The delivery tag and bit fields of Basic.Deliver and Basic.Ack
+_LONGLONG_OCTET = struct.Struct('>QB')
 """
 
     print "PROTOCOL_VERSION = (%d, %d, %d)" % (spec.major, spec.minor,
@@ -317,6 +351,7 @@ from pika import data
                    m.index,
                    methodid)
             print "        NAME = %s" % (fieldvalue(m.structName(),))
+            print "        __slots__ = %s" % (fieldSlots(m.arguments),)
             print
             print "        def __init__(self%s):" % (fieldDeclList(m.arguments),)
             print fieldInitList('            ', m.arguments)
@@ -324,6 +359,11 @@ from pika import data
             print "        def synchronous(self):"
             print "            return %s" % m.isSynchronous
             print
+            if m.structName() in SPECIALIZED_FROM_BYTES:
+                print "        @classmethod"
+                print "        def from_bytes(cls, encoded, offset=0):"
+                print SPECIALIZED_FROM_BYTES[m.structName()]
+                print
             genDecodeMethodFields(m)
             genEncodeMethodFields(m)
 
@@ -335,6 +375,7 @@ from pika import data
             print "    CLASS = %s" % (camel(c.name),)
             print "    INDEX = 0x%.04X  # %d" % (c.index, c.index)
             print "    NAME = %s" % (fieldvalue(c.structName(),))
+            print "    __slots__ = %s" % (fieldSlots(c.fields),)
             print
 
             index = 0